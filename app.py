@@ -1,15 +1,39 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for, session
 from flask_cors import CORS
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import jwt
-import bcrypt
 import re
 import uuid
 from functools import wraps
 import json
+import base64
+import time
+import hmac
+import ipaddress
+from search_index import PropertySearchIndex
+from cache import TTLCache
+from password_hasher import PasswordHasher, HasherBusy
+from response_cache import create_response_cache
+from ratings import RatingStore, RatingSummary, aggregate_reviews
+from events import EventBroker, BrokerFull, format_sse, parse_event_id
+from recent_views import RecentViews
+from token_revocation import RevocationList, RevocationsUnavailable
+from bookings import BOOKING_SELECT, BOOKING_STATUSES, parse_idempotency_key, serialize_booking, validate_booking
+from availability import AVAILABILITY_SELECT, availability_changes, availability_state, parse_property_ids, property_channel
+from messaging import (
+    CONVERSATION_SELECT, MESSAGE_SELECT, aggregate_conversations, build_message_row, conversation_id,
+    serialize_conversation, serialize_message, user_channel, validate_message
+)
+from repositories import ServiceKeyMissing, create_repositories
+from metrics import Metrics
+from profiling import RequestProfiler
+from json_provider import FastJSONProvider, stream_json
+from compression import choose_encoding, compress, compress_chunks, is_compressible
+from exports import EXPORTS, FORMATS as EXPORT_FORMATS, export_chunks, export_select, keyset_pages
+from property_import import PropertyImporter, build_property_row, detect_format, read_records, validate_property
+from property_views import VIEWS, RATING_FIELDS, needs_admin, parse_fields, select_columns, first_image_only, serialize_property
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +44,66 @@ app = Flask(__name__)
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string')
+app.config['MAX_PER_PAGE'] = int(os.getenv('MAX_PER_PAGE', 100))
+app.config['PROPERTIES_COUNT_METHOD'] = os.getenv('PROPERTIES_COUNT_METHOD', 'exact')
+app.config['DASHBOARD_STATS_RPC'] = os.getenv('DASHBOARD_STATS_RPC', 'False').lower() == 'true'
+app.config['SEARCH_INDEX_REFRESH_SECONDS'] = int(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', 300))
+app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 10000))
+app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 60))
+app.config['JWT_VERIFY_CACHE_SIZE'] = int(os.getenv('JWT_VERIFY_CACHE_SIZE', 10000))
+app.config['JWT_VERIFY_CACHE_TTL'] = int(os.getenv('JWT_VERIFY_CACHE_TTL', 60))  # 0 = decode every request
+app.config['TOKEN_REVOCATION_SYNC_SECONDS'] = float(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', 30))
+app.config['BCRYPT_ROUNDS'] = int(os.getenv('BCRYPT_ROUNDS', 12))
+app.config['BCRYPT_WORKERS'] = int(os.getenv('BCRYPT_WORKERS', 0)) or None  # 0 = one per CPU
+app.config['BCRYPT_MAX_PENDING'] = int(os.getenv('BCRYPT_MAX_PENDING', 32))
+app.config['BCRYPT_TIMEOUT'] = float(os.getenv('BCRYPT_TIMEOUT', 10))
+app.config['BCRYPT_EXECUTOR'] = os.getenv('BCRYPT_EXECUTOR', 'process')
+app.config['RESPONSE_CACHE_BACKEND'] = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')  # memory, sqlite or none
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 60))
+app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+app.config['RESPONSE_CACHE_PATH'] = os.getenv('RESPONSE_CACHE_PATH')
+app.config['RATING_CACHE_TTL'] = int(os.getenv('RATING_CACHE_TTL', 300))
+app.config['REVIEWS_PREVIEW_SIZE'] = int(os.getenv('REVIEWS_PREVIEW_SIZE', 5))
+app.config['DATABASE_BACKEND'] = os.getenv('DATABASE_BACKEND', 'supabase')  # supabase or sqlite
+app.config['SQLITE_DATABASE_PATH'] = os.getenv('SQLITE_DATABASE_PATH', 'easypg.sqlite3')
+app.config['DB_MAX_CONNECTIONS'] = int(os.getenv('DB_MAX_CONNECTIONS', 20))
+app.config['DB_MAX_KEEPALIVE'] = int(os.getenv('DB_MAX_KEEPALIVE', 10))
+app.config['DB_KEEPALIVE_EXPIRY'] = float(os.getenv('DB_KEEPALIVE_EXPIRY', 30))
+app.config['DB_TIMEOUT'] = float(os.getenv('DB_TIMEOUT', 10))
+app.config['DB_FANOUT_WORKERS'] = int(os.getenv('DB_FANOUT_WORKERS', 8))  # 0 = run queries one after another
+app.config['ASGI_MAX_CONCURRENCY'] = int(os.getenv('ASGI_MAX_CONCURRENCY', 256))
+app.config['ASGI_MAX_PENDING'] = int(os.getenv('ASGI_MAX_PENDING', 1024))
+app.config['ASGI_WSGI_THREADS'] = int(os.getenv('ASGI_WSGI_THREADS', 40))
+app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+app.config['IMPORT_MAX_ERRORS'] = int(os.getenv('IMPORT_MAX_ERRORS', 1000))
+app.config['EXPORT_PAGE_SIZE'] = int(os.getenv('EXPORT_PAGE_SIZE', 1000))
+app.config['GEO_DEFAULT_RADIUS_KM'] = float(os.getenv('GEO_DEFAULT_RADIUS_KM', 5))
+app.config['GEO_MAX_RADIUS_KM'] = float(os.getenv('GEO_MAX_RADIUS_KM', 50))
+app.config['PUSH_BACKLOG'] = int(os.getenv('PUSH_BACKLOG', 100))
+app.config['PUSH_MAX_SUBSCRIBERS'] = int(os.getenv('PUSH_MAX_SUBSCRIBERS', 10000))
+app.config['PUSH_HEARTBEAT_SECONDS'] = float(os.getenv('PUSH_HEARTBEAT_SECONDS', 15))
+app.config['LONG_POLL_TIMEOUT'] = float(os.getenv('LONG_POLL_TIMEOUT', 25))
+app.config['AVAILABILITY_MAX_PROPERTIES'] = int(os.getenv('AVAILABILITY_MAX_PROPERTIES', 100))
+app.config['SAVED_PROPERTIES_LIMIT'] = int(os.getenv('SAVED_PROPERTIES_LIMIT', 500))
+app.config['RECENT_VIEWS_SIZE'] = int(os.getenv('RECENT_VIEWS_SIZE', 20))
+app.config['RECENT_VIEWS_FLUSH_SECONDS'] = float(os.getenv('RECENT_VIEWS_FLUSH_SECONDS', 5))
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')  # unset = /metrics only answers loopback clients
+app.config['SERVER_TIMING_HEADER'] = os.getenv('SERVER_TIMING_HEADER', 'True').lower() == 'true'
+app.config['PROFILING_ENABLED'] = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # 0 = only on request (X-Profile)
+app.config['PROFILE_DIRECTORY'] = os.getenv('PROFILE_DIRECTORY', 'profiles')
+app.config['PROFILE_INTERVAL_MS'] = float(os.getenv('PROFILE_INTERVAL_MS', 1))
+app.config['PROFILE_MAX_PROFILES'] = int(os.getenv('PROFILE_MAX_PROFILES', 200))
+app.config['JSON_ENCODER'] = os.getenv('JSON_ENCODER', 'auto')  # auto (orjson if installed), orjson or stdlib
+app.config['JSON_STREAM_MIN_ITEMS'] = int(os.getenv('JSON_STREAM_MIN_ITEMS', 200))
+app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+app.config['COMPRESSION_MIN_BYTES'] = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+app.config['COMPRESSION_GZIP_LEVEL'] = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+# jsonify() and request.get_json() through orjson when it's installed
+app.json = FastJSONProvider(app, app.config['JSON_ENCODER'])
 
 # Initialize CORS
 CORS(app)
@@ -27,12 +111,106 @@ CORS(app)
 # Supabase Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_ANON_KEY')
+# Only for the functions the anon key may not execute (bookings); never for table reads and writes
+SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+# Per-route latency, response sizes and database calls, served on /metrics
+metrics = Metrics()
+
+# Profiles of single requests, for admins (X-Profile) or a sample of traffic; off unless PROFILING_ENABLED
+request_profiler = RequestProfiler(
+    directory=app.config['PROFILE_DIRECTORY'],
+    sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+    interval=app.config['PROFILE_INTERVAL_MS'] / 1000,
+    max_profiles=app.config['PROFILE_MAX_PROFILES']
+)
+
+# Told of every database call: the request metrics and, when on, the profiler
+query_observers = []
+if app.config['METRICS_ENABLED']:
+    query_observers.append(metrics.record_query)
+if app.config['PROFILING_ENABLED']:
+    query_observers.append(request_profiler.record_query)
+
+def observe_query(method, path, prefer, seconds, status):
+    for observer in query_observers:
+        observer(method, path, prefer, seconds, status)
+
+# Table repositories on Supabase, or on a local SQLite file for development and benchmarks
+db = create_repositories(
+    app.config['DATABASE_BACKEND'],
+    supabase_url=SUPABASE_URL,
+    supabase_key=SUPABASE_KEY,
+    service_key=SUPABASE_SERVICE_KEY,
+    sqlite_path=app.config['SQLITE_DATABASE_PATH'],
+    max_connections=app.config['DB_MAX_CONNECTIONS'],
+    max_keepalive=app.config['DB_MAX_KEEPALIVE'],
+    keepalive_expiry=app.config['DB_KEEPALIVE_EXPIRY'],
+    timeout=app.config['DB_TIMEOUT'],
+    fanout_workers=app.config['DB_FANOUT_WORKERS'],
+    on_request=observe_query if query_observers else None
+)
+if app.config['DATABASE_BACKEND'] == 'supabase' and not SUPABASE_SERVICE_KEY:
+    app.logger.warning('SUPABASE_SERVICE_ROLE_KEY is not set: bookings%s will be refused with 503',
+                       ' and /api/dashboard/stats (DASHBOARD_STATS_RPC)' if app.config['DASHBOARD_STATS_RPC'] else '')
+
+# In-process search index, loaded lazily on the first search. Each rebuild
+# publishes the availability changes it finds to the listings' event channels
+search_index = PropertySearchIndex(
+    refresh_seconds=app.config['SEARCH_INDEX_REFRESH_SECONDS'],
+    on_rebuild=lambda previous, current: publish_availability(availability_changes(previous, current))
+)
+
+# Search documents are listing cards plus the text the index matches on
+SEARCH_DOCUMENT_SELECT = select_columns(VIEWS['listing'] + ('landmark', 'description', 'status', 'latitude', 'longitude'))
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase URL and Key must be provided")
+# Authenticated user profiles, keyed by user id
+user_cache = TTLCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Claims of recently verified tokens, keyed by token, so a client's repeated requests skip jwt.decode
+verified_tokens = TTLCache(maxsize=app.config['JWT_VERIFY_CACHE_SIZE'], ttl=app.config['JWT_VERIFY_CACHE_TTL'])
+
+# Ids of logged-out tokens, held in memory and synced from revoked_tokens in the background
+token_revocations = RevocationList(
+    lambda since: load_revoked_tokens(since),
+    lambda jti, user_id, expires_at: db.revoked_tokens.insert({'jti': jti, 'user_id': user_id, 'expires_at': expires_at}),
+    purge=lambda before: db.revoked_tokens.purge_expired(before),
+    sync_seconds=app.config['TOKEN_REVOCATION_SYNC_SECONDS']
+)
+
+# bcrypt runs in its own worker pool so logins can't starve other requests
+password_hasher = PasswordHasher(
+    workers=app.config['BCRYPT_WORKERS'],
+    max_pending=app.config['BCRYPT_MAX_PENDING'],
+    rounds=app.config['BCRYPT_ROUNDS'],
+    timeout=app.config['BCRYPT_TIMEOUT'],
+    executor=app.config['BCRYPT_EXECUTOR']
+)
+
+# Rendered responses of the public property endpoints
+response_cache = create_response_cache(
+    backend=app.config['RESPONSE_CACHE_BACKEND'],
+    ttl=app.config['RESPONSE_CACHE_TTL'],
+    max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES'],
+    path=app.config['RESPONSE_CACHE_PATH']
+)
+
+# Per-property rating summaries, loaded in batches from property_rating_summary
+rating_store = RatingStore(lambda property_ids: load_rating_summaries(property_ids), ttl=app.config['RATING_CACHE_TTL'])
+
+# Push events for SSE streams and long-polls in this process (new messages, read receipts, room availability)
+event_broker = EventBroker(backlog=app.config['PUSH_BACKLOG'], max_subscribers=app.config['PUSH_MAX_SUBSCRIBERS'])
+
+# Each user's recently viewed listings, recorded in memory and written to recently_viewed in batches
+recent_views = RecentViews(
+    lambda user_ids: load_recent_views(user_ids),
+    lambda rows: db.recently_viewed.upsert(rows),
+    size=app.config['RECENT_VIEWS_SIZE'],
+    flush_seconds=app.config['RECENT_VIEWS_FLUSH_SECONDS']
+)
+
+# Columns safe to keep in memory and hand to routes (never password_hash)
+USER_CONTEXT_COLUMNS = 'id, email, full_name, phone, user_type, is_verified'
 
 # Utility Functions
 def validate_email(email):
@@ -44,47 +222,633 @@ def validate_phone(phone):
     return re.match(pattern, phone) is not None
 
 def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with metrics.timed('bcrypt'):
+        return password_hasher.hash(password)
 
 def verify_password(password, hashed):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    with metrics.timed('bcrypt'):
+        return password_hasher.verify(password, hashed)
+
+def busy_response(error):
+    return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
+
+def json_list_response(payload, key, status=200):
+    """jsonify(payload), but streamed a batch at a time when the list payload[key] is long."""
+    if len(payload[key]) < app.config['JSON_STREAM_MIN_ITEMS']:
+        return jsonify(payload), status
+    return app.response_class(stream_json(app.json, payload, key), mimetype=app.json.mimetype), status
 
 def generate_jwt_token(user_id):
     payload = {
         'user_id': user_id,
         'exp': datetime.utcnow() + timedelta(days=7),
-        'iat': datetime.utcnow()
+        'iat': datetime.utcnow(),
+        # Token id, so logging out can revoke this token alone
+        'jti': uuid.uuid4().hex
     }
     return jwt.encode(payload, app.config['JWT_SECRET_KEY'], algorithm='HS256')
 
+def decode_jwt_token(token):
+    """Claims of a valid token that hasn't been revoked, or None.
+
+    Tokens issued before jti was added can't be revoked; they run until they expire.
+    """
+    payload = verified_tokens.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
+        # Never remembered past the token's own expiry
+        verified_tokens.set(token, payload, min(verified_tokens.ttl, payload['exp'] - time.time()))
+    
+    if payload.get('jti') and token_revocations.is_revoked(payload['jti']):
+        return None
+    return payload
+
 def verify_jwt_token(token):
+    payload = decode_jwt_token(token)
+    return payload['user_id'] if payload else None
+
+def load_revoked_tokens(since, batch_size=1000):
+    """Unexpired revocations made at or after since (all of them when None), paged by jti."""
+    rows, last = [], None
+    while True:
+        query = db.revoked_tokens.select('jti, expires_at').gt('expires_at', datetime.utcnow().isoformat())
+        if since:
+            query = query.gte('revoked_at', since)
+        if last is not None:
+            query = query.gt('jti', last)
+        page = query.order('jti').limit(batch_size).execute().data or []
+        rows.extend(page)
+        if len(page) < batch_size:
+            return rows
+        last = page[-1]['jti']
+
+# Pagination helpers
+# Sort keys accepted by list endpoints, mapped to their database column.
+# Prefix a key with '-' for descending order (e.g. sort=-rent).
+PROPERTY_SORT_COLUMNS = {
+    'rent': 'rent_per_month',
+    'created_at': 'created_at',
+    'availability': 'available_rooms'
+}
+
+REVIEW_SORT_COLUMNS = {
+    'created_at': 'created_at',
+    'rating': 'rating'
+}
+
+COUNT_METHODS = ('exact', 'planned', 'estimated')
+
+def parse_sort(sort, columns, default='-created_at'):
+    sort = sort or default
+    desc = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in columns:
+        return None, None
+    return columns[key], desc
+
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
     try:
-        payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-        return payload['user_id']
-    except jwt.ExpiredSignatureError:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return sort_value, row_id
+    except (ValueError, TypeError):
         return None
-    except jwt.InvalidTokenError:
+
+def quote_filter_value(value):
+    # PostgREST needs reserved characters in logical filters double-quoted
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def apply_or_filter(query, expression):
+    # postgrest-py only grew or_() in later releases
+    if hasattr(query, 'or_'):
+        return query.or_(expression)
+    query.params = query.params.add('or', f'({expression})')
+    return query
+
+def apply_sort(query, column, desc, foreign_table=None, tiebreaker='id'):
+    # A single order param with id as tie-breaker, so pages never overlap
+    direction = '.desc' if desc else ''
+    key = f'{foreign_table}.order' if foreign_table else 'order'
+    query.params = query.params.add(key, f'{column}{direction},{tiebreaker}{direction}')
+    return query
+
+def apply_keyset(query, column, desc, cursor, tiebreaker='id'):
+    """Restrict query to rows strictly after cursor in (column, tiebreaker) order."""
+    sort_value, row_id = cursor
+    op = 'lt' if desc else 'gt'
+    value = quote_filter_value(sort_value)
+    expression = f'{column}.{op}.{value},and({column}.eq.{value},{tiebreaker}.{op}.{quote_filter_value(row_id)})'
+    return apply_or_filter(query, expression)
+
+def select_properties(fields, required=('id',), count=None, repos=None):
+    """properties query selecting only the columns and embeds fields need.
+
+    repos defaults to db; the ASGI app passes its async repositories.
+    """
+    columns = select_columns(fields, required)
+    if 'reviews' in fields:
+        columns += f', reviews({REVIEW_SELECT})'
+    query = (repos or db).properties.select(columns, count=count)
+
+    if first_image_only(fields):
+        query = query.order('image_order', foreign_table='property_images').limit(1, foreign_table='property_images')
+
+    if 'reviews' in fields:
+        # Only the newest reviews; the rest are paged through /api/properties/<id>/reviews
+        query = apply_sort(query, 'created_at', True, foreign_table='reviews')
+        query = query.limit(app.config['REVIEWS_PREVIEW_SIZE'] + 1, foreign_table='reviews')
+    return query
+
+def resolve_fields(default, exclude=()):
+    """Parse ?fields= for this request. Returns (fields, error response)."""
+    value = request.args.get('fields')
+    fields, error = parse_fields(value, default, exclude)
+    if error:
+        return None, (jsonify({'error': error}), 400)
+
+    if needs_admin(value):
+        user = get_request_user()
+        if not user or user['user_type'] != 'admin':
+            return None, (jsonify({'error': 'Admin access required'}), 403)
+    return fields, None
+
+def serialize_property_summary(prop):
+    """Listing card shape shared by /api/properties and /api/search."""
+    return serialize_property(prop, VIEWS['listing'])
+
+# Search helpers
+# Fields kept in the index for matching but left out of search responses
+SEARCH_INDEX_ONLY_FIELDS = ('description', 'status', 'latitude', 'longitude')
+
+SEARCH_SORTS = ('relevance', 'rent', '-rent', 'availability', '-availability', 'created_at', '-created_at')
+# Sorts for ?near= searches on /api/properties, ordered by the index
+NEARBY_SORTS = ('distance', 'rent', '-rent', 'availability', '-availability', 'created_at', '-created_at')
+
+def parse_near(near, radius_km):
+    """Parse ?near=lat,lng and ?radius_km=. Returns ((lat, lng, radius_km), error response)."""
+    try:
+        latitude, longitude = (float(part) for part in near.split(','))
+        radius = float(radius_km) if radius_km else app.config['GEO_DEFAULT_RADIUS_KM']
+    except ValueError:
+        return None, (jsonify({'error': 'near must be latitude,longitude and radius_km a number'}), 400)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None, (jsonify({'error': 'near is not a valid latitude,longitude'}), 400)
+    if not 0 < radius <= app.config['GEO_MAX_RADIUS_KM']:
+        return None, (jsonify({'error': f"radius_km must be more than 0 and at most {app.config['GEO_MAX_RADIUS_KM']:g}"}), 400)
+    return (latitude, longitude, radius), None
+
+# Review helpers
+REVIEW_SELECT = 'id, rating, review_title, review_text, created_at, users!reviews_student_id_fkey(full_name)'
+
+def serialize_review(review):
+    return {
+        'id': review['id'],
+        'rating': review['rating'],
+        'review_title': review.get('review_title') or '',
+        'review_text': review.get('review_text') or '',
+        'student_name': review['users']['full_name'] if review.get('users') else 'Anonymous',
+        'created_at': review['created_at']
+    }
+
+def review_page(rows, per_page, sort_column):
+    """Trim a per_page + 1 fetch and build the cursor for the next page."""
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1][sort_column], rows[-1]['id']) if has_next else None
+    return [serialize_review(review) for review in rows], has_next, next_cursor
+
+def search_document(prop):
+    doc = serialize_property_summary(prop)
+    doc['landmark'] = prop.get('landmark') or ''
+    doc['description'] = prop.get('description') or ''
+    doc['status'] = prop.get('status', 'pending')
+    doc['latitude'] = prop.get('latitude')
+    doc['longitude'] = prop.get('longitude')
+    return doc
+
+def load_search_documents(batch_size=1000):
+    """Stream approved listings from the database in id order, one batch at a time."""
+    pages = keyset_pages(lambda: db.properties.select(SEARCH_DOCUMENT_SELECT).eq('status', 'approved'), batch_size)
+    for rows in pages:
+        for prop in rows:
+            yield search_document(prop)
+
+# Rating helpers
+RATING_SUMMARY_COLUMNS = 'property_id, rating_1, rating_2, rating_3, rating_4, rating_5'
+
+def rating_summaries_query(repos, property_ids):
+    return repos.rating_summaries.select(RATING_SUMMARY_COLUMNS).in_('property_id', property_ids)
+
+def rating_summaries_from_rows(rows):
+    return {row['property_id']: RatingSummary.from_row(row) for row in rows or []}
+
+def load_rating_summaries(property_ids):
+    return rating_summaries_from_rows(rating_summaries_query(db, property_ids).execute().data)
+
+def attach_ratings(property_list, fields=('rating', 'review_count'), summaries=None):
+    """Fill the requested rating fields of serialized properties with one batched lookup.
+
+    summaries may be passed in when they were fetched alongside the properties.
+    """
+    fields = [field for field in fields if field in RATING_FIELDS]
+    if not property_list or not fields:
+        return property_list
+    if summaries is None:
+        summaries = rating_store.get_many([prop['id'] for prop in property_list])
+    for prop in property_list:
+        summary = summaries[prop['id']].to_dict()
+        values = {'rating': summary['rating'], 'review_count': summary['review_count'], 'rating_histogram': summary['histogram']}
+        for field in fields:
+            prop[field] = values[field]
+    return property_list
+
+def rebuild_rating_summaries(batch_size=1000):
+    """Recompute every property's summary from the reviews table."""
+    # Page through reviews in id order, keeping only the two columns we need
+    reviews = []
+    last_id = None
+    while True:
+        query = db.reviews.select('id, property_id, rating')
+        if last_id:
+            query = query.gt('id', last_id)
+        rows = query.order('id').limit(batch_size).execute().data or []
+        reviews.extend(rows)
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1]['id']
+
+    summaries = aggregate_reviews(reviews)
+    rows = [summary.to_row(property_id) for property_id, summary in summaries.items()]
+    for i in range(0, len(rows), batch_size):
+        db.rating_summaries.upsert(rows[i:i + batch_size])
+
+    # Properties whose reviews were all removed
+    existing = db.rating_summaries.select('property_id').execute().data or []
+    stale = [row['property_id'] for row in existing if row['property_id'] not in summaries]
+    for i in range(0, len(stale), batch_size):
+        db.rating_summaries.delete_many(stale[i:i + batch_size])
+
+    rating_store.clear()
+    invalidate_property_responses()
+    return len(reviews), len(summaries)
+
+@app.cli.command('rebuild-ratings')
+def rebuild_ratings_command():
+    """Recompute property_rating_summary from the reviews table."""
+    review_count, property_count = rebuild_rating_summaries()
+    print(f'Rebuilt rating summaries for {property_count} properties from {review_count} reviews')
+
+# Messaging helpers
+def unread_total_query(repos, user_id):
+    return repos.unread_counts.select('unread_count').eq('user_id', user_id)
+
+def unread_total(result):
+    return result.data[0]['unread_count'] if result.data else 0
+
+def conversations_query(repos, user_id):
+    """Validate this request's inbox parameters and build its query.
+
+    Returns (query, per_page, error response).
+    """
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), app.config['MAX_PER_PAGE'])
+    
+    # Most recently active first; conversation_id breaks ties between equal timestamps
+    query = repos.conversations.select(CONVERSATION_SELECT).eq('user_id', user_id)
+    if request.args.get('unread', 'false').lower() == 'true':
+        query = query.gt('unread_count', 0)
+    query = apply_sort(query, 'last_message_at', True, tiebreaker='conversation_id')
+    
+    cursor_param = request.args.get('cursor')
+    if cursor_param:
+        cursor = decode_cursor(cursor_param)
+        if not cursor:
+            return None, None, (jsonify({'error': 'Invalid cursor'}), 400)
+        query = apply_keyset(query, 'last_message_at', True, cursor, tiebreaker='conversation_id')
+    return query.limit(per_page + 1), per_page, None
+
+def conversations_response(rows, per_page, unread):
+    rows = rows or []
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1]['last_message_at'], rows[-1]['conversation_id']) if has_next else None
+    return jsonify({
+        'conversations': [serialize_conversation(row) for row in rows],
+        'unread_total': unread,
+        'pagination': {
+            'per_page': per_page,
+            'has_next': has_next,
+            'next_cursor': next_cursor
+        }
+    }), 200
+
+def poll_timeout():
+    timeout = request.args.get('timeout', app.config['LONG_POLL_TIMEOUT'], type=float)
+    return min(max(timeout, 0), app.config['LONG_POLL_TIMEOUT'])
+
+def poll_response(subscription, after, events, unread):
+    """Long-poll body: the events, the id to pass as ?after= next time, and the unread total."""
+    last_event_id = events[-1].id if events else (after if after is not None else subscription.start_id)
+    return jsonify({
+        'events': [event.to_dict() for event in events],
+        'last_event_id': str(last_event_id),
+        'unread_total': unread
+    }), 200
+
+def event_stream_headers():
+    # Proxies must pass each event through as it's written
+    return {'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+
+def rebuild_conversations(batch_size=1000):
+    """Fill in missing conversation ids and recompute conversations and unread counts from the messages table."""
+    # Messages sent before conversation ids existed, updated one sender/receiver/property at a time
+    legacy = set()
+    for rows in keyset_pages(lambda: db.messages.select('id, sender_id, receiver_id, property_id').is_('conversation_id', 'null'), batch_size):
+        legacy.update((row['sender_id'], row['receiver_id'], row['property_id']) for row in rows)
+    for sender_id, receiver_id, property_id in legacy:
+        db.messages.assign_conversation(sender_id, receiver_id, property_id, conversation_id(sender_id, receiver_id, property_id))
+    
+    columns = 'id, conversation_id, sender_id, receiver_id, property_id, message_text, is_read, created_at'
+    messages = (message for rows in keyset_pages(lambda: db.messages.select(columns), batch_size) for message in rows)
+    conversations, unread = aggregate_conversations(messages)
+    
+    rows = list(conversations.values())
+    for i in range(0, len(rows), batch_size):
+        db.conversations.upsert(rows[i:i + batch_size], on_conflict='user_id,conversation_id')
+    
+    # Users whose unread messages are all gone keep a row, at zero
+    existing = db.unread_counts.select('user_id').execute().data or []
+    counts = [{'user_id': user_id, 'unread_count': n} for user_id, n in unread.items()]
+    counts += [{'user_id': row['user_id'], 'unread_count': 0} for row in existing if row['user_id'] not in unread]
+    for i in range(0, len(counts), batch_size):
+        db.unread_counts.upsert(counts[i:i + batch_size])
+    
+    # Conversations whose messages were all deleted
+    existing = db.conversations.select('conversation_id').execute().data or []
+    stale = list({row['conversation_id'] for row in existing} - {cid for _, cid in conversations})
+    for i in range(0, len(stale), batch_size):
+        db.conversations.delete_many(stale[i:i + batch_size])
+    return len(legacy), len(conversations)
+
+@app.cli.command('rebuild-conversations')
+def rebuild_conversations_command():
+    """Recompute conversations and inbox_unread_counts from the messages table."""
+    legacy_count, conversation_count = rebuild_conversations()
+    print(f'Rebuilt {conversation_count} conversation rows ({legacy_count} sender/receiver pairs given conversation ids)')
+
+# Availability helpers
+def publish_availability(states):
+    for state in states:
+        event_broker.publish(property_channel(state['property_id']), 'availability', state)
+
+def availability_stream_ids():
+    """Property ids this availability stream follows. Returns (ids, error response)."""
+    ids, error = parse_property_ids(request.args.get('ids'), app.config['AVAILABILITY_MAX_PROPERTIES'])
+    if error:
+        return None, (jsonify({'error': error}), 400)
+    return ids, None
+
+def availability_snapshot_query(repos, property_ids):
+    return repos.properties.select(AVAILABILITY_SELECT).in_('id', property_ids)
+
+def availability_resume(subscription, after):
+    """Whether a stream starts with a snapshot, and the queued events to send after it.
+
+    New clients, and clients that missed events no longer kept, get the
+    current state of every listing instead of a reset.
+    """
+    events = subscription.drain()
+    reset = any(event.type == 'reset' for event in events)
+    return after is None or reset, [event for event in events if event.type != 'reset']
+
+def availability_snapshot(subscription, rows):
+    # Tagged with the id current when subscribing, so a reconnect resumes from there
+    states = [availability_state(row) for row in rows or []]
+    return format_sse('snapshot', {'properties': states}, subscription.start_id)
+
+# Saved property helpers
+# Orders GET /api/saved offers, as (key, descending); ties go to the most recently saved
+SAVED_SORTS = {
+    'recent': ('saved_at', True),
+    'price_low': ('rent_per_month', False),
+    'price_high': ('rent_per_month', True),
+    'rating': ('rating', True)
+}
+
+def saved_count_query(repos, student_id):
+    return repos.saved_counts.select('saved_count').eq('student_id', student_id)
+
+def saved_count(result):
+    return result.data[0]['saved_count'] if result.data else 0
+
+def sort_saved(entries, sort):
+    """Order entries (dicts with saved_at, rent_per_month and rating) in place; missing values go last."""
+    key, desc = SAVED_SORTS[sort]
+    # Stable sorts: most recently saved first, then by the requested key
+    entries.sort(key=lambda entry: entry['saved_at'] or '', reverse=True)
+    if key != 'saved_at':
+        if desc:
+            entries.sort(key=lambda entry: (entry[key] is not None, entry[key] or 0), reverse=True)
+        else:
+            entries.sort(key=lambda entry: (entry[key] is None, entry[key] or 0))
+    return entries
+
+# User context helpers
+def user_context_query(repos, user_id):
+    return repos.users.select(USER_CONTEXT_COLUMNS).eq('id', user_id)
+
+def fetch_user_context(user_id):
+    return db.users.get(user_id, USER_CONTEXT_COLUMNS)
+
+def get_user_context(user_id):
+    return user_cache.get_or_load(user_id, lambda: fetch_user_context(user_id))
+
+def invalidate_user_context(user_id):
+    user_cache.pop(user_id)
+
+def get_request_user():
+    """User for an optional Authorization header on a public route, or None."""
+    token = request.headers.get('Authorization', '')
+    if token.startswith('Bearer '):
+        token = token[7:]
+    try:
+        user_id = verify_jwt_token(token) if token else None
+    except RevocationsUnavailable:
+        # Can't tell whether the token was revoked, so treat the request as anonymous
         return None
+    return get_user_context(user_id) if user_id else None
+
+def request_user_id(allow_query_token=False):
+    """User id from this request's bearer token. Returns (user_id, error response).
+
+    allow_query_token also accepts ?access_token=, for clients such as
+    EventSource that can't set headers.
+    """
+    token = request.headers.get('Authorization')
+    if not token and allow_query_token:
+        token = request.args.get('access_token')
+    if not token:
+        return None, (jsonify({'error': 'No token provided'}), 401)
+    
+    if token.startswith('Bearer '):
+        token = token[7:]
+    
+    try:
+        user_id = verify_jwt_token(token)
+    except RevocationsUnavailable as e:
+        return None, busy_response(e)
+    if not user_id:
+        return None, (jsonify({'error': 'Invalid or expired token'}), 401)
+    return user_id, None
 
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'error': 'No token provided'}), 401
-        
-        if token.startswith('Bearer '):
-            token = token[7:]
-        
-        user_id = verify_jwt_token(token)
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
+        user_id, error = request_user_id()
+        if error:
+            return error
         
+        user = get_user_context(user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
         request.current_user_id = user_id
+        request.current_user = user
         return f(*args, **kwargs)
     
     return decorated_function
 
+def cached_response(tags):
+    """Serve a GET route from response_cache with ETag/Last-Modified validation.
+
+    tags(**view_args) names what the response depends on, so writes can drop
+    it with response_cache.invalidate(...).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Authenticated requests may see more (e.g. admin-only fields), so never share them
+            if not response_cache.enabled or request.headers.get('Authorization'):
+                return f(*args, **kwargs)
+
+            key = response_cache_key()
+            entry = response_cache.get(key)
+            status = 'HIT'
+
+            if entry is None:
+                status = 'MISS'
+                response = app.make_response(f(*args, **kwargs))
+                # Only successful responses are worth keeping
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.set(key, response.get_data(), response.mimetype, tags(**kwargs))
+
+            return cached_entry_response(entry, status)
+
+        return decorated_function
+    return decorator
+
+def response_cache_key():
+    # Same query in any parameter order shares one entry
+    return request.path + '?' + '&'.join(sorted(f'{k}={v}' for k, v in request.args.items(multi=True)))
+
+def cached_entry_response(entry, status):
+    """Response for a response_cache entry, answering If-None-Match/If-Modified-Since."""
+    response = app.response_class(entry.body, mimetype=entry.content_type)
+    response.set_etag(entry.etag)
+    response.last_modified = datetime.utcfromtimestamp(int(entry.created_at))
+    response.headers['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    response.headers['X-Cache'] = status
+    return response.make_conditional(request)
+
+def invalidate_property_responses(property_id=None):
+    """Drop cached listings, plus the detail page of property_id if given."""
+    tags = ['properties']
+    if property_id:
+        tags.append(f'property:{property_id}')
+    response_cache.invalidate(*tags)
+
+def admin_required(f):
+    @wraps(f)
+    @jwt_required
+    def decorated_function(*args, **kwargs):
+        if request.current_user['user_type'] != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+def profile_trigger():
+    """Why to profile this request: 'header' (an admin sent X-Profile), 'sample', or None."""
+    if request.headers.get('X-Profile'):
+        user_id, error = request_user_id()
+        user = None if error else get_user_context(user_id)
+        if user and user['user_type'] == 'admin':
+            return 'header'
+    return 'sample' if request_profiler.sampled() else None
+
+# Revoked token ids load when the server starts (run.py, asgi.py's startup); under
+# any other WSGI server (gunicorn app:app), on each process's first request
+@app.before_request
+def start_token_revocations():
+    token_revocations.start()
+
+# Request metrics
+@app.before_request
+def start_request_metrics():
+    if app.config['METRICS_ENABLED']:
+        metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed bodies (SSE, exports, static files) are timed to their headers and have no size yet
+    size = None if response.is_streamed else response.content_length
+    route = request.url_rule.rule if request.url_rule else None
+    timing = metrics.finish_request(route, request.method, response.status_code, size)
+    if timing and app.config['SERVER_TIMING_HEADER']:
+        response.headers['Server-Timing'] = timing
+    return response
+
+# Response compression. Registered after the metrics hook so it runs first,
+# and the metrics see the bytes actually sent
+@app.after_request
+def compress_response(response):
+    if not app.config['COMPRESSION_ENABLED'] or not is_compressible(response.mimetype) or response.direct_passthrough:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 206, 304) or request.method == 'HEAD'
+            or 'Content-Encoding' in response.headers):
+        return response
+    if not response.is_streamed and (response.content_length or 0) < app.config['COMPRESSION_MIN_BYTES']:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    levels = (app.config['COMPRESSION_GZIP_LEVEL'], app.config['COMPRESSION_BROTLI_QUALITY'])
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding, *levels)
+        response.headers.pop('Content-Length', None)
+    else:
+        with metrics.timed('compress'):
+            response.set_data(compress(response.get_data(), encoding, *levels))
+    response.headers['Content-Encoding'] = encoding
+
+    # The compressed bytes differ, so the validator can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 # Routes - Static Pages
 @app.route('/')
 def index():
@@ -151,8 +915,7 @@ def register():
             return jsonify({'error': 'Invalid user type'}), 400
         
         # Check if user already exists
-        existing_user = supabase.table('users').select('*').eq('email', data['email']).execute()
-        if existing_user.data:
+        if db.users.get_by_email(data['email'], 'id'):
             return jsonify({'error': 'Email already registered'}), 400
         
         # Hash password
@@ -171,11 +934,11 @@ def register():
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        # Insert user into Supabase
-        result = supabase.table('users').insert(user_data).execute()
+        # Insert user into the database
+        created = db.users.insert(user_data)
         
-        if result.data:
-            user = result.data[0]
+        if created:
+            user = created[0]
             return jsonify({
                 'message': 'User registered successfully',
                 'user': {
@@ -187,7 +950,9 @@ def register():
             }), 201
         else:
             return jsonify({'error': 'Failed to create user'}), 500
-        
+
+    except HasherBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -200,14 +965,12 @@ def login():
         if not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Email and password are required'}), 400
         
-        # Find user in Supabase
-        result = supabase.table('users').select('*').eq('email', data['email']).execute()
+        # Find user in the database
+        user = db.users.get_by_email(data['email'], f'{USER_CONTEXT_COLUMNS}, password_hash')
         
-        if not result.data:
+        if not user:
             return jsonify({'error': 'Invalid email or password'}), 401
         
-        user = result.data[0]
-        
         # Verify password
         if not verify_password(data['password'], user['password_hash']):
             return jsonify({'error': 'Invalid email or password'}), 401
@@ -218,6 +981,9 @@ def login():
         
         # Generate JWT token
         access_token = generate_jwt_token(user['id'])
+
+        # Warm the user cache for the requests that follow the login
+        user_cache.set(user['id'], {key: value for key, value in user.items() if key != 'password_hash'})
         
         return jsonify({
             'message': 'Login successful',
@@ -231,7 +997,9 @@ def login():
                 'is_verified': user['is_verified']
             }
         }), 200
-        
+
+    except HasherBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -239,18 +1007,60 @@ def login():
 @jwt_required
 def verify_token():
     try:
-        user_id = request.current_user_id
+        return verify_token_response(request.current_user)
         
-        # Get user from Supabase
-        result = supabase.table('users').select('*').eq('id', user_id).execute()
-        
-        if not result.data:
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def verify_token_response(user):
+    return jsonify({
+        'message': 'Token is valid',
+        'user': {
+            'id': user['id'],
+            'email': user['email'],
+            'full_name': user['full_name'],
+            'phone': user['phone'],
+            'user_type': user['user_type'],
+            'is_verified': user['is_verified']
+        }
+    }), 200
+
+@app.route('/api/auth/profile', methods=['PUT'])
+@jwt_required
+def update_profile():
+    try:
+        user_id = request.current_user_id
+        data = request.get_json() or {}
+
+        # Only these fields can be edited from the profile page
+        updates = {}
+        if 'full_name' in data:
+            if not data['full_name']:
+                return jsonify({'error': 'full_name is required'}), 400
+            updates['full_name'] = data['full_name']
+
+        if 'phone' in data:
+            if not validate_phone(data['phone']):
+                return jsonify({'error': 'Invalid phone number format'}), 400
+            updates['phone'] = data['phone']
+
+        if not updates:
+            return jsonify({'error': 'Nothing to update'}), 400
+
+        updates['updated_at'] = datetime.utcnow().isoformat()
+
+        updated = db.users.update(user_id, updates)
+
+        # Drop the cached profile so the next request sees the change
+        invalidate_user_context(user_id)
+
+        if not updated:
             return jsonify({'error': 'User not found'}), 404
-        
-        user = result.data[0]
-        
+
+        user = updated[0]
+
         return jsonify({
-            'message': 'Token is valid',
+            'message': 'Profile updated successfully',
             'user': {
                 'id': user['id'],
                 'email': user['email'],
@@ -260,23 +1070,96 @@ def verify_token():
                 'is_verified': user['is_verified']
             }
         }), 200
-        
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/auth/logout', methods=['POST'])
 @jwt_required
 def logout():
-    # In a real application, you might want to blacklist the token
-    return jsonify({'message': 'Logged out successfully'}), 200
+    try:
+        token = request.headers.get('Authorization', '')
+        if token.startswith('Bearer '):
+            token = token[7:]
+        
+        # Refused from now on here, and by other workers once they next sync
+        payload = decode_jwt_token(token)
+        if payload and payload.get('jti'):
+            token_revocations.revoke(payload['jti'], request.current_user_id, payload['exp'])
+            verified_tokens.pop(token)
+        
+        return jsonify({'message': 'Logged out successfully'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API Routes - Search
+@app.route('/api/search', methods=['GET'])
+def search():
+    try:
+        search_index.refresh_if_stale(load_search_documents)
+
+        # Get query parameters
+        query = request.args.get('q', '').strip()
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), app.config['MAX_PER_PAGE'])
+
+        near = None
+        if request.args.get('near'):
+            near, error = parse_near(request.args['near'], request.args.get('radius_km'))
+            if error:
+                return error
+
+        sort = request.args.get('sort', 'relevance')
+        sorts = SEARCH_SORTS + (('distance',) if near else ())
+        if sort not in sorts:
+            return jsonify({'error': f"sort must be one of: {', '.join(sorts)}"}), 400
+
+        # Amenities may be repeated (?amenities=wifi&amenities=meals) or comma separated
+        amenities = []
+        for value in request.args.getlist('amenities'):
+            amenities.extend(a for a in value.split(',') if a)
+
+        filters = {
+            'city': request.args.get('city'),
+            'property_type': request.args.get('property_type'),
+            'gender_preference': request.args.get('gender_preference'),
+            'amenities': amenities,
+            'min_rent': request.args.get('min_rent', type=float),
+            'max_rent': request.args.get('max_rent', type=float),
+            'min_rooms': request.args.get('min_rooms', type=int)
+        }
+
+        docs, total, facets = search_index.search(
+            query=query,
+            filters=filters,
+            sort=sort,
+            offset=(page - 1) * per_page,
+            limit=per_page,
+            near=near
+        )
+
+        property_list = [
+            {key: value for key, value in doc.items() if key not in SEARCH_INDEX_ONLY_FIELDS}
+            for doc in docs
+        ]
+        attach_ratings(property_list)
+
+        return jsonify({
+            'properties': property_list,
+            'facets': facets,
+            'pagination': {
+                'page': page,
+                'pages': (total + per_page - 1) // per_page,
+                'per_page': per_page,
+                'total': total,
+                'has_next': page * per_page < total,
+                'has_prev': page > 1
+            }
+        }), 200
 
-# API Routes - Search 
-# @app.route('api/search', methods=['GET'])
-# def search():
-#     try:
-#         pass
-#     except Exception as e:
-#         pass
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 # API Routes - Dashboard
 @app.route('/api/dashboard/stats', methods=['GET'])
@@ -284,263 +1167,379 @@ def logout():
 def get_dashboard_stats():
     try:
         user_id = request.current_user_id
-        
-        # Get user info
-        user_result = supabase.table('users').select('*').eq('id', user_id).execute()
-        if not user_result.data:
-            return jsonify({'error': 'User not found'}), 404
-        
-        user = user_result.data[0]
+        user = request.current_user
         user_type = request.args.get('type', user['user_type'])
         
-        if user_type == 'student':
-            # Student stats
-            saved_pgs = 12  # Placeholder - implement saved PGs functionality
-            
-            # Get applications count
-            applications_result = supabase.table('bookings').select('*').eq('student_id', user_id).execute()
-            applications = len(applications_result.data) if applications_result.data else 0
-            
-            visits = 3  # Placeholder - implement visits functionality
-            
-            # Get messages count
-            messages_result = supabase.table('messages').select('*').eq('receiver_id', user_id).execute()
-            messages = len(messages_result.data) if messages_result.data else 0
-            
-            stats = {
-                'saved_pgs': saved_pgs,
-                'applications': applications,
-                'visits': visits,
-                'messages': messages
-            }
-        else:
-            # Owner stats
-            properties_result = supabase.table('properties').select('*').eq('owner_id', user_id).execute()
-            total_properties = len(properties_result.data) if properties_result.data else 0
-            
-            # Calculate occupied rooms
-            occupied_rooms = 0
-            monthly_revenue = 0
-            if properties_result.data:
-                for prop in properties_result.data:
-                    occupied_rooms += (prop['total_rooms'] - prop['available_rooms'])
-                    
-                    # Get bookings for this property
-                    bookings_result = supabase.table('bookings').select('*').eq('property_id', prop['id']).eq('status', 'confirmed').execute()
-                    if bookings_result.data:
-                        for booking in bookings_result.data:
-                            monthly_revenue += booking['monthly_rent']
-            
-            # Get inquiries count
-            inquiries_result = supabase.table('messages').select('*').eq('receiver_id', user_id).execute()
-            inquiries = len(inquiries_result.data) if inquiries_result.data else 0
-            
-            stats = {
-                'total_properties': total_properties,
-                'occupied_rooms': occupied_rooms,
-                'monthly_revenue': monthly_revenue,
-                'inquiries': inquiries
-            }
+        # Independent queries issued together: the request waits for the slowest one
+        results = db.gather(*dashboard_stats_queries(db, user_id, user_type))
         
-        return jsonify({'stats': stats}), 200
+        return jsonify({'stats': dashboard_stats(user_type, results)}), 200
         
+    except ServiceKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def dashboard_stats_queries(repos, user_id, user_type):
+    """Queries behind /api/dashboard/stats; none depends on another's result."""
+    if user_type == 'student':
+        if app.config['DASHBOARD_STATS_RPC']:
+            # One round-trip: counts are aggregated inside Postgres
+            return [repos.service_rpc('student_dashboard_stats', {'student_uuid': user_id})]
+        # Count-only queries, no rows cross the wire
+        return [
+            repos.bookings.count_query(student_id=user_id),
+            repos.messages.count_query(receiver_id=user_id),
+            saved_count_query(repos, user_id)
+        ]
+    
+    if app.config['DASHBOARD_STATS_RPC']:
+        return [repos.service_rpc('owner_dashboard_stats', {'owner_uuid': user_id})]
+    # Bookings join properties (!inner) so they don't wait for the property ids
+    return [
+        repos.properties.select('id, total_rooms, available_rooms').eq('owner_id', user_id),
+        repos.bookings.select('monthly_rent, properties!inner(owner_id)').eq('properties.owner_id', user_id).eq('status', 'confirmed'),
+        repos.messages.count_query(receiver_id=user_id)
+    ]
+
+def dashboard_stats(user_type, results):
+    """Build the stats dict from the results of dashboard_stats_queries(), in order."""
+    if user_type == 'student':
+        visits = 3  # Placeholder - implement visits functionality
+        
+        if app.config['DASHBOARD_STATS_RPC']:
+            row = results[0].data[0]
+            applications = row['applications']
+            messages = row['messages']
+            saved_pgs = row['saved_pgs']
+        else:
+            applications = results[0].count or 0
+            messages = results[1].count or 0
+            saved_pgs = saved_count(results[2])
+        
+        return {
+            'saved_pgs': saved_pgs,
+            'applications': applications,
+            'visits': visits,
+            'messages': messages
+        }
+    
+    # Owner stats
+    if app.config['DASHBOARD_STATS_RPC']:
+        row = results[0].data[0]
+        total_properties = row['total_properties']
+        occupied_rooms = row['occupied_rooms']
+        monthly_revenue = row['monthly_revenue']
+        inquiries = row['inquiries']
+    else:
+        properties_result, bookings_result, inquiries_result = results
+        properties = properties_result.data or []
+        total_properties = len(properties)
+        
+        # Calculate occupied rooms
+        occupied_rooms = sum(prop['total_rooms'] - prop['available_rooms'] for prop in properties)
+        
+        # Confirmed bookings for all of the owner's properties
+        monthly_revenue = sum(booking['monthly_rent'] for booking in bookings_result.data or [])
+        inquiries = inquiries_result.count or 0
+    
+    return {
+        'total_properties': total_properties,
+        'occupied_rooms': occupied_rooms,
+        'monthly_revenue': monthly_revenue,
+        'inquiries': inquiries
+    }
+
 @app.route('/api/dashboard/recent-pgs', methods=['GET'])
 @jwt_required
 def get_recent_pgs():
     try:
-        # For demo purposes, return sample data
-        # In a real app, you'd track user's recently viewed PGs
-        recent_pgs = [
-            {
-                'id': '1',
-                'name': 'Vedaditya Boys Hostel',
-                'location': 'Kankot Rd, Near Government Engineering Collage, Rajkot',
-                'price': 6500,
-                'rating': 4.5,
-                'reviews': 124,
-                'status': 'Available',
-                'image': '/static/images/pg1.jpg'
-            },
-            {
-                'id': '2',
-                'name': 'Param Boys Hostel',
-                'location': 'Kankot Rd, Near Labhubhai Trivedi Engineering Collage, Rajkot',
-                'price': 8200,
-                'rating': 4.3,
-                'reviews': 89,
-                'status': 'Applied',
-                'image': '/static/images/pg2.jpg'
-            },
-            {
-                'id': '3',
-                'name': 'J. K. Boys Hostel',
-                'location': 'Kankot Rd, Near Government Engineering Collage, Rajkot',
-                'price': 7800,
-                'rating': 4.1,
-                'reviews': 156,
-                'status': 'Saved',
-                'image': '/static/images/pg3.jpg'
-            }
-        ]
+        limit = min(max(request.args.get('limit', 6, type=int), 1), app.config['RECENT_VIEWS_SIZE'])
+        
+        # Newest first, from the in-memory buffer (read from recently_viewed once per user)
+        property_ids = recent_views.recent(request.current_user_id)
+        if not property_ids:
+            return jsonify({'items': []}), 200
+        
+        # Every card in one query, with the rating summaries alongside
+        query = select_properties(RECENT_PG_FIELDS).in_('id', property_ids).eq('status', 'approved')
+        result, summaries = db.gather(query, lambda: rating_store.get_many(property_ids))
+        
+        # Keep the viewing order; listings deleted or withdrawn since are skipped
+        rows = {prop['id']: prop for prop in result.data or []}
+        property_list = [serialize_property(rows[property_id], RECENT_PG_FIELDS) for property_id in property_ids if property_id in rows][:limit]
+        attach_ratings(property_list, RECENT_PG_FIELDS, summaries)
+        
+        recent_pgs = [{
+            'id': prop['id'],
+            'name': prop['property_name'],
+            'location': f"{prop['city']}, {prop['state']}",
+            'price': prop['rent_per_month'],
+            'rating': prop['rating'],
+            'reviews': prop['review_count'],
+            'status': 'Available' if prop['available_rooms'] else 'Full',
+            'image': prop['image']
+        } for prop in property_list]
         
         return jsonify({'items': recent_pgs}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def load_recent_views(user_ids):
+    """Stored recently viewed items, {user_id: [{'property_id', 'viewed_at'}, ...]}, in one query."""
+    rows = db.recently_viewed.select('user_id, items').in_('user_id', user_ids).execute().data or []
+    return {row['user_id']: row['items'] for row in rows}
+
+RECENT_PG_FIELDS = ('id', 'property_name', 'city', 'state', 'rent_per_month', 'available_rooms', 'image', 'rating', 'review_count')
+
+DASHBOARD_PROPERTY_FIELDS = ('id', 'property_name', 'city', 'state', 'rent_per_month', 'status', 'image', 'rating', 'review_count')
+
 @app.route('/api/dashboard/recent-properties', methods=['GET'])
 @jwt_required
 def get_recent_properties():
     try:
         user_id = request.current_user_id
         
-        # Get user's recent properties from Supabase
-        result = supabase.table('properties').select('*, property_images(*)').eq('owner_id', user_id).order('updated_at', desc=True).limit(6).execute()
-        
-        property_list = []
-        if result.data:
-            for prop in result.data:
-                # Get first image
-                image_url = '/static/images/placeholder.jpg'
-                if prop.get('property_images') and len(prop['property_images']) > 0:
-                    image_url = prop['property_images'][0]['image_url']
-                
-                # Get reviews count (placeholder)
-                reviews_count = 0  # You can implement this by querying reviews table
-                
-                property_list.append({
-                    'id': prop['id'],
-                    'name': prop['property_name'],
-                    'location': f"{prop['city']}, {prop['state']}",
-                    'price': prop['rent_per_month'],
-                    'rating': 4.5,  # Placeholder - calculate from reviews
-                    'reviews': reviews_count,
-                    'status': prop['status'].title(),
-                    'image': image_url
-                })
+        fields, error = recent_properties_fields()
+        if error:
+            return error
         
-        return jsonify({'items': property_list}), 200
+        # Get user's recent properties from the database
+        result = recent_properties_query(db, user_id, fields).execute()
+        
+        return recent_properties_response(result.data, fields)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def recent_properties_fields():
+    # ?fields= returns property views; without it, the dashboard's own card shape
+    if request.args.get('fields'):
+        return resolve_fields('card', exclude=('reviews',))
+    return DASHBOARD_PROPERTY_FIELDS, None
+
+def recent_properties_query(repos, user_id, fields):
+    return select_properties(fields, repos=repos).eq('owner_id', user_id).order('updated_at', desc=True).limit(6)
+
+def recent_properties_response(rows, fields, summaries=None):
+    property_list = attach_ratings([serialize_property(prop, fields) for prop in rows or []], fields, summaries)
+    
+    if fields is DASHBOARD_PROPERTY_FIELDS:
+        property_list = [{
+            'id': prop['id'],
+            'name': prop['property_name'],
+            'location': f"{prop['city']}, {prop['state']}",
+            'price': prop['rent_per_month'],
+            'rating': prop['rating'],
+            'reviews': prop['review_count'],
+            'status': prop['status'].title(),
+            'image': prop['image']
+        } for prop in property_list]
+    
+    return jsonify({'items': property_list}), 200
+
 # API Routes - Properties
 @app.route('/api/properties', methods=['GET'])
+@cached_response(lambda: ['properties'])
 def get_properties():
     try:
-        # Get query parameters
-        city = request.args.get('city')
-        min_rent = request.args.get('min_rent', type=int)
-        max_rent = request.args.get('max_rent', type=int)
-        property_type = request.args.get('property_type')
-        gender_preference = request.args.get('gender_preference')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        # Build query
-        query = supabase.table('properties').select('*, users!properties_owner_id_fkey(full_name, phone, email), property_images(*)')
-        
-        # Apply filters
-        query = query.eq('status', 'approved')
-        
-        if city:
-            query = query.ilike('city', f'%{city}%')
-        
-        if min_rent:
-            query = query.gte('rent_per_month', min_rent)
-        
-        if max_rent:
-            query = query.lte('rent_per_month', max_rent)
-        
-        if property_type:
-            query = query.eq('property_type', property_type)
-        
-        if gender_preference:
-            query = query.eq('gender_preference', gender_preference)
+        query, listing, error = property_list_query(db)
+        if error:
+            return error
         
         # Execute query
         result = query.execute()
         
-        property_list = []
-        if result.data:
-            for prop in result.data:
-                # Process images
-                images = []
-                if prop.get('property_images'):
-                    images = [{'image_url': img['image_url'], 'image_order': img['image_order']} for img in prop['property_images']]
-                
-                # Process amenities
-                amenities = []
-                if prop.get('amenities'):
-                    amenities = prop['amenities'].split(',') if isinstance(prop['amenities'], str) else prop['amenities']
-                
-                # Get owner info
-                owner_info = {
-                    'name': 'Unknown',
-                    'phone': '',
-                    'email': ''
-                }
-                if prop.get('users'):
-                    owner_info = {
-                        'name': prop['users']['full_name'],
-                        'phone': prop['users']['phone'],
-                        'email': prop['users']['email']
-                    }
-                
-                property_list.append({
-                    'id': prop['id'],
-                    'property_name': prop['property_name'],
-                    'property_type': prop['property_type'],
-                    'city': prop['city'],
-                    'state': prop['state'],
-                    'address': prop['address'],
-                    'rent_per_month': prop['rent_per_month'],
-                    'security_deposit': prop['security_deposit'],
-                    'available_rooms': prop['available_rooms'],
-                    'total_rooms': prop['total_rooms'],
-                    'gender_preference': prop['gender_preference'],
-                    'amenities': amenities,
-                    'images': images,
-                    'owner': owner_info,
-                    'created_at': prop['created_at']
-                })
-        
-        # Simple pagination (Supabase handles this differently)
-        total = len(property_list)
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_properties = property_list[start:end]
-        
-        return jsonify({
-            'properties': paginated_properties,
-            'pagination': {
-                'page': page,
-                'pages': (total + per_page - 1) // per_page,
-                'per_page': per_page,
-                'total': total,
-                'has_next': end < total,
-                'has_prev': page > 1
-            }
-        }), 200
+        return property_list_response(result, listing)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def property_list_query(repos):
+    """Validate this request's listing parameters and build its query.
+
+    Returns (query, listing, error response); listing carries what
+    property_list_response() needs to page the result.
+    """
+    # Get query parameters
+    city = request.args.get('city')
+    min_rent = request.args.get('min_rent', type=int)
+    max_rent = request.args.get('max_rent', type=int)
+    property_type = request.args.get('property_type')
+    gender_preference = request.args.get('gender_preference')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), app.config['MAX_PER_PAGE'])
+    cursor_param = request.args.get('cursor')
+    count_method = request.args.get('count', app.config['PROPERTIES_COUNT_METHOD'])
+
+    if request.args.get('near'):
+        near, error = parse_near(request.args['near'], request.args.get('radius_km'))
+        if error:
+            return None, None, error
+        if cursor_param:
+            return None, None, (jsonify({'error': 'near pages with page, not cursor'}), 400)
+        sort = request.args.get('sort', 'distance')
+        if sort not in NEARBY_SORTS:
+            return None, None, (jsonify({'error': f"sort must be one of: {', '.join(NEARBY_SORTS)}"}), 400)
+        fields, error = resolve_fields('listing', exclude=('reviews',))
+        if error:
+            return None, None, error
+        filters = {
+            'city_contains': city,
+            'property_type': property_type,
+            'gender_preference': gender_preference,
+            'min_rent': min_rent or None,
+            'max_rent': max_rent or None
+        }
+        return nearby_list_query(repos, fields, near, filters, sort, page, per_page)
+
+    sort_column, sort_desc = parse_sort(request.args.get('sort'), PROPERTY_SORT_COLUMNS)
+    if not sort_column:
+        return None, None, (jsonify({'error': f"sort must be one of: {', '.join(PROPERTY_SORT_COLUMNS)}"}), 400)
+
+    if count_method not in COUNT_METHODS:
+        return None, None, (jsonify({'error': f"count must be one of: {', '.join(COUNT_METHODS)}"}), 400)
+
+    # Listings never embed reviews; page them per property instead
+    fields, error = resolve_fields('listing', exclude=('reviews',))
+    if error:
+        return None, None, error
+
+    cursor = None
+    if cursor_param:
+        cursor = decode_cursor(cursor_param)
+        if not cursor:
+            return None, None, (jsonify({'error': 'Invalid cursor'}), 400)
+
+    # Build query; the sort column is always selected so the next cursor can be built.
+    # Cursor pages aren't counted: the keyset filter would leave only the rows after the cursor
+    count = None if cursor else count_method
+    query = select_properties(fields, required=('id', sort_column), count=count, repos=repos)
+
+    # Apply filters
+    query = query.eq('status', 'approved')
+    
+    if city:
+        query = query.ilike('city', f'%{city}%')
+    
+    if min_rent:
+        query = query.gte('rent_per_month', min_rent)
+    
+    if max_rent:
+        query = query.lte('rent_per_month', max_rent)
+    
+    if property_type:
+        query = query.eq('property_type', property_type)
+    
+    if gender_preference:
+        query = query.eq('gender_preference', gender_preference)
+
+    query = apply_sort(query, sort_column, sort_desc)
+
+    # Fetch one extra row to know whether another page follows
+    if cursor:
+        query = apply_keyset(query, sort_column, sort_desc, cursor).limit(per_page + 1)
+    else:
+        # postgrest-py 0.10 treats the end of range() as exclusive
+        start = (page - 1) * per_page
+        query = query.range(start, start + per_page + 1)
+
+    listing = {
+        'fields': fields,
+        'page': page,
+        'per_page': per_page,
+        'cursor': cursor,
+        'sort_column': sort_column,
+        'sort': request.args.get('sort', '-created_at'),
+        'count_method': count_method
+    }
+    return query, listing, None
+
+def nearby_list_query(repos, fields, near, filters, sort, page, per_page):
+    """One page of approved listings within near's radius.
+
+    The search index's geo grid finds, filters and orders the matches; the
+    database query only fetches the requested fields for that page's ids.
+    Listings reach the index on its next refresh (SEARCH_INDEX_REFRESH_SECONDS).
+    """
+    search_index.refresh_if_stale(load_search_documents)
+    docs, total, _ = search_index.search(
+        filters=filters,
+        sort=sort,
+        offset=(page - 1) * per_page,
+        limit=per_page,
+        near=near,
+        facets=False
+    )
+
+    query = select_properties(fields, repos=repos).eq('status', 'approved').in_('id', [doc['id'] for doc in docs])
+    listing = {
+        'fields': fields,
+        'page': page,
+        'per_page': per_page,
+        'cursor': None,
+        'sort': sort,
+        'count_method': 'exact',
+        'nearby': {'docs': docs, 'total': total}
+    }
+    return query, listing, None
+
+def property_list_response(result, listing, summaries=None):
+    fields = listing['fields']
+    per_page = listing['per_page']
+    page = listing['page']
+    cursor = listing['cursor']
+
+    rows = result.data or []
+    nearby = listing.get('nearby')
+    if nearby:
+        # Back into the index's order, each with its distance
+        by_id = {row['id']: row for row in rows}
+        rows = [dict(by_id[doc['id']], distance_km=doc['distance_km']) for doc in nearby['docs'] if doc['id'] in by_id]
+        total = nearby['total']
+        has_next = page * per_page < total
+    elif cursor:
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        total = None
+    else:
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        # Total comes from the Content-Range header, exact or planner-estimated
+        total = result.count if result.count is not None else len(rows)
+
+    property_list = attach_ratings([serialize_property(prop, fields) for prop in rows], fields, summaries)
+    if nearby:
+        for prop, row in zip(property_list, rows):
+            prop['distance_km'] = row['distance_km']
+
+    next_cursor = None
+    if has_next and not nearby:
+        last = rows[-1]
+        next_cursor = encode_cursor(last[listing['sort_column']], last['id'])
+
+    return json_list_response({
+        'properties': property_list,
+        'pagination': {
+            'page': page if not cursor else None,
+            'pages': (total + per_page - 1) // per_page if total is not None else None,
+            'per_page': per_page,
+            'total': total,
+            'total_is_estimate': listing['count_method'] != 'exact' if total is not None else None,
+            'has_next': has_next,
+            'has_prev': bool(cursor) or page > 1,
+            'next_cursor': next_cursor,
+            'sort': listing['sort']
+        }
+    }, 'properties')
+
 @app.route('/api/properties', methods=['POST'])
 @jwt_required
 def create_property():
     try:
         user_id = request.current_user_id
-        
-        # Get user info
-        user_result = supabase.table('users').select('*').eq('id', user_id).execute()
-        if not user_result.data:
-            return jsonify({'error': 'User not found'}), 404
-        
-        user = user_result.data[0]
+        user = request.current_user
         
         # Check if user is owner
         if user['user_type'] != 'owner':
@@ -548,50 +1547,23 @@ def create_property():
         
         data = request.get_json()
         
-        # Validate required fields
-        required_fields = [
-            'property_name', 'property_type', 'address', 'city', 'state', 'pincode',
-            'total_rooms', 'available_rooms', 'bathrooms', 'floors',
-            'rent_per_month', 'security_deposit', 'gender_preference'
-        ]
-        
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
+        # Validate fields and build the pending listing
+        values, error = validate_property(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Create property data
-        property_data = {
-            'id': str(uuid.uuid4()),
-            'property_name': data['property_name'],
-            'property_type': data['property_type'],
-            'description': data.get('description', ''),
-            'address': data['address'],
-            'city': data['city'],
-            'state': data['state'],
-            'pincode': data['pincode'],
-            'landmark': data.get('landmark', ''),
-            'total_rooms': data['total_rooms'],
-            'available_rooms': data['available_rooms'],
-            'bathrooms': data['bathrooms'],
-            'floors': data['floors'],
-            'rent_per_month': data['rent_per_month'],
-            'security_deposit': data['security_deposit'],
-            'maintenance_charges': data.get('maintenance_charges', 0),
-            'amenities': ','.join(data.get('amenities', [])),
-            'gender_preference': data['gender_preference'],
-            'food_policy': data.get('food_policy', ''),
-            'visitor_policy': data.get('visitor_policy', ''),
-            'owner_id': user_id,
-            'status': 'pending',
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
-        }
+        property_data = build_property_row(values, user)
         
-        # Insert property into Supabase
-        result = supabase.table('properties').insert(property_data).execute()
+        # Insert property into the database
+        created = db.properties.insert(property_data)
         
-        if result.data:
-            property_obj = result.data[0]
+        if created:
+            property_obj = created[0]
+
+            # Keep the search index fresh without waiting for the next rebuild
+            search_index.add(search_document(dict(property_obj, users=user)))
+            invalidate_property_responses()
+
             return jsonify({
                 'message': 'Property created successfully',
                 'property': {
@@ -606,93 +1578,934 @@ def create_property():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/properties/import', methods=['POST'])
+@jwt_required
+def import_properties():
+    """Create properties and their images from a CSV or NDJSON upload, read as it streams in."""
+    try:
+        user = request.current_user
+        
+        if user['user_type'] not in ('owner', 'admin'):
+            return jsonify({'error': 'Only PG owners can import properties'}), 403
+        
+        # Admins import on behalf of an owner
+        owner = user
+        if user['user_type'] == 'admin':
+            owner_id = request.args.get('owner_id')
+            if not owner_id:
+                return jsonify({'error': 'owner_id is required'}), 400
+            owner = fetch_user_context(owner_id)
+            if not owner or owner['user_type'] != 'owner':
+                return jsonify({'error': 'Owner not found'}), 404
+        
+        format = detect_format(request.mimetype, request.args.get('format'))
+        if not format:
+            return jsonify({'error': 'Send text/csv or application/x-ndjson'}), 415
+        
+        batch_size = request.args.get('batch_size', app.config['IMPORT_BATCH_SIZE'], type=int)
+        batch_size = min(max(batch_size, 1), app.config['IMPORT_BATCH_SIZE'])
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        
+        def index_created(rows):
+            # One sort per batch instead of an insort per listing
+            search_index.add_many(search_document(dict(row, users=owner)) for row in rows)
+        
+        importer = PropertyImporter(
+            db, owner,
+            batch_size=batch_size,
+            max_errors=app.config['IMPORT_MAX_ERRORS'],
+            dry_run=dry_run,
+            on_created=index_created
+        )
+        for line, record, error in read_records(request.stream, format):
+            if error:
+                importer.error(line, error)
+            else:
+                importer.add(line, record)
+        importer.flush()
+        
+        if importer.properties_created and not dry_run:
+            invalidate_property_responses()
+        
+        return jsonify(importer.summary()), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/properties/<property_id>/availability', methods=['PUT'])
+@jwt_required
+def update_availability(property_id):
+    """Set a listing's available rooms and push the change to everyone watching it."""
+    try:
+        user = request.current_user
+        data = request.get_json() or {}
+        
+        available_rooms = data.get('available_rooms')
+        if not isinstance(available_rooms, int) or isinstance(available_rooms, bool) or available_rooms < 0:
+            return jsonify({'error': 'available_rooms must be a non-negative integer'}), 400
+        
+        prop = db.properties.get(property_id, 'id, owner_id, total_rooms, available_rooms, status')
+        if not prop:
+            return jsonify({'error': 'Property not found'}), 404
+        
+        if prop['owner_id'] != user['id'] and user['user_type'] != 'admin':
+            return jsonify({'error': 'You can only update your own properties'}), 403
+        
+        if available_rooms > prop['total_rooms']:
+            return jsonify({'error': f"available_rooms cannot exceed total_rooms ({prop['total_rooms']})"}), 400
+        
+        updated = db.properties.update(property_id, {
+            'available_rooms': available_rooms,
+            'updated_at': datetime.utcnow().isoformat()
+        })
+        
+        if not updated:
+            return jsonify({'error': 'Property not found'}), 404
+        
+        state = availability_state(updated[0])
+        if state['available_rooms'] != prop['available_rooms']:
+            search_index.update(property_id, {'available_rooms': available_rooms})
+            invalidate_property_responses(property_id)
+            publish_availability([state])
+        
+        return jsonify({'message': 'Availability updated successfully', 'availability': state}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/properties/availability/stream', methods=['GET'])
+def stream_availability():
+    """Server-Sent Events: available_rooms and status of the listings in ?ids= as they change."""
+    try:
+        property_ids, error = availability_stream_ids()
+        if error:
+            return error
+        
+        after = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('after'))
+        try:
+            subscription = event_broker.subscribe([property_channel(property_id) for property_id in property_ids], after)
+        except BrokerFull as e:
+            return busy_response(e)
+        
+        heartbeat = app.config['PUSH_HEARTBEAT_SECONDS']
+        
+        def generate():
+            with subscription:
+                yield 'retry: 3000\n\n'
+                snapshot, events = availability_resume(subscription, after)
+                if snapshot:
+                    yield availability_snapshot(subscription, availability_snapshot_query(db, property_ids).execute().data)
+                for event in events:
+                    yield format_sse(event.type, event.data, event.id)
+                while True:
+                    events = subscription.wait(heartbeat)
+                    for event in events:
+                        yield format_sse(event.type, event.data, event.id)
+                    if not events:
+                        # Quiet: a due search index rebuild publishes changes made by other workers
+                        search_index.refresh_if_stale(load_search_documents, wait=False)
+                        yield ': keep-alive\n\n'
+        
+        return Response(generate(), mimetype='text/event-stream', headers=event_stream_headers())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/properties/<property_id>', methods=['GET'])
+@cached_response(lambda property_id: [f'property:{property_id}'])
 def get_property(property_id):
     try:
-        # Get property with related data
-        result = supabase.table('properties').select('*, users!properties_owner_id_fkey(full_name, phone, email), property_images(*), reviews(*, users!reviews_student_id_fkey(full_name))').eq('id', property_id).execute()
+        fields, error = resolve_fields('detail')
+        if error:
+            return error
+        
+        # Get property with only the columns and embeds the requested fields need,
+        # and its rating summary (precomputed, not summed from reviews) at the same time
+        query = select_properties(fields).eq('id', property_id)
+        if any(field in RATING_FIELDS for field in fields):
+            result, summaries = db.gather(query, lambda: rating_store.get_many([property_id]))
+        else:
+            result, summaries = query.execute(), None
         
         if not result.data:
             return jsonify({'error': 'Property not found'}), 404
         
         prop = result.data[0]
+        property_data = serialize_property(prop, fields)
+        attach_ratings([property_data], fields, summaries)
         
-        # Calculate average rating
-        avg_rating = 0
-        if prop.get('reviews'):
-            total_rating = sum(review['rating'] for review in prop['reviews'])
-            avg_rating = round(total_rating / len(prop['reviews']), 1)
+        if 'reviews' in fields:
+            property_data['reviews'], _, property_data['reviews_next_cursor'] = review_page(prop.get('reviews') or [], app.config['REVIEWS_PREVIEW_SIZE'], 'created_at')
         
-        # Process images
-        images = []
-        if prop.get('property_images'):
-            images = [{'image_url': img['image_url'], 'image_order': img['image_order']} for img in prop['property_images']]
+        # Signed-in viewers get it in their recently viewed; written later, in a batch
+        if request.headers.get('Authorization'):
+            user_id, _ = request_user_id()
+            if user_id:
+                recent_views.record(user_id, prop['id'])
         
-        # Process amenities
-        amenities = []
-        if prop.get('amenities'):
-            amenities = prop['amenities'].split(',') if isinstance(prop['amenities'], str) else prop['amenities']
-        
-        # Process reviews
-        reviews = []
-        if prop.get('reviews'):
-            reviews = [{
-                'id': review['id'],
-                'rating': review['rating'],
-                'review_title': review.get('review_title', ''),
-                'review_text': review.get('review_text', ''),
-                'student_name': review['users']['full_name'] if review.get('users') else 'Anonymous',
-                'created_at': review['created_at']
-            } for review in prop['reviews']]
-        
-        # Get owner info
-        owner_info = {
-            'name': 'Unknown',
-            'phone': '',
-            'email': ''
-        }
-        if prop.get('users'):
-            owner_info = {
-                'name': prop['users']['full_name'],
-                'phone': prop['users']['phone'],
-                'email': prop['users']['email']
-            }
+        return jsonify({'property': property_data}), 200
         
-        property_data = {
-            'id': prop['id'],
-            'property_name': prop['property_name'],
-            'property_type': prop['property_type'],
-            'description': prop['description'],
-            'address': prop['address'],
-            'city': prop['city'],
-            'state': prop['state'],
-            'pincode': prop['pincode'],
-            'landmark': prop['landmark'],
-            'total_rooms': prop['total_rooms'],
-            'available_rooms': prop['available_rooms'],
-            'bathrooms': prop['bathrooms'],
-            'floors': prop['floors'],
-            'rent_per_month': prop['rent_per_month'],
-            'security_deposit': prop['security_deposit'],
-            'maintenance_charges': prop['maintenance_charges'],
-            'amenities': amenities,
-            'gender_preference': prop['gender_preference'],
-            'food_policy': prop['food_policy'],
-            'visitor_policy': prop['visitor_policy'],
-            'status': prop['status'],
-            'images': images,
-            'owner': owner_info,
-            'rating': avg_rating,
-            'review_count': len(reviews),
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API Routes - Reviews
+@app.route('/api/properties/<property_id>/reviews', methods=['GET'])
+@cached_response(lambda property_id: [f'property:{property_id}'])
+def get_property_reviews(property_id):
+    try:
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), app.config['MAX_PER_PAGE'])
+        cursor_param = request.args.get('cursor')
+        
+        sort_column, sort_desc = parse_sort(request.args.get('sort'), REVIEW_SORT_COLUMNS)
+        if not sort_column:
+            return jsonify({'error': f"sort must be one of: {', '.join(REVIEW_SORT_COLUMNS)}"}), 400
+        
+        query = db.reviews.select(REVIEW_SELECT).eq('property_id', property_id)
+        query = apply_sort(query, sort_column, sort_desc)
+        
+        if cursor_param:
+            cursor = decode_cursor(cursor_param)
+            if not cursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = apply_keyset(query, sort_column, sort_desc, cursor)
+        
+        result = query.limit(per_page + 1).execute()
+        rows = result.data or []
+        
+        # An empty first page is either a property without reviews or no property at all
+        if not rows and not cursor_param:
+            if not db.properties.exists(property_id):
+                return jsonify({'error': 'Property not found'}), 404
+        
+        reviews, has_next, next_cursor = review_page(rows, per_page, sort_column)
+        
+        return jsonify({
             'reviews': reviews,
-            'created_at': prop['created_at']
+            'summary': rating_store.get(property_id).to_dict(),
+            'pagination': {
+                'per_page': per_page,
+                'has_next': has_next,
+                'next_cursor': next_cursor,
+                'sort': request.args.get('sort', '-created_at')
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/properties/<property_id>/reviews', methods=['POST'])
+@jwt_required
+def create_review(property_id):
+    try:
+        user_id = request.current_user_id
+        user = request.current_user
+        
+        if user['user_type'] != 'student':
+            return jsonify({'error': 'Only students can review properties'}), 403
+        
+        data = request.get_json() or {}
+        
+        try:
+            rating = int(data.get('rating'))
+        except (TypeError, ValueError):
+            rating = 0
+        if rating < 1 or rating > 5:
+            return jsonify({'error': 'rating must be an integer from 1 to 5'}), 400
+        
+        if not db.properties.exists(property_id):
+            return jsonify({'error': 'Property not found'}), 404
+        
+        # One review per student per property
+        if db.reviews.find('id', property_id=property_id, student_id=user_id):
+            return jsonify({'error': 'You have already reviewed this property'}), 409
+        
+        review_data = {
+            'property_id': property_id,
+            'student_id': user_id,
+            'rating': rating,
+            'review_title': data.get('review_title', '').strip(),
+            'review_text': data.get('review_text', '').strip()
         }
         
-        return jsonify({'property': property_data}), 200
+        created = db.reviews.insert(review_data)
+        
+        if not created:
+            return jsonify({'error': 'Failed to create review'}), 500
+        
+        # The database trigger updates property_rating_summary; mirror it in memory
+        rating_store.apply(property_id, rating, 1)
+        invalidate_property_responses(property_id)
+        
+        review = created[0]
+        return jsonify({
+            'message': 'Review added successfully',
+            'review': serialize_review(dict(review, users={'full_name': user['full_name']})),
+            'rating': rating_store.get(property_id).to_dict()
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reviews/<review_id>', methods=['DELETE'])
+@jwt_required
+def delete_review(review_id):
+    try:
+        user_id = request.current_user_id
+        user = request.current_user
+        
+        review = db.reviews.get(review_id, 'id, property_id, student_id, rating')
+        if not review:
+            return jsonify({'error': 'Review not found'}), 404
+
+        if review['student_id'] != user_id and user['user_type'] != 'admin':
+            return jsonify({'error': 'You can only delete your own reviews'}), 403
+        
+        db.reviews.delete(review_id)
+        
+        rating_store.apply(review['property_id'], review['rating'], -1)
+        invalidate_property_responses(review['property_id'])
+        
+        return jsonify({'message': 'Review deleted successfully'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API Routes - Bookings
+@app.route('/api/bookings', methods=['POST'])
+@jwt_required
+def create_booking():
+    """Book a room. The room is held from now until the booking is cancelled."""
+    try:
+        user = request.current_user
+        
+        if user['user_type'] != 'student':
+            return jsonify({'error': 'Only students can book rooms'}), 403
+        
+        idempotency_key, error = parse_idempotency_key(request.headers.get('Idempotency-Key'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        params, error = validate_booking(request.get_json(silent=True) or {})
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Check-and-decrement of available_rooms and the insert happen in one
+        # transaction in the database, so concurrent bookings can't oversell
+        outcome = db.bookings.create(user['id'], params, idempotency_key)
+        result = outcome['result']
+        
+        if result == 'not_found':
+            return jsonify({'error': 'Property not found'}), 404
+        if result == 'sold_out':
+            return jsonify({'error': 'No rooms available'}), 409
+        if result == 'key_reused':
+            return jsonify({'error': 'This Idempotency-Key was already used for another booking'}), 422
+        if result == 'replayed':
+            response = jsonify({'message': 'Room already booked', 'booking': serialize_booking(outcome['booking'])})
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response, 200
+        
+        publish_booking_availability(outcome)
+        
+        return jsonify({
+            'message': 'Room booked',
+            'booking': serialize_booking(outcome['booking']),
+            'available_rooms': outcome['available_rooms']
+        }), 201
+        
+    except ServiceKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/bookings', methods=['GET'])
+@jwt_required
+def get_bookings():
+    """Students' own bookings, owners' bookings on their listings, every booking for admins; newest first."""
+    try:
+        user = request.current_user
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), app.config['MAX_PER_PAGE'])
+        
+        status = request.args.get('status')
+        if status and status not in BOOKING_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(BOOKING_STATUSES)}"}), 400
+        
+        query = db.bookings.select(f'{BOOKING_SELECT}, properties!inner(property_name, owner_id)')
+        if user['user_type'] == 'student':
+            query = query.eq('student_id', user['id'])
+        elif user['user_type'] == 'owner':
+            query = query.eq('properties.owner_id', user['id'])
+        if status:
+            query = query.eq('status', status)
+        if request.args.get('property_id'):
+            query = query.eq('property_id', request.args['property_id'])
+        
+        # One extra row tells whether another page follows (range() end is exclusive in postgrest-py 0.10)
+        start = (page - 1) * per_page
+        rows = query.order('created_at', desc=True).range(start, start + per_page + 1).execute().data or []
+        
+        bookings = []
+        for row in rows[:per_page]:
+            booking = serialize_booking(row)
+            booking['property_name'] = (row.get('properties') or {}).get('property_name')
+            bookings.append(booking)
+        
+        return jsonify({
+            'bookings': bookings,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'has_next': len(rows) > per_page,
+                'has_prev': page > 1
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/bookings/<booking_id>/confirm', methods=['POST'])
+@jwt_required
+def confirm_booking(booking_id):
+    """The listing's owner accepts a pending booking; its room stays held."""
+    try:
+        booking, error = booking_for_user(booking_id, request.current_user, owner_only=True)
+        if error:
+            return error
+        
+        # Only pending -> confirmed, so a cancellation racing this one wins cleanly
+        confirmed = db.bookings.confirm(booking_id)
+        if not confirmed:
+            return jsonify({'error': 'Only pending bookings can be confirmed'}), 409
+        
+        return jsonify({'message': 'Booking confirmed', 'booking': serialize_booking(confirmed)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/bookings/<booking_id>/cancel', methods=['POST'])
+@jwt_required
+def cancel_booking(booking_id):
+    """Cancel a pending or confirmed booking (the student, the owner or an admin); its room is freed."""
+    try:
+        booking, error = booking_for_user(booking_id, request.current_user)
+        if error:
+            return error
+        
+        outcome = db.bookings.cancel(booking_id)
+        if outcome['result'] == 'not_found':
+            return jsonify({'error': 'Booking not found'}), 404
+        if outcome['result'] == 'not_active':
+            return jsonify({'error': 'Booking is already cancelled or completed'}), 409
+        
+        publish_booking_availability(outcome)
+        
+        return jsonify({
+            'message': 'Booking cancelled',
+            'booking': serialize_booking(outcome['booking']),
+            'available_rooms': outcome['available_rooms']
+        }), 200
+        
+    except ServiceKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def booking_for_user(booking_id, user, owner_only=False):
+    """A booking user may act on: as its listing's owner, an admin, or (unless owner_only) its student.
+
+    Returns (booking, error response).
+    """
+    try:
+        uuid.UUID(booking_id)
+    except ValueError:
+        return None, (jsonify({'error': 'Booking not found'}), 404)
+    
+    rows = db.bookings.select('id, student_id, status, properties(owner_id)').eq('id', booking_id).execute().data
+    if not rows:
+        return None, (jsonify({'error': 'Booking not found'}), 404)
+    
+    booking = rows[0]
+    owner_id = (booking.get('properties') or {}).get('owner_id')
+    if user['user_type'] != 'admin' and owner_id != user['id'] and (owner_only or booking['student_id'] != user['id']):
+        if owner_only:
+            return None, (jsonify({'error': "Only the property's owner can confirm bookings"}), 403)
+        return None, (jsonify({'error': 'You can only cancel your own bookings or bookings for your properties'}), 403)
+    return booking, None
+
+def publish_booking_availability(outcome):
+    """Pass a booking's change of available_rooms on to the search index, cached pages and availability streams."""
+    state = {
+        'property_id': outcome['booking']['property_id'],
+        'available_rooms': outcome['available_rooms'],
+        'status': outcome['status']
+    }
+    search_index.update(state['property_id'], {'available_rooms': state['available_rooms']})
+    invalidate_property_responses(state['property_id'])
+    publish_availability([state])
+
+# API Routes - Saved Properties
+@app.route('/api/saved', methods=['GET'])
+@jwt_required
+def get_saved_properties():
+    """The caller's saved listings, hydrated with one properties query and one rating lookup."""
+    try:
+        user_id = request.current_user_id
+        
+        sort = request.args.get('sort', 'recent')
+        if sort not in SAVED_SORTS:
+            return jsonify({'error': f"sort must be one of: {', '.join(SAVED_SORTS)}"}), 400
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), app.config['MAX_PER_PAGE'])
+        
+        fields, error = resolve_fields('listing', exclude=('reviews',))
+        if error:
+            return error
+        
+        saved = db.saved_properties.select('property_id, notes, created_at').eq('student_id', user_id)
+        saved = saved.order('created_at', desc=True).limit(app.config['SAVED_PROPERTIES_LIMIT']).execute().data or []
+        property_ids = [row['property_id'] for row in saved]
+        
+        # Every saved listing at once, since price and rating order needs them all
+        rows, summaries = [], None
+        if property_ids:
+            query = select_properties(fields, required=('id', 'rent_per_month'), repos=db).in_('id', property_ids)
+            if sort == 'rating' or any(field in RATING_FIELDS for field in fields):
+                result, summaries = db.gather(query, lambda: rating_store.get_many(property_ids))
+            else:
+                result = query.execute()
+            rows = result.data or []
+        
+        saved_by_id = {row['property_id']: row for row in saved}
+        entries = []
+        for prop in rows:
+            saved_row = saved_by_id[prop['id']]
+            data = serialize_property(prop, fields)
+            data['saved_at'] = saved_row['created_at']
+            data['notes'] = saved_row['notes']
+            entries.append({
+                'property': data,
+                'saved_at': saved_row['created_at'],
+                'rent_per_month': prop['rent_per_month'],
+                'rating': summaries[prop['id']].average if summaries is not None else None
+            })
+        
+        sort_saved(entries, sort)
+        total = len(entries)
+        start = (page - 1) * per_page
+        properties = attach_ratings([entry['property'] for entry in entries[start:start + per_page]], fields, summaries)
+        
+        return jsonify({
+            'properties': properties,
+            'saved_count': total,
+            'pagination': {
+                'page': page,
+                'pages': (total + per_page - 1) // per_page,
+                'per_page': per_page,
+                'total': total,
+                'has_next': start + per_page < total,
+                'has_prev': page > 1,
+                'sort': sort
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/saved/ids', methods=['GET'])
+@jwt_required
+def get_saved_property_ids():
+    """Ids of the caller's saved listings, for marking them on search results."""
+    try:
+        user_id = request.current_user_id
+        
+        saved = db.saved_properties.select('property_id').eq('student_id', user_id)
+        saved = saved.limit(app.config['SAVED_PROPERTIES_LIMIT']).execute().data or []
+        
+        return jsonify({'property_ids': [row['property_id'] for row in saved]}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/saved/<property_id>', methods=['PUT'])
+@jwt_required
+def save_property(property_id):
+    try:
+        user = request.current_user
+        
+        if user['user_type'] != 'student':
+            return jsonify({'error': 'Only students can save properties'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        notes = data.get('notes')
+        if notes is not None and not isinstance(notes, str):
+            return jsonify({'error': 'notes must be a string'}), 400
+        
+        existing = db.saved_properties.select('id').eq('student_id', user['id']).eq('property_id', property_id)
+        count, saved, property_exists = db.gather(
+            saved_count_query(db, user['id']),
+            existing,
+            lambda: db.properties.exists(property_id)
+        )
+        if not property_exists:
+            return jsonify({'error': 'Property not found'}), 404
+        
+        if saved.data:
+            return jsonify({'message': 'Property already saved', 'property_id': property_id, 'saved_count': saved_count(count)}), 200
+        
+        if saved_count(count) >= app.config['SAVED_PROPERTIES_LIMIT']:
+            return jsonify({'error': f"You can save at most {app.config['SAVED_PROPERTIES_LIMIT']} properties"}), 400
+        
+        # A save racing this one makes the insert a no-op; the trigger only counts new rows
+        created = db.saved_properties.save(user['id'], property_id, notes)
+        
+        return jsonify({
+            'message': 'Property saved' if created else 'Property already saved',
+            'property_id': property_id,
+            'saved_count': saved_count(count) + (1 if created else 0)
+        }), 201 if created else 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/saved/<property_id>', methods=['DELETE'])
+@jwt_required
+def unsave_property(property_id):
+    try:
+        user_id = request.current_user_id
+        
+        deleted = db.saved_properties.unsave(user_id, property_id)
+        if not deleted:
+            return jsonify({'error': 'Property is not saved'}), 404
+        
+        return jsonify({
+            'message': 'Property removed from saved',
+            'property_id': property_id,
+            'saved_count': saved_count(saved_count_query(db, user_id).execute())
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API Routes - Messages
+@app.route('/api/messages/conversations', methods=['GET'])
+@jwt_required
+def get_conversations():
+    try:
+        user_id = request.current_user_id
+        
+        query, per_page, error = conversations_query(db, user_id)
+        if error:
+            return error
+        
+        result, unread = db.gather(query, unread_total_query(db, user_id))
+        
+        return conversations_response(result.data, per_page, unread_total(unread))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages/conversations/<conversation_id>', methods=['GET'])
+@jwt_required
+def get_conversation_messages(conversation_id):
+    try:
+        user_id = request.current_user_id
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), app.config['MAX_PER_PAGE'])
+        
+        # Newest first, like the inbox
+        query = db.messages.select(MESSAGE_SELECT).eq('conversation_id', conversation_id)
+        query = apply_sort(query, 'created_at', True)
+        
+        cursor_param = request.args.get('cursor')
+        if cursor_param:
+            cursor = decode_cursor(cursor_param)
+            if not cursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = apply_keyset(query, 'created_at', True, cursor)
+        
+        # The caller's conversation row proves they take part, and comes with the header
+        conversation_query = db.conversations.select(CONVERSATION_SELECT).eq('user_id', user_id).eq('conversation_id', conversation_id)
+        conversation, result = db.gather(conversation_query, query.limit(per_page + 1))
+        
+        if not conversation.data:
+            return jsonify({'error': 'Conversation not found'}), 404
+        
+        rows = result.data or []
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_next else None
+        
+        return jsonify({
+            'conversation': serialize_conversation(conversation.data[0]),
+            'messages': [serialize_message(message, user_id) for message in rows],
+            'pagination': {
+                'per_page': per_page,
+                'has_next': has_next,
+                'next_cursor': next_cursor
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages', methods=['POST'])
+@jwt_required
+def send_message():
+    try:
+        user_id = request.current_user_id
+        
+        values, error = validate_message(request.get_json() or {})
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if values['receiver_id'] == user_id:
+            return jsonify({'error': 'You cannot message yourself'}), 400
+        
+        calls = [lambda: get_user_context(values['receiver_id'])]
+        if values['property_id']:
+            calls.append(lambda: db.properties.exists(values['property_id']))
+        receiver, *property_exists = db.gather(*calls)
+        
+        if not receiver:
+            return jsonify({'error': 'Receiver not found'}), 404
+        if property_exists and not property_exists[0]:
+            return jsonify({'error': 'Property not found'}), 404
+        
+        # The database triggers update both conversation rows and the receiver's unread count
+        created = db.messages.insert(build_message_row(values, user_id))
+        
+        if not created:
+            return jsonify({'error': 'Failed to send message'}), 500
+        
+        message = created[0]
+        receiver_id = values['receiver_id']
+        event_broker.publish(user_channel(receiver_id), 'message', {
+            'message': serialize_message(message, receiver_id),
+            'unread_total': unread_total(unread_total_query(db, receiver_id).execute())
+        })
+        # The sender's other tabs and devices
+        event_broker.publish(user_channel(user_id), 'message', {'message': serialize_message(message, user_id)})
+        
+        return jsonify({
+            'message': 'Message sent successfully',
+            'data': serialize_message(message, user_id)
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages/read', methods=['POST'])
+@jwt_required
+def mark_messages_read():
+    """Mark the caller's unread messages read, in the given conversations or all of them."""
+    try:
+        user_id = request.current_user_id
+        data = request.get_json(silent=True) or {}
+        
+        conversation_ids = data.get('conversation_ids')
+        if conversation_ids is not None:
+            if not isinstance(conversation_ids, list) or not all(isinstance(cid, str) for cid in conversation_ids):
+                return jsonify({'error': 'conversation_ids must be a list of conversation ids'}), 400
+            if not conversation_ids:
+                return jsonify({'error': 'conversation_ids must not be empty'}), 400
+        
+        # Only conversations with something unread need the update and a read receipt
+        query = db.conversations.select('conversation_id, counterpart_id').eq('user_id', user_id).gt('unread_count', 0)
+        if conversation_ids is not None:
+            query = query.in_('conversation_id', conversation_ids)
+        unread_conversations = query.execute().data or []
+        
+        if unread_conversations:
+            db.messages.mark_read(user_id, conversation_ids)
+        
+        unread = unread_total(unread_total_query(db, user_id).execute())
+        read_ids = [row['conversation_id'] for row in unread_conversations]
+        
+        if read_ids:
+            read_at = datetime.utcnow().isoformat()
+            event_broker.publish(user_channel(user_id), 'read', {
+                'reader_id': user_id, 'conversation_ids': read_ids, 'unread_total': unread
+            })
+            for row in unread_conversations:
+                event_broker.publish(user_channel(row['counterpart_id']), 'read', {
+                    'reader_id': user_id, 'conversation_ids': [row['conversation_id']], 'read_at': read_at
+                })
+        
+        return jsonify({'conversation_ids': read_ids, 'unread_total': unread}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages/unread', methods=['GET'])
+@jwt_required
+def get_unread_total():
+    try:
+        return jsonify({'unread_total': unread_total(unread_total_query(db, request.current_user_id).execute())}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages/poll', methods=['GET'])
+@jwt_required
+def poll_messages():
+    """Long-poll: answer as soon as an event arrives for the caller, or after ?timeout= seconds."""
+    try:
+        user_id = request.current_user_id
+        after = parse_event_id(request.args.get('after'))
+        
+        try:
+            subscription = event_broker.subscribe([user_channel(user_id)], after)
+        except BrokerFull as e:
+            return busy_response(e)
+        
+        with subscription:
+            events = subscription.wait(poll_timeout())
+        
+        # Read after waiting, so messages handled by other workers show up in the count
+        unread = unread_total(unread_total_query(db, user_id).execute())
+        return poll_response(subscription, after, events, unread)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/messages/stream', methods=['GET'])
+def stream_messages():
+    """Server-Sent Events: message, read and unread events for the caller as they happen."""
+    try:
+        user_id, error = request_user_id(allow_query_token=True)
+        if error:
+            return error
+        
+        if not get_user_context(user_id):
+            return jsonify({'error': 'User not found'}), 404
+        
+        after = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('after'))
+        try:
+            subscription = event_broker.subscribe([user_channel(user_id)], after)
+        except BrokerFull as e:
+            return busy_response(e)
+        
+        heartbeat = app.config['PUSH_HEARTBEAT_SECONDS']
+        
+        def generate():
+            with subscription:
+                unread = unread_total(unread_total_query(db, user_id).execute())
+                yield f'retry: 3000\n\n{format_sse("unread", {"unread_total": unread})}'
+                while True:
+                    events = subscription.wait(heartbeat)
+                    for event in events:
+                        unread = event.data.get('unread_total', unread)
+                        yield format_sse(event.type, event.data, event.id)
+                    if events:
+                        continue
+                    # Quiet: recheck the counter for messages handled by other workers, then keep the connection alive
+                    latest = unread_total(unread_total_query(db, user_id).execute())
+                    if latest != unread:
+                        unread = latest
+                        yield format_sse('unread', {'unread_total': unread})
+                    else:
+                        yield ': keep-alive\n\n'
+        
+        return Response(generate(), mimetype='text/event-stream', headers=event_stream_headers())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API Routes - Exports
+@app.route('/api/export/<dataset>', methods=['GET'])
+@jwt_required
+def export_table(dataset):
+    """Stream properties, bookings or payments as CSV or NDJSON, page by page."""
+    try:
+        user_id = request.current_user_id
+        user = request.current_user
+        
+        if dataset not in EXPORTS:
+            return jsonify({'error': f"Export must be one of: {', '.join(EXPORTS)}"}), 404
+        
+        format = request.args.get('format', 'csv')
+        if format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+        
+        # Owners get their own listings and the bookings and payments on them,
+        # students their own bookings and payments, admins everything
+        filters = {}
+        owner_column = EXPORTS[dataset]['owner_column']
+        if user['user_type'] == 'admin':
+            if request.args.get('owner_id'):
+                filters[owner_column] = request.args['owner_id']
+        elif user['user_type'] == 'owner':
+            filters[owner_column] = user_id
+        elif dataset != 'properties':
+            filters['student_id'] = user_id
+        else:
+            return jsonify({'error': 'Only PG owners can export properties'}), 403
+        
+        if request.args.get('status'):
+            filters['status'] = request.args['status']
+        
+        repository = getattr(db, dataset)
+        columns = export_select(dataset)
+        
+        def build_query():
+            query = repository.select(columns)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            return query
+        
+        # Rows are read and sent a page at a time as the client downloads
+        compress = request.accept_encodings['gzip'] > 0
+        pages = keyset_pages(build_query, app.config['EXPORT_PAGE_SIZE'])
+        response = Response(export_chunks(dataset, format, pages, gzip=compress), mimetype=EXPORT_FORMATS[format])
+        
+        filename = f"easypg-{dataset}-{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        response.headers['Vary'] = 'Accept-Encoding'
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# API Routes - Admin
+@app.route('/api/admin/stats', methods=['GET'])
+@admin_required
+def get_admin_stats():
+    return jsonify({
+        'password_hashing': password_hasher.stats(),
+        'user_cache': user_cache.stats(),
+        'verified_tokens': verified_tokens.stats(),
+        'token_revocations': token_revocations.stats(),
+        'response_cache': response_cache.stats(),
+        'search_index': search_index.stats(),
+        'rating_store': rating_store.stats(),
+        'event_broker': event_broker.stats(),
+        'recent_views': recent_views.stats(),
+        'metrics': metrics.stats(),
+        'profiling': request_profiler.stats() if app.config['PROFILING_ENABLED'] else None
+    }), 200
+
+def is_loopback(address):
+    try:
+        return ipaddress.ip_address(address or '').is_loopback
+    except ValueError:
+        return False
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Not found'}), 404
+
+    token = app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    if not token and not is_loopback(request.remote_addr):
+        return jsonify({'error': 'Set METRICS_TOKEN to scrape metrics from another host'}), 403
+
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Initialize database tables (run once)
 @app.route('/api/init-db', methods=['POST'])
 def init_database():
@@ -701,9 +2514,7 @@ def init_database():
         # In a real application, you would set up your Supabase tables through the dashboard
         
         # Create admin user if not exists
-        admin_result = supabase.table('users').select('*').eq('email', 'admin@easypg.com').execute()
-        
-        if not admin_result.data:
+        if not db.users.get_by_email('admin@easypg.com', 'id'):
             admin_data = {
                 'id': str(uuid.uuid4()),
                 'email': 'admin@easypg.com',
@@ -716,7 +2527,7 @@ def init_database():
                 'updated_at': datetime.utcnow().isoformat()
             }
             
-            supabase.table('users').insert(admin_data).execute()
+            db.users.insert(admin_data)
             
         return jsonify({'message': 'Database initialized successfully'}), 200
         
@@ -732,5 +2543,10 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+# Profiling wraps every view defined above, and only when it's on
+if app.config['PROFILING_ENABLED']:
+    for endpoint, view in app.view_functions.items():
+        app.view_functions[endpoint] = request_profiler.wrap(view, profile_trigger)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,505 @@
+"""
+ASGI entry point for EasyPG.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:application
+
+The read endpoints that spend their time waiting on the database
+(GET /api/properties, /api/dashboard/stats, /api/dashboard/recent-properties
+and /api/auth/verify) run as coroutines on async PostgREST clients, so an
+idle wait costs a task rather than a thread. They share their validation,
+queries and response building with the Flask routes in app.py. Every other
+request is handed to the Flask app on a bounded thread pool, with its request
+and response bodies streamed through as Flask reads and writes them (bulk
+imports and exports never sit in memory whole).
+
+Message pushes (GET /api/messages/stream and /api/messages/poll) and the
+room availability feed (GET /api/properties/availability/stream) also run
+here: a connected client waits on the event broker as a task, so thousands
+of open streams cost no threads.
+
+ASGI_MAX_CONCURRENCY requests are served at once, up to ASGI_MAX_PENDING
+more wait their turn, and anything beyond that gets a 503 with Retry-After.
+Push connections are limited by PUSH_MAX_SUBSCRIBERS instead, since they
+spend their time idle.
+"""
+
+import asyncio
+import io
+import json
+import sys
+
+import anyio
+from flask import jsonify, request
+from werkzeug.exceptions import ClientDisconnected
+
+from app import (
+    RATING_FIELDS, SUPABASE_KEY, SUPABASE_SERVICE_KEY, SUPABASE_URL, app, availability_resume,
+    availability_snapshot, availability_snapshot_query, availability_stream_ids, busy_response, cached_entry_response,
+    dashboard_stats, dashboard_stats_queries, db, event_broker, event_stream_headers, load_search_documents,
+    poll_response, poll_timeout, property_list_query, property_list_response, rating_store,
+    rating_summaries_from_rows, rating_summaries_query, recent_properties_fields, recent_properties_query,
+    recent_properties_response, request_user_id, response_cache, response_cache_key, search_index, token_revocations,
+    unread_total, unread_total_query, user_cache, user_context_query, verify_token_response
+)
+from availability import property_channel
+from events import BrokerFull, format_sse, parse_event_id
+from messaging import user_channel
+from property_views import needs_admin
+from repositories import ServiceKeyMissing, create_async_repositories
+
+BUSY_BODY = json.dumps({'error': 'Server is busy, please retry'}).encode()
+
+# Request helpers
+
+async def load_request_user(repos, allow_query_token=False):
+    """The authenticated user, from the cache or one async query. Returns (user, error response)."""
+    user_id, error = request_user_id(allow_query_token)
+    if error:
+        return None, error
+
+    user = user_cache.get(user_id)
+    if user is None:
+        result = await user_context_query(repos, user_id).execute()
+        if not result.data:
+            return None, (jsonify({'error': 'User not found'}), 404)
+        user = result.data[0]
+        user_cache.set(user_id, user)
+    return user, None
+
+async def load_rating_summaries(repos, property_ids, fields):
+    """Summaries for attach_ratings(), or None when fields has no rating fields."""
+    if not any(field in RATING_FIELDS for field in fields):
+        return None
+    summaries, missing = rating_store.cached(property_ids)
+    if missing:
+        result = await rating_summaries_query(repos, missing).execute()
+        summaries.update(rating_store.store(missing, rating_summaries_from_rows(result.data)))
+    return summaries
+
+# Async routes
+
+async def get_properties(repos):
+    # Same response cache as the Flask route; authenticated requests are never shared
+    cacheable = response_cache.enabled and not request.headers.get('Authorization')
+    if cacheable:
+        key = response_cache_key()
+        entry = response_cache.get(key)
+        if entry is not None:
+            return cached_entry_response(entry, 'HIT')
+
+    # Admin-only fields check the caller's role; load it here so that check doesn't block
+    if needs_admin(request.args.get('fields')) and request.headers.get('Authorization'):
+        await load_request_user(repos)
+
+    # ?near= reads the search index; a due rebuild queries the database, so not on the loop
+    if request.args.get('near'):
+        await anyio.to_thread.run_sync(search_index.refresh_if_stale, load_search_documents)
+
+    query, listing, error = property_list_query(repos)
+    if error:
+        return error
+
+    result = await query.execute()
+    summaries = await load_rating_summaries(repos, [row['id'] for row in result.data or []], listing['fields'])
+    response = app.make_response(property_list_response(result, listing, summaries))
+
+    if cacheable and response.status_code == 200:
+        entry = response_cache.set(key, response.get_data(), response.mimetype, ['properties'])
+        return cached_entry_response(entry, 'MISS')
+    return response
+
+async def get_dashboard_stats(repos):
+    user, error = await load_request_user(repos)
+    if error:
+        return error
+
+    user_type = request.args.get('type', user['user_type'])
+    try:
+        queries = dashboard_stats_queries(repos, user['id'], user_type)
+    except ServiceKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
+    results = await asyncio.gather(*(query.execute() for query in queries))
+    return jsonify({'stats': dashboard_stats(user_type, results)}), 200
+
+async def get_recent_properties(repos):
+    user, error = await load_request_user(repos)
+    if error:
+        return error
+
+    fields, error = recent_properties_fields()
+    if error:
+        return error
+
+    result = await recent_properties_query(repos, user['id'], fields).execute()
+    summaries = await load_rating_summaries(repos, [row['id'] for row in result.data or []], fields)
+    return recent_properties_response(result.data, fields, summaries)
+
+async def verify_token(repos):
+    user, error = await load_request_user(repos)
+    if error:
+        return error
+    return verify_token_response(user)
+
+async def get_unread_total(repos):
+    user, error = await load_request_user(repos)
+    if error:
+        return error
+
+    result = await unread_total_query(repos, user['id']).execute()
+    return jsonify({'unread_total': unread_total(result)}), 200
+
+ASYNC_ROUTES = {
+    '/api/properties': get_properties,
+    '/api/dashboard/stats': get_dashboard_stats,
+    '/api/dashboard/recent-properties': get_recent_properties,
+    '/api/auth/verify': verify_token,
+    '/api/messages/unread': get_unread_total
+}
+
+# Async push routes
+
+class EventStream:
+    """An async route's event stream: response carries the headers, chunks the body as it's produced."""
+
+    def __init__(self, chunks, headers=None):
+        # An iterable body, so no Content-Length is set
+        self.response = app.response_class(iter(()), mimetype='text/event-stream', headers=headers)
+        self.chunks = chunks
+
+async def poll_messages(repos):
+    user, error = await load_request_user(repos)
+    if error:
+        return error
+
+    after = parse_event_id(request.args.get('after'))
+    try:
+        subscription = event_broker.subscribe([user_channel(user['id'])], after)
+    except BrokerFull as e:
+        return busy_response(e)
+
+    with subscription:
+        events = await subscription.wait_async(poll_timeout())
+
+    result = await unread_total_query(repos, user['id']).execute()
+    return poll_response(subscription, after, events, unread_total(result))
+
+async def stream_messages(repos):
+    user, error = await load_request_user(repos, allow_query_token=True)
+    if error:
+        return error
+
+    user_id = user['id']
+    after = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('after'))
+    try:
+        subscription = event_broker.subscribe([user_channel(user_id)], after)
+    except BrokerFull as e:
+        return busy_response(e)
+
+    heartbeat = app.config['PUSH_HEARTBEAT_SECONDS']
+
+    # Runs after the request context is gone, so it only uses what it closes over
+    async def generate():
+        with subscription:
+            unread = unread_total(await unread_total_query(repos, user_id).execute())
+            yield f'retry: 3000\n\n{format_sse("unread", {"unread_total": unread})}'
+            while True:
+                events = await subscription.wait_async(heartbeat)
+                for event in events:
+                    unread = event.data.get('unread_total', unread)
+                    yield format_sse(event.type, event.data, event.id)
+                if events:
+                    continue
+                latest = unread_total(await unread_total_query(repos, user_id).execute())
+                if latest != unread:
+                    unread = latest
+                    yield format_sse('unread', {'unread_total': unread})
+                else:
+                    yield ': keep-alive\n\n'
+
+    return EventStream(generate(), event_stream_headers())
+
+async def stream_availability(repos):
+    property_ids, error = availability_stream_ids()
+    if error:
+        return error
+
+    after = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('after'))
+    try:
+        subscription = event_broker.subscribe([property_channel(property_id) for property_id in property_ids], after)
+    except BrokerFull as e:
+        return busy_response(e)
+
+    heartbeat = app.config['PUSH_HEARTBEAT_SECONDS']
+
+    async def generate():
+        with subscription:
+            yield 'retry: 3000\n\n'
+            snapshot, events = availability_resume(subscription, after)
+            if snapshot:
+                result = await availability_snapshot_query(repos, property_ids).execute()
+                yield availability_snapshot(subscription, result.data)
+            for event in events:
+                yield format_sse(event.type, event.data, event.id)
+            while True:
+                events = await subscription.wait_async(heartbeat)
+                for event in events:
+                    yield format_sse(event.type, event.data, event.id)
+                if not events:
+                    # Checked here first so thousands of idle streams don't each take a thread to find out
+                    if search_index.is_stale():
+                        await anyio.to_thread.run_sync(search_index.refresh_if_stale, load_search_documents, False)
+                    yield ': keep-alive\n\n'
+
+    return EventStream(generate(), event_stream_headers())
+
+PUSH_ROUTES = {
+    '/api/messages/poll': poll_messages,
+    '/api/messages/stream': stream_messages,
+    '/api/properties/availability/stream': stream_availability
+}
+
+# ASGI <-> WSGI
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+class RequestBodyStream(io.RawIOBase):
+    """wsgi.input that receives the ASGI request body as the Flask app reads it.
+
+    Read from a worker thread started by anyio.to_thread; each chunk is
+    awaited on the event loop.
+    """
+
+    def __init__(self, receive):
+        self.receive = receive
+        self.pending = b''
+        self.done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.done:
+            message = anyio.from_thread.run(self.receive)
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            self.pending = message.get('body', b'')
+            self.done = not message.get('more_body')
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+def build_environ(scope, body=b'', stream=None):
+    """WSGI environ for an ASGI http scope.
+
+    The request body is body, or stream read on demand (to its end, whatever
+    Content-Length says).
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    if stream is not None:
+        environ['wsgi.input'] = stream
+        environ['wsgi.input_terminated'] = True
+        environ['CONTENT_LENGTH'] = dict(scope['headers']).get(b'content-length', b'').decode('latin-1')
+    return environ
+
+def start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    }
+
+class EasyPGASGI:
+    def __init__(self, flask_app, routes, push_routes=None, max_concurrency=256, max_pending=1024, wsgi_threads=40):
+        self.flask_app = flask_app
+        self.routes = routes
+        self.push_routes = push_routes or {}
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.wsgi_threads = wsgi_threads
+        self.active = 0
+        # Created inside the server's event loop
+        self.repos = None
+        self.semaphore = None
+        self.wsgi_limiter = None
+
+    async def startup(self):
+        if self.repos is not None:
+            return
+        self.repos = create_async_repositories(
+            db,
+            supabase_url=SUPABASE_URL,
+            supabase_key=SUPABASE_KEY,
+            service_key=SUPABASE_SERVICE_KEY,
+            max_connections=self.flask_app.config['DB_MAX_CONNECTIONS'],
+            max_keepalive=self.flask_app.config['DB_MAX_KEEPALIVE'],
+            keepalive_expiry=self.flask_app.config['DB_KEEPALIVE_EXPIRY'],
+            timeout=self.flask_app.config['DB_TIMEOUT']
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.wsgi_limiter = anyio.CapacityLimiter(self.wsgi_threads)
+        # Load the revoked token ids off the event loop before serving
+        if not token_revocations.started:
+            await anyio.to_thread.run_sync(token_revocations.start)
+
+    async def shutdown(self):
+        if self.repos is not None:
+            await self.repos.client.aclose()
+            if self.repos.service_client not in (None, self.repos.client):
+                await self.repos.service_client.aclose()
+            self.repos = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        # Servers without lifespan support (and test clients) start us here
+        await self.startup()
+
+        # Admission control: beyond the queue, refuse fast instead of piling up
+        if self.active >= self.max_concurrency + self.max_pending:
+            await self.respond(send, 503, [('Content-Type', 'application/json'), ('Retry-After', '1')], BUSY_BODY)
+            return
+
+        head = scope['method'] == 'HEAD'
+        handler = self.routes.get(scope['path']) if scope['method'] in ('GET', 'HEAD') else None
+
+        # Idle waits for events: outside the semaphore, bounded by the broker's subscriber cap
+        push_handler = self.push_routes.get(scope['path']) if scope['method'] == 'GET' else None
+        if push_handler:
+            await self.run_push(push_handler, build_environ(scope, await read_body(receive)), receive, send)
+            return
+
+        self.active += 1
+        try:
+            async with self.semaphore:
+                if not handler:
+                    # Flask streams the request in and the response out from its thread
+                    environ = build_environ(scope, stream=io.BufferedReader(RequestBodyStream(receive)))
+                    await anyio.to_thread.run_sync(self.run_wsgi, environ, send, head, limiter=self.wsgi_limiter)
+                    return
+                environ = build_environ(scope, await read_body(receive))
+                status, headers, content = await self.run_async(handler, environ)
+        finally:
+            self.active -= 1
+
+        await self.respond(send, status, headers, b'' if head else content)
+
+    async def run_async(self, handler, environ):
+        with self.flask_app.request_context(environ):
+            try:
+                # before_request hooks (request metrics) as Flask would run them
+                rv = self.flask_app.preprocess_request() or await handler(self.repos)
+            except Exception as e:
+                rv = jsonify({'error': str(e)}), 500
+            # after_request hooks (CORS headers) as Flask would run them
+            response = self.flask_app.process_response(self.flask_app.make_response(rv))
+            return response.status_code, list(response.headers.items()), response.get_data()
+
+    async def run_push(self, handler, environ, receive, send):
+        with self.flask_app.request_context(environ):
+            try:
+                rv = self.flask_app.preprocess_request() or await handler(self.repos)
+            except Exception as e:
+                rv = jsonify({'error': str(e)}), 500
+            stream = rv if isinstance(rv, EventStream) else None
+            response = self.flask_app.process_response(self.flask_app.make_response(stream.response if stream else rv))
+            status, headers = response.status_code, list(response.headers.items())
+            content = b'' if stream else response.get_data()
+
+        if stream is None:
+            await self.respond(send, status, headers, content)
+            return
+
+        await send(start_message(status, headers))
+        try:
+            async with anyio.create_task_group() as tasks:
+                async def watch_disconnect():
+                    while (await receive())['type'] != 'http.disconnect':
+                        pass
+                    tasks.cancel_scope.cancel()
+
+                tasks.start_soon(watch_disconnect)
+                async for chunk in stream.chunks:
+                    await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        finally:
+            # Closes the subscription
+            await stream.chunks.aclose()
+
+    def run_wsgi(self, environ, send, head=False):
+        """Run the Flask app on this worker thread, sending each chunk as the app produces it."""
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [int(status.split(' ', 1)[0]), headers]
+
+        chunks = self.flask_app(environ, start_response)
+        try:
+            # Werkzeug has called start_response by now, so headers go out before the body is built
+            anyio.from_thread.run(send, start_message(*started))
+            for chunk in chunks:
+                if chunk and not head:
+                    anyio.from_thread.run(send, {'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            anyio.from_thread.run(send, {'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    async def respond(self, send, status, headers, content):
+        await send(start_message(status, headers))
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+application = EasyPGASGI(
+    app,
+    ASYNC_ROUTES,
+    PUSH_ROUTES,
+    max_concurrency=app.config['ASGI_MAX_CONCURRENCY'],
+    max_pending=app.config['ASGI_MAX_PENDING'],
+    wsgi_threads=app.config['ASGI_WSGI_THREADS']
+)
@@ -0,0 +1,60 @@
+"""
+Room availability change feed for EasyPG listings.
+
+Each listing has an event channel (property:<id>) carrying its
+available_rooms and status whenever they change, so the search and
+dashboard pages can keep the cards they show current over one Server-Sent
+Event stream instead of re-fetching the catalogue.
+
+Changes made through this process are published as they happen. Changes
+made elsewhere (another worker, the Supabase dashboard) are found when the
+search index next rebuilds, by comparing the listings before and after.
+"""
+
+import uuid
+
+AVAILABILITY_SELECT = 'id, available_rooms, status'
+
+def property_channel(property_id):
+    """Event channel for one listing's availability."""
+    return f'property:{property_id}'
+
+def parse_property_ids(value, limit):
+    """Property ids from a comma-separated ?ids=. Returns (ids, None) or (None, error message)."""
+    ids = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            property_id = str(uuid.UUID(part))
+        except ValueError:
+            return None, f'Invalid property id: {part}'
+        if property_id not in ids:
+            ids.append(property_id)
+    if not ids:
+        return None, 'ids is required'
+    if len(ids) > limit:
+        return None, f'At most {limit} properties per stream'
+    return ids, None
+
+def availability_state(prop):
+    return {
+        'property_id': prop['id'],
+        'available_rooms': prop.get('available_rooms'),
+        'status': prop.get('status')
+    }
+
+def availability_changes(previous, current):
+    """States of the listings whose availability differs between two {id: document} maps.
+
+    A listing that was approved and is gone from current (withdrawn, rejected
+    or deleted) is reported with status None.
+    """
+    for property_id, doc in current.items():
+        old = previous.get(property_id)
+        if old is None or old.get('available_rooms') != doc.get('available_rooms') or old.get('status') != doc.get('status'):
+            yield availability_state(doc)
+    for property_id, old in previous.items():
+        if property_id not in current and old.get('status') == 'approved':
+            yield {'property_id': property_id, 'available_rooms': None, 'status': None}
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: latency and throughput of the main API routes on a
+reproducible dataset, checked against a stored baseline.
+
+Seeds a local SQLite database (the stand-in for Supabase) with listings,
+images, reviews, bookings and messages shaped like scripts/seed-sample-data.sql,
+generated from SEED so every run gets the same rows and the same requests.
+Then, for each route below, CONCURRENCY threads send the route's requests
+back to back through the app, after a warm-up round, and the suite reports
+p50/p95/p99 latency and requests per second:
+
+    login       POST /api/auth/login (bcrypt at BCRYPT_ROUNDS; fewer requests)
+    properties  GET /api/properties with a mix of filters, sorts and pages
+    property    GET /api/properties/<id>
+    dashboard   GET /api/dashboard/stats for owners and students
+
+The response cache is off (RESPONSE_CACHE_BACKEND=none) unless set in the
+environment, so every request reaches the database.
+
+--output saves the results as JSON; --baseline compares them with saved
+results from the same scale, concurrency, request count and BCRYPT_ROUNDS, and exits 1 when
+a route's p95 latency or throughput is more than --tolerance worse, or a
+route returned errors. --save-baseline writes the results as the new
+baseline. Baselines are only comparable on the machine that made them.
+
+Seeding the large scale takes a few minutes; with --data-dir the database
+is kept there and reused by later runs of the same scale and seed.
+
+Usage: python benchmarks/api_suite.py [--scale small|large] [--concurrency 16] [--requests 500]
+           [--baseline benchmarks/baseline.json [--save-baseline] [--tolerance 0.25]]
+           [--output results.json] [--data-dir DIR]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+SEED = 24
+# Bump when seed() changes, so a --data-dir seeded the old way isn't reused
+DATASET_VERSION = 2
+SCALES = {
+    'small': {'properties': 1000, 'reviews': 10000, 'messages': 100000},
+    'large': {'properties': 10000, 'reviews': 100000, 'messages': 1000000}
+}
+LISTINGS_PER_OWNER = 10
+STUDENTS_PER_LISTING = 2
+BOOKINGS_PER_LISTING = 2
+BATCH_SIZE = 1000
+PASSWORD = 'password123'
+# Logins pay for bcrypt, so they get this share of --requests
+LOGIN_SHARE = 0.1
+
+# Shapes from scripts/seed-sample-data.sql
+CITIES = (('Bangalore', 'Karnataka', '560095'), ('Rajkot', 'Gujarat', '360005'), ('Pune', 'Maharashtra', '411001'),
+          ('Ahmedabad', 'Gujarat', '380009'), ('Hyderabad', 'Telangana', '500081'), ('Chennai', 'Tamil Nadu', '600041'))
+PROPERTY_TYPES = (('boys_pg', 'boys_only'), ('girls_pg', 'girls_only'), ('co_living', 'co_living'))
+NAMES = ('Green Valley PG', 'Sunrise Residency', 'Metro Heights PG', 'City Center PG', 'Lakeview Hostel', 'Shanti Nivas')
+AMENITIES = ('wifi', 'parking', 'meals', 'security', 'laundry', 'cctv', 'housekeeping', 'gym', 'tv', 'ac', 'power_backup')
+ROOM_TYPES = ('Single Occupancy', 'Double Occupancy', 'Triple Occupancy')
+NEARBY = ('Metro Station', 'Shopping Mall', 'Hospital', 'IT Park', 'Bank/ATM', 'Restaurant')
+REVIEW_TEXTS = (
+    'Excellent PG with great facilities. The owner is very cooperative and the food is homely.',
+    'Clean rooms and good wifi, but the mess food could be better.',
+    'Safe area and close to the metro. Water supply is sometimes irregular.',
+    'Value for money. Housekeeping is regular and the staff are polite.'
+)
+MESSAGE_TEXTS = ('Is a room free from next month?', 'Are meals included in the rent?', 'Can I visit this weekend?',
+                 'Yes, a double room is available.', 'Please share your move-in date.')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='EasyPG API benchmark suite')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='requests per route')
+    parser.add_argument('--baseline', help='results JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to --baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95/throughput regression (0.25 = 25%%)')
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--data-dir', help='keep the seeded database here and reuse it')
+    args = parser.parse_args()
+    if args.save_baseline and not args.baseline:
+        parser.error('--save-baseline needs --baseline')
+    return args
+
+ARGS = parse_args()
+SCALE = SCALES[ARGS.scale]
+
+WORKDIR = ARGS.data_dir or tempfile.mkdtemp(prefix='easypg-suite-')
+os.makedirs(WORKDIR, exist_ok=True)
+DATABASE_PATH = os.path.join(WORKDIR, f'easypg-suite-{ARGS.scale}-{SEED}.sqlite3')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = DATABASE_PATH
+os.environ.setdefault('RESPONSE_CACHE_BACKEND', 'none')
+
+import app as easypg
+from messaging import conversation_id
+
+def rng_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def insert_batches(repository, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        repository.insert_many(rows[start:start + BATCH_SIZE])
+
+def seed(rng):
+    """Users, listings, images, reviews, bookings and messages for SCALE. Returns (owners, students, property ids)."""
+    db = easypg.db
+    started = datetime(2025, 1, 1)
+    password_hash = easypg.hash_password(PASSWORD)
+    owner_count = max(SCALE['properties'] // LISTINGS_PER_OWNER, 1)
+    student_count = max(SCALE['properties'] * STUDENTS_PER_LISTING, 1)
+
+    users = []
+    for kind, count in (('owner', owner_count), ('student', student_count)):
+        for i in range(count):
+            users.append({
+                'id': rng_uuid(rng), 'email': f'{kind}{i}@easypg.com', 'password_hash': password_hash,
+                'full_name': f'{kind.title()} {i}', 'phone': f'9{rng.randrange(10 ** 9):09d}',
+                'user_type': kind, 'is_verified': True
+            })
+    insert_batches(db.users, users)
+    owners, students = users[:owner_count], users[owner_count:]
+
+    properties, images = [], []
+    for i in range(SCALE['properties']):
+        owner = owners[i % owner_count]
+        city, state, pincode = rng.choice(CITIES)
+        property_type, gender = rng.choice(PROPERTY_TYPES)
+        total_rooms = rng.randint(8, 40)
+        property_id = rng_uuid(rng)
+        properties.append({
+            'id': property_id, 'property_name': f'{rng.choice(NAMES)} {i}', 'property_type': property_type,
+            'description': 'A comfortable and well-maintained PG for working professionals and students.',
+            'address': f'{i}, University Road, {city}', 'city': city, 'state': state, 'pincode': pincode,
+            'landmark': 'Near the metro station', 'nearby_places': rng.sample(NEARBY, 3),
+            'total_rooms': total_rooms, 'available_rooms': rng.randint(0, total_rooms),
+            'room_types': rng.sample(ROOM_TYPES, 2), 'bathrooms': rng.randint(2, 12), 'floors': rng.randint(1, 5),
+            'rent_per_month': rng.randrange(4000, 15000, 100), 'security_deposit': rng.randrange(5000, 25000, 1000),
+            'maintenance_charges': rng.randrange(0, 1000, 100), 'amenities': rng.sample(AMENITIES, rng.randint(3, 7)),
+            'gender_preference': gender, 'food_policy': 'provided', 'visitor_policy': 'restricted',
+            'latitude': round(12.9 + rng.random(), 6), 'longitude': round(77.5 + rng.random(), 6),
+            'status': 'approved' if rng.random() < 0.9 else 'pending', 'owner_id': owner['id'],
+            'owner_name': owner['full_name'], 'owner_phone': owner['phone'], 'owner_email': owner['email'],
+            'created_at': (started + timedelta(minutes=i)).isoformat()
+        })
+        for order in range(3):
+            images.append({'property_id': property_id, 'image_url': f'/static/images/pg{i}_{order + 1}.jpg', 'image_order': order})
+    insert_batches(db.properties, properties)
+    insert_batches(db.property_images, images)
+    property_ids = [row['id'] for row in properties if row['status'] == 'approved']
+
+    insert_batches(db.reviews, [{
+        'property_id': rng.choice(property_ids), 'student_id': rng.choice(students)['id'],
+        'rating': rng.choices((1, 2, 3, 4, 5), (1, 1, 3, 6, 6))[0], 'review_text': rng.choice(REVIEW_TEXTS),
+        'created_at': (started + timedelta(minutes=i)).isoformat()
+    } for i in range(SCALE['reviews'])])
+
+    by_id = {row['id']: row for row in properties}
+    bookings = []
+    for i in range(SCALE['properties'] * BOOKINGS_PER_LISTING):
+        prop = by_id[rng.choice(property_ids)]
+        bookings.append({
+            'property_id': prop['id'], 'student_id': rng.choice(students)['id'], 'room_type': rng.choice(ROOM_TYPES),
+            'check_in_date': (started + timedelta(days=rng.randrange(365))).date().isoformat(),
+            'monthly_rent': prop['rent_per_month'], 'security_deposit': prop['security_deposit'],
+            'status': rng.choice(('pending', 'confirmed', 'confirmed', 'completed', 'cancelled'))
+        })
+    insert_batches(db.bookings, bookings)
+
+    for start in range(0, SCALE['messages'], BATCH_SIZE):
+        rows = []
+        for i in range(start, min(start + BATCH_SIZE, SCALE['messages'])):
+            prop = by_id[rng.choice(property_ids)]
+            student_id = rng.choice(students)['id']
+            sender, receiver = (student_id, prop['owner_id']) if rng.random() < 0.6 else (prop['owner_id'], student_id)
+            rows.append({
+                'conversation_id': conversation_id(student_id, prop['owner_id'], prop['id']), 'sender_id': sender,
+                'receiver_id': receiver, 'property_id': prop['id'], 'message_text': rng.choice(MESSAGE_TEXTS),
+                'is_read': rng.random() >= 0.2, 'created_at': (started + timedelta(seconds=i)).isoformat()
+            })
+        easypg.db.messages.insert_many(rows)
+
+    return owners, students, property_ids
+
+def load_dataset(rng):
+    """Seed the database, or reuse the one --data-dir already holds for this scale and seed."""
+    manifest_path = DATABASE_PATH + '.json'
+    manifest = {'seed': SEED, 'scale': SCALE, 'dataset_version': DATASET_VERSION}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            saved = json.load(f)
+        if {key: saved.get(key) for key in manifest} == manifest:
+            return saved['owners'], saved['students'], saved['property_ids']
+
+    owners, students, property_ids = seed(rng)
+    dataset = {
+        'owners': [{'id': row['id'], 'email': row['email']} for row in owners],
+        'students': [{'id': row['id'], 'email': row['email']} for row in students],
+        'property_ids': property_ids
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump({**manifest, **dataset}, f)
+    return dataset['owners'], dataset['students'], dataset['property_ids']
+
+def plan(owners, students, property_ids, rng):
+    """Each route's requests as (method, path, headers, json body), the same for every run."""
+    requests = ARGS.requests
+    logins = max(int(requests * LOGIN_SHARE), ARGS.concurrency)
+    tokens = [easypg.generate_jwt_token(user['id']) for user in rng.sample(owners, min(len(owners), 50)) + rng.sample(students, min(len(students), 50))]
+
+    def listing_query():
+        params = {'page': rng.randint(1, 20), 'per_page': rng.choice((10, 20))}
+        if rng.random() < 0.5:
+            params['city'] = rng.choice(CITIES)[0]
+        if rng.random() < 0.3:
+            params['property_type'] = rng.choice(PROPERTY_TYPES)[0]
+        if rng.random() < 0.3:
+            params['max_rent'] = rng.randrange(6000, 15000, 1000)
+        if rng.random() < 0.5:
+            params['sort'] = rng.choice(('rent', '-rent', '-created_at', '-availability'))
+        return '/api/properties?' + '&'.join(f'{key}={value}' for key, value in params.items())
+
+    return {
+        'login': [('POST', '/api/auth/login', {}, {'email': rng.choice(owners + students)['email'], 'password': PASSWORD})
+                  for _ in range(logins)],
+        'properties': [('GET', listing_query(), {}, None) for _ in range(requests)],
+        'property': [('GET', f'/api/properties/{rng.choice(property_ids)}', {}, None) for _ in range(requests)],
+        'dashboard': [('GET', '/api/dashboard/stats', {'Authorization': f'Bearer {rng.choice(tokens)}'}, None)
+                      for _ in range(requests)]
+    }
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    return ordered[min(max(math.ceil(fraction * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+def run_route(requests):
+    """Send requests from CONCURRENCY threads. Returns (latencies in seconds, errors, wall seconds)."""
+    local = threading.local()
+    latencies, errors = [], []
+
+    def send(request):
+        if not hasattr(local, 'client'):
+            local.client = easypg.app.test_client()
+        method, path, headers, body = request
+        started = time.perf_counter()
+        response = local.client.open(path, method=method, headers=headers, json=body)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors.append(f'{method} {path}: {response.status_code}')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(ARGS.concurrency) as executor:
+        list(executor.map(send, requests))
+    return latencies, errors, time.perf_counter() - start
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': len(errors),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'throughput_rps': round(len(ordered) / elapsed, 1)
+    }
+
+def compare(results, baseline):
+    """Regressions of results against baseline, as messages."""
+    for key in ('seed', 'scale', 'concurrency', 'requests_per_route', 'bcrypt_rounds'):
+        if results[key] != baseline.get(key):
+            return [f'baseline {key} is {baseline.get(key)!r}, this run {results[key]!r}: not comparable']
+
+    regressions = []
+    limit = 1 + ARGS.tolerance
+    for name, route in results['routes'].items():
+        base = baseline['routes'].get(name)
+        if route['errors']:
+            regressions.append(f"{name}: {route['errors']} errors")
+        if base is None:
+            continue
+        if route['p95_ms'] > base['p95_ms'] * limit:
+            regressions.append(f"{name}: p95 {route['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms")
+        if route['throughput_rps'] * limit < base['throughput_rps']:
+            regressions.append(f"{name}: {route['throughput_rps']:.1f} req/s vs baseline {base['throughput_rps']:.1f}")
+    return regressions
+
+def main():
+    rng = random.Random(SEED)
+    seed_start = time.perf_counter()
+    owners, students, property_ids = load_dataset(rng)
+    print(f"{ARGS.scale} scale: {SCALE['properties']} listings, {SCALE['reviews']} reviews, {SCALE['messages']} messages, "
+          f'{len(owners)} owners, {len(students)} students (ready in {time.perf_counter() - seed_start:.1f}s), SQLite backend')
+    print(f'{ARGS.concurrency} concurrent clients, {ARGS.requests} requests per route (logins: {LOGIN_SHARE:.0%}), seed {SEED}')
+
+    routes = plan(owners, students, property_ids, random.Random(SEED + 1))
+    results = {
+        'seed': SEED,
+        'scale': SCALE,
+        'concurrency': ARGS.concurrency,
+        'requests_per_route': ARGS.requests,
+        'bcrypt_rounds': easypg.app.config['BCRYPT_ROUNDS'],
+        'backend': 'sqlite',
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created_at': datetime.utcnow().isoformat(),
+        'routes': {}
+    }
+
+    print(f"{'route':>12} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'req/s':>8}")
+    for name, requests in routes.items():
+        # Warm-up: first connections, lazily loaded caches and indexes
+        run_route(requests[:ARGS.concurrency])
+        latencies, errors, elapsed = run_route(requests)
+        route = results['routes'][name] = summarize(latencies, errors, elapsed)
+        print(f"{name:>12} {route['requests']:>9} {route['errors']:>7} {route['p50_ms']:>8.1f} {route['p95_ms']:>8.1f} "
+              f"{route['p99_ms']:>8.1f} {route['max_ms']:>8.1f} {route['throughput_rps']:>8.1f}")
+        for error in errors[:3]:
+            print(f'             {error}')
+
+    if ARGS.output:
+        with open(ARGS.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if ARGS.save_baseline:
+        with open(ARGS.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved baseline to {ARGS.baseline}')
+    elif ARGS.baseline:
+        with open(ARGS.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {ARGS.baseline} (tolerance {ARGS.tolerance:.0%})')
+
+if __name__ == '__main__':
+    main()
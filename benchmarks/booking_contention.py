@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark: admission-season rush on a few popular listings. STUDENTS
+students book rooms at once through POST /api/bookings, from WORKERS
+threads, and the owner confirms each booking as it comes in; some requests
+are retried with the same Idempotency-Key, as a client does after a
+timeout. Reports confirmed bookings per second and checks that no listing
+handed out more rooms than it had, and that retries never held a second
+room.
+
+For comparison, the same rush through a read-then-write booking (read
+available_rooms, write back one less, insert the booking), which is what
+the routes would do without create_booking, and how many rooms it oversells.
+
+Runs against a throwaway SQLite database.
+
+Usage: python benchmarks/booking_contention.py [students] [workers]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-bookings-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+
+import jwt
+
+import app as easypg
+
+STUDENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+PROPERTIES = 5
+ROOMS = 100
+RETRY_RATE = 0.1
+SEED = 20
+
+def token(user_id):
+    return jwt.encode({'user_id': user_id, 'exp': int(time.time()) + 3600}, easypg.app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+def seed(label):
+    users = easypg.db.users
+    owner = users.insert({'email': f'owner-{label}@easypg.com', 'full_name': 'Owner', 'phone': '9876543210', 'user_type': 'owner', 'is_verified': True})[0]
+    students = [row['id'] for row in users.insert([
+        {'email': f'student{i}-{label}@easypg.com', 'full_name': f'Student {i}', 'phone': '9876543210', 'user_type': 'student', 'is_verified': True}
+        for i in range(STUDENTS)
+    ])]
+    properties = [row['id'] for row in easypg.db.properties.insert([{
+        'property_name': f'Popular PG {i}', 'property_type': 'boys_pg', 'address': f'{i} University Road',
+        'city': 'Rajkot', 'state': 'Gujarat', 'pincode': '360005', 'total_rooms': ROOMS, 'available_rooms': ROOMS,
+        'rent_per_month': 6500, 'security_deposit': 10000, 'gender_preference': 'boys_only', 'status': 'approved',
+        'owner_id': owner['id'], 'owner_name': 'Owner', 'owner_phone': '9876543210', 'owner_email': f'owner-{label}@easypg.com'
+    } for i in range(PROPERTIES)])]
+    return owner['id'], students, properties
+
+def plan(students, properties, rng):
+    """(student, property, idempotency key, attempts) per student; most want the first listing."""
+    weights = [2 ** (PROPERTIES - i) for i in range(PROPERTIES)]
+    return [
+        (student_id, rng.choices(properties, weights)[0], str(uuid.uuid4()), 2 if rng.random() < RETRY_RATE else 1)
+        for student_id in students
+    ]
+
+def run_endpoint(owner_id, requests):
+    client = easypg.app.test_client()
+    owner_headers = {'Authorization': f'Bearer {token(owner_id)}'}
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def book(request):
+        student_id, property_id, key, attempts = request
+        headers = {'Authorization': f'Bearer {token(student_id)}', 'Idempotency-Key': key}
+        body = {'property_id': property_id, 'room_type': 'Single Occupancy', 'check_in_date': '2030-06-01'}
+        responses = [client.post('/api/bookings', headers=headers, json=body) for _ in range(attempts)]
+        first = responses[0]
+        # A retry of a booking gets it back; a retry of a sold-out request is sold out too
+        retries = [response.status_code for response in responses[1:]]
+        expected = 200 if first.status_code == 201 else first.status_code
+        if first.status_code == 201:
+            booking_id = first.get_json()['booking']['id']
+            confirmed = client.post(f'/api/bookings/{booking_id}/confirm', headers=owner_headers).status_code == 200
+            result = 'confirmed' if confirmed else 'unconfirmed'
+        else:
+            result = 'sold_out' if first.status_code == 409 else f'http {first.status_code}'
+        with lock:
+            outcomes[result] += 1
+            outcomes['replayed'] += retries.count(200)
+            outcomes['retry mismatch'] += sum(status != expected for status in retries)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(WORKERS) as executor:
+        list(executor.map(book, requests))
+    return outcomes, time.perf_counter() - start
+
+def naive_book(student_id, property_id):
+    prop = easypg.db.properties.get(property_id, 'available_rooms, rent_per_month')
+    if prop['available_rooms'] <= 0:
+        return False
+    easypg.db.properties.update(property_id, {'available_rooms': prop['available_rooms'] - 1})
+    easypg.db.bookings.insert({
+        'property_id': property_id, 'student_id': student_id, 'room_type': 'Single Occupancy',
+        'check_in_date': '2030-06-01', 'monthly_rent': prop['rent_per_month'], 'status': 'confirmed'
+    })
+    return True
+
+def run_naive(requests):
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def book(request):
+        student_id, property_id, _, _ = request
+        result = 'confirmed' if naive_book(student_id, property_id) else 'sold_out'
+        with lock:
+            outcomes[result] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(WORKERS) as executor:
+        list(executor.map(book, requests))
+    return outcomes, time.perf_counter() - start
+
+def oversold(properties):
+    """Bookings beyond each listing's ROOMS, summed, and whether every available_rooms matches its bookings."""
+    total, consistent = 0, True
+    for property_id in properties:
+        held = easypg.db.bookings.count_query(property_id=property_id).in_('status', ['pending', 'confirmed']).execute().count
+        available = easypg.db.properties.get(property_id, 'available_rooms')['available_rooms']
+        total += max(held - ROOMS, 0)
+        consistent = consistent and held + available == ROOMS
+    return total, consistent
+
+def main():
+    rng = random.Random(SEED)
+    print(f'{STUDENTS} students, {WORKERS} threads, {PROPERTIES} listings of {ROOMS} rooms, '
+          f'{RETRY_RATE:.0%} of bookings retried, SQLite backend')
+    print(f"{'booking':>12} {'confirmed':>10} {'sold out':>9} {'replayed':>9} {'seconds':>8} {'confirmed/s':>12} {'oversold':>9}")
+
+    owner_id, students, properties = seed('endpoint')
+    requests = plan(students, properties, rng)
+    outcomes, elapsed = run_endpoint(owner_id, requests)
+    endpoint_oversold, consistent = oversold(properties)
+    print(f"{'endpoint':>12} {outcomes['confirmed']:>10} {outcomes['sold_out']:>9} {outcomes['replayed']:>9} "
+          f"{elapsed:>8.2f} {outcomes['confirmed'] / elapsed:>12.1f} {endpoint_oversold:>9}")
+    unexpected = {result: n for result, n in outcomes.items() if n and result not in ('confirmed', 'sold_out', 'replayed')}
+    assert not unexpected, unexpected
+    assert endpoint_oversold == 0 and consistent
+    # Every room that someone asked for was booked, and nobody was turned away from a listing with rooms left
+    demand = Counter(property_id for _, property_id, _, _ in requests)
+    assert outcomes['confirmed'] == sum(min(n, ROOMS) for n in demand.values()), (outcomes, demand)
+
+    _, students, properties = seed('naive')
+    outcomes, elapsed = run_naive(plan(students, properties, rng))
+    naive_oversold, _ = oversold(properties)
+    print(f"{'read-write':>12} {outcomes['confirmed']:>10} {outcomes['sold_out']:>9} {'-':>9} "
+          f"{elapsed:>8.2f} {outcomes['confirmed'] / elapsed:>12.1f} {naive_oversold:>9}")
+
+if __name__ == '__main__':
+    main()
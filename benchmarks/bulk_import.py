@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading ROWS properties (two images each) through POST
+/api/properties one request at a time vs. one streamed CSV upload to
+POST /api/properties/import.
+
+Runs the app against a throwaway SQLite database. Also reports the import's
+Python memory for a tenth of the rows and for all of them: what stays
+allocated afterwards (search index entries for the new listings, the
+ref -> id map) and the peak on top of that while the upload is read and
+inserted, which stays flat because the upload is streamed in batches.
+
+Usage: python benchmarks/bulk_import.py [rows]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-import-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+
+import jwt
+
+import app as easypg
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+IMAGES_PER_PROPERTY = 2
+COLUMNS = [
+    'type', 'ref', 'property_ref', 'image_url', 'image_order',
+    'property_name', 'property_type', 'address', 'city', 'state', 'pincode',
+    'total_rooms', 'available_rooms', 'bathrooms', 'floors',
+    'rent_per_month', 'security_deposit', 'gender_preference', 'amenities'
+]
+
+def property_record(i):
+    return {
+        'property_name': f'Sunrise PG {i}', 'property_type': 'boys_pg', 'address': f'{i} University Road',
+        'city': 'Rajkot', 'state': 'Gujarat', 'pincode': '360005', 'total_rooms': 20, 'available_rooms': i % 20,
+        'bathrooms': 6, 'floors': 3, 'rent_per_month': 5000 + (i % 10) * 500, 'security_deposit': 10000,
+        'gender_preference': 'boys_only', 'amenities': ['wifi', 'meals']
+    }
+
+def write_upload(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        for i in range(rows):
+            record = property_record(i)
+            writer.writerow(dict(record, type='property', ref=f'p{i}', amenities='|'.join(record['amenities'])))
+            for j in range(IMAGES_PER_PROPERTY):
+                writer.writerow({'type': 'image', 'property_ref': f'p{i}', 'image_url': f'https://cdn.easypg.com/{i}/{j}.jpg', 'image_order': j})
+
+def import_upload(client, headers, path):
+    with open(path, 'rb') as f:
+        response = client.post(
+            '/api/properties/import', input_stream=f, content_type='text/csv',
+            headers=dict(headers, **{'Content-Length': str(os.path.getsize(path))})
+        )
+    assert response.status_code == 200, response.get_json()
+    summary = response.get_json()
+    assert summary['failed'] == 0, summary['errors'][:5]
+    return summary
+
+def one_by_one(client, headers, rows):
+    for i in range(rows):
+        response = client.post('/api/properties', json=property_record(i), headers=headers)
+        assert response.status_code == 201, response.get_json()
+        property_id = response.get_json()['property']['id']
+        # Images have no endpoint of their own; insert them the way a script would
+        easypg.db.property_images.insert([
+            {'property_id': property_id, 'image_url': f'https://cdn.easypg.com/{i}/{j}.jpg', 'image_order': j}
+            for j in range(IMAGES_PER_PROPERTY)
+        ])
+
+def main():
+    owner = easypg.db.users.insert({
+        'email': 'owner@easypg.com', 'full_name': 'Owner', 'phone': '9876543210',
+        'user_type': 'owner', 'is_verified': True
+    })[0]
+    token = jwt.encode({'user_id': owner['id'], 'exp': int(time.time()) + 3600}, easypg.app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = easypg.app.test_client()
+
+    full_upload = os.path.join(WORKDIR, 'full.csv')
+    small_upload = os.path.join(WORKDIR, 'small.csv')
+    write_upload(full_upload, ROWS)
+    write_upload(small_upload, max(ROWS // 10, 1))
+
+    print(f'{ROWS} properties, {IMAGES_PER_PROPERTY} images each, SQLite backend')
+    print(f"{'method':>12} {'seconds':>8} {'rows/s':>8}")
+
+    start = time.perf_counter()
+    one_by_one(client, headers, ROWS)
+    elapsed = time.perf_counter() - start
+    print(f"{'one by one':>12} {elapsed:>8.2f} {ROWS / elapsed:>8.0f}")
+
+    start = time.perf_counter()
+    summary = import_upload(client, headers, full_upload)
+    elapsed = time.perf_counter() - start
+    assert summary['properties_created'] == ROWS
+    print(f"{'import':>12} {elapsed:>8.2f} {ROWS / elapsed:>8.0f}")
+
+    print(f"\n{'rows':>8} {'upload KB':>10} {'kept KB':>8} {'working KB':>11}")
+    for path in (small_upload, full_upload):
+        tracemalloc.start()
+        summary = import_upload(client, headers, path)
+        kept, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{summary['properties_created']:>8} {os.path.getsize(path) / 1024:>10.0f} {kept / 1024:>8.0f} {(peak - kept) / 1024:>11.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: Supabase round-trips per /api/dashboard/stats request.
+
+Swaps the app's database client for an in-memory stand-in that counts every
+executed query and every row it returns, then requests the owner and student
+dashboards for owners with a growing number of properties. Each query sleeps
+QUERY_LATENCY_MS to stand in for the network, so ms/req shows independent
+queries issued one after another (serial) against issued together (fanout).
+
+Usage: python benchmarks/dashboard_roundtrips.py
+"""
+
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# app.py refuses to import without Supabase settings; the client is replaced below
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'eyJhbGciOiJIUzI1NiJ9.e30.benchmark')
+
+import app as easypg
+from repositories import Repositories
+
+PROPERTY_COUNTS = (1, 10, 50, 200, 1000)
+BOOKINGS_PER_PROPERTY = 5
+MESSAGES = 500
+REQUESTS = 20
+QUERY_LATENCY_MS = 5
+
+# (table, embed) -> (target table, local column, remote column)
+RELATIONS = {
+    ('bookings', 'properties'): ('properties', 'property_id', 'id')
+}
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class CountingQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.count = None
+        self.limit_rows = None
+
+    def select(self, *columns, count=None):
+        self.count = count
+        return self
+
+    def eq(self, column, value):
+        if '.' in column:
+            # Filter on an !inner embed: keep rows whose related row matches
+            embed, column = column.split('.', 1)
+            target, local, remote = RELATIONS[(self.table, embed)]
+            matches = {row[remote] for row in self.client.tables[target] if row.get(column) == value}
+            self.filters.append(lambda row: row.get(local) in matches)
+            return self
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def limit(self, size):
+        self.limit_rows = size
+        return self
+
+    def execute(self):
+        time.sleep(QUERY_LATENCY_MS / 1000)
+        rows = [row for row in self.client.tables[self.table] if all(f(row) for f in self.filters)]
+        total = len(rows)
+        if self.limit_rows is not None:
+            rows = rows[:self.limit_rows]
+        self.client.round_trips += 1
+        self.client.rows_transferred += len(rows)
+        return Response(rows, total if self.count else None)
+
+class CountingRpc:
+    """Mirrors scripts/dashboard-stats-functions.sql: one row back per call."""
+
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        time.sleep(QUERY_LATENCY_MS / 1000)
+        tables = self.client.tables
+        if self.name == 'owner_dashboard_stats':
+            owner_id = self.params['owner_uuid']
+            properties = [p for p in tables['properties'] if p['owner_id'] == owner_id]
+            property_ids = {p['id'] for p in properties}
+            row = {
+                'total_properties': len(properties),
+                'occupied_rooms': sum(p['total_rooms'] - p['available_rooms'] for p in properties),
+                'monthly_revenue': sum(b['monthly_rent'] for b in tables['bookings'] if b['property_id'] in property_ids and b['status'] == 'confirmed'),
+                'inquiries': sum(1 for m in tables['messages'] if m['receiver_id'] == owner_id)
+            }
+        else:
+            student_id = self.params['student_uuid']
+            row = {
+                'applications': sum(1 for b in tables['bookings'] if b['student_id'] == student_id),
+                'messages': sum(1 for m in tables['messages'] if m['receiver_id'] == student_id)
+            }
+        self.client.round_trips += 1
+        self.client.rows_transferred += 1
+        return Response([row])
+
+class CountingClient:
+    def __init__(self, tables):
+        self.tables = tables
+        self.round_trips = 0
+        self.rows_transferred = 0
+
+    def table(self, name):
+        return CountingQuery(self, name)
+
+    def rpc(self, name, params):
+        return CountingRpc(self, name, params)
+
+def build_dataset(property_count):
+    owner_id = str(uuid.uuid4())
+    student_id = str(uuid.uuid4())
+    users = [
+        {'id': owner_id, 'user_type': 'owner', 'email': 'owner@easypg.com', 'full_name': 'Owner', 'phone': '9876543210', 'is_verified': True},
+        {'id': student_id, 'user_type': 'student', 'email': 'student@easypg.com', 'full_name': 'Student', 'phone': '9876543211', 'is_verified': True}
+    ]
+    properties = []
+    bookings = []
+    for i in range(property_count):
+        property_id = str(uuid.uuid4())
+        properties.append({'id': property_id, 'owner_id': owner_id, 'total_rooms': 20, 'available_rooms': 5})
+        for j in range(BOOKINGS_PER_PROPERTY):
+            bookings.append({
+                'id': str(uuid.uuid4()),
+                'property_id': property_id,
+                'student_id': student_id,
+                'status': 'confirmed' if j % 2 == 0 else 'pending',
+                'monthly_rent': 6500
+            })
+    messages = [{'id': str(uuid.uuid4()), 'receiver_id': owner_id if i % 2 else student_id} for i in range(MESSAGES)]
+    tables = {'users': users, 'properties': properties, 'bookings': bookings, 'messages': messages}
+    return tables, owner_id, student_id
+
+def measure(client, user_id, user_type):
+    test_client = easypg.app.test_client()
+    headers = {'Authorization': f'Bearer {easypg.generate_jwt_token(user_id)}'}
+
+    client.round_trips = 0
+    client.rows_transferred = 0
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = test_client.get(f'/api/dashboard/stats?type={user_type}', headers=headers)
+        assert response.status_code == 200, response.get_json()
+    elapsed = time.perf_counter() - start
+
+    return client.round_trips / REQUESTS, client.rows_transferred / REQUESTS, elapsed / REQUESTS * 1000
+
+def main():
+    print(f"{'mode':>8} {'properties':>10} {'view':>8} {'round-trips':>12} {'legacy':>8} {'rows/req':>9} {'ms/req':>8}")
+    for mode in ('serial', 'fanout', 'rpc'):
+        easypg.app.config['DASHBOARD_STATS_RPC'] = mode == 'rpc'
+        workers = easypg.app.config['DB_FANOUT_WORKERS'] if mode != 'serial' else 0
+        for property_count in PROPERTY_COUNTS:
+            tables, owner_id, student_id = build_dataset(property_count)
+            client = CountingClient(tables)
+            easypg.db = Repositories(client, 'benchmark', workers)
+
+            trips, rows, ms = measure(client, owner_id, 'owner')
+            # Before batching: user + properties + one bookings query per property + inquiries
+            legacy = property_count + 3
+            print(f'{mode:>8} {property_count:>10} {"owner":>8} {trips:>12.2f} {legacy:>8} {rows:>9.0f} {ms:>8.2f}')
+
+            trips, rows, ms = measure(client, student_id, 'student')
+            print(f'{mode:>8} {property_count:>10} {"student":>8} {trips:>12.2f} {3:>8} {rows:>9.0f} {ms:>8.2f}')
+
+if __name__ == '__main__':
+    main()
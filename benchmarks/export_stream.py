@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GET /api/export/properties streamed page by page vs. the same
+CSV built from one query, for a small and a large table.
+
+Runs the app against a throwaway SQLite database and reads the export the
+way a download client would, chunk by chunk. Reports time to first byte,
+total time and peak Python memory; the streamed export's memory should not
+grow with the table.
+
+Usage: python benchmarks/export_stream.py [rows]
+"""
+
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-export-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+
+import jwt
+
+import app as easypg
+from exports import EXPORTS, csv_value, export_select, flatten
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+def seed(owner_id, start, count):
+    for offset in range(start, start + count, 1000):
+        easypg.db.properties.insert_many([{
+            'property_name': f'Sunrise PG {i}', 'property_type': 'boys_pg', 'address': f'{i} University Road',
+            'city': 'Rajkot', 'state': 'Gujarat', 'pincode': '360005', 'total_rooms': 20, 'available_rooms': i % 20,
+            'bathrooms': 6, 'floors': 3, 'rent_per_month': 5000 + (i % 10) * 500, 'security_deposit': 10000,
+            'gender_preference': 'boys_only', 'amenities': ['wifi', 'meals'], 'status': 'approved',
+            'description': 'Spacious furnished rooms close to the university campus. ' * 4,
+            'owner_id': owner_id, 'owner_name': 'Owner', 'owner_phone': '9876543210', 'owner_email': 'owner@easypg.com'
+        } for i in range(offset, min(offset + 1000, start + count))])
+
+def one_query_chunks(owner_id):
+    # Every row in memory before the first byte is written
+    rows = easypg.db.properties.select(export_select('properties')).eq('owner_id', owner_id).order('id').execute().data
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS['properties']['columns'])
+    for row in rows:
+        writer.writerow([csv_value(value) for value in flatten(row, 'properties').values()])
+    yield buffer.getvalue().encode('utf-8')
+
+def streamed_chunks(client, headers):
+    response = client.get('/api/export/properties', headers=headers, buffered=False)
+    assert response.status_code == 200
+    try:
+        yield from response.response
+    finally:
+        response.close()
+
+def measure(chunks):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in chunks:
+        if chunk and first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte * 1000, elapsed * 1000, peak / 1024, size / 1024
+
+def main():
+    owner = easypg.db.users.insert({
+        'email': 'owner@easypg.com', 'full_name': 'Owner', 'phone': '9876543210',
+        'user_type': 'owner', 'is_verified': True
+    })[0]
+    token = jwt.encode({'user_id': owner['id'], 'exp': int(time.time()) + 3600}, easypg.app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = easypg.app.test_client()
+
+    print(f"page size {easypg.app.config['EXPORT_PAGE_SIZE']}, SQLite backend")
+    print(f"{'rows':>7} {'method':>10} {'TTFB ms':>8} {'total ms':>9} {'peak KB':>8} {'CSV KB':>8}")
+    seeded = 0
+    for rows in (ROWS // 10, ROWS):
+        seed(owner['id'], seeded, rows - seeded)
+        seeded = rows
+        for method, chunks in (('one query', one_query_chunks(owner['id'])), ('streamed', streamed_chunks(client, headers))):
+            ttfb, total, peak, size = measure(chunks)
+            print(f'{rows:>7} {method:>10} {ttfb:>8.1f} {total:>9.0f} {peak:>8.0f} {size:>8.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: "PGs within N km of this college" over LISTINGS listings,
+with the search index's geo grid vs. computing the distance to every
+listing.
+
+Listings are scattered around a handful of college towns, the way the
+catalogue clusters. Each query returns the nearest page of 20 with the
+total count, as GET /api/properties?near= does.
+
+Usage: python benchmarks/geo_search.py [listings]
+"""
+
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from search_index import PropertySearchIndex, distance_km
+
+LISTINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+QUERIES = 200
+PER_PAGE = 20
+RADII_KM = (2, 5, 10, 25)
+SEED = 15
+
+CITIES = {
+    'Rajkot': (22.2897, 70.7783),
+    'Ahmedabad': (23.0225, 72.5714),
+    'Bangalore': (12.9716, 77.5946),
+    'Pune': (18.5204, 73.8567),
+    'Hyderabad': (17.3850, 78.4867),
+    'Kota': (25.2138, 75.8648),
+    'Indore': (22.7196, 75.8577),
+    'Chennai': (13.0827, 80.2707)
+}
+
+def build_documents(rng):
+    names = list(CITIES)
+    for i in range(LISTINGS):
+        city = names[i % len(names)]
+        lat, lng = CITIES[city]
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128))), 'property_name': f'PG {i}', 'city': city,
+            'property_type': 'boys_pg', 'gender_preference': 'boys_only', 'amenities': ['wifi'],
+            'rent_per_month': 4000 + (i % 20) * 500, 'available_rooms': i % 10, 'status': 'approved',
+            # Most listings within ~15 km of the centre
+            'latitude': lat + rng.gauss(0, 0.08), 'longitude': lng + rng.gauss(0, 0.08),
+            'created_at': f'2025-01-01T00:{i % 60:02d}:00'
+        }
+
+def scan(documents, lat, lng, radius_km):
+    matches = []
+    for doc in documents:
+        distance = distance_km(lat, lng, doc['latitude'], doc['longitude'])
+        if distance <= radius_km:
+            matches.append((distance, doc['id']))
+    matches.sort()
+    return matches[:PER_PAGE], len(matches)
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def main():
+    rng = random.Random(SEED)
+    documents = list(build_documents(rng))
+    index = PropertySearchIndex(refresh_seconds=0)
+    start = time.perf_counter()
+    index.rebuild(documents)
+    print(f'{LISTINGS} listings, index built in {time.perf_counter() - start:.1f}s')
+
+    # Query points near the towns, like a college picked on the map
+    points = []
+    for _ in range(QUERIES):
+        lat, lng = CITIES[rng.choice(list(CITIES))]
+        points.append((lat + rng.gauss(0, 0.03), lng + rng.gauss(0, 0.03)))
+
+    print(f"{'radius km':>9} {'matches':>8} {'grid p50 ms':>12} {'grid p95 ms':>12} {'scan p50 ms':>12}")
+    for radius in RADII_KM:
+        grid_times, scan_times, totals = [], [], []
+        for i, (lat, lng) in enumerate(points):
+            start = time.perf_counter()
+            docs, total, _ = index.search(near=(lat, lng, radius), sort='distance', limit=PER_PAGE, facets=False)
+            grid_times.append((time.perf_counter() - start) * 1000)
+            totals.append(total)
+
+            # The full scan is slow; a sample is enough to compare
+            if i < 20:
+                start = time.perf_counter()
+                nearest, scanned_total = scan(documents, lat, lng, radius)
+                scan_times.append((time.perf_counter() - start) * 1000)
+                assert scanned_total == total and [doc_id for _, doc_id in nearest] == [doc['id'] for doc in docs]
+        print(f'{radius:>9} {sum(totals) // len(totals):>8} {percentile(grid_times, 0.5):>12.2f} '
+              f'{percentile(grid_times, 0.95):>12.2f} {percentile(scan_times, 0.5):>12.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: an owner's unread badge and first inbox page as the mailbox
+grows, read from the trigger-maintained counters (GET /api/messages/unread,
+/api/messages/conversations) vs. computed from the messages table (count
+the unread rows; fetch every message and group it into conversations).
+
+Runs against a throwaway SQLite database. Messages come from many students,
+a fifth of them unread; the counter columns stay one row per user and per
+conversation however many messages there are.
+
+Usage: python benchmarks/inbox_counts.py [messages]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-inbox-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+
+import jwt
+
+import app as easypg
+from messaging import conversation_id
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+STUDENTS = 500
+REPEAT = 20
+SEED = 16
+
+def seed(owner_id, students, start, count, rng):
+    started = datetime(2025, 1, 1)
+    for offset in range(start, start + count, 1000):
+        rows = []
+        for i in range(offset, min(offset + 1000, start + count)):
+            student_id = students[rng.randrange(len(students))]
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'conversation_id': conversation_id(student_id, owner_id),
+                'sender_id': student_id,
+                'receiver_id': owner_id,
+                'message_text': f'Is a room free from next month? ({i})',
+                'is_read': rng.random() >= 0.2,
+                'created_at': (started + timedelta(seconds=i)).isoformat()
+            })
+        easypg.db.messages.insert_many(rows)
+
+def scan_unread(owner_id):
+    return easypg.db.messages.count(receiver_id=owner_id, is_read=False)
+
+def scan_inbox(owner_id, per_page=20):
+    rows = easypg.db.messages.find('id, conversation_id, sender_id, message_text, is_read, created_at', receiver_id=owner_id)
+    conversations = {}
+    for row in rows:
+        entry = conversations.setdefault(row['conversation_id'], {'last': row, 'unread': 0})
+        if row['created_at'] > entry['last']['created_at']:
+            entry['last'] = row
+        entry['unread'] += not row['is_read']
+    return sorted(conversations.values(), key=lambda entry: entry['last']['created_at'], reverse=True)[:per_page]
+
+def timed(fn):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+def main():
+    rng = random.Random(SEED)
+    users = easypg.db.users
+    owner = users.insert({'email': 'owner@easypg.com', 'full_name': 'Owner', 'phone': '9876543210', 'user_type': 'owner', 'is_verified': True})[0]
+    students = [row['id'] for row in users.insert([
+        {'email': f'student{i}@easypg.com', 'full_name': f'Student {i}', 'phone': '9876543210', 'user_type': 'student', 'is_verified': True}
+        for i in range(STUDENTS)
+    ])]
+    token = jwt.encode({'user_id': owner['id'], 'exp': int(time.time()) + 3600}, easypg.app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = easypg.app.test_client()
+
+    print(f'{STUDENTS} students messaging one owner, SQLite backend, median of {REPEAT}')
+    print(f"{'messages':>9} {'count ms':>9} {'counter ms':>11} {'scan inbox ms':>14} {'inbox ms':>9}")
+    seeded = 0
+    for size in (MESSAGES // 100, MESSAGES // 10, MESSAGES):
+        seed(owner['id'], students, seeded, size - seeded, rng)
+        seeded = size
+
+        counted = scan_unread(owner['id'])
+        badge = client.get('/api/messages/unread', headers=headers).get_json()['unread_total']
+        assert badge == counted, (badge, counted)
+
+        print(f"{size:>9} {timed(lambda: scan_unread(owner['id'])):>9.2f} "
+              f"{timed(lambda: client.get('/api/messages/unread', headers=headers)):>11.2f} "
+              f"{timed(lambda: scan_inbox(owner['id'])):>14.1f} "
+              f"{timed(lambda: client.get('/api/messages/conversations', headers=headers)):>9.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: encoding and sending a 1,000-listing page of GET /api/properties
+(listing view: owner block and images on every item).
+
+First the page's payload on its own: encode time with the stdlib json
+module (as Flask's default provider does it) and with FastJSONProvider, and
+the bytes on the wire uncompressed, gzipped and, when the brotli package is
+installed, brotli-compressed, with the time each compression takes. Then
+whole requests with each encoder and Accept-Encoding.
+
+Runs against a throwaway SQLite database with the response cache off.
+
+Usage: python benchmarks/json_payloads.py [listings] [repeat]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+LISTINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REPEAT = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+SEED = 25
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-json-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+os.environ['MAX_PER_PAGE'] = str(LISTINGS)
+
+from flask.json.provider import DefaultJSONProvider
+
+import app as easypg
+from compression import available_encodings, compress
+
+CITIES = ('Bangalore', 'Rajkot', 'Pune', 'Ahmedabad', 'Hyderabad', 'Chennai')
+AMENITIES = ('wifi', 'parking', 'meals', 'security', 'laundry', 'cctv', 'housekeeping', 'gym', 'ac', 'power_backup')
+
+def seed(rng):
+    owners = easypg.db.users.insert([
+        {'email': f'owner{i}@easypg.com', 'full_name': f'Owner {i}', 'phone': '9876543210', 'user_type': 'owner', 'is_verified': True}
+        for i in range(LISTINGS // 10 or 1)
+    ])
+    properties = easypg.db.properties.insert([{
+        'property_name': f'Green Valley PG {i}', 'property_type': 'boys_pg', 'address': f'{i}, University Road',
+        'city': rng.choice(CITIES), 'state': 'Gujarat', 'pincode': '360005', 'total_rooms': 20,
+        'available_rooms': rng.randint(0, 20), 'rent_per_month': rng.randrange(4000, 15000, 100),
+        'security_deposit': 10000, 'gender_preference': 'boys_only', 'amenities': rng.sample(AMENITIES, 5),
+        'status': 'approved', 'owner_id': owners[i % len(owners)]['id'], 'owner_name': owners[i % len(owners)]['full_name'],
+        'owner_phone': '9876543210', 'owner_email': owners[i % len(owners)]['email']
+    } for i in range(LISTINGS)])
+    easypg.db.property_images.insert_many([
+        {'property_id': prop['id'], 'image_url': f'/static/images/pg{i}_{order + 1}.jpg', 'image_order': order}
+        for i, prop in enumerate(properties) for order in range(3)
+    ])
+
+def per_call_ms(fn, n=REPEAT):
+    start = time.perf_counter()
+    for _ in range(n):
+        result = fn()
+    return (time.perf_counter() - start) / n * 1000, result
+
+def main():
+    seed(random.Random(SEED))
+    client = easypg.app.test_client()
+    path = f'/api/properties?per_page={LISTINGS}&fields=listing'
+    payload = client.get(path).get_json()
+    assert len(payload['properties']) == LISTINGS
+
+    stdlib = DefaultJSONProvider(easypg.app)
+    fast = easypg.app.json
+    print(f'{LISTINGS}-listing page (listing view), {REPEAT} runs each, {fast.encoder} available')
+    print(f"{'encoder':>24} {'ms/encode':>10} {'bytes':>10}")
+    ms, body = per_call_ms(lambda: stdlib.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    print(f"{'stdlib json (Flask)':>24} {ms:>10.2f} {len(body):>10}")
+    ms, fast_body = per_call_ms(lambda: fast.dumps_bytes(payload))
+    print(f"{'FastJSONProvider':>24} {ms:>10.2f} {len(fast_body):>10}")
+    assert json.loads(fast_body) == json.loads(body)
+
+    print(f"{'on the wire':>24} {'ms/body':>10} {'bytes':>10} {'ratio':>6}")
+    print(f"{'identity':>24} {0:>10.2f} {len(fast_body):>10} {1:>6.1f}")
+    levels = (easypg.app.config['COMPRESSION_GZIP_LEVEL'], easypg.app.config['COMPRESSION_BROTLI_QUALITY'])
+    for encoding in reversed(available_encodings()):
+        ms, compressed = per_call_ms(lambda: compress(fast_body, encoding, *levels))
+        print(f'{encoding:>24} {ms:>10.2f} {len(compressed):>10} {len(fast_body) / len(compressed):>6.1f}')
+
+    print(f"{'GET ' + path.split('?')[0]:>24} {'ms/req':>10} {'bytes':>10}")
+    for encoder in ('stdlib', fast.encoder):
+        fast.encoder = encoder
+        for encoding in ('identity',) + tuple(reversed(available_encodings())):
+            ms, response = per_call_ms(lambda: client.get(path, headers={'Accept-Encoding': encoding}))
+            assert response.headers.get('Content-Encoding', 'identity') == encoding
+            print(f"{encoder + ', ' + encoding:>24} {ms:>10.2f} {len(response.data):>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: what checking the bearer token costs each request, with REVOKED
+logged-out tokens on record.
+
+Per token check: jwt.decode alone (no revocation, as before logout could
+revoke anything), jwt.decode plus a revoked_tokens lookup in the database,
+and decode_jwt_token (the memoized claims plus the in-memory revocation
+set). Then the whole jwt_required decorator (token, revocation and the
+cached user) per request, for the same three.
+
+Runs against a throwaway SQLite database.
+
+Usage: python benchmarks/jwt_overhead.py [revoked] [requests]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-jwt-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+
+import jwt
+
+import app as easypg
+
+REVOKED = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+SEED = 21
+
+def seed(user_id, rng):
+    expires_at = (datetime.utcnow() + timedelta(days=7)).isoformat()
+    for start in range(0, REVOKED, 1000):
+        easypg.db.revoked_tokens.insert_many([
+            {'jti': uuid.UUID(int=rng.getrandbits(128)).hex, 'user_id': user_id, 'expires_at': expires_at}
+            for _ in range(start, min(start + 1000, REVOKED))
+        ])
+
+def decode_only(token):
+    return jwt.decode(token, easypg.app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+
+class QueryRevocations:
+    """Revocation checks as a database lookup per request."""
+
+    def is_revoked(self, jti):
+        return bool(easypg.db.revoked_tokens.select('jti').eq('jti', jti).execute().data)
+
+def decode_and_query(token):
+    payload = decode_only(token)
+    return None if QueryRevocations().is_revoked(payload['jti']) else payload
+
+def per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+def main():
+    rng = random.Random(SEED)
+    user = easypg.db.users.insert({'email': 'student@easypg.com', 'full_name': 'Student', 'phone': '9876543210', 'user_type': 'student', 'is_verified': True})[0]
+    seed(user['id'], rng)
+    token = easypg.generate_jwt_token(user['id'])
+    headers = {'Authorization': f'Bearer {token}'}
+    client = easypg.app.test_client()
+
+    # Load the revoked ids and the user once, as a running server would have
+    easypg.token_revocations.sync()
+    assert client.get('/api/auth/verify', headers=headers).status_code == 200
+
+    print(f'{REVOKED} revoked tokens on record, {REQUESTS} checks each, SQLite backend')
+    print(f"{'token check':>34} {'us/check':>9}")
+    print(f"{'jwt.decode, no revocation':>34} {per_call_us(lambda: decode_only(token), REQUESTS):>9.1f}")
+    print(f"{'jwt.decode + revoked_tokens query':>34} {per_call_us(lambda: decode_and_query(token), REQUESTS):>9.1f}")
+    print(f"{'memo + in-memory revocation set':>34} {per_call_us(lambda: easypg.decode_jwt_token(token), REQUESTS):>9.1f}")
+
+    print(f"{'jwt_required':>34} {'us/req':>9}")
+    protected = easypg.jwt_required(lambda: None)
+    revocations = easypg.token_revocations
+    ttl = easypg.app.config['JWT_VERIFY_CACHE_TTL'] or 60
+    for label, memo_ttl, revocation_list in (
+        ('decode + revoked_tokens query', 0, QueryRevocations()),
+        ('decode + in-memory revocation set', 0, revocations),
+        ('memo + in-memory revocation set', ttl, revocations)
+    ):
+        easypg.verified_tokens.clear()
+        easypg.verified_tokens.ttl = memo_ttl
+        easypg.token_revocations = revocation_list
+        with easypg.app.test_request_context('/api/auth/verify', headers=headers):
+            print(f'{label:>34} {per_call_us(protected, REQUESTS):>9.1f}')
+    easypg.token_revocations = revocations
+
+    # And a revoked token is refused
+    client.post('/api/auth/logout', headers=headers)
+    assert client.get('/api/auth/verify', headers=headers).status_code == 401
+
+if __name__ == '__main__':
+    main()
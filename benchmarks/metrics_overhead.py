@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: what the request metrics cost. Times REQUESTS requests to the
+home page (no database call, so the hooks are most of the work beyond
+routing) and to a listing detail page (one query), with METRICS_ENABLED on
+and off in alternating rounds (best round kept), and then the recording
+calls on their own: one database call, and one request start to finish
+with its Server-Timing header.
+
+Runs against a throwaway SQLite database.
+
+Usage: python benchmarks/metrics_overhead.py [requests]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-metrics-')
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+# Every detail request goes to the database
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+
+import app as easypg
+from metrics import Metrics
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+ROUNDS = 5
+
+def seed():
+    owner = easypg.db.users.insert({'email': 'owner@easypg.com', 'full_name': 'Owner', 'phone': '9876543210', 'user_type': 'owner', 'is_verified': True})[0]
+    return easypg.db.properties.insert({
+        'property_name': 'Metrics PG', 'property_type': 'boys_pg', 'address': '1 University Road',
+        'city': 'Rajkot', 'state': 'Gujarat', 'pincode': '360005', 'total_rooms': 10, 'available_rooms': 5,
+        'rent_per_month': 6500, 'security_deposit': 10000, 'gender_preference': 'boys_only', 'status': 'approved',
+        'owner_id': owner['id'], 'owner_name': 'Owner', 'owner_phone': '9876543210', 'owner_email': 'owner@easypg.com'
+    })[0]['id']
+
+def per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+def main():
+    property_id = seed()
+    client = easypg.app.test_client()
+    routes = (('/', 'home page, no query'), (f'/api/properties/{property_id}', 'listing detail, 1 query'))
+
+    print(f'{REQUESTS} requests each, best of {ROUNDS} rounds, SQLite backend')
+    print(f"{'request':>24} {'off us/req':>11} {'on us/req':>10} {'overhead':>9}")
+    for path, label in routes:
+        assert client.get(path).status_code == 200
+        timings = {False: float('inf'), True: float('inf')}
+        for _ in range(ROUNDS):
+            for enabled in (False, True):
+                easypg.app.config['METRICS_ENABLED'] = enabled
+                timings[enabled] = min(timings[enabled], per_call_us(lambda: client.get(path), REQUESTS))
+        print(f'{label:>24} {timings[False]:>11.1f} {timings[True]:>10.1f} {timings[True] - timings[False]:>9.1f}')
+    assert 'Server-Timing' in client.get(routes[1][0]).headers
+
+    metrics = Metrics()
+    def one_request():
+        metrics.start_request()
+        metrics.record_query('GET', '/rest/v1/properties', '', 0.002, 200)
+        metrics.finish_request('/api/properties/<property_id>', 'GET', 200, 1800)
+
+    print(f"{'recording':>24} {'us/call':>11}")
+    print(f"{'one database call':>24} {per_call_us(lambda: metrics.record_query('GET', '/rest/v1/properties', '', 0.002, 200), REQUESTS):>11.2f}")
+    print(f"{'request with 1 call':>24} {per_call_us(one_request, REQUESTS):>11.2f}")
+
+if __name__ == '__main__':
+    main()
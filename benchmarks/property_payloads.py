@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: bytes read from Supabase and bytes sent to the client per
+property request, for each ?fields= view.
+
+Swaps the app's database client for an in-memory stand-in that honours the
+select column list (including embeds) and measures the JSON it would have
+returned. The "legacy" rows select every column the way the routes did
+before views existed, while still serializing the default view.
+
+Usage: python benchmarks/property_payloads.py
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# app.py refuses to import without Supabase settings; the client is replaced below
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'eyJhbGciOiJIUzI1NiJ9.e30.benchmark')
+# Every request should reach the database stand-in
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+
+import httpx
+
+import app as easypg
+from repositories import Repositories
+
+PROPERTIES = 500
+IMAGES_PER_PROPERTY = 6
+REVIEWS_PER_PROPERTY = 20
+PER_PAGE = 20
+REQUESTS = 50
+
+LEGACY_SELECT = '*, users!properties_owner_id_fkey(full_name, phone, email), property_images(*)'
+
+# (table, embed) -> (target table, local column, remote column, many)
+RELATIONS = {
+    ('properties', 'users'): ('users', 'owner_id', 'id', False),
+    ('properties', 'property_images'): ('property_images', 'id', 'property_id', True),
+    ('properties', 'reviews'): ('reviews', 'id', 'property_id', True),
+    ('reviews', 'users'): ('users', 'student_id', 'id', False)
+}
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+def split_columns(select):
+    """Split a select string on commas that are not inside an embed."""
+    parts, depth, current = [], 0, ''
+    for ch in select:
+        if ch == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += (ch == '(') - (ch == ')')
+        current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+def sort_rows(rows, order):
+    for part in reversed(order.split(',')):
+        column, _, direction = part.partition('.')
+        rows = sorted(rows, key=lambda row: row.get(column) or 0, reverse=direction == 'desc')
+    return rows
+
+class MeasuringQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.columns = '*'
+        self.filters = []
+        self.count = None
+        self.params = httpx.QueryParams()
+
+    def select(self, *columns, count=None):
+        self.columns = ','.join(columns)
+        self.count = count
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False, foreign_table=None):
+        key = f'{foreign_table}.order' if foreign_table else 'order'
+        self.params = self.params.add(key, f"{column}{'.desc' if desc else ''}")
+        return self
+
+    def limit(self, size, foreign_table=None):
+        key = f'{foreign_table}.limit' if foreign_table else 'limit'
+        self.params = self.params.set(key, str(size))
+        return self
+
+    def range(self, start, end):
+        self.params = self.params.set('offset', str(start)).set('limit', str(end - start))
+        return self
+
+    def project(self, table, row, select):
+        if select.strip() == '*':
+            return dict(row)
+        out = {}
+        for item in split_columns(select):
+            if '(' in item:
+                head, inner = item.split('(', 1)
+                name = head.split('!')[0]
+                target, local, remote, many = RELATIONS[(table, name)]
+                children = [child for child in self.client.tables[target] if child[remote] == row[local]]
+                if many:
+                    if self.params.get(f'{name}.order'):
+                        children = sort_rows(children, self.params[f'{name}.order'])
+                    if self.params.get(f'{name}.limit'):
+                        children = children[:int(self.params[f'{name}.limit'])]
+                    out[name] = [self.project(target, child, inner[:-1]) for child in children]
+                else:
+                    out[name] = self.project(target, children[0], inner[:-1]) if children else None
+            elif item == '*':
+                out.update(row)
+            else:
+                out[item] = row.get(item)
+        return out
+
+    def execute(self):
+        rows = [row for row in self.client.tables[self.table] if all(f(row) for f in self.filters)]
+        total = len(rows)
+        if self.params.get('order'):
+            rows = sort_rows(rows, self.params['order'])
+        offset = int(self.params.get('offset', 0))
+        limit = self.params.get('limit')
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+        data = [self.project(self.table, row, self.columns) for row in rows]
+        if self.table == 'properties':
+            self.client.bytes_read += len(json.dumps(data, default=str))
+        return Response(data, total if self.count else None)
+
+class MeasuringClient:
+    def __init__(self, tables):
+        self.tables = tables
+        self.bytes_read = 0
+
+    def table(self, name):
+        return MeasuringQuery(self, name)
+
+def build_dataset():
+    start = datetime(2025, 1, 1)
+    owner_id = str(uuid.uuid4())
+    users = [{'id': owner_id, 'full_name': 'Owner', 'phone': '9876543210', 'email': 'owner@easypg.com', 'user_type': 'owner'}]
+    students = [str(uuid.uuid4()) for _ in range(REVIEWS_PER_PROPERTY)]
+    users += [{'id': student_id, 'full_name': f'Student {i}', 'phone': '9876543211', 'email': f's{i}@easypg.com', 'user_type': 'student'} for i, student_id in enumerate(students)]
+
+    properties, images, reviews = [], [], []
+    for i in range(PROPERTIES):
+        property_id = str(uuid.uuid4())
+        properties.append({
+            'id': property_id, 'owner_id': owner_id, 'property_name': f'Sunrise PG {i}', 'property_type': 'boys_pg',
+            'description': 'Spacious furnished rooms close to the university campus with daily housekeeping. ' * 8,
+            'address': f'{i} University Road, Near Government Engineering College', 'city': 'Rajkot', 'state': 'Gujarat',
+            'pincode': '360005', 'landmark': 'Opposite Kalavad Road bus stop', 'latitude': 22.2916, 'longitude': 70.7932,
+            'total_rooms': 20, 'available_rooms': i % 20, 'bathrooms': 6, 'floors': 3, 'carpet_area': 2400,
+            'rent_per_month': 5000 + (i % 10) * 500, 'security_deposit': 10000, 'maintenance_charges': 500, 'electricity_charges': 0,
+            'amenities': ['wifi', 'meals', 'laundry', 'parking', 'ac', 'security'], 'gender_preference': 'boys_only',
+            'food_policy': 'Three vegetarian meals a day; non-vegetarian food is not allowed in the kitchen. ' * 3,
+            'visitor_policy': 'Visitors are allowed in the common area until 8 PM with prior notice to the warden. ' * 3,
+            'smoking_allowed': False, 'drinking_allowed': False, 'status': 'approved', 'verified_at': start.isoformat(),
+            'verification_notes': 'Documents checked on site.', 'search_keywords': 'pg hostel rajkot boys wifi meals',
+            'featured': False, 'created_at': (start + timedelta(hours=i)).isoformat(), 'updated_at': (start + timedelta(hours=i)).isoformat()
+        })
+        for j in range(IMAGES_PER_PROPERTY):
+            images.append({
+                'id': str(uuid.uuid4()), 'property_id': property_id, 'image_url': f'https://cdn.easypg.com/properties/{property_id}/{j}.jpg',
+                'image_title': f'Room photo {j}', 'image_order': j, 'is_primary': j == 0, 'created_at': start.isoformat()
+            })
+        for j, student_id in enumerate(students):
+            reviews.append({
+                'id': str(uuid.uuid4()), 'property_id': property_id, 'student_id': student_id, 'rating': j % 5 + 1,
+                'review_title': 'Good stay', 'review_text': 'Clean rooms, helpful warden and decent food. ' * 4,
+                'created_at': (start + timedelta(days=j)).isoformat()
+            })
+
+    return {'users': users, 'properties': properties, 'property_images': images, 'reviews': reviews, 'property_rating_summary': []}
+
+def measure(client, path):
+    test_client = easypg.app.test_client()
+    client.bytes_read = 0
+    response_bytes = 0
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = test_client.get(path)
+        assert response.status_code == 200, response.get_json()
+        response_bytes += len(response.get_data())
+    elapsed = time.perf_counter() - start
+    return client.bytes_read / REQUESTS, response_bytes / REQUESTS, elapsed / REQUESTS * 1000
+
+def main():
+    client = MeasuringClient(build_dataset())
+    easypg.db = Repositories(client, 'benchmark')
+    property_id = client.tables['properties'][0]['id']
+
+    cases = [
+        ('list', 'legacy', f'/api/properties?per_page={PER_PAGE}', True),
+        ('list', 'listing', f'/api/properties?per_page={PER_PAGE}', False),
+        ('list', 'card', f'/api/properties?per_page={PER_PAGE}&fields=card', False),
+        ('detail', 'legacy', f'/api/properties/{property_id}', True),
+        ('detail', 'detail', f'/api/properties/{property_id}', False),
+        ('detail', 'card', f'/api/properties/{property_id}?fields=card', False)
+    ]
+
+    print(f"{'endpoint':>8} {'view':>8} {'db KB/req':>10} {'json KB/req':>12} {'ms/req':>8}")
+    select_columns = easypg.select_columns
+    for endpoint, view, path, legacy in cases:
+        # Legacy: every column and full embeds, as before ?fields= existed
+        easypg.select_columns = (lambda fields, required=('id',): LEGACY_SELECT) if legacy else select_columns
+        db_bytes, json_bytes, ms = measure(client, path)
+        print(f'{endpoint:>8} {view:>8} {db_bytes / 1024:>10.1f} {json_bytes / 1024:>12.1f} {ms:>8.2f}')
+    easypg.select_columns = select_columns
+
+if __name__ == '__main__':
+    main()
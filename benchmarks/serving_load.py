@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Load test: threaded Flask server vs. the ASGI app under many concurrent clients.
+
+Starts a stand-in for Supabase's REST API on localhost (the SQLite backend
+behind a threaded HTTP server, in its own process, that waits DB_LATENCY_MS
+before each answer like a remote database would), then runs `python run.py` once per serving
+mode against it and drives CLIENTS concurrent keep-alive clients at the
+async endpoints for DURATION seconds.
+
+Usage: python benchmarks/serving_load.py [clients] [duration]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import httpx
+import jwt
+
+from sqlite_backend import SQLiteClient, SQLiteTransport
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+DB_LATENCY_MS = 20
+PROPERTIES = 200
+MODES = ('threaded', 'asgi')
+JWT_SECRET = 'benchmark-secret'
+SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiJ9.e30.benchmark'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def seed(client):
+    users = client.table('users')
+    owner = users.insert({'email': 'owner@easypg.com', 'full_name': 'Owner', 'phone': '9876543210', 'user_type': 'owner', 'is_verified': True}).execute().data[0]
+    student = users.insert({'email': 'student@easypg.com', 'full_name': 'Student', 'phone': '9876543211', 'user_type': 'student', 'is_verified': True}).execute().data[0]
+    properties = client.table('properties').insert([{
+        'property_name': f'Sunrise PG {i}', 'property_type': 'boys_pg', 'address': f'{i} University Road',
+        'city': 'Rajkot', 'state': 'Gujarat', 'pincode': '360005', 'total_rooms': 20, 'available_rooms': i % 20,
+        'rent_per_month': 5000 + (i % 10) * 500, 'security_deposit': 10000, 'gender_preference': 'boys_only',
+        'amenities': ['wifi', 'meals'], 'status': 'approved', 'owner_id': owner['id'],
+        'owner_name': 'Owner', 'owner_phone': '9876543210', 'owner_email': 'owner@easypg.com'
+    } for i in range(PROPERTIES)]).execute().data
+    client.table('bookings').insert([{
+        'property_id': prop['id'], 'student_id': student['id'], 'room_type': 'single',
+        'check_in_date': '2025-01-01', 'monthly_rent': 6500, 'status': 'confirmed'
+    } for prop in properties[:50]]).execute()
+    return owner, student
+
+def serve_database(path, port, ready):
+    """Serve PostgREST requests for the SQLite file at path on localhost, DB_LATENCY_MS late."""
+    transport = SQLiteTransport(SQLiteClient(path).database)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def handle_one(self):
+            time.sleep(DB_LATENCY_MS / 1000)
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            path = self.path.replace('/rest/v1', '', 1)
+            request = httpx.Request(self.command, f'http://sqlite.local{path}', headers=dict(self.headers), content=body)
+            response = transport.handle_request(request)
+            content = response.read()
+            self.send_response(response.status_code)
+            for name, value in response.headers.items():
+                if name.lower() not in ('content-length', 'connection'):
+                    self.send_header(name, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = handle_one
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 1024
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            # Connections reset when an app server is stopped
+            pass
+
+    server = Server(('127.0.0.1', port), Handler)
+    ready.set()
+    server.serve_forever()
+
+def start_database(path):
+    # Its own process, so the load generator and the database don't share a GIL
+    port = free_port()
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=serve_database, args=(path, port, ready), daemon=True)
+    process.start()
+    ready.wait(30)
+    return process, f'http://127.0.0.1:{port}'
+
+def start_app(mode, database_url, port):
+    env = dict(
+        os.environ,
+        SERVER_MODE=mode,
+        FLASK_PORT=str(port),
+        FLASK_HOST='127.0.0.1',
+        FLASK_DEBUG='False',
+        DATABASE_BACKEND='supabase',
+        SUPABASE_URL=database_url,
+        SUPABASE_ANON_KEY=SUPABASE_KEY,
+        JWT_SECRET_KEY=JWT_SECRET,
+        # Every request should reach the database
+        RESPONSE_CACHE_BACKEND='none',
+        DB_MAX_CONNECTIONS='100',
+        DB_MAX_KEEPALIVE='100'
+    )
+    process = subprocess.Popen([sys.executable, 'run.py'], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/auth/verify', timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+async def client_loop(client, requests, deadline, results):
+    i = 0
+    while time.perf_counter() < deadline:
+        path, headers = requests[i % len(requests)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        results.append((time.perf_counter() - start, ok))
+
+async def load(base_url, requests):
+    results = []
+    limits = httpx.Limits(max_connections=CLIENTS, max_keepalive_connections=CLIENTS)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + DURATION
+        await asyncio.gather(*(client_loop(client, requests, deadline, results) for _ in range(CLIENTS)))
+    return results
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix='easypg-load-'), 'easypg.sqlite3')
+    owner, student = seed(SQLiteClient(path))
+    database, database_url = start_database(path)
+
+    owner_token = jwt.encode({'user_id': owner['id'], 'exp': int(time.time()) + 3600}, JWT_SECRET, algorithm='HS256')
+    student_token = jwt.encode({'user_id': student['id'], 'exp': int(time.time()) + 3600}, JWT_SECRET, algorithm='HS256')
+    requests = [
+        ('/api/properties?fields=card&per_page=20', {}),
+        ('/api/dashboard/stats', {'Authorization': f'Bearer {owner_token}'}),
+        ('/api/dashboard/stats', {'Authorization': f'Bearer {student_token}'}),
+        ('/api/auth/verify', {'Authorization': f'Bearer {student_token}'})
+    ]
+
+    print(f'{CLIENTS} clients, {DURATION:.0f}s per mode, {DB_LATENCY_MS} ms database latency')
+    print(f"{'mode':>9} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in MODES:
+        port = free_port()
+        process = start_app(mode, database_url, port)
+        try:
+            results = asyncio.run(load(f'http://127.0.0.1:{port}', requests))
+        finally:
+            process.terminate()
+            process.wait()
+        latencies = sorted(seconds * 1000 for seconds, ok in results if ok)
+        errors = sum(1 for _, ok in results if not ok)
+        print(f'{mode:>9} {len(results):>9} {len(results) / DURATION:>8.0f} {errors:>7} '
+              f'{percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.95):>8.1f} {percentile(latencies, 0.99):>8.1f}')
+    database.terminate()
+
+if __name__ == '__main__':
+    main()
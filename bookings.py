@@ -0,0 +1,90 @@
+"""
+Room bookings for EasyPG listings.
+
+A student's booking holds one of the listing's rooms from the moment it's
+made: create_booking (scripts/bookings.sql) takes the room off
+available_rooms and inserts the booking in one transaction, and only while
+available_rooms > 0, so students booking a listing's last rooms at the same
+time can't oversell it. The owner then confirms or cancels the booking;
+cancelling (by either side) gives the room back, through cancel_booking.
+
+A client may send an Idempotency-Key with a booking. Retrying with the same
+key returns the booking the first attempt made instead of holding a second
+room.
+"""
+
+import uuid
+from datetime import date, datetime
+
+BOOKING_COLUMNS = (
+    'id', 'property_id', 'student_id', 'room_type', 'check_in_date', 'check_out_date', 'monthly_rent',
+    'security_deposit', 'total_amount', 'status', 'booking_notes', 'confirmed_at', 'cancelled_at', 'created_at', 'updated_at'
+)
+
+BOOKING_SELECT = ', '.join(BOOKING_COLUMNS)
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+MAX_NOTES_LENGTH = 1000
+MAX_ROOM_TYPE_LENGTH = 100
+
+# pending and confirmed bookings hold a room
+BOOKING_STATUSES = ('pending', 'confirmed', 'cancelled', 'completed')
+
+def serialize_booking(row):
+    """A booking as the API returns it (never the idempotency key)."""
+    return {column: row.get(column) for column in BOOKING_COLUMNS}
+
+def parse_idempotency_key(value):
+    """Idempotency-Key header value. Returns (key or None, None) or (None, error message)."""
+    if value is None:
+        return None, None
+    key = value.strip()
+    if not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return None, f'Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters'
+    return key, None
+
+def parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date(), None
+    except (TypeError, ValueError):
+        return None, f'{name} must be a date (YYYY-MM-DD)'
+
+def validate_booking(data, today=None):
+    """Check a new booking. Returns (create_booking parameters, None) or (None, error message)."""
+    try:
+        property_id = str(uuid.UUID(data.get('property_id')))
+    except (TypeError, ValueError, AttributeError):
+        return None, 'property_id must be a property id'
+
+    room_type = data.get('room_type')
+    if not isinstance(room_type, str) or not room_type.strip():
+        return None, 'room_type is required'
+    room_type = room_type.strip()
+    if len(room_type) > MAX_ROOM_TYPE_LENGTH:
+        return None, f'room_type must be at most {MAX_ROOM_TYPE_LENGTH} characters'
+
+    check_in, error = parse_date(data.get('check_in_date'), 'check_in_date')
+    if error:
+        return None, error
+    if check_in < (today or date.today()):
+        return None, 'check_in_date cannot be in the past'
+
+    check_out = None
+    if data.get('check_out_date'):
+        check_out, error = parse_date(data['check_out_date'], 'check_out_date')
+        if error:
+            return None, error
+        if check_out <= check_in:
+            return None, 'check_out_date must be after check_in_date'
+
+    notes = data.get('booking_notes') or None
+    if notes is not None and (not isinstance(notes, str) or len(notes) > MAX_NOTES_LENGTH):
+        return None, f'booking_notes must be text of at most {MAX_NOTES_LENGTH} characters'
+
+    return {
+        'p_property_id': property_id,
+        'p_room_type': room_type,
+        'p_check_in_date': check_in.isoformat(),
+        'p_check_out_date': check_out.isoformat() if check_out else None,
+        'p_booking_notes': notes
+    }, None
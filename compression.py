@@ -0,0 +1,74 @@
+"""
+Response compression for EasyPG.
+
+Text responses (JSON, HTML, CSS, JS, CSV) above a size threshold are sent
+brotli- or gzip-compressed, whichever the client's Accept-Encoding prefers
+among those available: brotli needs the optional brotli package, gzip is
+always there. Listing pages repeat the same keys, owner blocks and image
+paths on every item, so they shrink several times over. Streamed bodies are
+compressed chunk by chunk as they're produced; event streams are left alone,
+since a compressor would hold events back.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript', 'image/svg+xml'
+)
+
+def available_encodings():
+    """Content codings this process can produce, preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def choose_encoding(accept_encodings):
+    """The coding to use for a werkzeug Accept-Encoding header, or None."""
+    return accept_encodings.best_match(available_encodings())
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+class Compressor:
+    """One body's compressor: feed chunks to compress(), then flush() once."""
+
+    def __init__(self, encoding, gzip_level=6, brotli_quality=4):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: zlib stream in a gzip wrapper
+            self.compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def flush(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+def compress(body, encoding, gzip_level=6, brotli_quality=4):
+    compressor = Compressor(encoding, gzip_level, brotli_quality)
+    return compressor.compress(body) + compressor.flush()
+
+def compress_chunks(chunks, encoding, gzip_level=6, brotli_quality=4):
+    """Compress a streamed body as it's produced, yielding whatever the compressor hands back."""
+    compressor = Compressor(encoding, gzip_level, brotli_quality)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -0,0 +1,214 @@
+"""
+In-process publish/subscribe for EasyPG's push endpoints.
+
+Routes publish small JSON events to named channels (e.g. user:<id>), and
+Server-Sent Event streams and long-polls subscribe to them instead of
+polling the database. Each channel keeps its last few events, so a client
+that reconnects with the id of the last event it saw (Last-Event-ID, or
+?after=) is sent what it missed, or a `reset` event when that's no longer
+possible and it should reload instead.
+
+Subscribers can wait from a Flask worker thread or from the ASGI event loop.
+Events reach subscribers in the same process only.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+class BrokerFull(Exception):
+    """Raised when max_subscribers subscriptions are already open."""
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def to_dict(self):
+        return {'id': str(self.id), 'type': self.type, 'data': self.data}
+
+def format_sse(event_type, data, event_id=None):
+    """One text/event-stream message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+def parse_event_id(value):
+    """Event id from Last-Event-ID or ?after=; None when absent or malformed."""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+class Channel:
+    __slots__ = ('backlog', 'subscribers', 'missed_before')
+
+    def __init__(self, backlog, missed_before):
+        self.backlog = deque(maxlen=backlog)
+        self.subscribers = set()
+        # Events up to this id may have been dropped from the backlog
+        self.missed_before = missed_before
+
+class Subscription:
+    """Events published to some channels since subscribing, queued until read."""
+
+    def __init__(self, broker, names):
+        self.broker = broker
+        self.names = names
+        self.events = deque()
+        self.condition = threading.Condition()
+        # Latest event id when subscribing: where a client without events resumes
+        self.start_id = None
+        # (loop, asyncio.Event) while a coroutine is waiting
+        self.waker = None
+        self.closed = False
+
+    def push(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+            waker = self.waker
+        if waker is not None:
+            loop, ready = waker
+            loop.call_soon_threadsafe(ready.set)
+
+    def drain(self):
+        with self.condition:
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def wait(self, timeout):
+        """Queued events, blocking up to timeout seconds for the first one."""
+        with self.condition:
+            if not self.events:
+                self.condition.wait(timeout)
+        return self.drain()
+
+    async def wait_async(self, timeout):
+        """wait() for the event loop."""
+        ready = asyncio.Event()
+        with self.condition:
+            if not self.events:
+                self.waker = (asyncio.get_running_loop(), ready)
+        if self.waker is not None:
+            try:
+                await asyncio.wait_for(ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self.condition:
+                    self.waker = None
+        return self.drain()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class EventBroker:
+    def __init__(self, backlog=100, max_channels=100000, max_subscribers=10000):
+        self.backlog = backlog
+        self.max_channels = max_channels
+        self.max_subscribers = max_subscribers
+        self.lock = threading.Lock()
+        self.channels = OrderedDict()
+        self.subscribers = 0
+        self.published = 0
+        # Microseconds since the epoch at startup, then counting up, so ids keep
+        # increasing across restarts and an id from before one shows as a gap
+        self.ids = itertools.count(time.time_ns() // 1000)
+        self.last_id = next(self.ids)
+        # Events up to here are unknown to channels created from now on
+        self.forgotten_id = self.last_id
+
+    def _channel(self, name):
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = Channel(self.backlog, self.forgotten_id)
+            self._evict()
+        else:
+            self.channels.move_to_end(name)
+        return channel
+
+    def _evict(self):
+        # Least recently used channels nobody is listening to
+        for name in list(self.channels):
+            if len(self.channels) <= self.max_channels:
+                return
+            channel = self.channels[name]
+            if not channel.subscribers:
+                if channel.backlog:
+                    self.forgotten_id = max(self.forgotten_id, channel.backlog[-1].id)
+                del self.channels[name]
+
+    def publish(self, name, event_type, data):
+        with self.lock:
+            self.last_id = next(self.ids)
+            event = Event(self.last_id, event_type, data)
+            channel = self._channel(name)
+            if len(channel.backlog) == channel.backlog.maxlen:
+                channel.missed_before = channel.backlog[0].id
+            channel.backlog.append(event)
+            subscribers = list(channel.subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            subscription.push(event)
+        return event
+
+    def subscribe(self, names, after=None):
+        """Subscription to channels names.
+
+        With after (an event id), events since then are queued first, or a
+        `reset` event if some of them are no longer kept.
+        """
+        subscription = Subscription(self, list(names))
+        with self.lock:
+            if self.subscribers >= self.max_subscribers:
+                raise BrokerFull('Too many open event streams, please retry')
+            self.subscribers += 1
+            subscription.start_id = self.last_id
+            missed = []
+            gap = False
+            for name in subscription.names:
+                channel = self._channel(name)
+                channel.subscribers.add(subscription)
+                if after is not None:
+                    gap = gap or after < channel.missed_before
+                    missed.extend(event for event in channel.backlog if event.id > after)
+            if gap:
+                subscription.events.append(Event(self.last_id, 'reset', {}))
+            else:
+                subscription.events.extend(sorted(missed, key=lambda event: event.id))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers -= 1
+            for name in subscription.names:
+                channel = self.channels.get(name)
+                if channel is not None:
+                    channel.subscribers.discard(subscription)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'channels': len(self.channels),
+                'subscribers': self.subscribers,
+                'published': self.published
+            }
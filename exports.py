@@ -0,0 +1,128 @@
+"""
+Streaming table exports for EasyPG.
+
+Rows are read in id order, one keyset page at a time, and written out as
+CSV or NDJSON as each page arrives, so an export of any size holds one page
+in memory and the client starts receiving data straight away. CSV uses the
+same columns and `|`-separated amenities as POST /api/properties/import.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+# name -> columns written, embeds they come from, and the column that scopes rows to an owner
+EXPORTS = {
+    'properties': {
+        'columns': (
+            'id', 'property_name', 'property_type', 'description', 'address', 'city', 'state',
+            'pincode', 'landmark', 'latitude', 'longitude', 'total_rooms', 'available_rooms',
+            'bathrooms', 'floors', 'rent_per_month', 'security_deposit', 'maintenance_charges', 'amenities',
+            'gender_preference', 'food_policy', 'visitor_policy', 'status', 'owner_id',
+            'created_at', 'updated_at'
+        ),
+        'embedded': {},
+        'owner_column': 'owner_id'
+    },
+    'bookings': {
+        'columns': (
+            'id', 'property_id', 'property_name', 'student_id', 'room_type', 'check_in_date',
+            'check_out_date', 'monthly_rent', 'security_deposit', 'total_amount', 'status',
+            'booking_notes', 'created_at', 'updated_at'
+        ),
+        # !inner so owners can be filtered on properties.owner_id
+        'embedded': {'property_name': 'properties!inner(property_name, owner_id)'},
+        'owner_column': 'properties.owner_id'
+    },
+    'payments': {
+        'columns': (
+            'id', 'booking_id', 'student_id', 'owner_id', 'payment_type', 'amount',
+            'payment_method', 'transaction_id', 'status', 'due_date', 'paid_at', 'created_at'
+        ),
+        'embedded': {},
+        'owner_column': 'owner_id'
+    }
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+def export_select(name):
+    spec = EXPORTS[name]
+    columns = [column for column in spec['columns'] if column not in spec['embedded']]
+    return ', '.join(columns + sorted(set(spec['embedded'].values())))
+
+def flatten(row, name):
+    """Row with embedded columns lifted to the top level, in export column order."""
+    spec = EXPORTS[name]
+    out = {}
+    for column in spec['columns']:
+        if column in spec['embedded']:
+            embed = spec['embedded'][column].split('!')[0].split('(')[0]
+            out[column] = (row.get(embed) or {}).get(column)
+        else:
+            out[column] = row.get(column)
+    return out
+
+def keyset_pages(build_query, page_size=1000):
+    """Yield lists of rows from build_query() in id order, page_size at a time.
+
+    Each page is a fresh query for ids after the last one seen, so pages stay
+    fast however deep into the table the export is.
+    """
+    last_id = None
+    while True:
+        query = build_query()
+        if last_id:
+            query = query.gt('id', last_id)
+        rows = query.order('id').limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return '|'.join(str(item) for item in value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+def csv_chunks(name, pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS[name]['columns'])
+    # The header goes out before the first query
+    yield buffer.getvalue().encode('utf-8')
+    for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([csv_value(value) for value in flatten(row, name).values()])
+        yield buffer.getvalue().encode('utf-8')
+
+def ndjson_chunks(name, pages):
+    # Let the response start before the first query
+    yield b''
+    for rows in pages:
+        yield ''.join(json.dumps(flatten(row, name), default=str) + '\n' for row in rows).encode('utf-8')
+
+def gzip_chunks(chunks, level=6):
+    """gzip a stream, flushing after every chunk so each page reaches the client as it's read."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_chunks(name, format, pages, gzip=False):
+    """Encoded body of an export: bytes chunks, one per page."""
+    chunks = csv_chunks(name, pages) if format == 'csv' else ndjson_chunks(name, pages)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,88 @@
+"""
+JSON encoding for EasyPG's API responses.
+
+FastJSONProvider replaces Flask's stdlib-based provider for jsonify() and
+friends. With JSON_ENCODER=auto (the default) it encodes with orjson when
+that's installed, several times faster than the json module on listing
+pages, and falls back to json otherwise; orjson or stdlib pick one outright.
+Output keeps Flask's conventions: keys sorted, compact outside debug mode,
+dates as HTTP dates, UUIDs and dataclasses converted. Values orjson can't
+encode (integers beyond 64 bits) fall back to json for that response.
+
+stream_json() encodes a response whose one long list is sent item by item,
+so a large page starts going out before the whole body is built.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODERS = ('auto', 'orjson', 'stdlib')
+
+class FastJSONProvider(DefaultJSONProvider):
+    def __init__(self, app, encoder='auto'):
+        super().__init__(app)
+        if encoder not in ENCODERS:
+            raise ValueError(f"JSON encoder must be one of {', '.join(ENCODERS)}")
+        if encoder == 'orjson' and orjson is None:
+            raise ValueError('JSON_ENCODER=orjson needs the orjson package')
+        self.encoder = 'stdlib' if encoder == 'stdlib' or orjson is None else 'orjson'
+
+    def dumps_bytes(self, obj, indent=False):
+        """obj as UTF-8 JSON, with this provider's options."""
+        if self.encoder == 'orjson':
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except TypeError:
+                pass
+        separators = None if indent else (',', ':')
+        return json.dumps(obj, default=self.default, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+                          indent=2 if indent else None, separators=separators).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or self.encoder == 'stdlib':
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or self.encoder == 'stdlib':
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+def stream_json(provider, obj, key, batch_size=100):
+    """Chunks of provider's encoding of dict obj, with the list obj[key] encoded batch_size items at a time.
+
+    Keys come out in the same order as the provider would write them.
+    """
+    keys = sorted(obj) if provider.sort_keys else list(obj)
+    yield b'{'
+    for position, name in enumerate(keys):
+        prefix = provider.dumps_bytes(name) + b':'
+        if position:
+            prefix = b',' + prefix
+        if name != key:
+            yield prefix + provider.dumps_bytes(obj[name])
+            continue
+
+        items = obj[key]
+        yield prefix + b'['
+        for start in range(0, len(items), batch_size):
+            chunk = b','.join(provider.dumps_bytes(item) for item in items[start:start + batch_size])
+            yield chunk if start == 0 else b',' + chunk
+        yield b']'
+    yield b'}\n'
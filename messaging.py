@@ -0,0 +1,132 @@
+"""
+Conversations and unread counters for EasyPG messaging.
+
+Messages between two users about one property (or none) form a
+conversation. Its id is derived from the two users and the property, so
+either side, and every worker, computes the same id without a lookup. Each
+participant has a row in conversations with the last message and their
+unread count, and inbox_unread_counts holds each user's total; the triggers
+in scripts/messaging.sql maintain both as messages are sent, read and
+deleted, so showing counts is a primary-key read however large the mailbox.
+"""
+
+import uuid
+from datetime import datetime
+
+# Fixed namespace for conversation ids; changing it orphans every conversation
+CONVERSATION_NAMESPACE = uuid.UUID('6b1f3c9e-2a4d-5e8f-9c0b-7d6e5f4a3b2c')
+
+MAX_MESSAGE_LENGTH = 5000
+
+MESSAGE_SELECT = 'id, conversation_id, sender_id, receiver_id, property_id, message_text, is_read, read_at, created_at'
+
+CONVERSATION_SELECT = (
+    'conversation_id, counterpart_id, property_id, last_message_id, last_message_text, '
+    'last_sender_id, last_message_at, unread_count, '
+    'users!conversations_counterpart_id_fkey(full_name, user_type), properties(property_name)'
+)
+
+def conversation_id(user_id, other_id, property_id=None):
+    low, high = sorted((str(user_id), str(other_id)))
+    return str(uuid.uuid5(CONVERSATION_NAMESPACE, f"{low}:{high}:{property_id or ''}"))
+
+def user_channel(user_id):
+    """Event channel for pushes to one user."""
+    return f'user:{user_id}'
+
+def validate_message(data):
+    """Check a new message. Returns ({receiver_id, property_id, message_text}, None) or (None, error message)."""
+    receiver_id = data.get('receiver_id')
+    if not receiver_id or not isinstance(receiver_id, str):
+        return None, 'receiver_id is required'
+
+    text = data.get('message_text')
+    if not isinstance(text, str) or not text.strip():
+        return None, 'message_text is required'
+    text = text.strip()
+    if len(text) > MAX_MESSAGE_LENGTH:
+        return None, f'message_text must be at most {MAX_MESSAGE_LENGTH} characters'
+
+    property_id = data.get('property_id') or None
+    if property_id is not None and not isinstance(property_id, str):
+        return None, 'property_id must be a string'
+
+    return {'receiver_id': receiver_id, 'property_id': property_id, 'message_text': text}, None
+
+def build_message_row(values, sender_id):
+    return {
+        'id': str(uuid.uuid4()),
+        'conversation_id': conversation_id(sender_id, values['receiver_id'], values['property_id']),
+        'sender_id': sender_id,
+        'receiver_id': values['receiver_id'],
+        'property_id': values['property_id'],
+        'message_text': values['message_text'],
+        'is_read': False,
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+def serialize_message(message, user_id):
+    return {
+        'id': message['id'],
+        'conversation_id': message['conversation_id'],
+        'sender_id': message['sender_id'],
+        'receiver_id': message['receiver_id'],
+        'property_id': message.get('property_id'),
+        'message_text': message['message_text'],
+        'direction': 'sent' if message['sender_id'] == user_id else 'received',
+        'is_read': bool(message.get('is_read')),
+        'read_at': message.get('read_at'),
+        'created_at': message['created_at']
+    }
+
+def serialize_conversation(row):
+    counterpart = row.get('users') or {}
+    prop = row.get('properties') or {}
+    return {
+        'conversation_id': row['conversation_id'],
+        'counterpart': {
+            'id': row['counterpart_id'],
+            'name': counterpart.get('full_name') or 'Unknown user',
+            'user_type': counterpart.get('user_type')
+        },
+        'property': {'id': row['property_id'], 'name': prop.get('property_name')} if row.get('property_id') else None,
+        'last_message': {
+            'id': row['last_message_id'],
+            'text': row['last_message_text'],
+            'sender_id': row['last_sender_id'],
+            'created_at': row['last_message_at']
+        },
+        'unread_count': row['unread_count']
+    }
+
+def aggregate_conversations(messages):
+    """Fold message rows, in any order, into {(user_id, conversation_id): conversations row}
+    and {user_id: unread total}, as the triggers would have built them.
+    """
+    conversations = {}
+    unread = {}
+    for message in messages:
+        if message['sender_id'] == message['receiver_id']:
+            continue
+        cid = message['conversation_id']
+        for user_id, other_id in ((message['sender_id'], message['receiver_id']), (message['receiver_id'], message['sender_id'])):
+            row = conversations.setdefault((user_id, cid), {
+                'user_id': user_id,
+                'conversation_id': cid,
+                'counterpart_id': other_id,
+                'property_id': message.get('property_id'),
+                'unread_count': 0,
+                'last_message_at': None
+            })
+            if row['last_message_at'] is not None and row['last_message_at'] > message['created_at']:
+                continue
+            row.update({
+                'last_message_id': message['id'],
+                'last_message_text': message['message_text'][:200],
+                'last_sender_id': message['sender_id'],
+                'last_message_at': message['created_at']
+            })
+        if not message.get('is_read'):
+            conversations[(message['receiver_id'], cid)]['unread_count'] += 1
+            unread[message['receiver_id']] = unread.get(message['receiver_id'], 0) + 1
+    return conversations, unread
@@ -0,0 +1,219 @@
+"""
+Request metrics for EasyPG.
+
+Each request's latency, status and response size is recorded per route (the
+URL rule, so /api/properties/<property_id> is one series however many
+listings there are), along with the database calls it made: every PostgREST
+request, to Supabase or the SQLite backend, is counted and timed by table
+and operation. GET /metrics serves the totals in the Prometheus text format,
+and each response carries a Server-Timing header splitting its own time into
+database calls, bcrypt and the rest (validation, JSON building), so a slow
+request can be read off the browser's network panel.
+
+Recording costs a few dict updates under one lock per request and per
+database call, cheap enough to leave on.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Database calls per request
+CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+# Requests that matched no URL rule share one series, so scanners can't add series
+UNMATCHED_ROUTE = 'unmatched'
+
+def query_labels(method, path, prefer=''):
+    """(table, operation) of a PostgREST request; an rpc call's table is the function name."""
+    parts = path.rstrip('/').split('/')
+    if len(parts) > 1 and parts[-2] == 'rpc':
+        return parts[-1], 'rpc'
+    if method in ('GET', 'HEAD'):
+        operation = 'select'
+    elif method == 'POST':
+        operation = 'upsert' if 'resolution=' in prefer else 'insert'
+    else:
+        operation = {'PATCH': 'update', 'DELETE': 'delete'}.get(method, method.lower())
+    return parts[-1], operation
+
+class Histogram:
+    """Cumulative Prometheus histogram; callers hold the registry lock."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus +Inf, not cumulative until rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestTimings:
+    """Time spent by one request, for its Server-Timing header.
+
+    Database calls may come from gather()'s worker threads at once, so they
+    are appended (atomic) rather than summed in place.
+    """
+
+    __slots__ = ('started', 'calls', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = []
+        self.phases = []
+
+class Metrics:
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, size_buckets=SIZE_BUCKETS, call_buckets=CALL_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.call_buckets = call_buckets
+        self.lock = threading.Lock()
+        # (route, method, status) -> requests
+        self.responses = {}
+        # (route, method) -> Histogram
+        self.latency = {}
+        self.sizes = {}
+        self.request_calls = {}
+        self.request_db_seconds = {}
+        # (table, operation) -> [calls, errors, Histogram of seconds]
+        self.queries = {}
+        # The current request's timings; each thread and task sees its own
+        self.current = contextvars.ContextVar('request_timings', default=None)
+
+    def start_request(self):
+        self.current.set(RequestTimings())
+
+    def record_query(self, method, path, prefer, seconds, status):
+        """One PostgREST request; status is None when it raised."""
+        timings = self.current.get()
+        if timings is not None:
+            timings.calls.append(seconds)
+        key = query_labels(method, path, prefer)
+        with self.lock:
+            entry = self.queries.get(key)
+            if entry is None:
+                entry = self.queries[key] = [0, 0, Histogram(self.latency_buckets)]
+            entry[0] += 1
+            if status is None or status >= 400:
+                entry[1] += 1
+            entry[2].observe(seconds)
+
+    @contextmanager
+    def timed(self, phase):
+        """Count the enclosed block towards phase in this request's Server-Timing."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = self.current.get()
+            if timings is not None:
+                timings.phases.append((phase, time.perf_counter() - started))
+
+    def finish_request(self, route, method, status, size):
+        """Record the current request. Returns its Server-Timing header value, or None outside a request.
+
+        size is None when the body is streamed and its length isn't known.
+        """
+        timings = self.current.get()
+        if timings is None:
+            return None
+        self.current.set(None)
+        seconds = time.perf_counter() - timings.started
+        db_seconds = sum(timings.calls)
+        route = route or UNMATCHED_ROUTE
+        key = (route, method)
+
+        with self.lock:
+            response_key = (route, method, status)
+            self.responses[response_key] = self.responses.get(response_key, 0) + 1
+            self._histogram(self.latency, key, self.latency_buckets).observe(seconds)
+            self._histogram(self.request_calls, key, self.call_buckets).observe(len(timings.calls))
+            self._histogram(self.request_db_seconds, key, self.latency_buckets).observe(db_seconds)
+            if size is not None:
+                self._histogram(self.sizes, key, self.size_buckets).observe(size)
+
+        return server_timing(seconds, len(timings.calls), db_seconds, timings.phases)
+
+    def _histogram(self, histograms, key, buckets):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    def render(self):
+        """All series in the Prometheus text exposition format."""
+        with self.lock:
+            lines = []
+            self._render_counter(lines, 'easypg_http_requests_total', 'Requests by route, method and status.',
+                                 ('route', 'method', 'status'), self.responses)
+            self._render_histograms(lines, 'easypg_http_request_duration_seconds', 'Request latency by route, to the response headers.',
+                                    ('route', 'method'), self.latency)
+            self._render_histograms(lines, 'easypg_http_response_size_bytes', 'Response body size by route (streamed bodies excluded).',
+                                    ('route', 'method'), self.sizes)
+            self._render_histograms(lines, 'easypg_http_request_db_calls', 'Database calls made by each request, by route.',
+                                    ('route', 'method'), self.request_calls)
+            self._render_histograms(lines, 'easypg_http_request_db_seconds', 'Database time of each request (concurrent calls summed), by route.',
+                                    ('route', 'method'), self.request_db_seconds)
+            self._render_counter(lines, 'easypg_db_calls_total', 'Database calls by table and operation.',
+                                 ('table', 'operation'), {key: entry[0] for key, entry in self.queries.items()})
+            self._render_counter(lines, 'easypg_db_call_errors_total', 'Failed database calls by table and operation.',
+                                 ('table', 'operation'), {key: entry[1] for key, entry in self.queries.items()})
+            self._render_histograms(lines, 'easypg_db_call_duration_seconds', 'Database call latency by table and operation.',
+                                    ('table', 'operation'), {key: entry[2] for key, entry in self.queries.items()})
+        return '\n'.join(lines) + '\n'
+
+    def _render_counter(self, lines, name, help_text, label_names, values):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key, value in sorted(values.items()):
+            lines.append(f'{name}{{{labels(label_names, key)}}} {value}')
+
+    def _render_histograms(self, lines, name, help_text, label_names, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(histograms.items()):
+            label_text = labels(label_names, key)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_text}}} {float(histogram.sum)}')
+            lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': sum(self.responses.values()),
+                'errors': sum(n for (_, _, status), n in self.responses.items() if status >= 500),
+                'routes': len(self.latency),
+                'db_calls': sum(entry[0] for entry in self.queries.values()),
+                'db_call_errors': sum(entry[1] for entry in self.queries.values())
+            }
+
+def labels(names, values):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def server_timing(seconds, calls, db_seconds, phases):
+    """Server-Timing value: db (summed over calls, so concurrent calls can exceed total), each phase, app and total."""
+    entries = [f'db;dur={db_seconds * 1000:.1f};desc="{calls} call{"" if calls == 1 else "s"}"']
+    phase_seconds = 0
+    for phase, phase_time in phases:
+        entries.append(f'{phase};dur={phase_time * 1000:.1f}')
+        phase_seconds += phase_time
+    # What's left: routing, validation, serialization; clamped when gather() overlapped calls
+    entries.append(f'app;dur={max(seconds - db_seconds - phase_seconds, 0) * 1000:.1f}')
+    entries.append(f'total;dur={seconds * 1000:.1f}')
+    return ', '.join(entries)
@@ -0,0 +1,135 @@
+"""
+Bounded bcrypt worker pool for EasyPG.
+
+bcrypt is deliberately CPU-heavy. Running it on the request threads lets a
+burst of logins starve cheap requests, so hashing and checking happen in a
+separate process pool with a cap on outstanding jobs. Jobs over the cap are
+rejected straight away instead of queueing behind everyone else.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+class HasherBusy(Exception):
+    """Raised when the pool is at capacity or a job timed out."""
+
+# Worker functions live at module level so the process pool can pickle them
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+class PasswordHasher:
+    def __init__(self, workers=None, max_pending=32, rounds=12, timeout=10, executor='process'):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.timeout = timeout
+        self.executor_type = executor
+
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.samples = deque(maxlen=1024)
+
+    def _get_executor(self):
+        # Created lazily so pre-forking servers don't inherit a pool from the master
+        if self.executor is None:
+            if self.executor_type == 'thread':
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            else:
+                context = multiprocessing.get_context('spawn')
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self.executor
+
+    def _run(self, fn, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy('Too many password operations in progress, please retry')
+            self.pending += 1
+            self.submitted += 1
+            executor = self._get_executor()
+
+        start = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # A job stays pending until it leaves its worker: a timed-out job that
+        # is already running can't be cancelled, and still holds a worker
+        future.add_done_callback(self._release)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self.lock:
+                self.timeouts += 1
+            raise HasherBusy('Password operation timed out, please retry')
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            self.samples.append(elapsed)
+        return result
+
+    def _release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+
+    def hash(self, password):
+        return self._run(_hashpw, password, self.rounds)
+
+    def verify(self, password, hashed):
+        return self._run(_checkpw, password, hashed)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            completed = self.completed
+            stats = {
+                'executor': self.executor_type,
+                'workers': self.workers,
+                'rounds': self.rounds,
+                'max_pending': self.max_pending,
+                'queue_depth': self.pending,
+                'submitted': self.submitted,
+                'completed': completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'failed': self.failed,
+                'avg_seconds': self.total_seconds / completed if completed else 0.0,
+                'max_seconds': self.max_seconds
+            }
+        for name, q in (('p50_seconds', 0.50), ('p95_seconds', 0.95), ('p99_seconds', 0.99)):
+            stats[name] = samples[min(int(q * len(samples)), len(samples) - 1)] if samples else 0.0
+        return stats
@@ -0,0 +1,212 @@
+"""
+On-demand request profiling for EasyPG.
+
+When profiling is enabled, each Flask view is wrapped so that a chosen
+request (an admin's request carrying X-Profile, or a random sample of
+PROFILE_SAMPLE_RATE) runs under cProfile while a sampler thread records its
+stack every interval seconds. Each profiled request leaves three files in
+the profile directory:
+
+    <id>.prof       pstats (python -m pstats, snakeviz)
+    <id>.collapsed  collapsed stacks, one "frame;frame;... count" per line,
+                    for flamegraph.pl or speedscope
+    <id>.json       the request, its duration and every database call it
+                    made, in order, with its table, operation and duration
+
+and its response names them in an X-Profile-Id header.
+
+Only one request is profiled at a time (a profiler hooks the interpreter);
+requests chosen while another is being profiled run as usual. With
+profiling disabled nothing is wrapped, so it costs nothing.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+from flask import after_this_request, request
+
+from metrics import query_labels
+
+logger = logging.getLogger(__name__)
+
+class Profile:
+    """One profiled request in progress."""
+
+    def __init__(self, profile_id, endpoint, method, path, trigger):
+        self.id = profile_id
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        # (table, operation, offset from the start, seconds, status); appended from gather()'s threads too
+        self.queries = []
+        self.stacks = Counter()
+
+class StackSampler:
+    """Counts the collapsed stacks of one thread, sampled every interval seconds."""
+
+    def __init__(self, thread_id, stacks, interval, root=None):
+        self.thread_id = thread_id
+        self.stacks = stacks
+        self.root = root
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame, self.root)] += 1
+
+def collapse(frame, root=None):
+    """A stack as 'outermost;...;innermost', each frame 'function (file:line)', up to (not including) code root."""
+    frames = []
+    while frame is not None and frame.f_code is not root:
+        code = frame.f_code
+        frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+class RequestProfiler:
+    def __init__(self, directory='profiles', sample_rate=0.0, interval=0.001, max_profiles=200):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_profiles = max_profiles
+        # Held while a request is profiled; others chosen meanwhile are skipped
+        self.lock = threading.Lock()
+        self.current = contextvars.ContextVar('profile', default=None)
+        self.profiled = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def wrap(self, view, choose):
+        """view, profiled whenever choose() names a trigger ('header', 'sample') rather than None."""
+        @wraps(view)
+        def profiled_view(*args, **kwargs):
+            trigger = choose()
+            if trigger is None:
+                return view(*args, **kwargs)
+            if not self.lock.acquire(blocking=False):
+                self.skipped += 1
+                return view(*args, **kwargs)
+            try:
+                return self.run(view, args, kwargs, trigger)
+            finally:
+                self.lock.release()
+
+        return profiled_view
+
+    def run(self, view, args, kwargs, trigger):
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.endpoint}-{uuid.uuid4().hex[:8]}"
+        profile = Profile(profile_id, request.endpoint, request.method, request.full_path.rstrip('?'), trigger)
+        token = self.current.set(profile)
+        # Stacks start at the view, not the server's frames above it
+        sampler = StackSampler(threading.get_ident(), profile.stacks, self.interval, root=RequestProfiler.run.__code__)
+        profiler = cProfile.Profile()
+
+        sampler.start()
+        profiler.enable()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            profiler.disable()
+            sampler.stop()
+            self.current.reset(token)
+            duration = time.perf_counter() - profile.started
+            try:
+                self.save(profile, profiler, duration)
+                self.profiled += 1
+
+                @after_this_request
+                def name_profile(response):
+                    response.headers['X-Profile-Id'] = profile_id
+                    return response
+            except OSError:
+                self.errors += 1
+                logger.exception('Saving profile %s failed', profile_id)
+
+    def record_query(self, method, path, prefer, seconds, status):
+        """on_request hook: adds a database call to the profile of the current request, if any."""
+        profile = self.current.get()
+        if profile is not None:
+            table, operation = query_labels(method, path, prefer)
+            offset = time.perf_counter() - seconds - profile.started
+            profile.queries.append((table, operation, offset, seconds, status))
+
+    def save(self, profile, profiler, duration):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        profiler.dump_stats(base + '.prof')
+
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in sorted(profile.stacks.items()):
+                f.write(f'{stack} {count}\n')
+
+        queries = sorted(profile.queries, key=lambda query: query[2])
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'id': profile.id,
+                'endpoint': profile.endpoint,
+                'method': profile.method,
+                'path': profile.path,
+                'trigger': profile.trigger,
+                'started_at': profile.started_at.isoformat(),
+                'duration_ms': round(duration * 1000, 3),
+                'samples': sum(profile.stacks.values()),
+                'sample_interval_ms': self.interval * 1000,
+                'db_calls': len(queries),
+                'db_ms': round(sum(query[3] for query in queries) * 1000, 3),
+                'queries': [{
+                    'table': table,
+                    'operation': operation,
+                    'start_ms': round(offset * 1000, 3),
+                    'duration_ms': round(seconds * 1000, 3),
+                    'status': status
+                } for table, operation, offset, seconds, status in queries]
+            }, f, indent=2)
+
+        self.prune()
+
+    def prune(self):
+        """Keep the newest max_profiles profiles (ids start with their timestamp)."""
+        ids = sorted({name.rsplit('.', 1)[0] for name in os.listdir(self.directory) if name.endswith('.json')})
+        for profile_id in ids[:max(len(ids) - self.max_profiles, 0)]:
+            for extension in ('.prof', '.collapsed', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        return {
+            'directory': os.path.abspath(self.directory),
+            'sample_rate': self.sample_rate,
+            'profiled': self.profiled,
+            'skipped': self.skipped,
+            'errors': self.errors
+        }
@@ -0,0 +1,327 @@
+"""
+Property validation and bulk import for EasyPG.
+
+validate_property() holds the rules a new listing must pass; both
+POST /api/properties and POST /api/properties/import use it. The importer
+reads CSV or NDJSON records one at a time from the request stream and
+inserts them in batches, so memory stays flat however long the upload is
+(only the ref -> id map of imported properties grows).
+
+Every record is a property unless its `type` is "image". A property may
+carry a `ref` that image records in the same upload point at with
+`property_ref`, e.g. in NDJSON:
+
+    {"ref": "hsr-1", "property_name": "Sunrise PG", "property_type": "boys_pg", ...}
+    {"type": "image", "property_ref": "hsr-1", "image_url": "https://...", "image_order": 0}
+"""
+
+import csv
+import io
+import json
+import re
+import uuid
+from datetime import datetime
+
+from postgrest.exceptions import APIError
+
+REQUIRED_FIELDS = (
+    'property_name', 'property_type', 'address', 'city', 'state', 'pincode',
+    'total_rooms', 'available_rooms', 'bathrooms', 'floors',
+    'rent_per_month', 'security_deposit', 'gender_preference'
+)
+
+TEXT_FIELDS = (
+    'property_name', 'description', 'address', 'city', 'state', 'pincode',
+    'landmark', 'food_policy', 'visitor_policy'
+)
+INTEGER_FIELDS = ('total_rooms', 'available_rooms', 'bathrooms', 'floors')
+DECIMAL_FIELDS = ('rent_per_month', 'security_deposit', 'maintenance_charges')
+# Optional, but given together; (low, high) in degrees
+COORDINATE_FIELDS = {'latitude': (-90, 90), 'longitude': (-180, 180)}
+
+# Mirrors the CHECK constraints in scripts/complete-database-setup.sql
+CHOICES = {
+    'property_type': ('boys_pg', 'girls_pg', 'co_living', 'hostel', 'shared_apartment'),
+    'gender_preference': ('boys_only', 'girls_only', 'co_living')
+}
+
+FORMATS = {
+    'csv': ('text/csv',),
+    'ndjson': ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-lines')
+}
+
+def is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def parse_number(value, cast):
+    if isinstance(value, bool):
+        raise ValueError
+    return cast(value.strip()) if isinstance(value, str) else cast(value)
+
+def parse_amenities(value):
+    # A list (JSON) or "wifi|meals" / "wifi,meals" (CSV)
+    if is_blank(value):
+        return []
+    if isinstance(value, str):
+        value = re.split(r'[|,]', value)
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def validate_property(data):
+    """Check and normalize a new property's fields.
+
+    Returns (values, None) with numbers parsed and amenities as a list, or
+    (None, error message).
+    """
+    for field in REQUIRED_FIELDS:
+        if is_blank(data.get(field)):
+            return None, f'{field} is required'
+
+    values = {}
+    for field in TEXT_FIELDS:
+        values[field] = '' if is_blank(data.get(field)) else str(data[field]).strip()
+
+    for field in INTEGER_FIELDS:
+        try:
+            values[field] = parse_number(data[field], int)
+        except (TypeError, ValueError):
+            return None, f'{field} must be a whole number'
+        if values[field] < 0:
+            return None, f'{field} cannot be negative'
+
+    for field in DECIMAL_FIELDS:
+        if is_blank(data.get(field)):
+            values[field] = 0
+            continue
+        try:
+            values[field] = parse_number(data[field], float)
+        except (TypeError, ValueError):
+            return None, f'{field} must be a number'
+        if values[field] < 0:
+            return None, f'{field} cannot be negative'
+
+    given = [field for field in COORDINATE_FIELDS if not is_blank(data.get(field))]
+    if given and len(given) < len(COORDINATE_FIELDS):
+        return None, 'latitude and longitude must be given together'
+    for field, (low, high) in COORDINATE_FIELDS.items():
+        if not given:
+            values[field] = None
+            continue
+        try:
+            values[field] = parse_number(data[field], float)
+        except (TypeError, ValueError):
+            return None, f'{field} must be a number'
+        if not low <= values[field] <= high:
+            return None, f'{field} must be between {low} and {high}'
+
+    if values['available_rooms'] > values['total_rooms']:
+        return None, 'available_rooms cannot exceed total_rooms'
+
+    for field, choices in CHOICES.items():
+        values[field] = str(data[field]).strip()
+        if values[field] not in choices:
+            return None, f"{field} must be one of: {', '.join(choices)}"
+
+    values['amenities'] = parse_amenities(data.get('amenities'))
+    return values, None
+
+def build_property_row(values, owner):
+    """properties row for validated values, listed by owner and pending review."""
+    now = datetime.utcnow().isoformat()
+    return dict(
+        values,
+        id=str(uuid.uuid4()),
+        owner_name=owner['full_name'],
+        owner_phone=owner['phone'],
+        owner_email=owner['email'],
+        owner_id=owner['id'],
+        status='pending',
+        created_at=now,
+        updated_at=now
+    )
+
+def validate_image(data):
+    if is_blank(data.get('image_url')):
+        return None, 'image_url is required'
+    try:
+        image_order = 0 if is_blank(data.get('image_order')) else parse_number(data['image_order'], int)
+    except (TypeError, ValueError):
+        return None, 'image_order must be a whole number'
+    return {'image_url': str(data['image_url']).strip(), 'image_order': image_order}, None
+
+# Reading uploads
+
+def detect_format(mimetype, requested=None):
+    """'csv' or 'ndjson' from ?format= or the Content-Type, else None."""
+    if requested:
+        return requested if requested in FORMATS else None
+    for name, mimetypes in FORMATS.items():
+        if mimetype in mimetypes:
+            return name
+    return None
+
+def read_records(stream, format):
+    """Yield (line number, record dict or None, error) from a binary stream, one record at a time.
+
+    An unreadable stream ends with an error whose line is None; the records
+    before it have already been yielded.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if format == 'csv' else None)
+    try:
+        if format == 'csv':
+            yield from read_csv(text)
+        else:
+            yield from read_ndjson(text)
+    except UnicodeDecodeError:
+        yield None, None, 'upload is not UTF-8 encoded; stopped reading'
+    except csv.Error as e:
+        yield None, None, f'malformed CSV ({e}); stopped reading'
+
+def read_csv(text):
+    reader = csv.DictReader(text)
+    for record in reader:
+        # Blank cells are missing values, as in NDJSON
+        yield reader.line_num, {key: value for key, value in record.items() if key and not is_blank(value)}, None
+
+def read_ndjson(text):
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'each line must be a JSON object'
+            continue
+        yield line_number, record, None
+
+class PropertyImporter:
+    """Validate records and insert them in batches for one owner.
+
+    A batch the database rejects is retried row by row, so one bad row only
+    costs its own record. on_created(rows) is called with every batch of
+    properties that made it in.
+    """
+
+    def __init__(self, repos, owner, batch_size=500, max_errors=1000, dry_run=False, on_created=None):
+        self.repos = repos
+        self.owner = owner
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.dry_run = dry_run
+        self.on_created = on_created
+
+        self.pending_properties = []  # (line, ref, row)
+        self.pending_images = []      # (line, property ref, row)
+        self.refs = {}                # ref -> (line, id) of the property it names
+        self.failed_refs = set()
+
+        self.properties_created = 0
+        self.images_created = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message, ref=None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'ref': ref, 'error': message})
+
+    def add(self, line, record):
+        record = dict(record)
+        kind = str(record.pop('type', None) or 'property').strip().lower()
+        if kind == 'property':
+            self.add_property(line, record)
+        elif kind == 'image':
+            self.add_image(line, record)
+        else:
+            self.error(line, 'type must be property or image')
+            return
+
+        if len(self.pending_properties) >= self.batch_size or len(self.pending_images) >= self.batch_size:
+            self.flush()
+
+    def add_property(self, line, record):
+        ref = None if is_blank(record.get('ref')) else str(record['ref']).strip()
+        if ref and ref in self.refs:
+            self.error(line, f'ref {ref} is already used on line {self.refs[ref][0]}', ref)
+            return
+
+        values, error = validate_property(record)
+        if error:
+            self.error(line, error, ref)
+            return
+
+        row = build_property_row(values, self.owner)
+        if ref:
+            self.refs[ref] = (line, row['id'])
+        self.pending_properties.append((line, ref, row))
+
+    def add_image(self, line, record):
+        ref = None if is_blank(record.get('property_ref')) else str(record['property_ref']).strip()
+        if not ref:
+            self.error(line, 'property_ref is required')
+            return
+        if ref not in self.refs:
+            self.error(line, f'property_ref {ref} does not match an earlier property', ref)
+            return
+
+        values, error = validate_image(record)
+        if error:
+            self.error(line, error, ref)
+            return
+
+        values['property_id'] = self.refs[ref][1]
+        self.pending_images.append((line, ref, values))
+
+    def flush(self):
+        # Properties first: images reference them
+        properties, self.pending_properties = self.pending_properties, []
+        created = self.insert(self.repos.properties, properties)
+        for line, ref, row in properties:
+            if row['id'] not in created and ref:
+                self.failed_refs.add(ref)
+        self.properties_created += len(created)
+        if created and self.on_created and not self.dry_run:
+            self.on_created([row for _, _, row in properties if row['id'] in created])
+
+        images, self.pending_images = self.pending_images, []
+        ready = []
+        for line, ref, row in images:
+            if ref in self.failed_refs:
+                self.error(line, f'property {ref} on line {self.refs[ref][0]} was not imported', ref)
+            else:
+                ready.append((line, ref, dict(row, id=str(uuid.uuid4()))))
+        self.images_created += len(self.insert(self.repos.property_images, ready))
+
+    def insert(self, repository, pending):
+        """Insert pending rows; returns the ids that were stored."""
+        if not pending:
+            return set()
+        if self.dry_run:
+            return {row['id'] for _, _, row in pending}
+        try:
+            repository.insert_many([row for _, _, row in pending])
+            return {row['id'] for _, _, row in pending}
+        except APIError:
+            pass
+
+        # Find the offending rows
+        created = set()
+        for line, ref, row in pending:
+            try:
+                repository.insert_many([row])
+                created.add(row['id'])
+            except APIError as e:
+                self.error(line, e.message or str(e), ref)
+        return created
+
+    def summary(self):
+        return {
+            'dry_run': self.dry_run,
+            'properties_created': self.properties_created,
+            'images_created': self.images_created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
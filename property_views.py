@@ -0,0 +1,126 @@
+"""
+Field selection for EasyPG property responses.
+
+Each response field knows which Supabase columns or embeds it needs, so a
+request for a named view (card, listing, detail, admin) or an explicit
+fields= list selects only those columns and serializes only those keys.
+"""
+
+PLACEHOLDER_IMAGE = '/static/images/placeholder.jpg'
+
+OWNER_EMBED = 'users!properties_owner_id_fkey(full_name, phone, email)'
+IMAGES_EMBED = 'property_images(image_url, image_order)'
+
+# Fields returned exactly as stored
+COLUMN_FIELDS = (
+    'id', 'property_name', 'property_type', 'description', 'address', 'city', 'state',
+    'pincode', 'landmark', 'latitude', 'longitude', 'total_rooms', 'available_rooms', 'bathrooms',
+    'floors', 'rent_per_month', 'security_deposit', 'maintenance_charges', 'gender_preference',
+    'food_policy', 'visitor_policy', 'status', 'owner_id', 'created_at', 'updated_at'
+)
+
+# Fields built from a column or embed -> what they select
+DERIVED_FIELDS = {
+    'amenities': 'amenities',
+    'images': IMAGES_EMBED,
+    'image': IMAGES_EMBED,
+    'owner': OWNER_EMBED
+}
+
+# Fields the app fills in from other sources (rating summaries, reviews query)
+RATING_FIELDS = ('rating', 'review_count', 'rating_histogram')
+EXTRA_FIELDS = RATING_FIELDS + ('reviews',)
+
+ALL_FIELDS = COLUMN_FIELDS + tuple(DERIVED_FIELDS) + EXTRA_FIELDS
+
+LISTING_FIELDS = (
+    'id', 'property_name', 'property_type', 'city', 'state', 'address', 'rent_per_month',
+    'security_deposit', 'available_rooms', 'total_rooms', 'gender_preference', 'amenities',
+    'images', 'owner', 'created_at', 'rating', 'review_count'
+)
+
+DETAIL_FIELDS = (
+    'id', 'property_name', 'property_type', 'description', 'address', 'city', 'state',
+    'pincode', 'landmark', 'latitude', 'longitude', 'total_rooms', 'available_rooms', 'bathrooms', 'floors',
+    'rent_per_month', 'security_deposit', 'maintenance_charges', 'amenities',
+    'gender_preference', 'food_policy', 'visitor_policy', 'status', 'images', 'owner',
+    'rating', 'review_count', 'rating_histogram', 'reviews', 'created_at'
+)
+
+VIEWS = {
+    # Just what a search result card shows
+    'card': (
+        'id', 'property_name', 'city', 'state', 'rent_per_month', 'available_rooms',
+        'gender_preference', 'image', 'rating', 'review_count'
+    ),
+    'listing': LISTING_FIELDS,
+    'detail': DETAIL_FIELDS,
+    'admin': DETAIL_FIELDS + ('owner_id', 'updated_at')
+}
+
+# Fields only admins may see, whether asked for by view or by name
+ADMIN_ONLY_FIELDS = tuple(field for field in VIEWS['admin'] if field not in VIEWS['detail'])
+
+def parse_fields(value, default, exclude=()):
+    """Resolve a fields= parameter to a field tuple.
+
+    value is a view name or a comma separated list of field names. Fields in
+    exclude are dropped from views and rejected in explicit lists. Returns
+    (fields, None) or (None, error message).
+    """
+    value = (value or default).strip()
+    if value in VIEWS:
+        return tuple(field for field in VIEWS[value] if field not in exclude), None
+
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    allowed = [field for field in ALL_FIELDS if field not in exclude]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        return None, f"fields must be one of the views ({', '.join(VIEWS)}) or a list of: {', '.join(allowed)}"
+    return fields, None
+
+def needs_admin(value):
+    """True when a fields= value asks for any field in ADMIN_ONLY_FIELDS."""
+    value = (value or '').strip()
+    fields = VIEWS[value] if value in VIEWS else [field.strip() for field in value.split(',')]
+    return any(field in ADMIN_ONLY_FIELDS for field in fields)
+
+def select_columns(fields, required=('id',)):
+    """Supabase select string for fields, plus any columns in required."""
+    columns = []
+    for field in tuple(required) + tuple(fields):
+        if field in COLUMN_FIELDS:
+            columns.append(field)
+        elif field in DERIVED_FIELDS:
+            columns.append(DERIVED_FIELDS[field])
+    return ', '.join(dict.fromkeys(columns))
+
+def first_image_only(fields):
+    """True when only the cover image is needed, so the embed can be limited to one row."""
+    return 'image' in fields and 'images' not in fields
+
+def serialize_property(prop, fields):
+    """Build the response dict for prop with exactly the requested fields.
+
+    Fields in EXTRA_FIELDS are left for the caller to fill in.
+    """
+    data = {}
+    for field in fields:
+        if field in COLUMN_FIELDS:
+            data[field] = prop.get(field)
+        elif field == 'amenities':
+            amenities = prop.get('amenities') or []
+            data['amenities'] = amenities.split(',') if isinstance(amenities, str) else amenities
+        elif field == 'images':
+            data['images'] = [{'image_url': img['image_url'], 'image_order': img['image_order']} for img in prop.get('property_images') or []]
+        elif field == 'image':
+            images = sorted(prop.get('property_images') or [], key=lambda img: img.get('image_order') or 0)
+            data['image'] = images[0]['image_url'] if images else PLACEHOLDER_IMAGE
+        elif field == 'owner':
+            owner = prop.get('users')
+            data['owner'] = {
+                'name': owner['full_name'],
+                'phone': owner['phone'],
+                'email': owner['email']
+            } if owner else {'name': 'Unknown', 'phone': '', 'email': ''}
+    return data
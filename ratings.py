@@ -0,0 +1,121 @@
+"""
+Precomputed rating summaries for EasyPG properties.
+
+Each property keeps a review count and a 1-5 star histogram, so the average
+and count come out in O(1) instead of summing every review per request. The
+database copy lives in property_rating_summary (maintained by the trigger in
+scripts/rating-summary.sql); RatingStore keeps a short-lived in-process copy
+and applies review inserts/deletes to it as they happen.
+"""
+
+import threading
+
+from cache import TTLCache
+
+STARS = (1, 2, 3, 4, 5)
+
+class RatingSummary:
+    def __init__(self, histogram=None):
+        self.histogram = list(histogram) if histogram else [0] * len(STARS)
+
+    @classmethod
+    def from_row(cls, row):
+        return cls([row.get(f'rating_{star}') or 0 for star in STARS])
+
+    def to_row(self, property_id):
+        row = {
+            'property_id': property_id,
+            'review_count': self.count,
+            'rating_sum': self.total
+        }
+        for star, n in zip(STARS, self.histogram):
+            row[f'rating_{star}'] = n
+        return row
+
+    @property
+    def count(self):
+        return sum(self.histogram)
+
+    @property
+    def total(self):
+        return sum(star * n for star, n in zip(STARS, self.histogram))
+
+    @property
+    def average(self):
+        count = self.count
+        return round(self.total / count, 1) if count else 0
+
+    def apply(self, rating, delta):
+        i = int(rating) - 1
+        self.histogram[i] = max(self.histogram[i] + delta, 0)
+
+    def to_dict(self):
+        return {
+            'rating': self.average,
+            'review_count': self.count,
+            'histogram': {str(star): n for star, n in zip(STARS, self.histogram)}
+        }
+
+def aggregate_reviews(reviews):
+    """Fold (property_id, rating) rows into {property_id: RatingSummary}."""
+    summaries = {}
+    for review in reviews:
+        summary = summaries.setdefault(review['property_id'], RatingSummary())
+        summary.apply(review['rating'], 1)
+    return summaries
+
+class RatingStore:
+    """Batched, cached access to rating summaries.
+
+    loader(property_ids) must return {property_id: RatingSummary} for the ids
+    that have a stored summary; ids it leaves out have no reviews yet.
+    """
+
+    def __init__(self, loader, maxsize=50000, ttl=300):
+        self.loader = loader
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+
+    def get(self, property_id):
+        return self.get_many([property_id])[property_id]
+
+    def get_many(self, property_ids):
+        summaries, missing = self.cached(property_ids)
+        if missing:
+            # One round-trip for every summary not already in memory
+            summaries.update(self.store(missing, self.loader(missing)))
+        return summaries
+
+    def cached(self, property_ids):
+        """Split property_ids into ({property_id: RatingSummary} in memory, [missing ids])."""
+        summaries = {}
+        missing = []
+        for property_id in dict.fromkeys(property_ids):
+            summary = self.cache.get(property_id)
+            if summary is None:
+                missing.append(property_id)
+            else:
+                summaries[property_id] = summary
+        return summaries, missing
+
+    def store(self, property_ids, loaded):
+        """Cache what a loader returned for property_ids; ids it left out have no reviews."""
+        summaries = {}
+        for property_id in property_ids:
+            summary = loaded.get(property_id) or RatingSummary()
+            self.cache.set(property_id, summary)
+            summaries[property_id] = summary
+        return summaries
+
+    def apply(self, property_id, rating, delta):
+        """Reflect a review insert (delta=1) or delete (delta=-1) in memory."""
+        with self.lock:
+            summary = self.cache.get(property_id)
+            if summary is not None:
+                summary.apply(rating, delta)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()
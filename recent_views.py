@@ -0,0 +1,185 @@
+"""
+Recently viewed listings for EasyPG users.
+
+Opening a listing's detail page records the view in a per-user buffer held
+in memory: the user's last `size` listings, newest first, each listing at
+most once. The buffers are written to the recently_viewed table (one row per
+user, see scripts/recently-viewed.sql) by a background thread every
+`flush_seconds`, in batched upserts, so a page view never waits on a
+database write. A user's stored row is read once, the first time their
+buffer is needed, and merged with any views recorded before it arrived.
+
+Views recorded since the last flush are lost if the process dies without
+exiting normally; on a normal exit the buffers are flushed one last time.
+"""
+
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class ViewBuffer:
+    __slots__ = ('items', 'loaded')
+
+    def __init__(self):
+        # property_id -> viewed_at (ISO timestamp), oldest first
+        self.items = OrderedDict()
+        # Whether the stored row has been merged in
+        self.loaded = False
+
+class RecentViews:
+    """Per-user recently viewed buffers with write-behind batching.
+
+    load(user_ids) must return {user_id: [{'property_id', 'viewed_at'}, ...]}
+    for the users that have a stored row; save(rows) upserts rows of
+    {'user_id', 'items', 'updated_at'}.
+    """
+
+    def __init__(self, load, save, size=20, flush_seconds=5, batch_size=500, max_users=100000):
+        self.load = load
+        self.save = save
+        self.size = size
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_users = max_users
+        self.lock = threading.Lock()
+        # Only one flush at a time, so an older snapshot never overwrites a newer one
+        self.flush_lock = threading.Lock()
+        self.users = OrderedDict()
+        self.dirty = set()
+        # Users whose rows are being written by the current flush
+        self.flushing = set()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+
+    def _buffer(self, user_id):
+        buffer = self.users.get(user_id)
+        if buffer is None:
+            buffer = self.users[user_id] = ViewBuffer()
+            self._evict()
+        else:
+            self.users.move_to_end(user_id)
+        return buffer
+
+    def _evict(self):
+        # Least recently used buffers that have nothing waiting to be written
+        for user_id in list(self.users):
+            if len(self.users) <= self.max_users:
+                return
+            if user_id not in self.dirty and user_id not in self.flushing:
+                del self.users[user_id]
+
+    def _merge(self, buffer, stored):
+        if buffer.loaded:
+            return
+        items = {item['property_id']: item['viewed_at'] for item in stored or []}
+        for property_id, viewed_at in buffer.items.items():
+            if viewed_at > items.get(property_id, ''):
+                items[property_id] = viewed_at
+        newest = sorted(items.items(), key=lambda item: item[1])[-self.size:]
+        buffer.items = OrderedDict(newest)
+        buffer.loaded = True
+
+    def record(self, user_id, property_id):
+        viewed_at = datetime.utcnow().isoformat()
+        with self.lock:
+            buffer = self._buffer(user_id)
+            buffer.items.pop(property_id, None)
+            buffer.items[property_id] = viewed_at
+            while len(buffer.items) > self.size:
+                buffer.items.popitem(last=False)
+            self.dirty.add(user_id)
+            self.recorded += 1
+            if self.thread is None:
+                self._start()
+
+    def recent(self, user_id, limit=None):
+        """user_id's recently viewed property ids, newest first."""
+        with self.lock:
+            buffer = self.users.get(user_id)
+            loaded = buffer is not None and buffer.loaded
+        if not loaded:
+            stored = self.load([user_id]).get(user_id)
+            with self.lock:
+                buffer = self._buffer(user_id)
+                self._merge(buffer, stored)
+        with self.lock:
+            return list(reversed(buffer.items))[:limit]
+
+    def flush(self):
+        """Write every buffer changed since the last flush. Returns the number of rows written."""
+        with self.flush_lock:
+            with self.lock:
+                user_ids = list(self.dirty)
+                self.dirty.clear()
+                self.flushing.update(user_ids)
+                unloaded = [user_id for user_id in user_ids if not self.users[user_id].loaded]
+
+            try:
+                # Buffers whose stored rows were never read would overwrite them with
+                # only this process's views, so read those first, in one query
+                if unloaded:
+                    stored = self.load(unloaded)
+                    with self.lock:
+                        for user_id in unloaded:
+                            self._merge(self.users[user_id], stored.get(user_id))
+
+                updated_at = datetime.utcnow().isoformat()
+                with self.lock:
+                    rows = [{
+                        'user_id': user_id,
+                        'items': [{'property_id': property_id, 'viewed_at': viewed_at} for property_id, viewed_at in reversed(self.users[user_id].items.items())],
+                        'updated_at': updated_at
+                    } for user_id in user_ids]
+
+                for start in range(0, len(rows), self.batch_size):
+                    self.save(rows[start:start + self.batch_size])
+            except Exception:
+                with self.lock:
+                    self.dirty.update(user_ids)
+                    self.flush_errors += 1
+                raise
+            finally:
+                with self.lock:
+                    self.flushing.difference_update(user_ids)
+
+            with self.lock:
+                self.flushes += 1
+                self.rows_written += len(rows)
+            return len(rows)
+
+    def _start(self):
+        self.thread = threading.Thread(target=self._run, name='recent-views-flush', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self.stopped.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception:
+                # Kept dirty; retried on the next tick
+                logger.exception('Recently viewed flush failed')
+
+    def close(self):
+        """Stop the flush thread and write what's left."""
+        self.stopped.set()
+        self.flush()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'users': len(self.users),
+                'pending_users': len(self.dirty),
+                'recorded': self.recorded,
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+                'flush_errors': self.flush_errors
+            }
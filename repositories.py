@@ -0,0 +1,373 @@
+"""
+Data access for EasyPG.
+
+One repository per table, all written against the postgrest query builder.
+Both backends speak it: the Supabase client, and the local SQLite client in
+sqlite_backend.py. Routes take a builder from select() for anything more
+involved than the helpers here.
+
+Independent queries can be issued together with Repositories.gather(), which
+runs them on a small thread pool over the client's shared keep-alive
+connection pool, so a request waits for its slowest query rather than the
+sum of all of them.
+
+Given on_request, every PostgREST request the clients send is reported to it
+(method, path, Prefer header, seconds, status) for the request metrics.
+
+Tables are read and written with the anon key, under the row-level security
+policies. The few SQL functions that trust the ids they're given (booking,
+cancelling, the dashboard stats) can only be executed by the service_role
+key, so they go through a second client holding that key
+(Repositories.service_rpc()); it is used for nothing else.
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+from httpx import Headers, QueryParams
+from postgrest import AsyncFilterRequestBuilder, AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from postgrest.types import ReturnMethod
+from postgrest.utils import AsyncClient, SyncClient
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+
+class ServiceKeyMissing(RuntimeError):
+    """Raised when a service_role-only function is called without a service_role key."""
+
+class Repository:
+    table_name = None
+    key = 'id'
+
+    def __init__(self, client):
+        self.client = client
+
+    def table(self):
+        return self.client.table(self.table_name)
+
+    def select(self, columns='*', count=None):
+        return self.table().select(columns, count=count)
+
+    def get(self, row_id, columns='*'):
+        result = self.select(columns).eq(self.key, row_id).execute()
+        return result.data[0] if result.data else None
+
+    def find(self, columns='*', **filters):
+        query = self.select(columns)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query.execute().data or []
+
+    def exists(self, row_id):
+        return self.get(row_id, self.key) is not None
+
+    def count_query(self, **filters):
+        """Builder whose result.count is the number of matching rows."""
+        query = self.select(self.key, count='exact')
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        # limit(0) keeps the Content-Range total while returning no rows
+        return query.limit(0)
+
+    def count(self, **filters):
+        return self.count_query(**filters).execute().count or 0
+
+    def insert(self, data):
+        return self.table().insert(data).execute().data
+
+    def insert_many(self, rows):
+        """Insert rows in one request without sending them back."""
+        self.table().insert(rows, returning=ReturnMethod.minimal).execute()
+
+    def upsert(self, rows, on_conflict=None):
+        return self.table().upsert(rows, on_conflict=on_conflict or self.key).execute().data
+
+    def update(self, row_id, values):
+        return self.table().update(values).eq(self.key, row_id).execute().data
+
+    def delete(self, row_id):
+        return self.table().delete().eq(self.key, row_id).execute().data
+
+    def delete_many(self, row_ids):
+        return self.table().delete().in_(self.key, row_ids).execute().data
+
+class UserRepository(Repository):
+    table_name = 'users'
+
+    def get_by_email(self, email, columns='*'):
+        result = self.select(columns).eq('email', email).execute()
+        return result.data[0] if result.data else None
+
+class PropertyRepository(Repository):
+    table_name = 'properties'
+
+class PropertyImageRepository(Repository):
+    table_name = 'property_images'
+
+class BookingRepository(Repository):
+    table_name = 'bookings'
+
+    def __init__(self, client, service_rpc):
+        super().__init__(client)
+        self.service_rpc = service_rpc
+
+    def create(self, student_id, params, idempotency_key=None):
+        """Hold a room and record a pending booking, in one transaction (see scripts/bookings.sql)."""
+        params = dict(params, p_student_id=student_id, p_idempotency_key=idempotency_key)
+        return self.service_rpc('create_booking', params).execute().data[0]
+
+    def confirm(self, booking_id):
+        """Confirm a pending booking. Returns it, or None when it wasn't pending."""
+        now = datetime.utcnow().isoformat()
+        query = self.table().update({'status': 'confirmed', 'confirmed_at': now, 'updated_at': now})
+        rows = query.eq('id', booking_id).eq('status', 'pending').execute().data
+        return rows[0] if rows else None
+
+    def cancel(self, booking_id):
+        """Cancel a pending or confirmed booking and give its room back, in one transaction."""
+        return self.service_rpc('cancel_booking', {'p_booking_id': booking_id}).execute().data[0]
+
+class PaymentRepository(Repository):
+    table_name = 'payments'
+
+class ReviewRepository(Repository):
+    table_name = 'reviews'
+
+class MessageRepository(Repository):
+    table_name = 'messages'
+
+    def mark_read(self, receiver_id, conversation_ids=None):
+        """Mark receiver_id's unread messages read, in conversation_ids or all of them.
+
+        One statement; the triggers in scripts/messaging.sql adjust the counters.
+        """
+        query = self.table().update({'is_read': True, 'read_at': datetime.utcnow().isoformat()}, returning=ReturnMethod.minimal)
+        query = query.eq('receiver_id', receiver_id).eq('is_read', False)
+        if conversation_ids is not None:
+            query = query.in_('conversation_id', conversation_ids)
+        query.execute()
+
+    def assign_conversation(self, sender_id, receiver_id, property_id, conversation_id):
+        """Set conversation_id on messages sent before it existed."""
+        query = self.table().update({'conversation_id': conversation_id}, returning=ReturnMethod.minimal)
+        query = query.eq('sender_id', sender_id).eq('receiver_id', receiver_id).is_('conversation_id', 'null')
+        query = query.eq('property_id', property_id) if property_id else query.is_('property_id', 'null')
+        query.execute()
+
+class ConversationRepository(Repository):
+    table_name = 'conversations'
+    key = 'conversation_id'
+
+class UnreadCountRepository(Repository):
+    table_name = 'inbox_unread_counts'
+    key = 'user_id'
+
+class SavedPropertyRepository(Repository):
+    table_name = 'saved_properties'
+
+    def save(self, student_id, property_id, notes=None):
+        """Save property_id for student_id; saving it again changes nothing. Returns the new row, if any."""
+        row = {'student_id': student_id, 'property_id': property_id, 'notes': notes}
+        return self.table().upsert(row, ignore_duplicates=True, on_conflict='student_id,property_id').execute().data
+
+    def unsave(self, student_id, property_id):
+        return self.table().delete().eq('student_id', student_id).eq('property_id', property_id).execute().data
+
+class SavedCountRepository(Repository):
+    table_name = 'saved_property_counts'
+    key = 'student_id'
+
+class RecentlyViewedRepository(Repository):
+    table_name = 'recently_viewed'
+    key = 'user_id'
+
+class RevokedTokenRepository(Repository):
+    table_name = 'revoked_tokens'
+    key = 'jti'
+
+    def purge_expired(self, before):
+        """Delete revocations of tokens that expired before then; they can't be used anyway."""
+        self.table().delete(returning=ReturnMethod.minimal).lt('expires_at', before).execute()
+
+class RatingSummaryRepository(Repository):
+    table_name = 'property_rating_summary'
+    key = 'property_id'
+
+class ObservedClient(SyncClient):
+    """SyncClient that reports each request's duration and status to on_request."""
+
+    def __init__(self, on_request, **kwargs):
+        self.on_request = on_request
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        status = None
+        try:
+            # Reads the body too, so the time covers the whole round-trip
+            response = super().send(request, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.on_request(request.method, request.url.path, request.headers.get('prefer', ''), time.perf_counter() - started, status)
+
+class AsyncObservedClient(AsyncClient):
+    """Async counterpart of ObservedClient."""
+
+    def __init__(self, on_request, **kwargs):
+        self.on_request = on_request
+        super().__init__(**kwargs)
+
+    async def send(self, request, **kwargs):
+        started = time.perf_counter()
+        status = None
+        try:
+            response = await super().send(request, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            self.on_request(request.method, request.url.path, request.headers.get('prefer', ''), time.perf_counter() - started, status)
+
+def create_session(on_request=None, **kwargs):
+    """HTTP session for a postgrest-py client, observed when on_request is given."""
+    return ObservedClient(on_request, **kwargs) if on_request else SyncClient(**kwargs)
+
+def create_async_session(on_request=None, **kwargs):
+    return AsyncObservedClient(on_request, **kwargs) if on_request else AsyncClient(**kwargs)
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """postgrest-py client whose session uses the given connection pool limits."""
+
+    def __init__(self, base_url, limits, on_request=None, **kwargs):
+        self.limits = limits
+        self.on_request = on_request
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return create_session(self.on_request, base_url=base_url, headers=headers, timeout=timeout, limits=self.limits)
+
+class AsyncPooledPostgrestClient(AsyncPostgrestClient):
+    """Async counterpart of PooledPostgrestClient, for the ASGI app."""
+
+    def __init__(self, base_url, limits, on_request=None, **kwargs):
+        self.limits = limits
+        self.on_request = on_request
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return create_async_session(self.on_request, base_url=base_url, headers=headers, timeout=timeout, limits=self.limits)
+
+    def rpc(self, func, params):
+        # postgrest-py 0.10 declares this async by mistake; return the builder like the sync client
+        return AsyncFilterRequestBuilder(self.session, f'/rpc/{func}', 'POST', Headers(), QueryParams(), json=params)
+
+class PooledSupabaseClient(Client):
+    """Supabase client whose PostgREST requests share one tuned keep-alive pool."""
+
+    def __init__(self, supabase_url, supabase_key, limits, timeout, on_request=None):
+        self.limits = limits
+        self.on_request = on_request
+        super().__init__(supabase_url, supabase_key, ClientOptions(postgrest_client_timeout=timeout))
+
+    def _init_postgrest_client(self, rest_url, supabase_key, headers, schema, timeout):
+        client = PooledPostgrestClient(rest_url, self.limits, self.on_request, headers=headers, schema=schema, timeout=timeout)
+        client.auth(token=supabase_key)
+        return client
+
+class Repositories:
+    def __init__(self, client, backend, fanout_workers=0, timeout=None, on_request=None, service_client=None):
+        self.client = client
+        # Holds the service_role key, for service_rpc() only; None when no key was given
+        self.service_client = service_client
+        self.backend = backend
+        self.timeout = timeout
+        self.on_request = on_request
+        self.executor = ThreadPoolExecutor(max_workers=fanout_workers, thread_name_prefix='db-fanout') if fanout_workers else None
+        self.users = UserRepository(client)
+        self.properties = PropertyRepository(client)
+        self.property_images = PropertyImageRepository(client)
+        self.bookings = BookingRepository(client, self.service_rpc)
+        self.payments = PaymentRepository(client)
+        self.reviews = ReviewRepository(client)
+        self.messages = MessageRepository(client)
+        self.conversations = ConversationRepository(client)
+        self.unread_counts = UnreadCountRepository(client)
+        self.saved_properties = SavedPropertyRepository(client)
+        self.saved_counts = SavedCountRepository(client)
+        self.recently_viewed = RecentlyViewedRepository(client)
+        self.revoked_tokens = RevokedTokenRepository(client)
+        self.rating_summaries = RatingSummaryRepository(client)
+
+    def rpc(self, name, params):
+        return self.client.rpc(name, params)
+
+    def service_rpc(self, name, params):
+        """rpc() for a function only the service_role key may execute."""
+        if self.service_client is None:
+            raise ServiceKeyMissing(f'{name} needs the service_role key; set SUPABASE_SERVICE_ROLE_KEY')
+        return self.service_client.rpc(name, params)
+
+    def gather(self, *calls):
+        """Run independent queries concurrently and return their results in order.
+
+        Each call is a query builder (executed) or a zero-argument callable.
+        Calls must not gather() themselves, or they can wait on their own pool.
+        """
+        calls = [call.execute if hasattr(call, 'execute') else call for call in calls]
+        if self.executor is None or len(calls) < 2:
+            return [call() for call in calls]
+        # Each call runs in a copy of the caller's context, so its time counts towards the caller's request
+        futures = [self.executor.submit(contextvars.copy_context().run, call) for call in calls]
+        return [future.result(timeout=self.timeout) for future in futures]
+
+def create_repositories(backend='supabase', supabase_url=None, supabase_key=None, sqlite_path=None,
+                        max_connections=20, max_keepalive=10, keepalive_expiry=30, timeout=10, fanout_workers=8,
+                        on_request=None, service_key=None):
+    """Build repositories for backend 'supabase' or 'sqlite'.
+
+    supabase_key is the anon key; service_key, if given, is the service_role
+    key, used only by service_rpc(). SQLite has no roles, so there service_rpc()
+    uses the one client.
+    max_connections, max_keepalive and keepalive_expiry size the HTTP pool,
+    timeout bounds each query in seconds, fanout_workers is how many
+    queries gather() runs at once (0 runs them one after another), and
+    on_request, if given, is called after every PostgREST request.
+    """
+    if backend == 'supabase':
+        if not supabase_url or not supabase_key:
+            raise ValueError("Supabase URL and Key must be provided")
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive, keepalive_expiry=keepalive_expiry)
+        client = PooledSupabaseClient(supabase_url, supabase_key, limits, timeout, on_request)
+        service_client = PooledSupabaseClient(supabase_url, service_key, limits, timeout, on_request) if service_key else None
+        return Repositories(client, backend, fanout_workers, timeout, on_request, service_client)
+    if backend == 'sqlite':
+        # Imported lazily so the Supabase deployment never touches it
+        from sqlite_backend import SQLiteClient
+        client = SQLiteClient(sqlite_path or 'easypg.sqlite3', on_request=on_request)
+        return Repositories(client, backend, fanout_workers, timeout, on_request, client)
+    raise ValueError(f'Unknown database backend: {backend}')
+
+def create_async_repositories(repositories, supabase_url=None, supabase_key=None,
+                              max_connections=20, max_keepalive=10, keepalive_expiry=30, timeout=10, service_key=None):
+    """Async repositories on the same database as repositories.
+
+    Only the builder methods (select(), count_query(), table(), rpc()) apply;
+    their execute() is a coroutine. Create them inside the event loop that
+    will use them.
+    """
+    if repositories.backend == 'supabase':
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive, keepalive_expiry=keepalive_expiry)
+        def async_client(key):
+            headers = {**DEFAULT_POSTGREST_CLIENT_HEADERS, 'apiKey': key, 'Authorization': f'Bearer {key}'}
+            return AsyncPooledPostgrestClient(f'{supabase_url}/rest/v1', limits, repositories.on_request, headers=headers, timeout=timeout)
+
+        service_client = async_client(service_key) if service_key else None
+        return Repositories(async_client(supabase_key), 'supabase', on_request=repositories.on_request, service_client=service_client)
+    if repositories.backend == 'sqlite':
+        from sqlite_backend import AsyncSQLiteClient
+        client = AsyncSQLiteClient(repositories.client.database, repositories.on_request)
+        return Repositories(client, 'sqlite', on_request=repositories.on_request, service_client=client)
+    raise ValueError(f'No async client for database backend: {repositories.backend}')
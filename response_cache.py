@@ -0,0 +1,234 @@
+"""
+Response cache for EasyPG's public read endpoints.
+
+Stores rendered JSON bodies keyed by request path + query string, tagged so
+writes can invalidate every response that depends on them. Two stores are
+available:
+
+- MemoryStore: per-process LRU bounded by total body size (default)
+- SQLiteStore: a file shared by every worker on the same machine
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+class CacheEntry:
+    def __init__(self, body, content_type, etag, created_at, expires_at):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+class MemoryStore:
+    """LRU store bounded by the total size of cached bodies."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.size = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            entry, _ = item
+            if entry.expires_at <= time.time():
+                self._delete(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, tags):
+        with self.lock:
+            if key in self.entries:
+                self._delete(key)
+            self.entries[key] = (entry, tuple(tags))
+            self.size += len(entry.body)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes and self.entries:
+                self._delete(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tags.get(tag, ())):
+                    self._delete(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+            self.size = 0
+
+    def _delete(self, key):
+        entry, tags = self.entries.pop(key)
+        self.size -= len(entry.body)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+class SQLiteStore:
+    """Store shared between processes through a local SQLite file."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.evictions = 0
+        conn = self._connect()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                content_type TEXT,
+                etag TEXT,
+                created_at REAL,
+                expires_at REAL,
+                size INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS response_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at);
+        ''')
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT body, content_type, etag, created_at, expires_at FROM responses WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(bytes(row[0]), row[1], row[2], row[3], row[4])
+
+    def set(self, key, entry, tags):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, body, content_type, etag, created_at, expires_at, size) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.body, entry.content_type, entry.etag, entry.created_at, entry.expires_at, len(entry.body))
+            )
+            conn.execute('DELETE FROM response_tags WHERE key = ?', (key,))
+            conn.executemany('INSERT OR IGNORE INTO response_tags (tag, key) VALUES (?, ?)', [(tag, key) for tag in tags])
+            self._evict(conn)
+
+    def _evict(self, conn):
+        conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total > self.max_bytes:
+            # Oldest entries go first until we are back under the bound
+            for key, size in conn.execute('SELECT key, size FROM responses ORDER BY created_at').fetchall():
+                conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.evictions += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        conn.execute('DELETE FROM response_tags WHERE key NOT IN (SELECT key FROM responses)')
+
+    def invalidate(self, tags):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for tag in tags:
+                conn.execute('DELETE FROM responses WHERE key IN (SELECT key FROM response_tags WHERE tag = ?)', (tag,))
+                conn.execute('DELETE FROM response_tags WHERE tag = ?', (tag,))
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM responses')
+            conn.execute('DELETE FROM response_tags')
+
+    def stats(self):
+        entries, size = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'evictions': self.evictions, 'path': self.path}
+
+class ResponseCache:
+    def __init__(self, store, ttl=60):
+        self.store = store
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.store is not None
+
+    def get(self, key):
+        entry = self.store.get(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, body, content_type, tags):
+        now = time.time()
+        etag = hashlib.sha1(body).hexdigest()
+        entry = CacheEntry(body, content_type, etag, now, now + self.ttl)
+        self.store.set(key, entry, tags)
+        return entry
+
+    def invalidate(self, *tags):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.invalidations += 1
+        self.store.invalidate(tags)
+
+    def clear(self):
+        if self.enabled:
+            self.store.clear()
+
+    def stats(self):
+        if not self.enabled:
+            return {'enabled': False}
+        with self.lock:
+            stats = {'enabled': True, 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
+        stats.update(self.store.stats())
+        return stats
+
+def create_response_cache(backend='memory', ttl=60, max_bytes=64 * 1024 * 1024, path=None):
+    """Build a ResponseCache for backend 'memory', 'sqlite' or 'none'."""
+    if backend == 'none':
+        return ResponseCache(None, ttl)
+    if backend == 'sqlite':
+        path = path or os.path.join(tempfile.gettempdir(), 'easypg-response-cache.sqlite3')
+        return ResponseCache(SQLiteStore(path, max_bytes), ttl)
+    if backend == 'memory':
+        return ResponseCache(MemoryStore(max_bytes), ttl)
+    raise ValueError(f'Unknown response cache backend: {backend}')
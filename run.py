@@ -7,20 +7,17 @@ A beginner-friendly PG accommodation platform
 import os
 import sys
 from dotenv import load_dotenv
-from app import app
-from app import db
 
 # Load environment variables
 load_dotenv()
 
+from app import app, db, hash_password, token_revocations
+
 
 def create_sample_data():
     """Create sample data for testing"""
-    from app import User, Property, PropertyImage, bcrypt
-    import json
-    
     # Check if sample data already exists
-    if Property.query.count() > 0:
+    if db.properties.count() > 0:
         print("Sample data already exists!")
         return
     
@@ -28,30 +25,24 @@ def create_sample_data():
     
     try:
         # Create sample users
-        student_password = bcrypt.generate_password_hash('student123').decode('utf-8')
-        owner_password = bcrypt.generate_password_hash('owner123').decode('utf-8')
-        
-        student = User(
-            email='student@example.com',
-            password_hash=student_password,
-            full_name='John Student',
-            phone='9876543210',
-            user_type='student',
-            is_verified=True
-        )
-        
-        owner = User(
-            email='owner@example.com',
-            password_hash=owner_password,
-            full_name='Jane Owner',
-            phone='9876543211',
-            user_type='owner',
-            is_verified=True
-        )
-        
-        db.session.add(student)
-        db.session.add(owner)
-        db.session.commit()
+        student, owner = db.users.insert([
+            {
+                'email': 'student@example.com',
+                'password_hash': hash_password('student123'),
+                'full_name': 'John Student',
+                'phone': '9876543210',
+                'user_type': 'student',
+                'is_verified': True
+            },
+            {
+                'email': 'owner@example.com',
+                'password_hash': hash_password('owner123'),
+                'full_name': 'Jane Owner',
+                'phone': '9876543211',
+                'user_type': 'owner',
+                'is_verified': True
+            }
+        ])
         
         # Create sample properties
         properties_data = [
@@ -64,6 +55,8 @@ def create_sample_data():
                 'state': 'Karnataka',
                 'pincode': '560034',
                 'landmark': 'Near Forum Mall',
+                'latitude': 12.9352,
+                'longitude': 77.6245,
                 'total_rooms': 20,
                 'available_rooms': 5,
                 'bathrooms': 10,
@@ -71,12 +64,15 @@ def create_sample_data():
                 'rent_per_month': 8500,
                 'security_deposit': 15000,
                 'maintenance_charges': 500,
-                'amenities': 'wifi,parking,meals,security,power_backup',
+                'amenities': ['wifi', 'parking', 'meals', 'security', 'power_backup'],
                 'gender_preference': 'boys_only',
                 'food_policy': 'Vegetarian meals included',
                 'visitor_policy': 'Visitors allowed till 9 PM',
                 'status': 'approved',
-                'owner_id': owner.id
+                'owner_id': owner['id'],
+                'owner_name': owner['full_name'],
+                'owner_phone': owner['phone'],
+                'owner_email': owner['email']
             },
             {
                 'property_name': 'Sunrise Residency',
@@ -87,6 +83,8 @@ def create_sample_data():
                 'state': 'Karnataka',
                 'pincode': '560102',
                 'landmark': 'Near Central Mall',
+                'latitude': 12.9116,
+                'longitude': 77.6389,
                 'total_rooms': 15,
                 'available_rooms': 3,
                 'bathrooms': 8,
@@ -94,12 +92,15 @@ def create_sample_data():
                 'rent_per_month': 9200,
                 'security_deposit': 18000,
                 'maintenance_charges': 600,
-                'amenities': 'wifi,meals,security,power_backup,laundry',
+                'amenities': ['wifi', 'meals', 'security', 'power_backup', 'laundry'],
                 'gender_preference': 'girls_only',
                 'food_policy': 'Both veg and non-veg available',
                 'visitor_policy': 'Female visitors only',
                 'status': 'approved',
-                'owner_id': owner.id
+                'owner_id': owner['id'],
+                'owner_name': owner['full_name'],
+                'owner_phone': owner['phone'],
+                'owner_email': owner['email']
             },
             {
                 'property_name': 'Metro Heights PG',
@@ -110,6 +111,8 @@ def create_sample_data():
                 'state': 'Karnataka',
                 'pincode': '560066',
                 'landmark': 'Near ITPL',
+                'latitude': 12.9698,
+                'longitude': 77.75,
                 'total_rooms': 25,
                 'available_rooms': 8,
                 'bathrooms': 12,
@@ -117,12 +120,15 @@ def create_sample_data():
                 'rent_per_month': 7800,
                 'security_deposit': 12000,
                 'maintenance_charges': 400,
-                'amenities': 'wifi,parking,security,gym,power_backup',
+                'amenities': ['wifi', 'parking', 'security', 'gym', 'power_backup'],
                 'gender_preference': 'co_living',
                 'food_policy': 'Cafeteria available',
                 'visitor_policy': 'Visitors allowed with prior notice',
                 'status': 'approved',
-                'owner_id': owner.id
+                'owner_id': owner['id'],
+                'owner_name': owner['full_name'],
+                'owner_phone': owner['phone'],
+                'owner_email': owner['email']
             },
             {
                 'property_name': 'City Center PG',
@@ -133,6 +139,8 @@ def create_sample_data():
                 'state': 'Karnataka',
                 'pincode': '560001',
                 'landmark': 'Near UB City Mall',
+                'latitude': 12.9716,
+                'longitude': 77.5963,
                 'total_rooms': 12,
                 'available_rooms': 2,
                 'bathrooms': 6,
@@ -140,50 +148,41 @@ def create_sample_data():
                 'rent_per_month': 12000,
                 'security_deposit': 25000,
                 'maintenance_charges': 800,
-                'amenities': 'wifi,parking,meals,gym,security,power_backup,ac',
+                'amenities': ['wifi', 'parking', 'meals', 'gym', 'security', 'power_backup', 'ac'],
                 'gender_preference': 'boys_only',
                 'food_policy': 'Premium meals included',
                 'visitor_policy': 'Visitors allowed till 10 PM',
                 'status': 'approved',
-                'owner_id': owner.id
+                'owner_id': owner['id'],
+                'owner_name': owner['full_name'],
+                'owner_phone': owner['phone'],
+                'owner_email': owner['email']
             }
         ]
         
-        for prop_data in properties_data:
-            property_obj = Property(**prop_data)
-            db.session.add(property_obj)
-            db.session.commit()
-            
-            # Add sample images
-            sample_images = [
-                f'/static/images/pg{properties_data.index(prop_data) + 1}_1.jpg',
-                f'/static/images/pg{properties_data.index(prop_data) + 1}_2.jpg',
-                f'/static/images/pg{properties_data.index(prop_data) + 1}_3.jpg'
-            ]
-            
-            for i, image_url in enumerate(sample_images):
-                image = PropertyImage(
-                    property_id=property_obj.id,
-                    image_url=image_url,
-                    image_order=i
-                )
-                db.session.add(image)
+        properties = db.properties.insert(properties_data)
+        
+        # Add sample images
+        images = []
+        for number, property_obj in enumerate(properties, start=1):
+            for i in range(3):
+                images.append({
+                    'property_id': property_obj['id'],
+                    'image_url': f'/static/images/pg{number}_{i + 1}.jpg',
+                    'image_order': i
+                })
+        db.property_images.insert(images)
         
-        db.session.commit()
         print("Sample data created successfully!")
         
     except Exception as e:
-        db.session.rollback()
         print(f"Error creating sample data: {e}")
+
 def main():
     """Main function to run the application"""
     
-    # Create database tables
+    # Tables come from scripts/ (Supabase) or are created on startup (SQLite)
     with app.app_context():
-        db.create_all()
-        print("Database tables created!")
-        
-        # Create sample data
         create_sample_data()
     
     print("\n" + "="*50)
@@ -194,6 +193,8 @@ def main():
     print("🔧 API Base: http://localhost:5000/api")
     print("="*50)
     
+    token_revocations.start()
+    
     # Run the Flask development server
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -203,14 +204,33 @@ if __name__ == '__main__':
     host = os.getenv('FLASK_HOST', '0.0.0.0')
     port = int(os.getenv('FLASK_PORT', 5000))
     
+    # threaded: Flask development server, one thread per request
+    # asgi: uvicorn serving asgi.py, async I/O for the busiest read endpoints
+    server_mode = os.getenv('SERVER_MODE', 'threaded')
+    
     print(f"Starting EasyPG Application...")
     print(f"Debug mode: {debug}")
+    print(f"Server mode: {server_mode}")
     print(f"Running on http://{host}:{port}")
     
-    # Run the Flask application
-    app.run(
-        debug=debug,
-        host=host,
-        port=port,
-        threaded=True
-    )
+    # A fresh local SQLite database starts out with the sample data
+    if app.config['DATABASE_BACKEND'] == 'sqlite':
+        with app.app_context():
+            create_sample_data()
+    
+    if server_mode == 'asgi':
+        import uvicorn
+        from asgi import application
+        
+        uvicorn.run(application, host=host, port=port, log_level='debug' if debug else 'info')
+    else:
+        # Load the revoked token ids before taking requests
+        token_revocations.start()
+        
+        # Run the Flask application
+        app.run(
+            debug=debug,
+            host=host,
+            port=port,
+            threaded=True
+        )
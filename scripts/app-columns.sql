@@ -0,0 +1,45 @@
+-- Columns and tables the Flask API reads and writes that complete-database-setup.sql
+-- does not create (the API stores its own bcrypt hashes). Run after it.
+
+ALTER TABLE public.users ADD COLUMN IF NOT EXISTS password_hash TEXT;
+ALTER TABLE public.users ADD COLUMN IF NOT EXISTS is_verified BOOLEAN DEFAULT FALSE;
+
+-- Coordinates for radius search (GET /api/properties?near=), as in database-schema.sql
+ALTER TABLE public.properties ADD COLUMN IF NOT EXISTS latitude DECIMAL(10,8);
+ALTER TABLE public.properties ADD COLUMN IF NOT EXISTS longitude DECIMAL(11,8);
+
+-- Payment history, as in database-schema.sql (exported by /api/export/payments)
+CREATE TABLE IF NOT EXISTS public.payments (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  booking_id UUID REFERENCES public.bookings(id) ON DELETE CASCADE,
+  student_id UUID REFERENCES public.users(id) ON DELETE CASCADE,
+  owner_id UUID REFERENCES public.users(id) ON DELETE CASCADE,
+  payment_type TEXT NOT NULL,
+  amount DECIMAL(10,2) NOT NULL,
+  payment_method TEXT,
+  transaction_id TEXT,
+  gateway_payment_id TEXT,
+  gateway_order_id TEXT,
+  status TEXT DEFAULT 'pending',
+  failure_reason TEXT,
+  due_date DATE,
+  paid_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_payments_owner_id ON public.payments(owner_id, id);
+CREATE INDEX IF NOT EXISTS idx_payments_student_id ON public.payments(student_id, id);
+
+ALTER TABLE public.payments ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own payments" ON public.payments;
+CREATE POLICY "Users can view own payments" ON public.payments
+  FOR SELECT USING (
+    student_id IN (
+      SELECT id FROM public.users WHERE auth_user_id = auth.uid() OR id::text = auth.uid()::text
+    ) OR
+    owner_id IN (
+      SELECT id FROM public.users WHERE auth_user_id = auth.uid() OR id::text = auth.uid()::text
+    )
+  );
@@ -0,0 +1,142 @@
+-- Room bookings for EasyPG
+-- Booking a room and cancelling a booking each change bookings and the
+-- listing's available_rooms together, in the functions below, so students
+-- booking a listing's last rooms at the same time can't oversell it: the
+-- decrement only happens while available_rooms > 0, and the row lock it
+-- takes makes the other bookings of that listing wait their turn. A retried
+-- booking with the same idempotency key gets the first attempt's booking
+-- back instead of a second room. Safe to re-run.
+--
+-- The functions trust the student and booking ids they're given (the Flask
+-- app checks who's asking), so only the server's service_role key may call
+-- them; the public anon key can't reach them through /rest/v1/rpc.
+
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS confirmed_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.bookings ADD COLUMN IF NOT EXISTS cancelled_at TIMESTAMP WITH TIME ZONE;
+
+-- One booking per student and key (keys are the client's, so two students may pick the same one)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_student_idempotency ON public.bookings(student_id, idempotency_key);
+CREATE INDEX IF NOT EXISTS idx_bookings_student_created ON public.bookings(student_id, created_at DESC);
+
+ALTER TABLE public.properties DROP CONSTRAINT IF EXISTS properties_available_rooms_nonnegative;
+ALTER TABLE public.properties ADD CONSTRAINT properties_available_rooms_nonnegative CHECK (available_rooms >= 0);
+
+-- Hold one room of an approved listing for a student. Returns one {"result": ...}:
+-- booked (with booking, available_rooms, status), replayed (booking),
+-- key_reused (the key was used for another listing), sold_out or not_found
+CREATE OR REPLACE FUNCTION public.create_booking(
+  p_property_id UUID,
+  p_student_id UUID,
+  p_room_type TEXT,
+  p_check_in_date DATE,
+  p_check_out_date DATE DEFAULT NULL,
+  p_booking_notes TEXT DEFAULT NULL,
+  p_idempotency_key TEXT DEFAULT NULL
+)
+RETURNS SETOF JSONB AS $$
+DECLARE
+  prop public.properties;
+  booking public.bookings;
+BEGIN
+  IF p_idempotency_key IS NOT NULL THEN
+    SELECT * INTO booking FROM public.bookings
+    WHERE student_id = p_student_id AND idempotency_key = p_idempotency_key;
+    IF FOUND THEN
+      RETURN NEXT jsonb_build_object(
+        'result', CASE WHEN booking.property_id = p_property_id THEN 'replayed' ELSE 'key_reused' END,
+        'booking', to_jsonb(booking)
+      );
+      RETURN;
+    END IF;
+  END IF;
+
+  BEGIN
+    UPDATE public.properties SET
+      available_rooms = available_rooms - 1,
+      updated_at = NOW()
+    WHERE id = p_property_id AND status = 'approved' AND available_rooms > 0
+    RETURNING * INTO prop;
+
+    IF NOT FOUND THEN
+      RETURN NEXT jsonb_build_object('result', CASE
+        WHEN EXISTS (SELECT 1 FROM public.properties WHERE id = p_property_id AND status = 'approved') THEN 'sold_out'
+        ELSE 'not_found'
+      END);
+      RETURN;
+    END IF;
+
+    INSERT INTO public.bookings (
+      property_id, student_id, room_type, check_in_date, check_out_date,
+      monthly_rent, security_deposit, total_amount, status, booking_notes, idempotency_key
+    ) VALUES (
+      p_property_id, p_student_id, p_room_type, p_check_in_date, p_check_out_date,
+      prop.rent_per_month, prop.security_deposit, prop.rent_per_month + COALESCE(prop.security_deposit, 0),
+      'pending', p_booking_notes, p_idempotency_key
+    )
+    RETURNING * INTO booking;
+  EXCEPTION WHEN unique_violation THEN
+    -- The same key, booked at the same time: leaving this block undoes the decrement
+    SELECT * INTO booking FROM public.bookings
+    WHERE student_id = p_student_id AND idempotency_key = p_idempotency_key;
+    RETURN NEXT jsonb_build_object(
+      'result', CASE WHEN booking.property_id = p_property_id THEN 'replayed' ELSE 'key_reused' END,
+      'booking', to_jsonb(booking)
+    );
+    RETURN;
+  END;
+
+  RETURN NEXT jsonb_build_object(
+    'result', 'booked',
+    'booking', to_jsonb(booking),
+    'available_rooms', prop.available_rooms,
+    'status', prop.status
+  );
+  RETURN;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cancel a pending or confirmed booking and give its room back. Returns one
+-- {"result": ...}: cancelled (with booking, available_rooms, status),
+-- not_active (already cancelled or completed) or not_found
+CREATE OR REPLACE FUNCTION public.cancel_booking(p_booking_id UUID)
+RETURNS SETOF JSONB AS $$
+DECLARE
+  prop public.properties;
+  booking public.bookings;
+BEGIN
+  UPDATE public.bookings SET
+    status = 'cancelled',
+    cancelled_at = NOW(),
+    updated_at = NOW()
+  WHERE id = p_booking_id AND status IN ('pending', 'confirmed')
+  RETURNING * INTO booking;
+
+  IF NOT FOUND THEN
+    RETURN NEXT jsonb_build_object('result', CASE
+      WHEN EXISTS (SELECT 1 FROM public.bookings WHERE id = p_booking_id) THEN 'not_active'
+      ELSE 'not_found'
+    END);
+    RETURN;
+  END IF;
+
+  UPDATE public.properties SET
+    available_rooms = LEAST(available_rooms + 1, total_rooms),
+    updated_at = NOW()
+  WHERE id = booking.property_id
+  RETURNING * INTO prop;
+
+  RETURN NEXT jsonb_build_object(
+    'result', 'cancelled',
+    'booking', to_jsonb(booking),
+    'available_rooms', prop.available_rooms,
+    'status', prop.status
+  );
+  RETURN;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE ALL ON FUNCTION public.create_booking(UUID, UUID, TEXT, DATE, DATE, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.cancel_booking(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_booking(UUID, UUID, TEXT, DATE, DATE, TEXT, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.cancel_booking(UUID) TO service_role;
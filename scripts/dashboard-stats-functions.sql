@@ -0,0 +1,45 @@
+-- Dashboard aggregate functions for EasyPG
+-- Lets /api/dashboard/stats fetch every counter in a single round-trip.
+-- Enable in the app with DASHBOARD_STATS_RPC=true after running this script;
+-- the app calls them with SUPABASE_SERVICE_ROLE_KEY.
+
+-- Helpful indexes for the aggregates below
+CREATE INDEX IF NOT EXISTS idx_bookings_property_status ON public.bookings(property_id, status);
+CREATE INDEX IF NOT EXISTS idx_messages_receiver_id ON public.messages(receiver_id);
+
+-- Owner dashboard: properties, occupied rooms, confirmed revenue and inquiries
+CREATE OR REPLACE FUNCTION public.owner_dashboard_stats(owner_uuid UUID)
+RETURNS TABLE (
+  total_properties BIGINT,
+  occupied_rooms BIGINT,
+  monthly_revenue NUMERIC,
+  inquiries BIGINT
+) AS $$
+  SELECT
+    (SELECT COUNT(*) FROM public.properties p WHERE p.owner_id = owner_uuid),
+    (SELECT COALESCE(SUM(p.total_rooms - p.available_rooms), 0)
+       FROM public.properties p WHERE p.owner_id = owner_uuid),
+    (SELECT COALESCE(SUM(b.monthly_rent), 0)
+       FROM public.bookings b
+       JOIN public.properties p ON p.id = b.property_id
+      WHERE p.owner_id = owner_uuid AND b.status = 'confirmed'),
+    (SELECT COUNT(*) FROM public.messages m WHERE m.receiver_id = owner_uuid);
+$$ LANGUAGE sql STABLE;
+
+-- Student dashboard: booking applications and received messages
+-- (saved-properties.sql replaces this with a version that also returns saved_pgs)
+CREATE OR REPLACE FUNCTION public.student_dashboard_stats(student_uuid UUID)
+RETURNS TABLE (
+  applications BIGINT,
+  messages BIGINT
+) AS $$
+  SELECT
+    (SELECT COUNT(*) FROM public.bookings b WHERE b.student_id = student_uuid),
+    (SELECT COUNT(*) FROM public.messages m WHERE m.receiver_id = student_uuid);
+$$ LANGUAGE sql STABLE;
+
+-- They take any user's id, so only the server (service_role key) may call them
+REVOKE ALL ON FUNCTION public.owner_dashboard_stats(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.student_dashboard_stats(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.owner_dashboard_stats(UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION public.student_dashboard_stats(UUID) TO service_role;
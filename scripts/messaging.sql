@@ -0,0 +1,170 @@
+-- Conversations and unread counters for EasyPG messaging
+-- Each participant of a conversation (two users, optionally about one property)
+-- has a row in conversations with the last message and their unread count, and
+-- inbox_unread_counts holds every user's total. Triggers keep both up to date as
+-- messages are inserted, read or deleted, so the inbox and its badges never
+-- scan the messages table.
+-- The API sets messages.conversation_id when it sends a message. Fill it in for
+-- existing messages, and rebuild the counters, with: flask --app app rebuild-conversations
+
+ALTER TABLE public.messages ADD COLUMN IF NOT EXISTS conversation_id UUID;
+ALTER TABLE public.messages ADD COLUMN IF NOT EXISTS read_at TIMESTAMP WITH TIME ZONE;
+
+CREATE TABLE IF NOT EXISTS public.conversations (
+  user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+  conversation_id UUID NOT NULL,
+  counterpart_id UUID REFERENCES public.users(id) ON DELETE CASCADE,
+  property_id UUID REFERENCES public.properties(id) ON DELETE SET NULL,
+  last_message_id UUID,
+  last_message_text TEXT,
+  last_sender_id UUID,
+  last_message_at TIMESTAMP WITH TIME ZONE,
+  unread_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (user_id, conversation_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.inbox_unread_counts (
+  user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  unread_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Keyset paging for GET /api/messages/conversations and a conversation's messages
+CREATE INDEX IF NOT EXISTS idx_conversations_user_last ON public.conversations(user_id, last_message_at DESC, conversation_id DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON public.messages(conversation_id, created_at DESC, id DESC);
+
+ALTER TABLE public.conversations ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.inbox_unread_counts ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own conversations" ON public.conversations;
+CREATE POLICY "Users can view own conversations" ON public.conversations
+  FOR SELECT USING (
+    user_id IN (
+      SELECT id FROM public.users WHERE auth_user_id = auth.uid() OR id::text = auth.uid()::text
+    )
+  );
+
+DROP POLICY IF EXISTS "Users can view own unread counts" ON public.inbox_unread_counts;
+CREATE POLICY "Users can view own unread counts" ON public.inbox_unread_counts
+  FOR SELECT USING (
+    user_id IN (
+      SELECT id FROM public.users WHERE auth_user_id = auth.uid() OR id::text = auth.uid()::text
+    )
+  );
+
+DROP POLICY IF EXISTS "Service role can manage conversations" ON public.conversations;
+CREATE POLICY "Service role can manage conversations" ON public.conversations
+  FOR ALL WITH CHECK (true);
+
+DROP POLICY IF EXISTS "Service role can manage unread counts" ON public.inbox_unread_counts;
+CREATE POLICY "Service role can manage unread counts" ON public.inbox_unread_counts
+  FOR ALL WITH CHECK (true);
+
+-- Add p_delta to one participant's unread count in a conversation and to their total
+CREATE OR REPLACE FUNCTION public.apply_unread(p_user_id UUID, p_conversation_id UUID, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+  UPDATE public.conversations SET
+    unread_count = GREATEST(unread_count + p_delta, 0),
+    updated_at = NOW()
+  WHERE user_id = p_user_id AND conversation_id = p_conversation_id;
+
+  INSERT INTO public.inbox_unread_counts AS i (user_id, unread_count)
+  VALUES (p_user_id, GREATEST(p_delta, 0))
+  ON CONFLICT (user_id) DO UPDATE SET
+    unread_count = GREATEST(i.unread_count + p_delta, 0),
+    updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION public.handle_message_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.conversation_id IS NULL OR NEW.sender_id = NEW.receiver_id THEN
+    RETURN NULL;
+  END IF;
+
+  -- One row per participant; a message older than the last one shown leaves it alone
+  INSERT INTO public.conversations AS c (
+    user_id, conversation_id, counterpart_id, property_id,
+    last_message_id, last_message_text, last_sender_id, last_message_at
+  )
+  VALUES
+    (NEW.sender_id, NEW.conversation_id, NEW.receiver_id, NEW.property_id,
+     NEW.id, LEFT(NEW.message_text, 200), NEW.sender_id, NEW.created_at),
+    (NEW.receiver_id, NEW.conversation_id, NEW.sender_id, NEW.property_id,
+     NEW.id, LEFT(NEW.message_text, 200), NEW.sender_id, NEW.created_at)
+  ON CONFLICT (user_id, conversation_id) DO UPDATE SET
+    last_message_id = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at OR c.last_message_at IS NULL THEN EXCLUDED.last_message_id ELSE c.last_message_id END,
+    last_message_text = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at OR c.last_message_at IS NULL THEN EXCLUDED.last_message_text ELSE c.last_message_text END,
+    last_sender_id = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at OR c.last_message_at IS NULL THEN EXCLUDED.last_sender_id ELSE c.last_sender_id END,
+    last_message_at = GREATEST(c.last_message_at, EXCLUDED.last_message_at),
+    updated_at = NOW();
+
+  IF NOT COALESCE(NEW.is_read, FALSE) THEN
+    PERFORM public.apply_unread(NEW.receiver_id, NEW.conversation_id, 1);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Statement-level, so marking a whole conversation read updates each counter once
+CREATE OR REPLACE FUNCTION public.handle_messages_read()
+RETURNS TRIGGER AS $$
+DECLARE
+  changed RECORD;
+BEGIN
+  FOR changed IN
+    SELECT n.receiver_id, n.conversation_id,
+           SUM(CASE WHEN COALESCE(o.is_read, FALSE) THEN 1 ELSE 0 END)
+         - SUM(CASE WHEN COALESCE(n.is_read, FALSE) THEN 1 ELSE 0 END) AS delta
+    FROM old_messages o
+    JOIN new_messages n ON n.id = o.id
+    WHERE n.conversation_id IS NOT NULL AND n.sender_id <> n.receiver_id
+    GROUP BY n.receiver_id, n.conversation_id
+  LOOP
+    IF changed.delta <> 0 THEN
+      PERFORM public.apply_unread(changed.receiver_id, changed.conversation_id, changed.delta::INTEGER);
+    END IF;
+  END LOOP;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION public.handle_message_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF OLD.conversation_id IS NOT NULL AND OLD.sender_id <> OLD.receiver_id AND NOT COALESCE(OLD.is_read, FALSE) THEN
+    PERFORM public.apply_unread(OLD.receiver_id, OLD.conversation_id, -1);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS on_message_insert ON public.messages;
+CREATE TRIGGER on_message_insert
+  AFTER INSERT ON public.messages
+  FOR EACH ROW EXECUTE FUNCTION public.handle_message_insert();
+
+DROP TRIGGER IF EXISTS on_messages_read ON public.messages;
+CREATE TRIGGER on_messages_read
+  AFTER UPDATE ON public.messages
+  REFERENCING OLD TABLE AS old_messages NEW TABLE AS new_messages
+  FOR EACH STATEMENT EXECUTE FUNCTION public.handle_messages_read();
+
+DROP TRIGGER IF EXISTS on_message_delete ON public.messages;
+CREATE TRIGGER on_message_delete
+  AFTER DELETE ON public.messages
+  FOR EACH ROW EXECUTE FUNCTION public.handle_message_delete();
+
+-- Only the triggers above change the counters; the functions run as their
+-- owner, so nobody else needs to execute them (and apply_unread would let
+-- anyone with the anon key rewrite any user's counts through /rest/v1/rpc)
+REVOKE ALL ON FUNCTION public.apply_unread(UUID, UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.handle_message_insert() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.handle_messages_read() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.handle_message_delete() FROM PUBLIC, anon, authenticated;
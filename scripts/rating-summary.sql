@@ -0,0 +1,75 @@
+-- Rating summaries for EasyPG
+-- Keeps a per-property review count and 1-5 star histogram up to date as
+-- reviews are inserted, updated or deleted, so the API never has to scan
+-- the reviews table to show a rating.
+-- Backfill existing reviews afterwards with: flask --app app rebuild-ratings
+
+CREATE TABLE IF NOT EXISTS public.property_rating_summary (
+  property_id UUID PRIMARY KEY REFERENCES public.properties(id) ON DELETE CASCADE,
+  review_count INTEGER NOT NULL DEFAULT 0,
+  rating_sum INTEGER NOT NULL DEFAULT 0,
+  rating_1 INTEGER NOT NULL DEFAULT 0,
+  rating_2 INTEGER NOT NULL DEFAULT 0,
+  rating_3 INTEGER NOT NULL DEFAULT 0,
+  rating_4 INTEGER NOT NULL DEFAULT 0,
+  rating_5 INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.property_rating_summary ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view rating summaries" ON public.property_rating_summary
+  FOR SELECT USING (true);
+
+CREATE POLICY "Service role can manage rating summaries" ON public.property_rating_summary
+  FOR ALL WITH CHECK (true);
+
+-- Add (p_delta = 1) or remove (p_delta = -1) one rating from a property's summary
+CREATE OR REPLACE FUNCTION public.apply_review_rating(p_property_id UUID, p_rating INTEGER, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+  INSERT INTO public.property_rating_summary (property_id)
+  VALUES (p_property_id)
+  ON CONFLICT (property_id) DO NOTHING;
+
+  UPDATE public.property_rating_summary SET
+    review_count = review_count + p_delta,
+    rating_sum = rating_sum + p_delta * p_rating,
+    rating_1 = rating_1 + CASE WHEN p_rating = 1 THEN p_delta ELSE 0 END,
+    rating_2 = rating_2 + CASE WHEN p_rating = 2 THEN p_delta ELSE 0 END,
+    rating_3 = rating_3 + CASE WHEN p_rating = 3 THEN p_delta ELSE 0 END,
+    rating_4 = rating_4 + CASE WHEN p_rating = 4 THEN p_delta ELSE 0 END,
+    rating_5 = rating_5 + CASE WHEN p_rating = 5 THEN p_delta ELSE 0 END,
+    updated_at = NOW()
+  WHERE property_id = p_property_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION public.handle_review_rating_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.apply_review_rating(OLD.property_id, OLD.rating, -1);
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.apply_review_rating(NEW.property_id, NEW.rating, 1);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS on_review_rating_change ON public.reviews;
+CREATE TRIGGER on_review_rating_change
+  AFTER INSERT OR DELETE OR UPDATE OF rating, property_id ON public.reviews
+  FOR EACH ROW EXECUTE FUNCTION public.handle_review_rating_change();
+
+-- Only the trigger changes summaries; without this, anyone with the anon key
+-- could shift any listing's rating through /rest/v1/rpc/apply_review_rating
+REVOKE ALL ON FUNCTION public.apply_review_rating(UUID, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.handle_review_rating_change() FROM PUBLIC, anon, authenticated;
+
+-- Keyset paging for GET /api/properties/<id>/reviews (newest / rating sorts)
+CREATE INDEX IF NOT EXISTS idx_reviews_property_created ON public.reviews(property_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_reviews_property_rating ON public.reviews(property_id, rating, id);
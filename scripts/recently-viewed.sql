@@ -0,0 +1,25 @@
+-- Recently viewed listings for EasyPG
+-- One row per user holding their last few viewed listings, newest first, as
+-- [{"property_id": ..., "viewed_at": ...}, ...]. The app keeps these in memory
+-- (recent_views.py) and writes them back in batches; listings deleted since
+-- are skipped when the dashboard loads them. Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS public.recently_viewed (
+  user_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  items JSONB NOT NULL DEFAULT '[]',
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.recently_viewed ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own recently viewed" ON public.recently_viewed;
+CREATE POLICY "Users can view own recently viewed" ON public.recently_viewed
+  FOR SELECT USING (
+    user_id IN (
+      SELECT id FROM public.users WHERE auth_user_id = auth.uid() OR id::text = auth.uid()::text
+    )
+  );
+
+DROP POLICY IF EXISTS "Service role can manage recently viewed" ON public.recently_viewed;
+CREATE POLICY "Service role can manage recently viewed" ON public.recently_viewed
+  FOR ALL WITH CHECK (true);
@@ -0,0 +1,21 @@
+-- Revoked login tokens for EasyPG
+-- POST /api/auth/logout records the token's id (its jti claim) here until the
+-- token would have expired. The app keeps the unexpired ids in memory and
+-- re-reads rows newer than its last sync, by revoked_at, every
+-- TOKEN_REVOCATION_SYNC_SECONDS; expired rows are deleted hourly. Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS public.revoked_tokens (
+  jti TEXT PRIMARY KEY,
+  user_id UUID REFERENCES public.users(id) ON DELETE CASCADE,
+  expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  revoked_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON public.revoked_tokens(revoked_at);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON public.revoked_tokens(expires_at);
+
+ALTER TABLE public.revoked_tokens ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Service role can manage revoked tokens" ON public.revoked_tokens;
+CREATE POLICY "Service role can manage revoked tokens" ON public.revoked_tokens
+  FOR ALL WITH CHECK (true);
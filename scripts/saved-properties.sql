@@ -0,0 +1,98 @@
+-- Saved properties (each student's wishlist) for EasyPG
+-- database-schema.sql creates saved_properties; the other setup scripts don't,
+-- so it's created here when missing. saved_property_counts holds each student's
+-- number of saved listings, kept current by triggers, so the dashboard's Saved
+-- PGs count is one primary-key read. Safe to re-run: the counts are backfilled
+-- from saved_properties at the end.
+
+CREATE TABLE IF NOT EXISTS public.saved_properties (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  student_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+  property_id UUID NOT NULL REFERENCES public.properties(id) ON DELETE CASCADE,
+  notes TEXT,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  UNIQUE(student_id, property_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.saved_property_counts (
+  student_id UUID PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+  saved_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- GET /api/saved reads a student's saved rows newest first
+CREATE INDEX IF NOT EXISTS idx_saved_properties_student_created ON public.saved_properties(student_id, created_at DESC);
+
+ALTER TABLE public.saved_properties ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.saved_property_counts ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Students can view own saved counts" ON public.saved_property_counts;
+CREATE POLICY "Students can view own saved counts" ON public.saved_property_counts
+  FOR SELECT USING (
+    student_id IN (
+      SELECT id FROM public.users WHERE auth_user_id = auth.uid() OR id::text = auth.uid()::text
+    )
+  );
+
+DROP POLICY IF EXISTS "Service role can manage saved properties" ON public.saved_properties;
+CREATE POLICY "Service role can manage saved properties" ON public.saved_properties
+  FOR ALL WITH CHECK (true);
+
+DROP POLICY IF EXISTS "Service role can manage saved counts" ON public.saved_property_counts;
+CREATE POLICY "Service role can manage saved counts" ON public.saved_property_counts
+  FOR ALL WITH CHECK (true);
+
+CREATE OR REPLACE FUNCTION public.handle_saved_property_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO public.saved_property_counts AS s (student_id, saved_count)
+    VALUES (NEW.student_id, 1)
+    ON CONFLICT (student_id) DO UPDATE SET
+      saved_count = s.saved_count + 1,
+      updated_at = NOW();
+  ELSE
+    UPDATE public.saved_property_counts SET
+      saved_count = GREATEST(saved_count - 1, 0),
+      updated_at = NOW()
+    WHERE student_id = OLD.student_id;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS on_saved_property_change ON public.saved_properties;
+CREATE TRIGGER on_saved_property_change
+  AFTER INSERT OR DELETE ON public.saved_properties
+  FOR EACH ROW EXECUTE FUNCTION public.handle_saved_property_change();
+
+REVOKE ALL ON FUNCTION public.handle_saved_property_change() FROM PUBLIC, anon, authenticated;
+
+-- Student dashboard, now with the saved count (the return type changes, so drop first)
+DROP FUNCTION IF EXISTS public.student_dashboard_stats(UUID);
+CREATE FUNCTION public.student_dashboard_stats(student_uuid UUID)
+RETURNS TABLE (
+  applications BIGINT,
+  messages BIGINT,
+  saved_pgs BIGINT
+) AS $$
+  SELECT
+    (SELECT COUNT(*) FROM public.bookings b WHERE b.student_id = student_uuid),
+    (SELECT COUNT(*) FROM public.messages m WHERE m.receiver_id = student_uuid),
+    (SELECT COALESCE(MAX(s.saved_count), 0) FROM public.saved_property_counts s WHERE s.student_id = student_uuid);
+$$ LANGUAGE sql STABLE;
+
+-- Takes any student's id, so only the server (service_role key) may call it
+REVOKE ALL ON FUNCTION public.student_dashboard_stats(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.student_dashboard_stats(UUID) TO service_role;
+
+-- Backfill, and correct any drift
+INSERT INTO public.saved_property_counts AS s (student_id, saved_count)
+SELECT student_id, COUNT(*) FROM public.saved_properties GROUP BY student_id
+ON CONFLICT (student_id) DO UPDATE SET
+  saved_count = EXCLUDED.saved_count,
+  updated_at = NOW();
+
+UPDATE public.saved_property_counts s SET saved_count = 0, updated_at = NOW()
+WHERE NOT EXISTS (SELECT 1 FROM public.saved_properties p WHERE p.student_id = s.student_id);
@@ -0,0 +1,466 @@
+"""
+In-process search index for EasyPG property listings.
+
+Keeps an inverted index over the text fields of every listing plus sorted
+numeric indexes on rent and available rooms, so /api/search can filter,
+rank and facet the catalogue without a database round-trip. Listings with
+coordinates are also bucketed on a lat/lng grid for radius searches.
+"""
+
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+# Field weights used for relevance scoring
+TEXT_FIELDS = {
+    'property_name': 3,
+    'city': 2,
+    'landmark': 2,
+    'description': 1
+}
+AMENITY_WEIGHT = 1
+
+FACET_FIELDS = ('city', 'property_type', 'gender_preference')
+
+# Upper bounds of the rent facet buckets; the last bucket is open-ended
+RENT_BUCKETS = (5000, 7500, 10000, 15000)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Grid cell size for radius searches, ~1.1 km north-south
+GEO_CELL_DEGREES = 0.01
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+def tokenize(text):
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def normalize_amenities(amenities):
+    if not amenities:
+        return []
+    if isinstance(amenities, str):
+        amenities = amenities.split(',')
+    return [a.strip().lower() for a in amenities if a and a.strip()]
+
+def rent_bucket(rent):
+    lower = 0
+    for upper in RENT_BUCKETS:
+        if rent < upper:
+            return f'{lower}-{upper}'
+        lower = upper
+    return f'{lower}+'
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance between two points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def in_range(value, low=None, high=None):
+    return value is not None and (low is None or value >= low) and (high is None or value <= high)
+
+class GeoGridIndex:
+    """Points bucketed into fixed lat/lng cells; a radius query only visits the cells it overlaps."""
+
+    def __init__(self, cell_degrees=GEO_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        # doc_id -> (lat, lng) in degrees
+        self.points = {}
+
+    def cell(self, lat, lng):
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def add(self, lat, lng, doc_id):
+        if lat is None or lng is None:
+            return
+        lat, lng = float(lat), float(lng)
+        self.points[doc_id] = (lat, lng)
+        # Cells hold what the distance check needs: radians and cos(lat), computed once
+        lat_rad = math.radians(lat)
+        self.cells.setdefault(self.cell(lat, lng), {})[doc_id] = (lat_rad, math.radians(lng), math.cos(lat_rad))
+
+    def remove(self, doc_id):
+        point = self.points.pop(doc_id, None)
+        if point is None:
+            return
+        key = self.cell(*point)
+        del self.cells[key][doc_id]
+        if not self.cells[key]:
+            del self.cells[key]
+
+    def within(self, lat, lng, radius_km):
+        """{doc_id: haversine term} for every point within radius_km of (lat, lng).
+
+        The term grows with distance, so it sorts like one; to_km() turns it
+        into kilometres for the few results actually returned.
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        # Degrees of longitude shrink towards the poles
+        lng_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        low_row, low_col = self.cell(lat - lat_span, lng - lng_span)
+        high_row, high_col = self.cell(lat + lat_span, lng + lng_span)
+
+        # Haversine inlined: this loop is the whole cost of a query
+        lat1, lng1 = math.radians(lat), math.radians(lng)
+        cos1 = math.cos(lat1)
+        # Compare haversine's a against its value at radius_km instead of taking asin per point
+        limit = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+        sin = math.sin
+        found = {}
+        for row in range(low_row, high_row + 1):
+            for col in range(low_col, high_col + 1):
+                cell = self.cells.get((row, col))
+                if not cell:
+                    continue
+                for doc_id, (lat2, lng2, cos2) in cell.items():
+                    a = sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * sin((lng2 - lng1) / 2) ** 2
+                    if a <= limit:
+                        found[doc_id] = a
+        return found
+
+    @staticmethod
+    def to_km(term):
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(term, 1.0)))
+
+class SortedNumericIndex:
+    """Sorted (value, id) pairs supporting range lookups in O(log n + k)."""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, value, doc_id, bulk=False):
+        if value is None:
+            return
+        if bulk:
+            self.entries.append((float(value), doc_id))
+        else:
+            insort(self.entries, (float(value), doc_id))
+
+    def sort(self):
+        self.entries.sort()
+
+    def remove(self, value, doc_id):
+        if value is None:
+            return
+        entry = (float(value), doc_id)
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def range(self, low=None, high=None):
+        start = 0 if low is None else bisect_left(self.entries, (float(low), ''))
+        # chr(0x10FFFF) sorts after any id, so equal values on the bound are included
+        end = len(self.entries) if high is None else bisect_right(self.entries, (float(high), chr(0x10FFFF)))
+        return {doc_id for _, doc_id in self.entries[start:end]}
+
+class PropertySearchIndex:
+    """Inverted + numeric index over property documents.
+
+    Documents are the serialized listing dicts the API returns; the index keeps
+    them so search results can be served without hitting the database.
+    """
+
+    def __init__(self, refresh_seconds=300, on_rebuild=None):
+        self.refresh_seconds = refresh_seconds
+        # Called with the documents before and after each rebuild but the first
+        self.on_rebuild = on_rebuild
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.loaded_at = None
+        self._clear()
+
+    def _clear(self):
+        self.documents = {}
+        self.postings = {}
+        self.vocabulary = []
+        self.amenities = {}
+        self.facets = {field: {} for field in FACET_FIELDS}
+        self.status = {}
+        self.rent = SortedNumericIndex()
+        self.rooms = SortedNumericIndex()
+        self.geo = GeoGridIndex()
+
+    # Maintenance
+    def refresh_if_stale(self, loader, wait=True):
+        """Rebuild from loader() when the index is empty or older than refresh_seconds.
+
+        With wait=False, return at once if another thread is already rebuilding.
+        """
+        if not self.is_stale():
+            return False
+        if not self.build_lock.acquire(blocking=wait):
+            return False
+        try:
+            # Another thread may have rebuilt while we waited
+            if not self.is_stale():
+                return False
+            self.rebuild(loader())
+        finally:
+            self.build_lock.release()
+        return True
+
+    def is_stale(self):
+        if self.loaded_at is None:
+            return True
+        return self.refresh_seconds > 0 and time.time() - self.loaded_at > self.refresh_seconds
+
+    def rebuild(self, documents):
+        with self.lock:
+            previous = self.documents if self.loaded_at is not None else None
+            self._clear()
+            # Append everything, then sort once instead of inserting in order
+            for doc in documents:
+                self._add(doc, bulk=True)
+            self.vocabulary.sort()
+            self.rent.sort()
+            self.rooms.sort()
+            self.loaded_at = time.time()
+            # Later adds mutate the live map while on_rebuild reads this one
+            current = dict(self.documents) if previous is not None and self.on_rebuild else None
+        if current is not None:
+            self.on_rebuild(previous, current)
+
+    def add(self, doc):
+        """Insert or replace a single document."""
+        with self.lock:
+            if doc['id'] in self.documents:
+                self._remove(doc['id'])
+            self._add(doc)
+
+    def update(self, doc_id, values):
+        """Change some fields of an indexed document. Returns False if it isn't indexed."""
+        with self.lock:
+            doc = self.documents.get(doc_id)
+            if doc is None:
+                return False
+            self._remove(doc_id)
+            self._add(dict(doc, **values))
+        return True
+
+    def add_many(self, docs):
+        """Insert or replace documents, sorting the indexes once at the end."""
+        docs = list(docs)
+        with self.lock:
+            # Removals bisect the sorted indexes, so they go before any append
+            for doc in docs:
+                if doc['id'] in self.documents:
+                    self._remove(doc['id'])
+            for doc in docs:
+                self._add(doc, bulk=True)
+            self.vocabulary.sort()
+            self.rent.sort()
+            self.rooms.sort()
+
+    def remove(self, doc_id):
+        with self.lock:
+            if doc_id in self.documents:
+                self._remove(doc_id)
+
+    def _terms(self, doc):
+        terms = {}
+        for field, weight in TEXT_FIELDS.items():
+            for token in tokenize(doc.get(field)):
+                terms[token] = terms.get(token, 0) + weight
+        for amenity in normalize_amenities(doc.get('amenities')):
+            for token in tokenize(amenity):
+                terms[token] = terms.get(token, 0) + AMENITY_WEIGHT
+        return terms
+
+    def _add(self, doc, bulk=False):
+        doc_id = doc['id']
+        self.documents[doc_id] = doc
+
+        for token, weight in self._terms(doc).items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                if bulk:
+                    self.vocabulary.append(token)
+                else:
+                    insort(self.vocabulary, token)
+            self.postings[token][doc_id] = weight
+
+        for amenity in normalize_amenities(doc.get('amenities')):
+            self.amenities.setdefault(amenity, set()).add(doc_id)
+
+        for field in FACET_FIELDS:
+            value = doc.get(field)
+            if value:
+                self.facets[field].setdefault(value.lower(), set()).add(doc_id)
+
+        self.status.setdefault(doc.get('status', 'approved'), set()).add(doc_id)
+        self.rent.add(doc.get('rent_per_month'), doc_id, bulk)
+        self.rooms.add(doc.get('available_rooms'), doc_id, bulk)
+        self.geo.add(doc.get('latitude'), doc.get('longitude'), doc_id)
+
+    def _remove(self, doc_id):
+        doc = self.documents.pop(doc_id)
+
+        for token in self._terms(doc):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+                i = bisect_left(self.vocabulary, token)
+                if i < len(self.vocabulary) and self.vocabulary[i] == token:
+                    del self.vocabulary[i]
+
+        for amenity in normalize_amenities(doc.get('amenities')):
+            self._discard(self.amenities, amenity, doc_id)
+
+        for field in FACET_FIELDS:
+            value = doc.get(field)
+            if value:
+                self._discard(self.facets[field], value.lower(), doc_id)
+
+        self._discard(self.status, doc.get('status', 'approved'), doc_id)
+        self.rent.remove(doc.get('rent_per_month'), doc_id)
+        self.rooms.remove(doc.get('available_rooms'), doc_id)
+        self.geo.remove(doc_id)
+
+    @staticmethod
+    def _discard(index, key, doc_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del index[key]
+
+    # Querying
+    def _match_token(self, token, prefix=False):
+        """Postings for a token; the last query token also matches as a prefix."""
+        if not prefix:
+            return dict(self.postings.get(token, {}))
+        matched = {}
+        i = bisect_left(self.vocabulary, token)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(token):
+            for doc_id, weight in self.postings[self.vocabulary[i]].items():
+                matched[doc_id] = max(matched.get(doc_id, 0), weight)
+            i += 1
+        return matched
+
+    def search(self, query=None, filters=None, sort='relevance', offset=0, limit=10, status='approved',
+               near=None, facets=True):
+        """Run a query and return (documents, total, facets).
+
+        filters may contain city, property_type, gender_preference (exact,
+        case-insensitive), city_contains (substring), amenities (list, all
+        required), min_rent, max_rent and min_rooms. Facets are counted over
+        the full matching set, unless facets is False.
+
+        near is (latitude, longitude, radius_km): only listings within the
+        radius match, sort='distance' puts the nearest first, and the
+        documents returned carry distance_km.
+        """
+        filters = filters or {}
+        with self.lock:
+            distances = None
+            if near:
+                # Start from the few listings in range rather than the whole catalogue
+                distances = self.geo.within(*near)
+                listed = self.status.get(status, set())
+                candidates = {doc_id for doc_id in distances if doc_id in listed}
+            else:
+                candidates = set(self.status.get(status, ()))
+            scores = None
+
+            tokens = tokenize(query)
+            for i, token in enumerate(tokens):
+                matched = self._match_token(token, prefix=(i == len(tokens) - 1))
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {doc_id: scores[doc_id] + weight for doc_id, weight in matched.items() if doc_id in scores}
+            if scores is not None:
+                candidates &= scores.keys()
+
+            for field in FACET_FIELDS:
+                value = filters.get(field)
+                if value:
+                    candidates &= self.facets[field].get(value.lower(), set())
+
+            if filters.get('city_contains'):
+                value = filters['city_contains'].lower()
+                candidates = {d for d in candidates if value in (self.documents[d].get('city') or '').lower()}
+
+            for amenity in normalize_amenities(filters.get('amenities')):
+                candidates &= self.amenities.get(amenity, set())
+
+            ranges = (
+                ('rent_per_month', self.rent, filters.get('min_rent'), filters.get('max_rent')),
+                ('available_rooms', self.rooms, filters.get('min_rooms'), None)
+            )
+            for field, index, low, high in ranges:
+                if low is None and high is None:
+                    continue
+                if distances is not None:
+                    # Checking the few candidates beats materializing the whole range
+                    candidates = {d for d in candidates if in_range(self.documents[d].get(field), low, high)}
+                else:
+                    candidates &= index.range(low, high)
+
+            counts = self._count_facets(candidates) if facets else None
+            if sort == 'distance':
+                if distances is None:
+                    raise ValueError('sort=distance needs near')
+                ordered = sorted(candidates, key=lambda d: (distances[d], d))
+            else:
+                ordered = self._sort(candidates, scores or {}, sort)
+            total = len(ordered)
+            page = ordered[offset:offset + limit]
+            if distances is None:
+                docs = [self.documents[doc_id] for doc_id in page]
+            else:
+                docs = [dict(self.documents[doc_id], distance_km=round(self.geo.to_km(distances[doc_id]), 2)) for doc_id in page]
+
+        return docs, total, counts
+
+    def _count_facets(self, doc_ids):
+        counts = {field: {} for field in FACET_FIELDS}
+        counts['amenities'] = {}
+        counts['rent'] = {}
+        for doc_id in doc_ids:
+            doc = self.documents[doc_id]
+            for field in FACET_FIELDS:
+                value = doc.get(field)
+                if value:
+                    counts[field][value] = counts[field].get(value, 0) + 1
+            for amenity in normalize_amenities(doc.get('amenities')):
+                counts['amenities'][amenity] = counts['amenities'].get(amenity, 0) + 1
+            if doc.get('rent_per_month') is not None:
+                bucket = rent_bucket(doc['rent_per_month'])
+                counts['rent'][bucket] = counts['rent'].get(bucket, 0) + 1
+        return counts
+
+    def _sort(self, doc_ids, scores, sort):
+        docs = self.documents
+        newest = sorted(doc_ids, key=lambda d: (docs[d].get('created_at') or '', d), reverse=True)
+        if sort in (None, '', 'relevance'):
+            # Stable sort keeps newest-first among equal scores
+            return sorted(newest, key=lambda d: scores.get(d, 0), reverse=True)
+        if sort == '-created_at':
+            return newest
+        desc = sort.startswith('-')
+        field = {
+            'rent': 'rent_per_month',
+            'availability': 'available_rooms',
+            'created_at': 'created_at'
+        }.get(sort.lstrip('-'))
+        if not field:
+            raise ValueError(f'Unsupported sort: {sort}')
+        missing = '' if field == 'created_at' else 0
+        return sorted(doc_ids, key=lambda d: (docs[d].get(field) or missing, d), reverse=desc)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'documents': len(self.documents),
+                'terms': len(self.postings),
+                'loaded_at': self.loaded_at
+            }
@@ -0,0 +1,827 @@
+"""
+Local SQLite backend for EasyPG.
+
+Serves the part of the PostgREST API the app uses (column selection with
+embedded relations, filters, or/and trees, ordering, ranges and counts,
+insert/upsert/update/delete and SQL functions) from a SQLite file. It plugs
+in underneath postgrest-py as an httpx transport, so every query the routes
+build runs unchanged against either backend.
+
+Tables, indexes and `LANGUAGE sql` functions are read from the same scripts
+used to set up Supabase; see SCHEMA_SCRIPTS.
+"""
+
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import anyio
+import httpx
+from httpx import Headers, QueryParams
+from postgrest import AsyncFilterRequestBuilder, AsyncPostgrestClient, SyncPostgrestClient
+
+from repositories import create_async_session, create_session
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+
+# Applied in order; later scripts may add tables, columns, indexes and functions
+SCHEMA_SCRIPTS = (
+    'complete-database-setup.sql',
+    'app-columns.sql',
+    'dashboard-stats-functions.sql',
+    'rating-summary.sql',
+    'messaging.sql',
+    'saved-properties.sql',
+    'recently-viewed.sql',
+    'bookings.sql',
+    'revoked-tokens.sql'
+)
+
+# plpgsql triggers can't be read from the scripts; these mirror scripts/rating-summary.sql
+SQLITE_TRIGGERS = '''
+CREATE TRIGGER IF NOT EXISTS reviews_rating_insert AFTER INSERT ON reviews BEGIN
+  INSERT OR IGNORE INTO property_rating_summary (property_id) VALUES (NEW.property_id);
+  UPDATE property_rating_summary SET
+    review_count = review_count + 1,
+    rating_sum = rating_sum + NEW.rating,
+    rating_1 = rating_1 + (NEW.rating = 1), rating_2 = rating_2 + (NEW.rating = 2),
+    rating_3 = rating_3 + (NEW.rating = 3), rating_4 = rating_4 + (NEW.rating = 4),
+    rating_5 = rating_5 + (NEW.rating = 5)
+  WHERE property_id = NEW.property_id;
+END;
+CREATE TRIGGER IF NOT EXISTS reviews_rating_delete AFTER DELETE ON reviews BEGIN
+  UPDATE property_rating_summary SET
+    review_count = review_count - 1,
+    rating_sum = rating_sum - OLD.rating,
+    rating_1 = rating_1 - (OLD.rating = 1), rating_2 = rating_2 - (OLD.rating = 2),
+    rating_3 = rating_3 - (OLD.rating = 3), rating_4 = rating_4 - (OLD.rating = 4),
+    rating_5 = rating_5 - (OLD.rating = 5)
+  WHERE property_id = OLD.property_id;
+END;
+'''
+
+# Row-level versions of the triggers in scripts/messaging.sql
+MESSAGE_TRIGGERS = '''
+CREATE TRIGGER IF NOT EXISTS messages_conversation_insert AFTER INSERT ON messages
+WHEN NEW.conversation_id IS NOT NULL AND NEW.sender_id <> NEW.receiver_id BEGIN
+  INSERT INTO conversations (user_id, conversation_id, counterpart_id, property_id, last_message_id, last_message_text, last_sender_id, last_message_at)
+  VALUES
+    (NEW.sender_id, NEW.conversation_id, NEW.receiver_id, NEW.property_id, NEW.id, substr(NEW.message_text, 1, 200), NEW.sender_id, NEW.created_at),
+    (NEW.receiver_id, NEW.conversation_id, NEW.sender_id, NEW.property_id, NEW.id, substr(NEW.message_text, 1, 200), NEW.sender_id, NEW.created_at)
+  ON CONFLICT (user_id, conversation_id) DO UPDATE SET
+    last_message_id = CASE WHEN excluded.last_message_at >= last_message_at OR last_message_at IS NULL THEN excluded.last_message_id ELSE last_message_id END,
+    last_message_text = CASE WHEN excluded.last_message_at >= last_message_at OR last_message_at IS NULL THEN excluded.last_message_text ELSE last_message_text END,
+    last_sender_id = CASE WHEN excluded.last_message_at >= last_message_at OR last_message_at IS NULL THEN excluded.last_sender_id ELSE last_sender_id END,
+    last_message_at = max(coalesce(last_message_at, ''), excluded.last_message_at);
+  UPDATE conversations SET unread_count = unread_count + 1
+  WHERE NOT coalesce(NEW.is_read, 0) AND user_id = NEW.receiver_id AND conversation_id = NEW.conversation_id;
+  INSERT INTO inbox_unread_counts (user_id, unread_count)
+  SELECT NEW.receiver_id, 1 WHERE NOT coalesce(NEW.is_read, 0)
+  ON CONFLICT (user_id) DO UPDATE SET unread_count = unread_count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS messages_conversation_read AFTER UPDATE OF is_read ON messages
+WHEN NEW.conversation_id IS NOT NULL AND NEW.sender_id <> NEW.receiver_id
+  AND coalesce(OLD.is_read, 0) <> coalesce(NEW.is_read, 0) BEGIN
+  UPDATE conversations SET unread_count = max(unread_count + (CASE WHEN NEW.is_read THEN -1 ELSE 1 END), 0)
+  WHERE user_id = NEW.receiver_id AND conversation_id = NEW.conversation_id;
+  UPDATE inbox_unread_counts SET unread_count = max(unread_count + (CASE WHEN NEW.is_read THEN -1 ELSE 1 END), 0)
+  WHERE user_id = NEW.receiver_id;
+END;
+CREATE TRIGGER IF NOT EXISTS messages_conversation_delete AFTER DELETE ON messages
+WHEN OLD.conversation_id IS NOT NULL AND OLD.sender_id <> OLD.receiver_id AND NOT coalesce(OLD.is_read, 0) BEGIN
+  UPDATE conversations SET unread_count = max(unread_count - 1, 0)
+  WHERE user_id = OLD.receiver_id AND conversation_id = OLD.conversation_id;
+  UPDATE inbox_unread_counts SET unread_count = max(unread_count - 1, 0)
+  WHERE user_id = OLD.receiver_id;
+END;
+'''
+
+# scripts/saved-properties.sql
+SAVED_TRIGGERS = '''
+CREATE TRIGGER IF NOT EXISTS saved_properties_count_insert AFTER INSERT ON saved_properties BEGIN
+  INSERT INTO saved_property_counts (student_id, saved_count) VALUES (NEW.student_id, 1)
+  ON CONFLICT (student_id) DO UPDATE SET saved_count = saved_count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS saved_properties_count_delete AFTER DELETE ON saved_properties BEGIN
+  UPDATE saved_property_counts SET saved_count = max(saved_count - 1, 0) WHERE student_id = OLD.student_id;
+END;
+'''
+
+# plpgsql functions in scripts/bookings.sql. SQLiteDatabase runs each in one
+# BEGIN IMMEDIATE transaction, which queues bookings as the row lock does in Postgres
+
+def booking_replay(booking, property_id):
+    return [{'result': 'replayed' if booking['property_id'] == property_id else 'key_reused', 'booking': booking}]
+
+def create_booking(conn, p_property_id, p_student_id, p_room_type, p_check_in_date, p_check_out_date=None,
+                   p_booking_notes=None, p_idempotency_key=None):
+    if p_idempotency_key is not None:
+        rows = conn.execute('SELECT * FROM bookings WHERE student_id = ? AND idempotency_key = ?', (p_student_id, p_idempotency_key)).fetchall()
+        if rows:
+            return booking_replay(dict(rows[0]), p_property_id)
+
+    now = now_iso()
+    props = conn.execute(
+        "UPDATE properties SET available_rooms = available_rooms - 1, updated_at = ? "
+        "WHERE id = ? AND status = 'approved' AND available_rooms > 0 RETURNING *",
+        (now, p_property_id)
+    ).fetchall()
+    if not props:
+        approved = conn.execute("SELECT 1 FROM properties WHERE id = ? AND status = 'approved'", (p_property_id,)).fetchall()
+        return [{'result': 'sold_out' if approved else 'not_found'}]
+
+    prop = props[0]
+    booking = conn.execute(
+        'INSERT INTO bookings (id, property_id, student_id, room_type, check_in_date, check_out_date, monthly_rent, '
+        'security_deposit, total_amount, status, booking_notes, idempotency_key, created_at, updated_at) '
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?) RETURNING *",
+        (str(uuid.uuid4()), p_property_id, p_student_id, p_room_type, p_check_in_date, p_check_out_date, prop['rent_per_month'],
+         prop['security_deposit'], prop['rent_per_month'] + (prop['security_deposit'] or 0), p_booking_notes, p_idempotency_key, now, now)
+    ).fetchall()[0]
+    return [{'result': 'booked', 'booking': dict(booking), 'available_rooms': prop['available_rooms'], 'status': prop['status']}]
+
+def cancel_booking(conn, p_booking_id):
+    now = now_iso()
+    bookings = conn.execute(
+        "UPDATE bookings SET status = 'cancelled', cancelled_at = ?, updated_at = ? "
+        "WHERE id = ? AND status IN ('pending', 'confirmed') RETURNING *",
+        (now, now, p_booking_id)
+    ).fetchall()
+    if not bookings:
+        exists = conn.execute('SELECT 1 FROM bookings WHERE id = ?', (p_booking_id,)).fetchall()
+        return [{'result': 'not_active' if exists else 'not_found'}]
+
+    booking = bookings[0]
+    prop = conn.execute(
+        'UPDATE properties SET available_rooms = min(available_rooms + 1, total_rooms), updated_at = ? WHERE id = ? RETURNING *',
+        (now, booking['property_id'])
+    ).fetchall()[0]
+    return [{'result': 'cancelled', 'booking': dict(booking), 'available_rooms': prop['available_rooms'], 'status': prop['status']}]
+
+BOOKING_FUNCTIONS = {'create_booking': create_booking, 'cancel_booking': cancel_booking}
+
+RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')
+
+# Postgres type -> (SQLite affinity, how values are stored)
+def column_kind(sql_type):
+    sql_type = sql_type.upper()
+    if sql_type.endswith('[]') or sql_type.startswith('JSON'):
+        return 'TEXT', 'json'
+    if sql_type.startswith('BOOL'):
+        return 'INTEGER', 'boolean'
+    if sql_type.startswith(('INT', 'BIGINT', 'SMALLINT', 'SERIAL', 'BIGSERIAL')):
+        return 'INTEGER', 'integer'
+    if sql_type.startswith(('DECIMAL', 'NUMERIC', 'REAL', 'FLOAT', 'DOUBLE')):
+        return 'REAL', 'real'
+    return 'TEXT', 'text'
+
+def split_top_level(text, sep=','):
+    """Split on sep outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, ''
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '\\' and quoted and i + 1 < len(text):
+            current += text[i:i + 2]
+            i += 2
+            continue
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += ch
+        i += 1
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+class Column:
+    def __init__(self, name, sql_type, definition):
+        self.name = name
+        self.affinity, self.kind = column_kind(sql_type)
+        self.primary_key = bool(re.search(r'\bPRIMARY\s+KEY\b', definition, re.I))
+        self.unique = bool(re.search(r'\bUNIQUE\b', definition, re.I))
+        self.not_null = bool(re.search(r'\bNOT\s+NULL\b', definition, re.I))
+        self.references = None
+        self.on_delete = None
+        self.check = None
+        self.default = None
+        self.generated = None
+
+        match = re.search(r'\bREFERENCES\s+(?:public\.)?(\w+)\s*\((\w+)\)(?:\s+ON\s+DELETE\s+(CASCADE|SET\s+NULL|RESTRICT))?', definition, re.I)
+        if match:
+            self.references = (match.group(1), match.group(2))
+            self.on_delete = match.group(3)
+
+        match = re.search(r'\bCHECK\s*\(', definition, re.I)
+        if match:
+            depth, start = 0, match.end() - 1
+            for i in range(start, len(definition)):
+                depth += {'(': 1, ')': -1}.get(definition[i], 0)
+                if depth == 0:
+                    self.check = definition[start:i + 1]
+                    break
+
+        match = re.search(r"\bDEFAULT\s+('(?:[^']|'')*'|[\w.]+(?:\(\))?)", definition, re.I)
+        if match:
+            default = match.group(1)
+            lowered = default.lower()
+            if 'uuid' in lowered:
+                self.generated = 'uuid'
+            elif lowered in ('now()', 'current_timestamp'):
+                self.generated = 'now'
+            elif lowered in ('true', 'false'):
+                self.default = '1' if lowered == 'true' else '0'
+            elif default == "'{}'":
+                self.default = "'[]'"
+            else:
+                self.default = default
+
+    def ddl(self):
+        parts = [self.name, self.affinity]
+        if self.primary_key:
+            parts.append('PRIMARY KEY')
+        if self.unique:
+            parts.append('UNIQUE')
+        if self.not_null and not self.generated:
+            parts.append('NOT NULL')
+        if self.default is not None:
+            parts.append(f'DEFAULT {self.default}')
+        if self.check and self.kind != 'json':
+            parts.append(f'CHECK {self.check}')
+        if self.references:
+            parts.append(f'REFERENCES {self.references[0]}({self.references[1]})')
+            if self.on_delete:
+                parts.append(f'ON DELETE {self.on_delete.upper()}')
+        return ' '.join(parts)
+
+    def encode(self, value):
+        if value is None:
+            return None
+        if self.kind == 'json':
+            if isinstance(value, str):
+                # Postgres array literal ('{a,b}') or JSON text
+                value = json.loads(value) if value.startswith(('[', '{"')) else [item for item in value.strip('{}').split(',') if item]
+            return json.dumps(value)
+        if self.kind == 'boolean':
+            if isinstance(value, str):
+                return 1 if value.lower() in ('true', 't', '1') else 0
+            return 1 if value else 0
+        return value
+
+    def decode(self, value):
+        if value is None:
+            return None
+        if self.kind == 'json':
+            return json.loads(value)
+        if self.kind == 'boolean':
+            return bool(value)
+        return value
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}
+        self.constraints = []
+
+    @property
+    def primary_key(self):
+        for column in self.columns.values():
+            if column.primary_key:
+                return column.name
+        return None
+
+    def ddl(self):
+        items = [column.ddl() for column in self.columns.values()] + self.constraints
+        return f'CREATE TABLE IF NOT EXISTS {self.name} (\n  ' + ',\n  '.join(items) + '\n)'
+
+class Schema:
+    """Tables, indexes and SQL functions collected from Postgres setup scripts."""
+
+    def __init__(self):
+        self.tables = {}
+        self.indexes = []
+        self.functions = {}
+
+    @classmethod
+    def from_scripts(cls, paths):
+        schema = cls()
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                schema.load(f.read())
+        return schema
+
+    def load(self, script):
+        # Strip line comments so they can't hide or fake statements
+        script = re.sub(r'--[^\n]*', '', script)
+
+        for match in re.finditer(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:public\.)?(\w+)\s*\((.*?)\n\s*\);', script, re.I | re.S):
+            table = Table(match.group(1))
+            for item in split_top_level(match.group(2)):
+                head = re.match(r'\w*', item).group(0).upper()
+                if head in ('PRIMARY', 'UNIQUE', 'CONSTRAINT', 'FOREIGN', 'CHECK'):
+                    table.constraints.append(item.replace('public.', ''))
+                    continue
+                name, rest = item.split(None, 1)
+                sql_type = re.match(r'([\w]+(?:\s*\([\d,\s]+\))?(?:\s+WITH(?:OUT)?\s+TIME\s+ZONE)?(?:\[\])?)', rest, re.I).group(1)
+                table.columns[name] = Column(name, sql_type, rest[len(sql_type):])
+            self.tables[table.name] = table
+
+        for match in re.finditer(r'ALTER\s+TABLE\s+(?:public\.)?(\w+)\s+ADD\s+COLUMN\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+([^;]+);', script, re.I):
+            table = self.tables.get(match.group(1))
+            if table is not None:
+                rest = match.group(3)
+                sql_type = re.match(r'([\w]+(?:\s*\([\d,\s]+\))?(?:\[\])?)', rest).group(1)
+                table.columns[match.group(2)] = Column(match.group(2), sql_type, rest[len(sql_type):])
+
+        for match in re.finditer(r'CREATE\s+(UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(?:public\.)?(\w+)\s*\(([^;]+)\)\s*;', script, re.I):
+            unique, name, table, columns = match.groups()
+            self.indexes.append((table, f"CREATE {unique or ''}INDEX IF NOT EXISTS {name} ON {table}({columns})"))
+
+        # Only plain SQL functions translate; plpgsql ones need register_function()
+        # (a body never spans two $$ blocks, so a plpgsql function can't swallow the next one)
+        pattern = r'CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+(?:public\.)?(\w+)\s*\(([^)]*)\)\s*RETURNS\s+((?:(?!\$\$).)*?)\s+AS\s+\$\$((?:(?!\$\$).)*)\$\$\s*LANGUAGE\s+sql'
+        for match in re.finditer(pattern, script, re.I | re.S):
+            name, params, returns, body = match.groups()
+            param_names = [param.split()[0] for param in params.split(',') if param.strip()]
+            body = body.strip().rstrip(';').replace('public.', '')
+            for param in param_names:
+                body = re.sub(rf'\b{param}\b', f':{param}', body)
+            # RETURNS TABLE (a BIGINT, b NUMERIC) names the result columns
+            table = re.match(r'TABLE\s*\((.*)\)', returns.strip(), re.I | re.S)
+            columns = [column.split()[0] for column in split_top_level(table.group(1))] if table else None
+            self.functions[name] = (body, columns)
+
+class QueryError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+class Embed:
+    def __init__(self, alias, name, hint, select, inner=False):
+        self.alias = alias
+        self.name = name
+        self.hint = hint
+        self.select = select
+        # !inner: parents without a matching child are dropped, and
+        # alias.column filters apply to the parents
+        self.inner = inner
+
+def parse_select(select):
+    """Split a PostgREST select string into plain columns and embeds."""
+    columns, embeds = [], []
+    for item in split_top_level(select or '*'):
+        if '(' in item:
+            head, inner = item.split('(', 1)
+            alias = None
+            if ':' in head:
+                alias, head = head.split(':', 1)
+            name, *hints = [part.strip() for part in head.split('!')]
+            joins = [hint for hint in hints if hint in ('inner', 'left')]
+            hint = next((hint for hint in hints if hint not in joins), None)
+            embeds.append(Embed(alias or name, name, hint, inner[:-1], 'inner' in joins))
+        else:
+            columns.append(item.split(':')[-1].split('::')[0].strip())
+    return columns, embeds
+
+class SQLiteDatabase:
+    def __init__(self, path, scripts=None):
+        scripts = scripts or [os.path.join(SCRIPTS_DIR, name) for name in SCHEMA_SCRIPTS]
+        self.schema = Schema.from_scripts([path for path in scripts if os.path.exists(path)])
+        self.python_functions = {}
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+
+        if path == ':memory:':
+            # One connection shared by every thread; shared-cache memory
+            # databases lock whole tables, so requests take turns instead
+            self.path = f'file:easypg-{uuid.uuid4().hex}?mode=memory&cache=shared'
+            self.shared_conn = self._open()
+            self.access_lock = threading.RLock()
+        else:
+            self.path = path
+            self.shared_conn = None
+            self.access_lock = contextlib.nullcontext()
+        self._create_schema()
+        bookings = self.schema.tables.get('bookings')
+        if bookings is not None and 'idempotency_key' in bookings.columns:
+            for name, fn in BOOKING_FUNCTIONS.items():
+                self.register_function(name, self._write_function(fn))
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, uri=self.path.startswith('file:'), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA case_sensitive_like=ON')
+        if not self.path.startswith('file:'):
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @property
+    def conn(self):
+        if self.shared_conn is not None:
+            return self.shared_conn
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._open()
+        return conn
+
+    def _create_schema(self):
+        conn = self.conn
+        for table in self.schema.tables.values():
+            conn.execute(table.ddl())
+            # Files created before a script added columns: ADD COLUMN IF NOT EXISTS, as in Postgres
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table.name})')}
+            for column in table.columns.values():
+                if column.name not in existing:
+                    conn.execute(f'ALTER TABLE {table.name} ADD COLUMN {column.ddl()}')
+        for table, ddl in self.schema.indexes:
+            if table in self.schema.tables:
+                try:
+                    conn.execute(ddl)
+                except sqlite3.OperationalError:
+                    # Index on a column this schema doesn't have
+                    pass
+        if 'reviews' in self.schema.tables and 'property_rating_summary' in self.schema.tables:
+            conn.executescript(SQLITE_TRIGGERS)
+        if all(name in self.schema.tables for name in ('messages', 'conversations', 'inbox_unread_counts')):
+            conn.executescript(MESSAGE_TRIGGERS)
+        if 'saved_properties' in self.schema.tables and 'saved_property_counts' in self.schema.tables:
+            conn.executescript(SAVED_TRIGGERS)
+
+    def register_function(self, name, fn):
+        """Serve rpc(name) with fn(conn, **params) -> list of row dicts."""
+        self.python_functions[name] = fn
+
+    def _write_function(self, fn):
+        """fn run in a write transaction of its own, as a plpgsql function runs in its statement's."""
+        def run(conn, **params):
+            with self.write_lock:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    result = fn(conn, **params)
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                return result
+        return run
+
+    def table(self, name):
+        table = self.schema.tables.get(name)
+        if table is None:
+            raise QueryError(404, '42P01', f'relation "public.{name}" does not exist')
+        return table
+
+    def column(self, table, name):
+        column = table.columns.get(name)
+        if column is None:
+            raise QueryError(400, '42703', f'column {table.name}.{name} does not exist')
+        return column
+
+    # Filters
+
+    def _condition(self, table, column_name, expression, args):
+        negate = False
+        op, _, value = expression.partition('.')
+        if op == 'not':
+            negate = True
+            op, _, value = value.partition('.')
+        column = self.column(table, column_name)
+        sql = self._operator(column, op, value, args)
+        return f'NOT ({sql})' if negate else sql
+
+    def _operator(self, column, op, value, args):
+        name = column.name
+        comparisons = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+        if op in comparisons:
+            args.append(column.encode(unquote(value)) if column.kind == 'boolean' else unquote(value))
+            return f'{name} {comparisons[op]} ?'
+        if op in ('like', 'ilike'):
+            args.append(unquote(value).replace('*', '%'))
+            return f'{name} LIKE ?' if op == 'like' else f'LOWER({name}) LIKE LOWER(?)'
+        if op == 'in':
+            values = [unquote(v) for v in split_top_level(value.strip()[1:-1])]
+            if not values:
+                return '0'
+            args.extend(values)
+            return f"{name} IN ({', '.join('?' * len(values))})"
+        if op == 'is':
+            lowered = value.lower()
+            if lowered == 'null':
+                return f'{name} IS NULL'
+            return f'{name} = {1 if lowered == "true" else 0}'
+        if op in ('cs', 'ov') and column.kind == 'json':
+            values = [unquote(v) for v in split_top_level(value.strip()[1:-1])]
+            args.extend(values)
+            checks = [f'EXISTS (SELECT 1 FROM json_each({name}) WHERE value = ?)' for _ in values]
+            return ' AND '.join(checks) if op == 'cs' else ' OR '.join(checks) or '0'
+        raise QueryError(400, 'PGRST100', f'unsupported operator "{op}"')
+
+    def _logic(self, table, mode, expression, args):
+        parts = []
+        for item in split_top_level(expression.strip()[1:-1]):
+            nested = re.match(r'^(not\.)?(and|or)(\(.*\))$', item, re.S)
+            if nested:
+                sql = self._logic(table, nested.group(2), nested.group(3), args)
+                parts.append(f'NOT {sql}' if nested.group(1) else sql)
+            else:
+                column_name, _, condition = item.partition('.')
+                parts.append(self._condition(table, column_name, condition, args))
+        return '(' + f' {mode.upper()} '.join(parts) + ')'
+
+    def _where(self, table, params):
+        clauses, args = [], []
+        for key, value in params:
+            if key in RESERVED_PARAMS or '.' in key:
+                continue
+            if key in ('or', 'and'):
+                clauses.append(self._logic(table, key, value, args))
+            else:
+                clauses.append(self._condition(table, key, value, args))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', args
+
+    def _order(self, table, order):
+        terms = []
+        for term in split_top_level(order or ''):
+            bits = term.split('.')
+            column = self.column(table, bits[0])
+            desc = 'desc' in bits[1:]
+            # Postgres defaults: NULLS LAST ascending, NULLS FIRST descending
+            nulls = 'FIRST' if 'nullsfirst' in bits[1:] or (desc and 'nullslast' not in bits[1:]) else 'LAST'
+            terms.append(f"{column.name} {'DESC' if desc else 'ASC'} NULLS {nulls}")
+        return (' ORDER BY ' + ', '.join(terms)) if terms else ''
+
+    # Reads
+
+    def _relation(self, table, embed):
+        """Resolve an embed to (target table, local column, remote column, many)."""
+        target = self.table(embed.name)
+        forward = [c for c in table.columns.values() if c.references and c.references[0] == target.name]
+        reverse = [c for c in target.columns.values() if c.references and c.references[0] == table.name]
+        if embed.hint:
+            forward = [c for c in forward if embed.hint in (c.name, f'{table.name}_{c.name}_fkey')]
+            reverse = [c for c in reverse if embed.hint in (c.name, f'{target.name}_{c.name}_fkey')]
+        if len(forward) == 1 and not reverse:
+            return target, forward[0].name, forward[0].references[1], False
+        if len(reverse) == 1 and not forward:
+            return target, reverse[0].references[1], reverse[0].name, True
+        raise QueryError(300, 'PGRST201', f"Could not embed '{embed.name}' from '{table.name}': use a !hint to pick a relationship")
+
+    def _fetch(self, table, select, where='', args=(), order='', limit=None, offset=0, modifiers=None):
+        columns, embeds = parse_select(select)
+        names = list(table.columns) if '*' in columns or not columns and not embeds else [self.column(table, c).name for c in columns]
+        relations = [(embed, self._relation(table, embed)) for embed in embeds]
+        wanted = list(dict.fromkeys(names + [local for _, (_, local, _, _) in relations]))
+
+        sql = f"SELECT {', '.join(wanted) or 'NULL'} FROM {table.name}{where}{order}"
+        if limit is not None or offset:
+            sql += f' LIMIT {int(limit) if limit is not None else -1} OFFSET {int(offset)}'
+        rows = [dict(row) for row in self.conn.execute(sql, list(args))]
+
+        for embed, relation in relations:
+            self._attach(rows, embed, relation, modifiers or {})
+
+        result = []
+        for row in rows:
+            item = {name: table.columns[name].decode(row[name]) for name in names}
+            for embed, _ in relations:
+                item[embed.alias] = row[embed.alias]
+            result.append(item)
+        return result
+
+    def _attach(self, rows, embed, relation, modifiers):
+        target, local, remote, many = relation
+        keys = list({row[local] for row in rows if row[local] is not None})
+        # Child columns plus the join key, fetched for all parents at once
+        columns, _ = parse_select(embed.select)
+        select = embed.select if '*' in columns or remote in columns else f'{embed.select}, {remote}'
+        order = self._order(target, modifiers.get(f'{embed.alias}.order'))
+        limit = modifiers.get(f'{embed.alias}.limit')
+
+        children = []
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            where = f" WHERE {remote} IN ({', '.join('?' * len(chunk))})"
+            if many and limit is not None:
+                # Per-parent limit, like PostgREST's embedded limit
+                order_by = order[len(' ORDER BY '):] if order else 'rowid'
+                where = f' WHERE rowid IN (SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER (PARTITION BY {remote} ORDER BY {order_by}) AS n FROM {target.name}{where}) WHERE n <= {int(limit)})'
+            children.extend(self._fetch(target, select, where, chunk, order))
+
+        grouped = {}
+        for child in children:
+            grouped.setdefault(child[remote], []).append(child)
+        strip = remote not in columns and '*' not in columns
+        for row in rows:
+            matches = grouped.get(row[local], [])
+            if strip:
+                matches = [{k: v for k, v in child.items() if k != remote} for child in matches]
+            row[embed.alias] = matches if many else (matches[0] if matches else None)
+
+    def _inner_joins(self, table, select, params, where, args):
+        """Narrow where to parents with a child matching each !inner embed's filters."""
+        _, embeds = parse_select(select)
+        clauses = []
+        for embed in embeds:
+            if not embed.inner:
+                continue
+            target, local, remote, _ = self._relation(table, embed)
+            conditions = [
+                self._condition(target, key[len(embed.alias) + 1:], value, args)
+                for key, value in params
+                if key.startswith(f'{embed.alias}.') and key[len(embed.alias) + 1:] not in ('order', 'limit', 'offset')
+            ]
+            conditions.append(f'{remote} IS NOT NULL')
+            clauses.append(f"{local} IN (SELECT {remote} FROM {target.name} WHERE {' AND '.join(conditions)})")
+        if not clauses:
+            return where
+        return (where + ' AND ' if where else ' WHERE ') + ' AND '.join(clauses)
+
+    def select(self, table_name, params, headers):
+        table = self.table(table_name)
+        where, args = self._where(table, params)
+        where = self._inner_joins(table, dict(params).get('select', '*'), params, where, args)
+        order = self._order(table, dict(params).get('order'))
+        modifiers = {key: value for key, value in params if '.' in key}
+
+        limit = dict(params).get('limit')
+        offset = int(dict(params).get('offset', 0))
+        range_header = headers.get('range')
+        if range_header:
+            start, _, end = range_header.partition('-')
+            offset, limit = int(start), int(end) - int(start) + 1
+
+        rows = self._fetch(table, dict(params).get('select', '*'), where, args, order, limit, offset, modifiers)
+
+        total = None
+        if 'count=' in headers.get('prefer', ''):
+            total = self.conn.execute(f'SELECT COUNT(*) FROM {table.name}{where}', args).fetchone()[0]
+        return rows, offset, total
+
+    # Writes
+
+    def _returning(self, table, cursor_rows):
+        return [{name: table.columns[name].decode(row[name]) for name in table.columns} for row in cursor_rows]
+
+    def insert(self, table_name, params, headers, body):
+        table = self.table(table_name)
+        items = body if isinstance(body, list) else [body]
+        prefer = headers.get('prefer', '')
+        upsert = 'resolution=' in prefer
+        conflict = dict(params).get('on_conflict') or table.primary_key
+
+        rows = []
+        with self.write_lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for item in items:
+                    values = {}
+                    for column in table.columns.values():
+                        if column.name in item:
+                            values[column.name] = column.encode(item[column.name])
+                        elif column.generated == 'uuid':
+                            values[column.name] = str(uuid.uuid4())
+                        elif column.generated == 'now':
+                            values[column.name] = now_iso()
+                    for key in item:
+                        self.column(table, key)
+
+                    names = list(values)
+                    sql = f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+                    if upsert:
+                        updates = [name for name in item if name not in conflict.split(',')]
+                        if 'ignore-duplicates' in prefer or not updates:
+                            sql += f' ON CONFLICT({conflict}) DO NOTHING'
+                        else:
+                            sql += f" ON CONFLICT({conflict}) DO UPDATE SET {', '.join(f'{n} = excluded.{n}' for n in updates)}"
+                    rows.extend(self._returning(table, self.conn.execute(sql + ' RETURNING *', [values[n] for n in names]).fetchall()))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return rows
+
+    def update(self, table_name, params, headers, body):
+        table = self.table(table_name)
+        where, args = self._where(table, params)
+        assignments = [f'{self.column(table, name).name} = ?' for name in body]
+        values = [table.columns[name].encode(value) for name, value in body.items()]
+        with self.write_lock:
+            cursor = self.conn.execute(f"UPDATE {table.name} SET {', '.join(assignments)}{where} RETURNING *", values + args)
+            return self._returning(table, cursor.fetchall())
+
+    def delete(self, table_name, params, headers):
+        table = self.table(table_name)
+        where, args = self._where(table, params)
+        with self.write_lock:
+            cursor = self.conn.execute(f'DELETE FROM {table.name}{where} RETURNING *', args)
+            return self._returning(table, cursor.fetchall())
+
+    def rpc(self, name, params):
+        if name in self.python_functions:
+            return self.python_functions[name](self.conn, **(params or {}))
+        if name not in self.schema.functions:
+            raise QueryError(404, 'PGRST202', f'Could not find the function public.{name}')
+        body, columns = self.schema.functions[name]
+        rows = self.conn.execute(body, params or {}).fetchall()
+        return [dict(zip(columns, row)) if columns else dict(row) for row in rows]
+
+class SQLiteTransport(httpx.BaseTransport):
+    """Answers postgrest-py's HTTP requests from a SQLiteDatabase."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def handle_request(self, request):
+        path = request.url.path.strip('/').split('/')
+        params = list(request.url.params.multi_items())
+        headers = request.headers
+        body = json.loads(request.content) if request.content else None
+
+        try:
+            content_range = None
+            with self.database.access_lock:
+                if path[0] == 'rpc':
+                    data = self.database.rpc(path[1], body)
+                elif request.method in ('GET', 'HEAD'):
+                    data, offset, total = self.database.select(path[0], params, headers)
+                    end = offset + len(data) - 1 if data else offset
+                    content_range = f"{offset}-{end}/{'*' if total is None else total}"
+                elif request.method == 'POST':
+                    data = self.database.insert(path[0], params, headers, body)
+                elif request.method == 'PATCH':
+                    data = self.database.update(path[0], params, headers, body)
+                elif request.method == 'DELETE':
+                    data = self.database.delete(path[0], params, headers)
+                else:
+                    raise QueryError(405, 'PGRST117', f'Unsupported method {request.method}')
+        except QueryError as e:
+            return httpx.Response(e.status, json={'message': e.message, 'code': e.code, 'hint': None, 'details': None})
+        except sqlite3.IntegrityError as e:
+            code = '23505' if 'UNIQUE' in str(e) else '23503' if 'FOREIGN KEY' in str(e) else '23514' if 'CHECK' in str(e) else '23502'
+            return httpx.Response(409 if code in ('23505', '23503') else 400, json={'message': str(e), 'code': code, 'hint': None, 'details': None})
+        except sqlite3.OperationalError as e:
+            return httpx.Response(400, json={'message': str(e), 'code': '42601', 'hint': None, 'details': None})
+
+        if 'return=minimal' in headers.get('prefer', ''):
+            data = []
+        response_headers = {'Content-Range': content_range} if content_range else {}
+        return httpx.Response(200 if request.method != 'POST' or path[0] == 'rpc' else 201, json=data, headers=response_headers)
+
+class SQLiteClient(SyncPostgrestClient):
+    """postgrest-py client whose requests are served by a local SQLite file."""
+
+    def __init__(self, path, scripts=None, on_request=None):
+        self.database = SQLiteDatabase(path, scripts)
+        self.on_request = on_request
+        super().__init__('http://sqlite.local')
+
+    def create_session(self, base_url, headers, timeout):
+        return create_session(self.on_request, base_url=base_url, headers=headers, timeout=timeout, transport=SQLiteTransport(self.database))
+
+class AsyncSQLiteTransport(httpx.AsyncBaseTransport):
+    """SQLiteTransport for httpx.AsyncClient; queries run in a worker thread."""
+
+    def __init__(self, database):
+        self.transport = SQLiteTransport(database)
+
+    async def handle_async_request(self, request):
+        return await anyio.to_thread.run_sync(self.transport.handle_request, request)
+
+class AsyncSQLiteClient(AsyncPostgrestClient):
+    """Async postgrest-py client on an existing SQLiteDatabase."""
+
+    def __init__(self, database, on_request=None):
+        self.database = database
+        self.on_request = on_request
+        super().__init__('http://sqlite.local')
+
+    def create_session(self, base_url, headers, timeout):
+        return create_async_session(self.on_request, base_url=base_url, headers=headers, timeout=timeout, transport=AsyncSQLiteTransport(self.database))
+
+    def rpc(self, func, params):
+        # postgrest-py 0.10 declares this async by mistake; return the builder like the sync client
+        return AsyncFilterRequestBuilder(self.session, f'/rpc/{func}', 'POST', Headers(), QueryParams(), json=params)
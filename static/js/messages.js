@@ -0,0 +1,265 @@
+// Messages JavaScript
+
+// Global variables
+let currentUser = null
+let conversations = []
+let activeConversation = null
+let nextCursor = null
+let eventSource = null
+
+function showNotification(message, type = "info") {
+  const notification = document.createElement("div")
+  notification.className = `notification ${type}`
+  notification.textContent = message
+  document.body.appendChild(notification)
+
+  setTimeout(() => {
+    if (document.body.contains(notification)) {
+      document.body.removeChild(notification)
+    }
+  }, 3000)
+}
+
+async function makeAPIRequest(endpoint, options = {}) {
+  const url = `http://localhost:5000/api${endpoint}`
+  const token = localStorage.getItem("authToken")
+
+  const defaultOptions = {
+    headers: {
+      "Content-Type": "application/json",
+      ...(token && { Authorization: `Bearer ${token}` }),
+    },
+  }
+
+  const response = await fetch(url, { ...defaultOptions, ...options })
+  const data = await response.json()
+
+  if (!response.ok) {
+    throw new Error(data.error || "Request failed")
+  }
+
+  return data
+}
+
+function getInitials(name) {
+  if (!name) return "U"
+  return name
+    .split(" ")
+    .map((word) => word[0])
+    .join("")
+    .toUpperCase()
+    .substring(0, 2)
+}
+
+function escapeHTML(text) {
+  const div = document.createElement("div")
+  div.textContent = text || ""
+  return div.innerHTML
+}
+
+// Initialize messages page
+document.addEventListener("DOMContentLoaded", () => {
+  initializeMessages()
+})
+
+async function initializeMessages() {
+  const token = localStorage.getItem("authToken")
+  currentUser = JSON.parse(localStorage.getItem("userData") || "null")
+
+  if (!token || !currentUser) {
+    window.location.href = "/login"
+    return
+  }
+
+  document.getElementById("activeConversation").style.display = "none"
+  document.getElementById("searchConversations").addEventListener("input", renderConversations)
+
+  await loadConversations()
+  connectEventStream(token)
+}
+
+// Conversations
+async function loadConversations(more = false) {
+  try {
+    const cursor = more && nextCursor ? `&cursor=${encodeURIComponent(nextCursor)}` : ""
+    const data = await makeAPIRequest(`/messages/conversations?per_page=20${cursor}`)
+
+    conversations = more ? conversations.concat(data.conversations) : data.conversations
+    nextCursor = data.pagination.next_cursor
+    updateUnreadBadge(data.unread_total)
+    renderConversations()
+  } catch (error) {
+    console.error("Failed to load conversations:", error)
+    showNotification("Failed to load conversations", "error")
+  }
+}
+
+function renderConversations() {
+  const list = document.getElementById("conversationsList")
+  const filter = document.getElementById("searchConversations").value.trim().toLowerCase()
+
+  list.innerHTML = ""
+  conversations
+    .filter((conversation) => !filter || conversation.counterpart.name.toLowerCase().includes(filter))
+    .forEach((conversation) => {
+      const item = document.createElement("div")
+      item.className = `conversation-item${conversation.unread_count ? " unread" : ""}`
+      item.innerHTML = `
+            <div class="contact-avatar"><span>${getInitials(conversation.counterpart.name)}</span></div>
+            <div class="conversation-details">
+                <h4>${escapeHTML(conversation.counterpart.name)}</h4>
+                ${conversation.property ? `<small>${escapeHTML(conversation.property.name)}</small>` : ""}
+                <p>${escapeHTML(conversation.last_message.text)}</p>
+            </div>
+            ${conversation.unread_count ? `<span class="unread-count">${conversation.unread_count}</span>` : ""}
+        `
+      item.onclick = () => openConversation(conversation)
+      list.appendChild(item)
+    })
+
+  if (nextCursor) {
+    const button = document.createElement("button")
+    button.className = "btn btn-sm btn-outline"
+    button.textContent = "Load more"
+    button.onclick = () => loadConversations(true)
+    list.appendChild(button)
+  }
+}
+
+function updateUnreadBadge(total) {
+  document.title = total ? `(${total}) Messages - EasyPG` : "Messages - EasyPG"
+}
+
+// Active conversation
+async function openConversation(conversation) {
+  activeConversation = conversation
+  document.getElementById("noConversation").style.display = "none"
+  document.getElementById("activeConversation").style.display = "flex"
+  document.getElementById("contactInitials").textContent = getInitials(conversation.counterpart.name)
+  document.getElementById("contactName").textContent = conversation.counterpart.name
+  document.getElementById("contactStatus").textContent = conversation.property ? conversation.property.name : ""
+
+  try {
+    const data = await makeAPIRequest(`/messages/conversations/${conversation.conversation_id}`)
+    const area = document.getElementById("messagesArea")
+    area.innerHTML = ""
+    data.messages.reverse().forEach(appendMessage)
+
+    if (conversation.unread_count) {
+      const result = await makeAPIRequest("/messages/read", {
+        method: "POST",
+        body: JSON.stringify({ conversation_ids: [conversation.conversation_id] }),
+      })
+      conversation.unread_count = 0
+      updateUnreadBadge(result.unread_total)
+      renderConversations()
+    }
+  } catch (error) {
+    console.error("Failed to load messages:", error)
+    showNotification("Failed to load messages", "error")
+  }
+}
+
+function appendMessage(message) {
+  const area = document.getElementById("messagesArea")
+  const bubble = document.createElement("div")
+  bubble.className = `message ${message.direction}`
+  bubble.innerHTML = `
+        <p>${escapeHTML(message.message_text)}</p>
+        <small>${new Date(message.created_at).toLocaleString("en-IN")}</small>
+    `
+  area.appendChild(bubble)
+  area.scrollTop = area.scrollHeight
+}
+
+async function sendMessage(event) {
+  event.preventDefault()
+  const input = document.getElementById("messageInput")
+  if (!activeConversation || !input.value.trim()) return
+
+  try {
+    // The stream delivers the sent message back, which draws it
+    await makeAPIRequest("/messages", {
+      method: "POST",
+      body: JSON.stringify({
+        receiver_id: activeConversation.counterpart.id,
+        property_id: activeConversation.property ? activeConversation.property.id : null,
+        message_text: input.value.trim(),
+      }),
+    })
+    input.value = ""
+  } catch (error) {
+    showNotification(error.message, "error")
+  }
+}
+
+// Push updates over Server-Sent Events; EventSource reconnects with Last-Event-ID itself
+function connectEventStream(token) {
+  eventSource = new EventSource(`http://localhost:5000/api/messages/stream?access_token=${encodeURIComponent(token)}`)
+
+  eventSource.addEventListener("message", (event) => {
+    const data = JSON.parse(event.data)
+    const message = data.message
+    const conversation = conversations.find((c) => c.conversation_id === message.conversation_id)
+    const isOpen = activeConversation && activeConversation.conversation_id === message.conversation_id
+
+    if (isOpen) {
+      appendMessage(message)
+    }
+    if (data.unread_total !== undefined) {
+      updateUnreadBadge(data.unread_total)
+    }
+
+    if (!conversation) {
+      // A new conversation: reload the first page of the inbox
+      loadConversations()
+      return
+    }
+    conversation.last_message = { id: message.id, text: message.message_text, sender_id: message.sender_id, created_at: message.created_at }
+    if (message.direction === "received") {
+      if (isOpen) {
+        makeAPIRequest("/messages/read", { method: "POST", body: JSON.stringify({ conversation_ids: [message.conversation_id] }) })
+      } else {
+        conversation.unread_count += 1
+      }
+    }
+    conversations = [conversation].concat(conversations.filter((c) => c !== conversation))
+    renderConversations()
+  })
+
+  eventSource.addEventListener("read", (event) => {
+    const data = JSON.parse(event.data)
+    if (data.reader_id !== currentUser.id) return
+
+    // Read in another tab or device
+    conversations
+      .filter((c) => data.conversation_ids.includes(c.conversation_id))
+      .forEach((c) => (c.unread_count = 0))
+    updateUnreadBadge(data.unread_total)
+    renderConversations()
+  })
+
+  eventSource.addEventListener("unread", (event) => {
+    updateUnreadBadge(JSON.parse(event.data).unread_total)
+  })
+
+  eventSource.addEventListener("reset", () => {
+    // Missed too much while disconnected: start over from the server's state
+    loadConversations()
+  })
+}
+
+// Event handlers
+function newMessage() {
+  showNotification("Start a conversation from a property's page", "info")
+}
+
+function viewPropertyDetails() {
+  if (activeConversation && activeConversation.property) {
+    window.location.href = `/search?property=${activeConversation.property.id}`
+  }
+}
+
+function scheduleVisit() {
+  showNotification("Visit scheduling coming soon!", "info")
+}
@@ -1,25 +1,122 @@
+// Saved properties JavaScript
+
+let savedPage = 1;
+
+document.addEventListener("DOMContentLoaded", () => {
+  if (!localStorage.getItem("authToken")) {
+    window.location.href = "/login";
+    return;
+  }
+  loadSavedProperties();
+});
+
+async function makeAPIRequest(endpoint, options = {}) {
+  const token = localStorage.getItem("authToken");
+  const response = await fetch(`http://localhost:5000/api${endpoint}`, {
+    headers: {
+      "Content-Type": "application/json",
+      ...(token && { Authorization: `Bearer ${token}` }),
+    },
+    ...options,
+  });
+  const data = await response.json();
+
+  if (!response.ok) {
+    throw new Error(data.error || "Request failed");
+  }
+  return data;
+}
+
+// The server sorts the whole saved list, so changing the order starts again from page 1
 function sortSavedProperties() {
-    const selectedOption = document.getElementById("sortOptions").value;
-
-    // Replace this with actual logic based on your data source (local storage, backend, etc.)
-    switch (selectedOption) {
-      case "recent":
-        console.log("Sorting by: Recently Saved");
-        break;
-      case "price_low":
-        console.log("Sorting by: Price Low to High");
-        break;
-      case "price_high":
-        console.log("Sorting by: Price High to Low");
-        break;
-      case "rating":
-        console.log("Sorting by: Highest Rated");
-        break;
-      default:
-        console.log("Unknown sort option");
+  savedPage = 1;
+  loadSavedProperties();
+}
+
+async function loadSavedProperties(append = false) {
+  const sort = document.getElementById("sortOptions").value;
+  const container = document.getElementById("savedProperties");
+
+  try {
+    const data = await makeAPIRequest(`/saved?sort=${sort}&page=${savedPage}&per_page=12&fields=card`);
+
+    if (!append) {
+      container.innerHTML = "";
     }
+    data.properties.forEach((property) => container.appendChild(createSavedCard(property)));
 
-    // Actual sorting logic would go here
-    // e.g., reordering cards in the DOM based on data attributes
+    document.getElementById("totalSaved").textContent = data.saved_count;
+    document.getElementById("emptyState").style.display = data.saved_count ? "none" : "block";
+    container.style.display = data.saved_count ? "grid" : "none";
+
+    const more = document.getElementById("loadMoreSaved");
+    if (more) more.remove();
+    if (data.pagination.has_next) {
+      const button = document.createElement("button");
+      button.id = "loadMoreSaved";
+      button.className = "btn btn-outline";
+      button.textContent = "Load more";
+      button.onclick = () => {
+        savedPage += 1;
+        loadSavedProperties(true);
+      };
+      container.after(button);
+    }
+  } catch (error) {
+    console.error("Failed to load saved properties:", error);
   }
+}
 
+function createSavedCard(property) {
+  const card = document.createElement("div");
+  card.className = "property-card";
+  card.innerHTML = `
+      <div class="property-image-container">
+          <img src="${property.image}" alt="" class="property-image" loading="lazy">
+          <button class="save-btn saved" title="Remove from saved">
+              <i class="fas fa-heart"></i>
+          </button>
+      </div>
+      <div class="property-content">
+          <div class="property-header">
+              <h3 class="property-name"></h3>
+              <div class="property-location">
+                  <i class="fas fa-map-marker-alt"></i>
+                  <span></span>
+              </div>
+          </div>
+          <div class="property-details">
+              <div class="property-rating">
+                  <i class="fas fa-star"></i>
+                  <span>${property.review_count ? property.rating.toFixed(1) : "New"}</span>
+                  <span class="rating-count">(${property.review_count || 0} reviews)</span>
+              </div>
+          </div>
+          <div class="property-footer">
+              <div class="property-price">
+                  <span class="price-amount">₹${property.rent_per_month.toLocaleString()}</span>
+                  <span class="price-period">/month</span>
+              </div>
+              <div class="property-availability">${property.available_rooms} rooms available</div>
+          </div>
+      </div>
+  `;
+  // Text set here, not in the template, so names can't inject markup
+  card.querySelector(".property-name").textContent = property.property_name;
+  card.querySelector(".property-location span").textContent = `${property.city}, ${property.state}`;
+  card.querySelector(".save-btn").onclick = () => removeSavedProperty(property.id, card);
+  return card;
+}
+
+async function removeSavedProperty(propertyId, card) {
+  try {
+    const data = await makeAPIRequest(`/saved/${propertyId}`, { method: "DELETE" });
+    card.remove();
+    document.getElementById("totalSaved").textContent = data.saved_count;
+    if (!data.saved_count) {
+      document.getElementById("emptyState").style.display = "block";
+    }
+  } catch (error) {
+    console.error("Failed to remove saved property:", error);
+  }
+}
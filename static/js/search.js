@@ -6,6 +6,8 @@ let totalPages = 1
 const currentFilters = {}
 let properties = []
 let isLoading = false
+let availabilitySource = null
+let savedPropertyIds = new Set()
 
 // Initialize search page
 document.addEventListener("DOMContentLoaded", () => {
@@ -16,6 +18,7 @@ document.addEventListener("DOMContentLoaded", () => {
 function initializeSearchPage() {
   // Check authentication
   checkAuthStatus()
+  loadSavedPropertyIds()
 
   // Get search query from URL
   const urlParams = new URLSearchParams(window.location.search)
@@ -43,7 +46,7 @@ async function loadProperties() {
   try {
     setLoadingState(true)
 
-    const response = await makeAPIRequest("/properties")
+    const response = await makeAPIRequest("/search?per_page=12")
     properties = response.properties || []
 
     displayProperties(properties)
@@ -74,7 +77,7 @@ async function searchProperties() {
     const params = new URLSearchParams()
 
     if (searchQuery) {
-      params.append("city", searchQuery)
+      params.append("q", searchQuery)
     }
 
     Object.keys(filters).forEach((key) => {
@@ -87,10 +90,15 @@ async function searchProperties() {
       }
     })
 
+    const sortParam = SEARCH_SORTS[document.getElementById("sortBy").value]
+    if (sortParam) {
+      params.append("sort", sortParam)
+    }
+
     params.append("page", currentPage)
     params.append("per_page", 12)
 
-    const response = await makeAPIRequest(`/properties?${params.toString()}`)
+    const response = await makeAPIRequest(`/search?${params.toString()}`)
     properties = response.properties || []
 
     displayProperties(properties)
@@ -151,6 +159,39 @@ function displayProperties(properties) {
   // Show grid
   grid.style.display = "grid"
   noResults.style.display = "none"
+
+  watchAvailability(properties.map((property) => property.id))
+}
+
+// Keep the room counts on the cards shown current over Server-Sent Events
+function watchAvailability(propertyIds) {
+  if (availabilitySource) {
+    availabilitySource.close()
+  }
+  if (!window.EventSource || propertyIds.length === 0) return
+
+  const ids = encodeURIComponent(propertyIds.join(","))
+  availabilitySource = new EventSource(`http://localhost:5000/api/properties/availability/stream?ids=${ids}`)
+
+  availabilitySource.addEventListener("snapshot", (event) => {
+    JSON.parse(event.data).properties.forEach(updateAvailability)
+  })
+  availabilitySource.addEventListener("availability", (event) => {
+    updateAvailability(JSON.parse(event.data))
+  })
+}
+
+function updateAvailability(state) {
+  const property = properties.find((p) => p.id === state.property_id)
+  const element = document.querySelector(`[data-availability="${state.property_id}"]`)
+  if (!property || !element) return
+
+  if (state.status !== "approved") {
+    element.textContent = "No longer listed"
+    return
+  }
+  property.available_rooms = state.available_rooms
+  element.textContent = `${state.available_rooms} rooms available`
 }
 
 // Create property card
@@ -186,8 +227,8 @@ function createPropertyCard(property, index) {
             <div class="property-badges">
                 <span class="property-type-badge">${getPropertyTypeLabel(property.property_type)}</span>
             </div>
-            <button class="save-btn" onclick="toggleSave('${property.id}', this)">
-                <i class="far fa-heart"></i>
+            <button class="save-btn${savedPropertyIds.has(property.id) ? " saved" : ""}" data-save="${property.id}" onclick="toggleSave('${property.id}', this)">
+                <i class="${savedPropertyIds.has(property.id) ? "fas" : "far"} fa-heart"></i>
             </button>
         </div>
         
@@ -203,8 +244,8 @@ function createPropertyCard(property, index) {
             <div class="property-details">
                 <div class="property-rating">
                     <i class="fas fa-star"></i>
-                    <span>4.5</span>
-                    <span class="rating-count">(124 reviews)</span>
+                    <span>${property.review_count ? property.rating.toFixed(1) : "New"}</span>
+                    <span class="rating-count">(${property.review_count || 0} reviews)</span>
                 </div>
                 <span class="gender-badge">${getGenderLabel(property.gender_preference)}</span>
             </div>
@@ -219,7 +260,7 @@ function createPropertyCard(property, index) {
                     <span class="price-amount">₹${property.rent_per_month.toLocaleString()}</span>
                     <span class="price-period">/month</span>
                 </div>
-                <div class="property-availability">
+                <div class="property-availability" data-availability="${property.id}">
                     ${property.available_rooms} rooms available
                 </div>
             </div>
@@ -307,28 +348,34 @@ function clearFilters() {
   loadProperties()
 }
 
+// Sort options handled by /api/search
+const SEARCH_SORTS = {
+  relevance: "relevance",
+  price_low: "rent",
+  price_high: "-rent",
+}
+
 // Sort results
 function sortResults() {
   const sortBy = document.getElementById("sortBy").value
 
+  // Server-side sorts re-run the search so ordering covers every page
+  if (SEARCH_SORTS[sortBy]) {
+    currentPage = 1
+    searchProperties()
+    return
+  }
+
   const sortedProperties = [...properties]
 
   switch (sortBy) {
-    case "price_low":
-      sortedProperties.sort((a, b) => a.rent_per_month - b.rent_per_month)
-      break
-    case "price_high":
-      sortedProperties.sort((a, b) => b.rent_per_month - a.rent_per_month)
-      break
     case "rating":
-      // Placeholder sorting by rating
-      sortedProperties.sort((a, b) => 4.5 - 4.5) // All have same rating for demo
+      sortedProperties.sort((a, b) => (b.rating || 0) - (a.rating || 0))
       break
     case "distance":
       // Placeholder sorting by distance
       break
     default:
-      // Keep original order for relevance
       break
   }
 
@@ -425,21 +472,43 @@ function nextPage() {
 }
 
 // Property actions
-function toggleSave(propertyId, button) {
-  // Toggle save state
+async function loadSavedPropertyIds() {
+  try {
+    const response = await makeAPIRequest("/saved/ids")
+    savedPropertyIds = new Set(response.property_ids)
+    document.querySelectorAll("[data-save]").forEach((button) => {
+      setSavedState(button, savedPropertyIds.has(button.dataset.save))
+    })
+  } catch (error) {
+    console.error("Failed to load saved properties:", error)
+  }
+}
+
+function setSavedState(button, saved) {
   const icon = button.querySelector("i")
+  icon.classList.toggle("fas", saved)
+  icon.classList.toggle("far", !saved)
+  button.classList.toggle("saved", saved)
+}
+
+async function toggleSave(propertyId, button) {
+  const saved = !savedPropertyIds.has(propertyId)
+
+  try {
+    await makeAPIRequest(`/saved/${propertyId}`, { method: saved ? "PUT" : "DELETE" })
+  } catch (error) {
+    showNotification(error.message, "error")
+    return
+  }
 
-  if (icon.classList.contains("far")) {
-    icon.classList.remove("far")
-    icon.classList.add("fas")
-    button.classList.add("saved")
+  if (saved) {
+    savedPropertyIds.add(propertyId)
     showNotification("Property saved!", "success")
   } else {
-    icon.classList.remove("fas")
-    icon.classList.add("far")
-    button.classList.remove("saved")
+    savedPropertyIds.delete(propertyId)
     showNotification("Property removed from saved", "info")
   }
+  setSavedState(button, saved)
 }
 
 function viewProperty(propertyId) {
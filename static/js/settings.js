@@ -120,12 +120,25 @@ function clearSearchHistory() {
     }
 }
 
+// Saved properties live on the server now
+async function fetchSavedProperties() {
+    const token = localStorage.getItem('authToken');
+    try {
+        const response = await fetch('http://localhost:5000/api/saved?per_page=100&fields=card', {
+            headers: { Authorization: `Bearer ${token}` }
+        });
+        return response.ok ? (await response.json()).properties : [];
+    } catch (error) {
+        return [];
+    }
+}
+
 // Download user data
-function downloadData() {
+async function downloadData() {
     const userData = {
         settings: JSON.parse(localStorage.getItem('userSettings')) || {},
         searchHistory: JSON.parse(localStorage.getItem('searchHistory')) || [],
-        savedProperties: JSON.parse(localStorage.getItem('savedProperties')) || [],
+        savedProperties: await fetchSavedProperties(),
         profile: JSON.parse(localStorage.getItem('userProfile')) || {}
     };
     
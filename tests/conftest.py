@@ -0,0 +1,83 @@
+"""
+Shared fixtures: the app on a throwaway SQLite database (DATABASE_BACKEND=sqlite),
+with cheap bcrypt and the response cache off. The database lives for the whole
+session, so each test makes its own users and listings.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+WORKDIR = tempfile.mkdtemp(prefix='easypg-tests-')
+for name in ('SUPABASE_URL', 'SUPABASE_ANON_KEY', 'SUPABASE_SERVICE_ROLE_KEY'):
+    os.environ.pop(name, None)
+os.environ['DATABASE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_DATABASE_PATH'] = os.path.join(WORKDIR, 'easypg.sqlite3')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+os.environ['BCRYPT_ROUNDS'] = '4'
+os.environ['BCRYPT_EXECUTOR'] = 'thread'
+os.environ['PROFILING_ENABLED'] = 'False'
+
+import app as easypg_app
+
+PROPERTY = {
+    'property_name': 'Green Valley PG',
+    'property_type': 'boys_pg',
+    'address': '12, University Road',
+    'city': 'Rajkot',
+    'state': 'Gujarat',
+    'pincode': '360005',
+    'total_rooms': 10,
+    'available_rooms': 5,
+    'bathrooms': 2,
+    'floors': 1,
+    'rent_per_month': 7000,
+    'security_deposit': 1000,
+    'gender_preference': 'boys_only'
+}
+
+@pytest.fixture(scope='session')
+def easypg():
+    return easypg_app
+
+@pytest.fixture
+def client(easypg):
+    return easypg.app.test_client()
+
+@pytest.fixture
+def make_user(client):
+    """make_user(user_type) registers and logs in a new user; returns (user id, auth headers)."""
+    def make(user_type='student'):
+        email = f'{user_type}-{uuid.uuid4().hex[:12]}@easypg.com'
+        response = client.post('/api/auth/register', json={
+            'email': email,
+            'password': 'secret123',
+            'full_name': user_type.title(),
+            'phone': '9876543210',
+            'user_type': user_type
+        })
+        assert response.status_code == 201, response.get_json()
+        login = client.post('/api/auth/login', json={'email': email, 'password': 'secret123'}).get_json()
+        return login['user']['id'], {'Authorization': f"Bearer {login['token']}"}
+    return make
+
+@pytest.fixture
+def make_property(client, easypg):
+    """make_property(owner headers, **fields) creates an approved listing and returns its id."""
+    def make(headers, **fields):
+        response = client.post('/api/properties', headers=headers, json=dict(PROPERTY, **fields))
+        assert response.status_code == 201, response.get_json()
+        property_id = response.get_json()['property']['id']
+        easypg.db.properties.update(property_id, {'status': 'approved'})
+        return property_id
+    return make
+
+@pytest.fixture
+def unique_city():
+    """A city no other test's listings are in, to scope list queries to one test."""
+    return f'Testcity{uuid.uuid4().hex[:8]}'
@@ -0,0 +1,71 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from token_revocation import RevocationList, RevocationsUnavailable
+
+def test_logout_revokes_only_that_token(client, make_user):
+    _, headers = make_user('student')
+    assert client.get('/api/auth/verify', headers=headers).status_code == 200
+
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    assert client.get('/api/auth/verify', headers=headers).status_code == 401
+
+def test_other_sessions_survive_logout(client, easypg, make_user):
+    user_id, headers = make_user('student')
+    other = {'Authorization': f'Bearer {easypg.generate_jwt_token(user_id)}'}
+
+    client.post('/api/auth/logout', headers=headers)
+    assert client.get('/api/auth/verify', headers=other).status_code == 200
+
+def test_other_workers_pick_up_revocations(client, easypg, make_user):
+    _, headers = make_user('student')
+    jti = easypg.decode_jwt_token(headers['Authorization'][7:])['jti']
+    other_worker = RevocationList(easypg.load_revoked_tokens, None, sync_seconds=3600)
+    other_worker.start()
+    assert not other_worker.is_revoked(jti)
+
+    client.post('/api/auth/logout', headers=headers)
+    other_worker.sync()
+    assert other_worker.is_revoked(jti)
+    other_worker.stopped.set()
+
+def test_checks_fail_closed_until_revocations_load(caplog):
+    def load(since):
+        raise ConnectionError('database unreachable')
+
+    revocations = RevocationList(load, None, sync_seconds=3600, retry_seconds=3600)
+    with caplog.at_level(logging.ERROR, logger='token_revocation'):
+        revocations.start()
+    with pytest.raises(RevocationsUnavailable):
+        revocations.is_revoked('any')
+    assert revocations.stats()['sync_errors'] == 1
+    assert 'scripts/revoked-tokens.sql' in caplog.text
+    revocations.stopped.set()
+
+def test_revocations_load_once_per_process():
+    loads = []
+    revocations = RevocationList(lambda since: loads.append(since) or [], None, sync_seconds=3600)
+    revocations.start()
+    revocations.start()
+
+    assert loads == [None]
+    revocations.stopped.set()
+
+def test_importing_the_app_does_not_load_revocations(tmp_path):
+    env = dict(os.environ, DATABASE_BACKEND='sqlite', SQLITE_DATABASE_PATH=str(tmp_path / 'easypg.sqlite3'))
+    code = 'import app; print(app.token_revocations.started, app.token_revocations.syncs)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', '0']
+
+def test_authenticated_routes_answer_503_until_revocations_load(client, easypg, make_user, monkeypatch):
+    _, headers = make_user('student')
+    monkeypatch.setattr(easypg.token_revocations, 'loaded', False)
+
+    response = client.get('/api/auth/verify', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from availability import availability_changes
+
+def read_event(chunks):
+    """The next SSE message from a streamed response, as (id, type, data)."""
+    message = {}
+    for line in next(chunks).decode().strip().split('\n'):
+        name, _, value = line.partition(': ')
+        message[name] = value
+    return message.get('id'), message.get('event'), json.loads(message['data'])
+
+@pytest.fixture
+def open_stream(client):
+    """open_stream(ids, **headers) starts an availability stream; it's closed after the test."""
+    responses = []
+    def open_(property_ids, **headers):
+        response = client.get('/api/properties/availability/stream', query_string={'ids': ','.join(property_ids)},
+                              headers=headers, buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        responses.append(response)
+        chunks = iter(response.response)
+        assert next(chunks) == b'retry: 3000\n\n'
+        return chunks
+    yield open_
+    for response in responses:
+        response.close()
+
+def test_stream_starts_with_a_snapshot_then_sends_changes(client, make_user, make_property, open_stream):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=3)
+    chunks = open_stream([property_id])
+
+    _, event, data = read_event(chunks)
+    assert event == 'snapshot'
+    assert data == {'properties': [{'property_id': property_id, 'available_rooms': 3, 'status': 'approved'}]}
+
+    client.put(f'/api/properties/{property_id}/availability', headers=owner, json={'available_rooms': 1})
+    _, event, data = read_event(chunks)
+    assert (event, data) == ('availability', {'property_id': property_id, 'available_rooms': 1, 'status': 'approved'})
+
+def test_bookings_show_up_on_the_stream(client, make_user, make_property, open_stream):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=2)
+    _, student = make_user('student')
+    chunks = open_stream([property_id])
+    read_event(chunks)
+
+    client.post('/api/bookings', headers=student, json={'property_id': property_id, 'room_type': 'Single Occupancy', 'check_in_date': '2030-01-01'})
+    assert read_event(chunks)[2]['available_rooms'] == 1
+
+def test_reconnecting_resumes_without_a_snapshot(client, make_user, make_property, open_stream):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=5)
+    last_id, _, _ = read_event(open_stream([property_id]))
+
+    # Changes made while disconnected are replayed from the backlog
+    client.put(f'/api/properties/{property_id}/availability', headers=owner, json={'available_rooms': 4})
+    _, event, data = read_event(open_stream([property_id], **{'Last-Event-ID': last_id}))
+    assert (event, data['available_rooms']) == ('availability', 4)
+
+def test_stream_ids_are_validated(client, easypg, monkeypatch):
+    monkeypatch.setitem(easypg.app.config, 'AVAILABILITY_MAX_PROPERTIES', 1)
+    assert client.get('/api/properties/availability/stream').status_code == 400
+    assert client.get('/api/properties/availability/stream?ids=nope').status_code == 400
+    two = '00000000-0000-0000-0000-000000000001,00000000-0000-0000-0000-000000000002'
+    assert client.get(f'/api/properties/availability/stream?ids={two}').status_code == 400
+
+def test_changes_between_index_rebuilds():
+    previous = {'a': {'id': 'a', 'available_rooms': 2, 'status': 'approved'},
+                'b': {'id': 'b', 'available_rooms': 1, 'status': 'approved'}}
+    current = {'a': {'id': 'a', 'available_rooms': 1, 'status': 'approved'},
+               'c': {'id': 'c', 'available_rooms': 4, 'status': 'approved'}}
+
+    assert list(availability_changes(previous, current)) == [
+        {'property_id': 'a', 'available_rooms': 1, 'status': 'approved'},
+        {'property_id': 'c', 'available_rooms': 4, 'status': 'approved'},
+        {'property_id': 'b', 'available_rooms': None, 'status': None}
+    ]
@@ -0,0 +1,89 @@
+import threading
+
+from repositories import create_repositories
+
+BOOKING = {'room_type': 'Single Occupancy', 'check_in_date': '2030-01-01'}
+
+def available_rooms(easypg, property_id):
+    return easypg.db.properties.get(property_id, 'available_rooms')['available_rooms']
+
+def test_concurrent_bookings_never_oversell(easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=3)
+    students = [make_user('student')[1] for _ in range(12)]
+
+    statuses = []
+    def book(headers):
+        response = easypg.app.test_client().post('/api/bookings', headers=headers, json=dict(BOOKING, property_id=property_id))
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=book, args=(headers,)) for headers in students]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] * 3 + [409] * 9
+    assert available_rooms(easypg, property_id) == 0
+    bookings = easypg.db.bookings.select('id').eq('property_id', property_id).eq('status', 'pending').execute().data
+    assert len(bookings) == 3
+
+def test_retried_booking_replays_the_first(client, easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=2)
+    _, student = make_user('student')
+    headers = dict(student, **{'Idempotency-Key': 'retry-1'})
+
+    first = client.post('/api/bookings', headers=headers, json=dict(BOOKING, property_id=property_id))
+    retry = client.post('/api/bookings', headers=headers, json=dict(BOOKING, property_id=property_id))
+
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json()['booking']['id'] == first.get_json()['booking']['id']
+    assert available_rooms(easypg, property_id) == 1
+
+def test_idempotency_key_cannot_book_another_listing(client, make_user, make_property):
+    _, owner = make_user('owner')
+    first_id = make_property(owner)
+    second_id = make_property(owner)
+    _, student = make_user('student')
+    headers = dict(student, **{'Idempotency-Key': 'reused'})
+
+    assert client.post('/api/bookings', headers=headers, json=dict(BOOKING, property_id=first_id)).status_code == 201
+    assert client.post('/api/bookings', headers=headers, json=dict(BOOKING, property_id=second_id)).status_code == 422
+
+def test_cancelling_gives_the_room_back(client, easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=1)
+    _, student = make_user('student')
+    _, other_student = make_user('student')
+
+    booking = client.post('/api/bookings', headers=student, json=dict(BOOKING, property_id=property_id)).get_json()['booking']
+    assert available_rooms(easypg, property_id) == 0
+
+    assert client.post(f"/api/bookings/{booking['id']}/cancel", headers=other_student).status_code == 403
+    response = client.post(f"/api/bookings/{booking['id']}/cancel", headers=student)
+    assert response.status_code == 200
+    assert response.get_json()['available_rooms'] == 1
+    assert client.post(f"/api/bookings/{booking['id']}/cancel", headers=student).status_code == 409
+
+def test_bookings_need_the_service_role_key(client, easypg, make_user, make_property, monkeypatch):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=1)
+    _, student = make_user('student')
+    monkeypatch.setattr(easypg.db, 'service_client', None)
+
+    response = client.post('/api/bookings', headers=student, json=dict(BOOKING, property_id=property_id))
+    assert response.status_code == 503
+    assert 'SUPABASE_SERVICE_ROLE_KEY' in response.get_json()['error']
+    assert available_rooms(easypg, property_id) == 1
+
+def test_only_booking_functions_use_the_service_role_key():
+    anon_key = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.anon'
+    service_key = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.service'
+    repos = create_repositories('supabase', supabase_url='https://example.supabase.co', supabase_key=anon_key, service_key=service_key)
+
+    assert repos.client.postgrest.session.headers['Authorization'] == f'Bearer {anon_key}'
+    assert repos.service_client.postgrest.session.headers['Authorization'] == f'Bearer {service_key}'
+    assert repos.bookings.client is repos.client
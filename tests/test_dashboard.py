@@ -0,0 +1,42 @@
+import pytest
+
+BOOKING = {'room_type': 'Single Occupancy', 'check_in_date': '2030-01-01'}
+
+@pytest.fixture(params=[False, True], ids=['queries', 'rpc'])
+def stats_rpc(request, easypg, monkeypatch):
+    monkeypatch.setitem(easypg.app.config, 'DASHBOARD_STATS_RPC', request.param)
+    return request.param
+
+def test_owner_stats(client, make_user, make_property, stats_rpc):
+    _, owner = make_user('owner')
+    _, student = make_user('student')
+    property_id = make_property(owner, total_rooms=10, available_rooms=4, rent_per_month=7000)
+    make_property(owner, total_rooms=5, available_rooms=5)
+    booking = client.post('/api/bookings', headers=student, json=dict(BOOKING, property_id=property_id)).get_json()['booking']
+    client.post(f"/api/bookings/{booking['id']}/confirm", headers=owner)
+
+    stats = client.get('/api/dashboard/stats', headers=owner).get_json()['stats']
+    assert stats['total_properties'] == 2
+    # 10 - 4 rooms taken before the booking, and the booked one
+    assert stats['occupied_rooms'] == 7
+    assert stats['monthly_revenue'] == 7000
+
+def test_student_stats(client, make_user, make_property, stats_rpc):
+    _, owner = make_user('owner')
+    _, student = make_user('student')
+    property_id = make_property(owner)
+    client.post('/api/bookings', headers=student, json=dict(BOOKING, property_id=property_id))
+    client.put(f'/api/saved/{property_id}', headers=student)
+
+    stats = client.get('/api/dashboard/stats', headers=student).get_json()['stats']
+    assert stats['applications'] == 1
+    assert stats['saved_pgs'] == 1
+
+def test_stats_functions_need_the_service_role_key(client, easypg, make_user, monkeypatch):
+    _, owner = make_user('owner')
+    monkeypatch.setitem(easypg.app.config, 'DASHBOARD_STATS_RPC', True)
+    monkeypatch.setattr(easypg.db, 'service_client', None)
+
+    response = client.get('/api/dashboard/stats', headers=owner)
+    assert response.status_code == 503
+    assert 'SUPABASE_SERVICE_ROLE_KEY' in response.get_json()['error']
@@ -0,0 +1,89 @@
+import gzip
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from compression import compress_chunks
+from json_provider import FastJSONProvider, stream_json
+from response_cache import MemoryStore
+
+PAYLOAD = {
+    'properties': [{'id': str(uuid.UUID(int=i)), 'name': f'PG {i}', 'rent': 5000 + i, 'score': i / 3, 'tags': ['wifi', None]}
+                   for i in range(7)],
+    'pagination': {'page': 1, 'has_next': False, 'total': 7},
+    'when': datetime(2030, 1, 2, 3, 4, 5),
+    'uid': uuid.UUID(int=42),
+    'city': 'Vadodara – Alkapuri',
+    'big': 2 ** 70
+}
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def provider(request, easypg):
+    return FastJSONProvider(easypg.app, request.param)
+
+def test_encoders_agree(easypg):
+    fast = FastJSONProvider(easypg.app, 'orjson').dumps_bytes(PAYLOAD)
+    plain = FastJSONProvider(easypg.app, 'stdlib').dumps_bytes(PAYLOAD)
+
+    assert json.loads(fast) == json.loads(plain)
+    assert json.loads(fast)['when'] == 'Wed, 02 Jan 2030 03:04:05 GMT'
+    assert list(json.loads(fast)) == sorted(PAYLOAD)
+
+def test_streamed_json_matches_the_whole_body(provider):
+    payload = {key: value for key, value in PAYLOAD.items() if key != 'big'}
+    streamed = b''.join(stream_json(provider, payload, 'properties', batch_size=3))
+    assert streamed == provider.dumps_bytes(payload) + b'\n'
+
+    # A value orjson can't encode sends that part through json, escaped differently but equal
+    streamed = b''.join(stream_json(provider, PAYLOAD, 'properties', batch_size=3))
+    assert json.loads(streamed) == json.loads(provider.dumps_bytes(PAYLOAD))
+
+def test_streamed_compression_matches_the_body():
+    chunks = [b'{"properties":[', b'{"id":1},' * 500, b'{"id":2}]}']
+    assert gzip.decompress(b''.join(compress_chunks(iter(chunks), 'gzip'))) == b''.join(chunks)
+
+@pytest.fixture
+def listings(make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    for rent in range(5000, 5006):
+        make_property(owner, city=unique_city, rent_per_month=rent, description='Clean rooms and good food. ' * 20)
+    return {'city': unique_city, 'fields': 'detail', 'per_page': 6}
+
+def test_gzip_is_negotiated(client, listings):
+    plain = client.get('/api/properties', query_string=listings)
+    zipped = client.get('/api/properties', query_string=listings, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in plain.headers['Vary'] and 'Accept-Encoding' in zipped.headers['Vary']
+    assert int(zipped.headers['Content-Length']) < int(plain.headers['Content-Length']) / 3
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+
+    refused = client.get('/api/properties', query_string=listings, headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in refused.headers
+
+def test_small_responses_stay_uncompressed(client):
+    response = client.get('/api/properties?city=Nowhere', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_streamed_lists_compress_to_the_same_body(client, easypg, listings, monkeypatch):
+    plain = client.get('/api/properties', query_string=listings).get_data()
+    monkeypatch.setitem(easypg.app.config, 'JSON_STREAM_MIN_ITEMS', 2)
+
+    streamed = client.get('/api/properties', query_string=listings, headers={'Accept-Encoding': 'gzip'})
+    assert streamed.is_streamed
+    assert streamed.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in streamed.headers
+    assert json.loads(gzip.decompress(streamed.get_data())) == json.loads(plain)
+
+def test_compressed_cached_responses_get_weak_etags(client, easypg, listings, monkeypatch):
+    monkeypatch.setattr(easypg.response_cache, 'store', MemoryStore(1024 * 1024))
+    headers = {'Accept-Encoding': 'gzip'}
+
+    first = client.get('/api/properties', query_string=listings, headers=headers)
+    assert first.headers['ETag'].startswith('W/')
+    again = client.get('/api/properties', query_string=listings, headers=dict(headers, **{'If-None-Match': first.headers['ETag']}))
+    assert again.status_code == 304
+    assert 'Content-Encoding' not in again.headers
@@ -0,0 +1,42 @@
+import csv
+import io
+
+BOOKING = {'room_type': 'Single Occupancy', 'check_in_date': '2030-01-01'}
+
+def export_rows(client, headers, dataset):
+    response = client.get(f'/api/export/{dataset}', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+
+def test_owners_export_only_their_listings(client, make_user, make_property):
+    owner_id, owner = make_user('owner')
+    _, other_owner = make_user('owner')
+    mine = {make_property(owner), make_property(owner)}
+    make_property(other_owner)
+
+    rows = export_rows(client, owner, 'properties')
+    assert {row['id'] for row in rows} == mine
+    assert {row['owner_id'] for row in rows} == {owner_id}
+
+def test_bookings_export_is_scoped_to_the_user(client, make_user, make_property):
+    owner_id, owner = make_user('owner')
+    _, other_owner = make_user('owner')
+    student_id, student = make_user('student')
+    _, other_student = make_user('student')
+    property_id = make_property(owner)
+    other_property_id = make_property(other_owner)
+
+    mine = client.post('/api/bookings', headers=student, json=dict(BOOKING, property_id=property_id)).get_json()['booking']
+    theirs = client.post('/api/bookings', headers=other_student, json=dict(BOOKING, property_id=property_id)).get_json()['booking']
+    client.post('/api/bookings', headers=student, json=dict(BOOKING, property_id=other_property_id))
+
+    student_rows = export_rows(client, student, 'bookings')
+    assert mine['id'] in {row['id'] for row in student_rows}
+    assert {row['student_id'] for row in student_rows} == {student_id}
+
+    owner_rows = export_rows(client, owner, 'bookings')
+    assert {row['id'] for row in owner_rows} == {mine['id'], theirs['id']}
+
+def test_students_cannot_export_listings(client, make_user):
+    _, student = make_user('student')
+    assert client.get('/api/export/properties', headers=student).status_code == 403
@@ -0,0 +1,44 @@
+import json
+
+from conftest import PROPERTY
+
+def ndjson(*records):
+    return '\n'.join(record if isinstance(record, str) else json.dumps(record) for record in records)
+
+def import_upload(client, headers, body, **params):
+    return client.post('/api/properties/import', headers=headers, query_string=params, data=body,
+                       content_type='application/x-ndjson')
+
+def test_import_reports_each_bad_line(client, make_user):
+    _, owner = make_user('owner')
+    body = ndjson(
+        dict(PROPERTY, ref='a'),
+        {'type': 'image', 'property_ref': 'a', 'image_url': 'https://example.com/a.jpg', 'image_order': 0},
+        'not json',
+        dict(PROPERTY, ref='b', gender_preference='anyone'),
+        {'type': 'image', 'property_ref': 'b', 'image_url': 'https://example.com/b.jpg'},
+        dict(PROPERTY, ref='a'),
+        [1]
+    )
+
+    response = import_upload(client, owner, body)
+    summary = response.get_json()
+    assert response.status_code == 200
+    assert summary['properties_created'] == 1
+    assert summary['images_created'] == 1
+    assert summary['failed'] == 5
+    assert [(error['line'], error['ref']) for error in summary['errors']] == [
+        (3, None), (4, 'b'), (5, 'b'), (6, 'a'), (7, None)
+    ]
+
+def test_import_dry_run_writes_nothing(client, easypg, make_user):
+    owner_id, owner = make_user('owner')
+
+    summary = import_upload(client, owner, ndjson(dict(PROPERTY, ref='a')), dry_run='true').get_json()
+    assert summary['dry_run'] is True
+    assert summary['properties_created'] == 1
+    assert easypg.db.properties.select('id').eq('owner_id', owner_id).execute().data == []
+
+def test_students_cannot_import(client, make_user):
+    _, student = make_user('student')
+    assert import_upload(client, student, ndjson(dict(PROPERTY, ref='a'))).status_code == 403
@@ -0,0 +1,98 @@
+def send(client, headers, receiver_id, text, property_id=None):
+    response = client.post('/api/messages', headers=headers, json={
+        'receiver_id': receiver_id, 'property_id': property_id, 'message_text': text
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['data']
+
+def inbox(client, headers, **params):
+    response = client.get('/api/messages/conversations', headers=headers, query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_inbox_counts_unread_per_conversation(client, make_user, make_property):
+    owner_id, owner = make_user('owner')
+    property_id = make_property(owner)
+    first_id, first = make_user('student')
+    _, second = make_user('student')
+
+    send(client, first, owner_id, 'Is a room free?', property_id)
+    send(client, second, owner_id, 'Hello')
+    send(client, first, owner_id, 'From next month', property_id)
+
+    body = inbox(client, owner)
+    conversations = body['conversations']
+    assert body['unread_total'] == 3
+    # Most recently active first
+    assert [c['last_message']['text'] for c in conversations] == ['From next month', 'Hello']
+    assert [c['unread_count'] for c in conversations] == [2, 1]
+    assert conversations[0]['counterpart']['id'] == first_id
+    assert conversations[0]['property']['id'] == property_id
+    assert inbox(client, first)['unread_total'] == 0
+
+def test_reading_clears_the_counters(client, make_user):
+    owner_id, owner = make_user('owner')
+    _, first = make_user('student')
+    _, second = make_user('student')
+    send(client, first, owner_id, 'One')
+    send(client, first, owner_id, 'Two')
+    send(client, second, owner_id, 'Three')
+    conversation_id = inbox(client, first)['conversations'][0]['conversation_id']
+
+    response = client.post('/api/messages/read', headers=owner, json={'conversation_ids': [conversation_id]})
+    assert response.get_json() == {'conversation_ids': [conversation_id], 'unread_total': 1}
+    assert [c['last_message']['text'] for c in inbox(client, owner, unread='true')['conversations']] == ['Three']
+
+    # Nothing left to read there: no update, same total
+    assert client.post('/api/messages/read', headers=owner, json={'conversation_ids': [conversation_id]}).get_json()['conversation_ids'] == []
+    assert client.post('/api/messages/read', headers=owner).get_json()['unread_total'] == 0
+    assert client.get('/api/messages/unread', headers=owner).get_json() == {'unread_total': 0}
+
+def test_conversation_pages_and_access(client, make_user):
+    owner_id, owner = make_user('owner')
+    _, student = make_user('student')
+    _, stranger = make_user('student')
+    for i in range(5):
+        send(client, student, owner_id, f'Message {i}')
+    conversation_id = inbox(client, owner)['conversations'][0]['conversation_id']
+
+    texts, cursor = [], None
+    while True:
+        query = {'per_page': 2, **({'cursor': cursor} if cursor else {})}
+        page = client.get(f'/api/messages/conversations/{conversation_id}', headers=owner, query_string=query).get_json()
+        texts += [(m['message_text'], m['direction']) for m in page['messages']]
+        cursor = page['pagination']['next_cursor']
+        if not cursor:
+            break
+    assert texts == [(f'Message {i}', 'received') for i in reversed(range(5))]
+    assert client.get(f'/api/messages/conversations/{conversation_id}', headers=stranger).status_code == 404
+
+def test_inbox_pages_with_a_cursor(client, make_user):
+    owner_id, owner = make_user('owner')
+    for i in range(3):
+        send(client, make_user('student')[1], owner_id, f'Student {i}')
+
+    first_page = inbox(client, owner, per_page=2)
+    rest = inbox(client, owner, per_page=2, cursor=first_page['pagination']['next_cursor'])
+    texts = [c['last_message']['text'] for c in first_page['conversations'] + rest['conversations']]
+    assert texts == ['Student 2', 'Student 1', 'Student 0']
+    assert not rest['pagination']['has_next']
+
+def test_bad_messages_are_rejected(client, make_user):
+    user_id, headers = make_user('student')
+    assert client.post('/api/messages', headers=headers, json={'receiver_id': user_id, 'message_text': 'Hi'}).status_code == 400
+    missing = {'receiver_id': '00000000-0000-0000-0000-000000000000', 'message_text': 'Hi'}
+    assert client.post('/api/messages', headers=headers, json=missing).status_code == 404
+    assert client.post('/api/messages/read', headers=headers, json={'conversation_ids': 'all'}).status_code == 400
+
+def test_poll_delivers_messages_sent_since_the_last_event(client, make_user):
+    owner_id, owner = make_user('owner')
+    _, student = make_user('student')
+    after = client.get('/api/messages/poll', headers=owner, query_string={'timeout': 0}).get_json()['last_event_id']
+    send(client, student, owner_id, 'Hello')
+
+    body = client.get('/api/messages/poll', headers=owner, query_string={'after': after, 'timeout': 1}).get_json()
+    assert [(event['type'], event['data']['message']['message_text']) for event in body['events']] == [('message', 'Hello')]
+    assert body['events'][0]['data']['unread_total'] == 1
+    assert body['last_event_id'] == body['events'][0]['id']
+    assert body['unread_total'] == 1
@@ -0,0 +1,42 @@
+import re
+
+import pytest
+
+from metrics import query_labels
+
+REMOTE = {'REMOTE_ADDR': '203.0.113.9'}
+
+@pytest.mark.parametrize('method, path, prefer, labels', [
+    ('GET', '/rest/v1/properties', '', ('properties', 'select')),
+    ('POST', '/rest/v1/saved_properties', 'resolution=ignore-duplicates', ('saved_properties', 'upsert')),
+    ('PATCH', '/rest/v1/users', '', ('users', 'update')),
+    ('POST', '/rest/v1/rpc/create_booking', '', ('create_booking', 'rpc'))
+])
+def test_query_labels(method, path, prefer, labels):
+    assert query_labels(method, path, prefer) == labels
+
+def test_responses_carry_server_timing(client, make_user):
+    _, headers = make_user('student')
+    timing = client.get('/api/auth/verify', headers=headers).headers['Server-Timing']
+
+    assert re.match(r'db;dur=[\d.]+;desc="\d+ calls?", app;dur=[\d.]+, total;dur=[\d.]+$', timing)
+
+def test_metrics_count_routes_and_queries(client, unique_city):
+    client.get('/api/properties', query_string={'city': unique_city})
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert re.search(r'easypg_http_requests_total\{route="/api/properties",method="GET",status="200"\} \d+', body)
+    assert 'easypg_db_calls_total{table="properties",operation="select"}' in body
+    assert 'easypg_http_request_duration_seconds_bucket{route="/api/properties",method="GET",le="+Inf"}' in body
+
+def test_metrics_without_a_token_only_answer_loopback(client):
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '::1'}).status_code == 200
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 403
+
+def test_metrics_token_lets_other_hosts_in(client, easypg, monkeypatch):
+    monkeypatch.setitem(easypg.app.config, 'METRICS_TOKEN', 'scrape-me')
+
+    assert client.get('/metrics', environ_base=REMOTE).status_code == 401
+    assert client.get('/metrics', environ_base=REMOTE, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', environ_base=REMOTE, headers={'Authorization': 'Bearer scrape-me'}).status_code == 200
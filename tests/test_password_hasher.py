@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import password_hasher
+from password_hasher import HasherBusy, PasswordHasher
+
+def test_timed_out_jobs_hold_their_slot_until_they_finish(monkeypatch):
+    release = threading.Event()
+    def slow_hashpw(password, rounds):
+        release.wait(5)
+        return 'hashed'
+    monkeypatch.setattr(password_hasher, '_hashpw', slow_hashpw)
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4, timeout=0.05, executor='thread')
+
+    with pytest.raises(HasherBusy, match='timed out'):
+        hasher.hash('secret123')
+    # Still running in its worker, so still pending
+    with pytest.raises(HasherBusy, match='Too many'):
+        hasher.hash('secret123')
+
+    release.set()
+    hasher.executor.shutdown(wait=True)
+    stats = hasher.stats()
+    assert stats['queue_depth'] == 0
+    assert stats['timeouts'] == 1
+    assert stats['rejected'] == 1
+    assert stats['completed'] == 0
+
+def test_only_successful_jobs_count_as_completed():
+    hasher = PasswordHasher(workers=1, max_pending=4, rounds=4, executor='thread')
+    hashed = hasher.hash('secret123')
+
+    assert hasher.verify('secret123', hashed)
+    with pytest.raises(ValueError):
+        hasher.verify('secret123', 'not a bcrypt hash')
+
+    stats = hasher.stats()
+    assert stats['completed'] == 2
+    assert stats['failed'] == 1
+    assert stats['queue_depth'] == 0
+    hasher.shutdown()
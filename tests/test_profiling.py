@@ -0,0 +1,70 @@
+import json
+import logging
+import time
+
+from flask import Flask
+
+from profiling import RequestProfiler
+
+def profiled_app(profiler, trigger='header'):
+    app = Flask(__name__)
+
+    @app.route('/slow')
+    def slow():
+        profiler.record_query('GET', '/rest/v1/properties', None, 0.002, 200)
+        time.sleep(0.02)
+        return 'done'
+
+    app.view_functions['slow'] = profiler.wrap(app.view_functions['slow'], lambda: trigger)
+    return app
+
+def test_profiled_request_leaves_its_files(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), interval=0.001)
+    response = profiled_app(profiler).test_client().get('/slow?page=2')
+
+    profile_id = response.headers['X-Profile-Id']
+    assert {path.name for path in tmp_path.iterdir()} == {f'{profile_id}.prof', f'{profile_id}.collapsed', f'{profile_id}.json'}
+    report = json.loads((tmp_path / f'{profile_id}.json').read_text())
+    assert report['path'] == '/slow?page=2'
+    assert report['trigger'] == 'header'
+    assert report['duration_ms'] >= 20
+    assert report['queries'][0]['table'] == 'properties'
+    assert report['db_calls'] == 1
+    assert profiler.stats()['profiled'] == 1
+
+def test_unchosen_requests_are_not_profiled(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path))
+    response = profiled_app(profiler, trigger=None).test_client().get('/slow')
+
+    assert 'X-Profile-Id' not in response.headers
+    assert not tmp_path.exists() or not list(tmp_path.iterdir())
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), max_profiles=2)
+    client = profiled_app(profiler).test_client()
+    ids = [client.get('/slow').headers['X-Profile-Id'] for _ in range(3)]
+
+    assert {path.name.rsplit('.', 1)[0] for path in tmp_path.iterdir()} == set(ids[1:])
+
+def test_failed_saves_are_logged_and_the_response_still_sent(tmp_path, caplog):
+    blocked = tmp_path / 'not-a-directory'
+    blocked.write_text('')
+    profiler = RequestProfiler(directory=str(blocked))
+
+    with caplog.at_level(logging.ERROR, logger='profiling'):
+        response = profiled_app(profiler).test_client().get('/slow')
+
+    assert response.get_data(as_text=True) == 'done'
+    assert 'X-Profile-Id' not in response.headers
+    assert profiler.stats()['errors'] == 1
+    assert 'Saving profile' in caplog.text
+
+def test_only_admins_can_ask_for_a_profile(easypg, make_user):
+    user_id, headers = make_user('student')
+    with easypg.app.test_request_context('/api/properties', headers=dict(headers, **{'X-Profile': '1'})):
+        assert easypg.profile_trigger() is None
+
+    easypg.db.users.update(user_id, {'user_type': 'admin'})
+    easypg.invalidate_user_context(user_id)
+    with easypg.app.test_request_context('/api/properties', headers=dict(headers, **{'X-Profile': '1'})):
+        assert easypg.profile_trigger() == 'header'
@@ -0,0 +1,38 @@
+def list_page(client, city, **params):
+    response = client.get('/api/properties', query_string=dict(params, city=city, per_page=2))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_offset_pages_count_every_match(client, make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    for rent in (5000, 6000, 7000, 8000, 9000):
+        make_property(owner, city=unique_city, rent_per_month=rent)
+
+    pagination = list_page(client, unique_city, sort='rent')['pagination']
+    assert pagination['total'] == 5
+    assert pagination['pages'] == 3
+    assert pagination['total_is_estimate'] is False
+    assert pagination['has_next']
+
+def test_cursor_pages_walk_every_listing_without_totals(client, make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    for rent in (5000, 6000, 7000, 8000, 9000):
+        make_property(owner, city=unique_city, rent_per_month=rent)
+
+    page = list_page(client, unique_city, sort='rent')
+    rents = [prop['rent_per_month'] for prop in page['properties']]
+    while page['pagination']['next_cursor']:
+        page = list_page(client, unique_city, sort='rent', cursor=page['pagination']['next_cursor'])
+        pagination = page['pagination']
+        # A count here would only cover the rows after the cursor
+        assert pagination['total'] is None
+        assert pagination['pages'] is None
+        assert pagination['total_is_estimate'] is None
+        assert pagination['has_prev']
+        rents += [prop['rent_per_month'] for prop in page['properties']]
+
+    assert rents == [5000, 6000, 7000, 8000, 9000]
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get('/api/properties?cursor=not-a-cursor')
+    assert response.status_code == 400
@@ -0,0 +1,35 @@
+import pytest
+
+def make_admin(easypg, make_user):
+    user_id, headers = make_user('student')
+    easypg.db.users.update(user_id, {'user_type': 'admin'})
+    easypg.invalidate_user_context(user_id)
+    return headers
+
+def test_views_return_exactly_their_fields(client, make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    make_property(owner, city=unique_city)
+
+    card = client.get('/api/properties', query_string={'city': unique_city, 'fields': 'card'}).get_json()['properties'][0]
+    assert set(card) == {'id', 'property_name', 'city', 'state', 'rent_per_month', 'available_rooms',
+                         'gender_preference', 'image', 'rating', 'review_count'}
+    picked = client.get('/api/properties', query_string={'city': unique_city, 'fields': 'id,rent_per_month'}).get_json()
+    assert set(picked['properties'][0]) == {'id', 'rent_per_month'}
+
+def test_unknown_fields_are_rejected(client):
+    assert client.get('/api/properties?fields=id,password_hash').status_code == 400
+
+@pytest.mark.parametrize('fields', ['admin', 'owner_id', 'id,updated_at', 'owner_id,updated_at,owner'])
+def test_admin_only_fields_need_an_admin(client, easypg, make_user, make_property, unique_city, fields):
+    owner_id, owner = make_user('owner')
+    property_id = make_property(owner, city=unique_city)
+    query = {'city': unique_city, 'fields': fields}
+
+    assert client.get('/api/properties', query_string=query).status_code == 403
+    assert client.get('/api/properties', query_string=query, headers=owner).status_code == 403
+    assert client.get(f'/api/properties/{property_id}', query_string={'fields': fields}).status_code == 403
+
+    response = client.get('/api/properties', query_string=query, headers=make_admin(easypg, make_user))
+    assert response.status_code == 200
+    if 'owner_id' in fields or fields == 'admin':
+        assert response.get_json()['properties'][0]['owner_id'] == owner_id
@@ -0,0 +1,67 @@
+from ratings import RatingSummary, aggregate_reviews
+
+def review(client, headers, property_id, rating):
+    response = client.post(f'/api/properties/{property_id}/reviews', headers=headers, json={'rating': rating, 'review_text': 'Nice'})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+def stored_summary(easypg, property_id):
+    rows = easypg.db.rating_summaries.select('*').eq('property_id', property_id).execute().data
+    return rows[0] if rows else None
+
+def actual_ratings(easypg, property_id):
+    return [row['rating'] for row in easypg.db.reviews.select('rating').eq('property_id', property_id).execute().data]
+
+def test_stored_summary_follows_the_reviews(client, easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner)
+    students = [make_user('student')[1] for _ in range(4)]
+
+    created = [review(client, headers, property_id, rating) for headers, rating in zip(students, (5, 4, 4, 2))]
+    assert created[-1]['rating'] == {'rating': 3.8, 'review_count': 4, 'histogram': {'1': 0, '2': 1, '3': 0, '4': 2, '5': 1}}
+
+    ratings = actual_ratings(easypg, property_id)
+    row = stored_summary(easypg, property_id)
+    assert row['review_count'] == len(ratings)
+    assert row['rating_sum'] == sum(ratings)
+    assert [row[f'rating_{star}'] for star in range(1, 6)] == [ratings.count(star) for star in range(1, 6)]
+
+    review_id = client.get(f'/api/properties/{property_id}/reviews?sort=rating').get_json()['reviews'][0]['id']
+    assert client.delete(f'/api/reviews/{review_id}', headers=students[3]).status_code == 200
+    ratings = actual_ratings(easypg, property_id)
+    row = stored_summary(easypg, property_id)
+    assert sorted(ratings) == [4, 4, 5]
+    assert (row['review_count'], row['rating_sum']) == (3, 13)
+
+def test_responses_read_the_summary(client, easypg, make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, city=unique_city)
+    for rating in (5, 2):
+        review(client, make_user('student')[1], property_id, rating)
+    # Nothing in memory: the numbers come from property_rating_summary
+    easypg.rating_store.clear()
+
+    detail = client.get(f'/api/properties/{property_id}').get_json()['property']
+    assert (detail['rating'], detail['review_count']) == (3.5, 2)
+    assert detail['rating_histogram'] == {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1}
+    listing = client.get('/api/properties', query_string={'city': unique_city}).get_json()['properties'][0]
+    assert (listing['rating'], listing['review_count']) == (3.5, 2)
+
+def test_one_review_per_student(client, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner)
+    _, student = make_user('student')
+
+    review(client, student, property_id, 4)
+    assert client.post(f'/api/properties/{property_id}/reviews', headers=student, json={'rating': 5}).status_code == 409
+    assert client.post(f'/api/properties/{property_id}/reviews', headers=owner, json={'rating': 5}).status_code == 403
+
+def test_aggregate_matches_the_plain_average():
+    reviews = [{'property_id': 'a', 'rating': rating} for rating in (1, 3, 3, 5)] + [{'property_id': 'b', 'rating': 2}]
+    summaries = aggregate_reviews(reviews)
+
+    assert summaries['a'].average == 3.0
+    assert summaries['a'].to_row('a') == {'property_id': 'a', 'review_count': 4, 'rating_sum': 12,
+                                         'rating_1': 1, 'rating_2': 0, 'rating_3': 2, 'rating_4': 0, 'rating_5': 1}
+    assert RatingSummary.from_row(summaries['b'].to_row('b')).to_dict()['rating'] == 2.0
+    assert RatingSummary().average == 0
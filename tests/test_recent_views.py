@@ -0,0 +1,92 @@
+import pytest
+
+from recent_views import RecentViews
+
+class Table:
+    """recently_viewed in memory, counting the calls made to it."""
+
+    def __init__(self, rows=None):
+        self.rows = dict(rows or {})
+        self.loads = []
+        self.saves = []
+        self.fail = False
+
+    def load(self, user_ids):
+        self.loads.append(list(user_ids))
+        return {user_id: self.rows[user_id] for user_id in user_ids if user_id in self.rows}
+
+    def save(self, rows):
+        if self.fail:
+            raise ConnectionError('database unreachable')
+        self.saves.append(rows)
+        self.rows.update((row['user_id'], row['items']) for row in rows)
+
+@pytest.fixture
+def table():
+    return Table()
+
+@pytest.fixture
+def views(table):
+    # A flush interval long enough that only the test flushes
+    views = RecentViews(table.load, table.save, size=3, flush_seconds=3600, batch_size=2)
+    yield views
+    views.stopped.set()
+
+def test_views_are_newest_first_unique_and_bounded(views):
+    for property_id in ('a', 'b', 'c', 'a', 'd'):
+        views.record('u1', property_id)
+    assert views.recent('u1') == ['d', 'a', 'c']
+    assert views.recent('u1', limit=2) == ['d', 'a']
+
+def test_recording_never_writes_and_flushes_batch_the_writes(views, table):
+    for user_id in ('u1', 'u2', 'u3'):
+        views.record(user_id, 'a')
+        views.record(user_id, 'b')
+    assert table.saves == []
+
+    assert views.flush() == 3
+    # One read for every buffer that was never loaded, then batch_size rows per upsert
+    assert [sorted(user_ids) for user_ids in table.loads] == [['u1', 'u2', 'u3']]
+    assert [len(batch) for batch in table.saves] == [2, 1]
+    assert [item['property_id'] for item in table.rows['u1']] == ['b', 'a']
+    assert views.flush() == 0
+
+def test_stored_views_are_merged_not_overwritten(table):
+    table.rows['u1'] = [{'property_id': 'old', 'viewed_at': '2020-01-01T00:00:00'}]
+    views = RecentViews(table.load, table.save, size=3, flush_seconds=3600)
+    views.record('u1', 'new')
+
+    views.flush()
+    assert [item['property_id'] for item in table.rows['u1']] == ['new', 'old']
+    assert views.recent('u1') == ['new', 'old']
+    views.stopped.set()
+
+def test_failed_flushes_are_retried(views, table):
+    views.record('u1', 'a')
+    table.fail = True
+    with pytest.raises(ConnectionError):
+        views.flush()
+    assert views.stats()['pending_users'] == 1
+    assert views.stats()['flush_errors'] == 1
+
+    table.fail = False
+    assert views.flush() == 1
+    assert views.stats()['pending_users'] == 0
+
+def test_recent_pgs_follow_detail_views(client, easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    first, second = make_property(owner, available_rooms=0), make_property(owner)
+    user_id, student = make_user('student')
+
+    for property_id in (first, second, first):
+        assert client.get(f'/api/properties/{property_id}', headers=student).status_code == 200
+    # Anonymous views aren't recorded
+    client.get(f'/api/properties/{second}')
+
+    items = client.get('/api/dashboard/recent-pgs', headers=student).get_json()['items']
+    assert [(item['id'], item['status']) for item in items] == [(first, 'Full'), (second, 'Available')]
+
+    # Another worker reads them back once they're flushed
+    easypg.recent_views.flush()
+    other_worker = RecentViews(easypg.load_recent_views, easypg.db.recently_viewed.upsert, flush_seconds=3600)
+    assert other_worker.recent(user_id) == [first, second]
@@ -0,0 +1,65 @@
+import pytest
+
+from response_cache import MemoryStore, create_response_cache
+
+@pytest.fixture
+def cache(easypg, monkeypatch):
+    """The response cache on an empty in-memory store (the suite runs with it off)."""
+    monkeypatch.setattr(easypg.response_cache, 'store', MemoryStore(1024 * 1024))
+    return easypg.response_cache
+
+def test_repeat_requests_hit_the_cache(client, cache, make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    make_property(owner, city=unique_city)
+
+    first = client.get('/api/properties', query_string={'city': unique_city, 'sort': 'rent'})
+    # Parameter order doesn't matter
+    second = client.get('/api/properties', query_string={'sort': 'rent', 'city': unique_city})
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.get_data() == first.get_data()
+    assert first.headers['Cache-Control'] == 'public, max-age=0, must-revalidate'
+
+def test_matching_validators_get_304(client, cache, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner)
+    first = client.get(f'/api/properties/{property_id}')
+
+    revalidated = client.get(f'/api/properties/{property_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+    since = client.get(f'/api/properties/{property_id}', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    assert client.get(f'/api/properties/{property_id}', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_writes_invalidate_what_depends_on_them(client, cache, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, available_rooms=5)
+    first = client.get(f'/api/properties/{property_id}')
+
+    assert client.put(f'/api/properties/{property_id}/availability', headers=owner, json={'available_rooms': 4}).status_code == 200
+    after = client.get(f'/api/properties/{property_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert after.status_code == 200
+    assert after.headers['X-Cache'] == 'MISS'
+    assert after.get_json()['property']['available_rooms'] == 4
+
+def test_authenticated_requests_bypass_the_cache(client, cache, make_user):
+    _, headers = make_user('student')
+    before = cache.stats()
+    response = client.get('/api/properties', headers=headers)
+    assert 'X-Cache' not in response.headers
+    assert cache.stats() == before
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_stores_evict_and_invalidate_by_tag(backend, tmp_path):
+    cache = create_response_cache(backend, ttl=60, max_bytes=100, path=str(tmp_path / 'cache.sqlite3'))
+    cache.set('/a', b'x' * 60, 'application/json', ['properties'])
+    cache.set('/b', b'y' * 30, 'application/json', ['property:1'])
+    cache.set('/c', b'z' * 30, 'application/json', ['property:2'])
+
+    # Over max_bytes, the least recently used entry goes first
+    assert cache.get('/a') is None
+    cache.invalidate('property:1')
+    assert cache.get('/b') is None
+    assert cache.get('/c').body == b'z' * 30
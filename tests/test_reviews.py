@@ -0,0 +1,53 @@
+import pytest
+
+RATINGS = (5, 3, 4, 1, 5, 2, 4)
+
+@pytest.fixture
+def reviewed_property(easypg, make_user, make_property, monkeypatch):
+    """A listing with one review per rating in RATINGS, a minute apart, oldest first."""
+    monkeypatch.setitem(easypg.app.config, 'REVIEWS_PREVIEW_SIZE', 3)
+    _, owner = make_user('owner')
+    property_id = make_property(owner)
+    easypg.db.reviews.insert([{
+        'property_id': property_id,
+        'student_id': make_user('student')[0],
+        'rating': rating,
+        'review_text': f'Review {i}',
+        'created_at': f'2030-01-01T10:{i:02d}:00'
+    } for i, rating in enumerate(RATINGS)])
+    return property_id
+
+def walk(client, property_id, cursor=None, **params):
+    """Every review from cursor on, a page at a time."""
+    reviews = []
+    while True:
+        query = dict(params, per_page=2, **({'cursor': cursor} if cursor else {}))
+        response = client.get(f'/api/properties/{property_id}/reviews', query_string=query)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        assert len(page['reviews']) <= 2
+        reviews += page['reviews']
+        cursor = page['pagination']['next_cursor']
+        if not cursor:
+            assert not page['pagination']['has_next']
+            return reviews
+
+def test_detail_previews_the_newest_reviews(client, reviewed_property):
+    detail = client.get(f'/api/properties/{reviewed_property}').get_json()['property']
+    assert [review['review_text'] for review in detail['reviews']] == ['Review 6', 'Review 5', 'Review 4']
+
+    rest = walk(client, reviewed_property, detail['reviews_next_cursor'])
+    assert [review['review_text'] for review in rest] == ['Review 3', 'Review 2', 'Review 1', 'Review 0']
+
+def test_pages_cover_every_review_once_in_order(client, reviewed_property):
+    newest = walk(client, reviewed_property)
+    assert [review['review_text'] for review in newest] == [f'Review {i}' for i in reversed(range(len(RATINGS)))]
+
+    by_rating = walk(client, reviewed_property, sort='-rating')
+    assert [review['rating'] for review in by_rating] == sorted(RATINGS, reverse=True)
+    assert len({review['id'] for review in by_rating}) == len(RATINGS)
+
+def test_bad_parameters_and_missing_properties(client, reviewed_property):
+    assert client.get(f'/api/properties/{reviewed_property}/reviews?sort=helpful').status_code == 400
+    assert client.get(f'/api/properties/{reviewed_property}/reviews?cursor=nope').status_code == 400
+    assert client.get('/api/properties/00000000-0000-0000-0000-000000000000/reviews').status_code == 404
@@ -0,0 +1,60 @@
+def save(client, headers, property_id, **body):
+    return client.put(f'/api/saved/{property_id}', headers=headers, json=body)
+
+def stored_count(easypg, student_id):
+    rows = easypg.db.saved_counts.select('saved_count').eq('student_id', student_id).execute().data
+    return rows[0]['saved_count'] if rows else 0
+
+def test_saved_listings_come_back_hydrated_and_sorted(client, easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    cheap, middle, dear = (make_property(owner, rent_per_month=rent) for rent in (5000, 7000, 9000))
+    student_id, student = make_user('student')
+
+    for property_id in (middle, dear, cheap):
+        assert save(client, student, property_id, notes=f'note {property_id[:4]}').status_code == 201
+    review = client.post(f'/api/properties/{middle}/reviews', headers=student, json={'rating': 5})
+    assert review.status_code == 201
+
+    def order(**params):
+        body = client.get('/api/saved', headers=student, query_string=params).get_json()
+        return [prop['id'] for prop in body['properties']]
+
+    assert order() == [cheap, dear, middle]
+    assert order(sort='price_low') == [cheap, middle, dear]
+    assert order(sort='price_high') == [dear, middle, cheap]
+    assert order(sort='rating') == [middle, cheap, dear]
+    assert order(sort='price_low', per_page=2, page=2) == [dear]
+
+    body = client.get('/api/saved', headers=student, query_string={'fields': 'card'}).get_json()
+    assert body['saved_count'] == stored_count(easypg, student_id) == 3
+    assert body['properties'][0]['notes'] == f'note {cheap[:4]}'
+    assert body['properties'][0]['saved_at']
+    assert 'description' not in body['properties'][0]
+    assert sorted(client.get('/api/saved/ids', headers=student).get_json()['property_ids']) == sorted([cheap, middle, dear])
+
+def test_saving_twice_and_unsaving_keep_the_count_right(client, easypg, make_user, make_property):
+    _, owner = make_user('owner')
+    property_id = make_property(owner)
+    student_id, student = make_user('student')
+
+    assert save(client, student, property_id).get_json()['saved_count'] == 1
+    again = save(client, student, property_id)
+    assert again.status_code == 200
+    assert again.get_json()['saved_count'] == stored_count(easypg, student_id) == 1
+
+    removed = client.delete(f'/api/saved/{property_id}', headers=student)
+    assert removed.get_json()['saved_count'] == stored_count(easypg, student_id) == 0
+    assert client.delete(f'/api/saved/{property_id}', headers=student).status_code == 404
+
+def test_saving_is_limited_and_students_only(client, easypg, make_user, make_property, monkeypatch):
+    monkeypatch.setitem(easypg.app.config, 'SAVED_PROPERTIES_LIMIT', 1)
+    _, owner = make_user('owner')
+    first, second = make_property(owner), make_property(owner)
+    _, student = make_user('student')
+
+    assert save(client, owner, first).status_code == 403
+    assert save(client, student, '00000000-0000-0000-0000-000000000000').status_code == 404
+    assert save(client, student, first, notes=5).status_code == 400
+    assert save(client, student, first).status_code == 201
+    assert save(client, student, second).status_code == 400
+    assert client.get('/api/saved?sort=cheapest', headers=student).status_code == 400
@@ -0,0 +1,61 @@
+import pytest
+
+from search_index import PropertySearchIndex
+
+def listing(doc_id, **fields):
+    return dict({
+        'id': f'pg-{doc_id}', 'property_name': f'PG {doc_id}', 'city': 'Rajkot', 'property_type': 'boys_pg',
+        'gender_preference': 'boys_only', 'amenities': ['wifi'], 'rent_per_month': 7000, 'available_rooms': 2,
+        'status': 'approved', 'created_at': f'2030-01-0{doc_id}'
+    }, **fields)
+
+@pytest.fixture
+def index():
+    index = PropertySearchIndex(refresh_seconds=0)
+    index.rebuild([
+        listing(1, property_name='Green Valley PG', amenities=['wifi', 'meals'], rent_per_month=6000),
+        listing(2, property_name='Sunrise Residency', city='Pune', property_type='girls_pg',
+                gender_preference='girls_only', rent_per_month=9000, landmark='Near Green Park'),
+        listing(3, property_name='Metro Heights', amenities=['wifi', 'meals', 'gym'], rent_per_month=12000),
+        listing(4, property_name='Green Acres', status='pending')
+    ])
+    return index
+
+def ids(docs):
+    return [int(doc['id'][3:]) for doc in docs]
+
+def test_text_matches_rank_by_field_weight(index):
+    docs, total, _ = index.search('green')
+    # A name match outweighs a landmark match; pending listings never show
+    assert ids(docs) == [1, 2]
+    assert total == 2
+    assert ids(index.search('gre')[0]) == [1, 2]
+
+def test_filters_combine(index):
+    docs, _, _ = index.search(filters={'city': 'RAJKOT', 'amenities': ['meals'], 'min_rent': 7000})
+    assert ids(docs) == [3]
+    assert ids(index.search(filters={'max_rent': 9000}, sort='rent')[0]) == [1, 2]
+
+def test_facets_count_the_whole_match_not_the_page(index):
+    docs, total, facets = index.search(limit=1)
+    assert len(docs) == 1 and total == 3
+    assert facets['city'] == {'Rajkot': 2, 'Pune': 1}
+    assert facets['amenities'] == {'wifi': 3, 'meals': 2, 'gym': 1}
+    assert facets['rent'] == {'5000-7500': 1, '7500-10000': 1, '10000-15000': 1}
+
+def test_updates_and_removals_show_up_at_once(index):
+    index.update('pg-4', {'status': 'approved'})
+    assert 4 in ids(index.search('green')[0])
+    index.remove('pg-1')
+    assert ids(index.search('green')[0]) == [4, 2]
+
+def test_search_endpoint(client, easypg, make_user, make_property, unique_city):
+    _, owner = make_user('owner')
+    property_id = make_property(owner, city=unique_city, amenities=['wifi'])
+    easypg.search_index.update(property_id, {'status': 'approved'})
+
+    body = client.get('/api/search', query_string={'q': unique_city}).get_json()
+    assert [prop['id'] for prop in body['properties']] == [property_id]
+    assert body['facets']['city'] == {unique_city: 1}
+    assert 'description' not in body['properties'][0]
+    assert client.get('/api/search?sort=cheapest').status_code == 400
@@ -0,0 +1,71 @@
+import pytest
+from postgrest.exceptions import APIError
+
+from repositories import create_repositories
+
+@pytest.fixture
+def repos(tmp_path):
+    return create_repositories('sqlite', sqlite_path=str(tmp_path / 'easypg.sqlite3'), fanout_workers=2)
+
+def add_owner(repos, email='owner@easypg.com'):
+    return repos.users.insert({'email': email, 'full_name': 'Owner', 'phone': '9876543210', 'user_type': 'owner'})[0]
+
+def add_listings(repos, owner, rents, city='Rajkot'):
+    return repos.properties.insert([{
+        'property_name': f'PG {rent}', 'property_type': 'boys_pg', 'address': 'University Road', 'city': city,
+        'state': 'Gujarat', 'pincode': '360005', 'total_rooms': 10, 'available_rooms': 5, 'rent_per_month': rent,
+        'security_deposit': 1000, 'gender_preference': 'boys_only', 'amenities': ['wifi', 'meals'],
+        'owner_id': owner['id'], 'owner_name': owner['full_name'], 'owner_phone': owner['phone'], 'owner_email': owner['email']
+    } for rent in rents])
+
+def test_inserted_rows_come_back_with_defaults_and_types(repos):
+    owner = add_owner(repos)
+    listing = add_listings(repos, owner, [7000])[0]
+
+    assert listing['id'] and listing['created_at']
+    assert listing['status'] == 'pending'
+    assert listing['amenities'] == ['wifi', 'meals']
+    assert repos.properties.get(listing['id'], 'rent_per_month') == {'rent_per_month': 7000}
+
+def test_filters_order_ranges_and_counts(repos):
+    owner = add_owner(repos)
+    add_listings(repos, owner, [5000, 6000, 7000, 8000], city='Rajkot')
+    add_listings(repos, owner, [9000], city='Pune')
+
+    result = (repos.properties.select('rent_per_month', count='exact')
+              .ilike('city', '%raj%').gte('rent_per_month', 6000)
+              .order('rent_per_month', desc=True).range(0, 2).execute())
+    assert [row['rent_per_month'] for row in result.data] == [8000, 7000]
+    assert result.count == 3
+    assert repos.properties.count(city='Pune') == 1
+
+    either = repos.properties.select('rent_per_month').order('rent_per_month')
+    # postgrest-py 0.10 has no or_(); the app adds the param itself
+    either.params = either.params.add('or', '(rent_per_month.lt.6000,city.eq.Pune)')
+    either = either.execute()
+    assert [row['rent_per_month'] for row in either.data] == [5000, 9000]
+
+def test_embedded_relations(repos):
+    owner = add_owner(repos)
+    listing = add_listings(repos, owner, [7000])[0]
+    repos.property_images.insert_many([
+        {'property_id': listing['id'], 'image_url': f'/static/images/{order}.jpg', 'image_order': order} for order in (1, 0)
+    ])
+
+    row = (repos.properties.select('id, property_images(image_url), users(full_name)')
+           .order('image_order', foreign_table='property_images').eq('id', listing['id']).execute().data[0])
+    assert [image['image_url'] for image in row['property_images']] == ['/static/images/0.jpg', '/static/images/1.jpg']
+    assert row['users'] == {'full_name': 'Owner'}
+
+def test_constraint_errors_surface_as_postgrest_errors(repos):
+    add_owner(repos)
+    with pytest.raises(APIError):
+        add_owner(repos)
+
+def test_gather_returns_results_in_call_order(repos):
+    owner = add_owner(repos)
+    add_listings(repos, owner, [5000, 6000])
+
+    listings, owners = repos.gather(repos.properties.select('id'), repos.users.select('id'))
+    assert len(listings.data) == 2
+    assert owners.data == [{'id': owner['id']}]
@@ -0,0 +1,153 @@
+"""
+Revoked JWTs for EasyPG.
+
+Each token carries a jti (token id). Logging out records the token's jti in
+revoked_tokens (scripts/revoked-tokens.sql) until the token would have
+expired anyway, and every process keeps the revoked ids in memory, so
+checking a token on each request is a dict lookup rather than a database
+round-trip. A background thread picks up revocations made by other
+processes every sync_seconds and forgets ids whose tokens have expired.
+
+A token revoked in this process is refused at once; in other processes,
+within sync_seconds.
+
+The stored list is loaded once per process by start(), which the server
+entrypoints call at startup rather than on import. If that fails, the
+background thread retries every retry_seconds, and until it succeeds token
+checks raise RevocationsUnavailable rather than let revoked tokens through
+or wait on the database themselves.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+# Revocations committed late (a slow insert elsewhere) can carry a revoked_at
+# before the last sync; each sync looks this far back so none are missed
+SYNC_OVERLAP_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+class RevocationsUnavailable(Exception):
+    """Raised when a token is checked before the revocation list has loaded."""
+
+def epoch(value):
+    """Seconds since the epoch for an ISO timestamp (UTC when it has no offset)."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class RevocationList:
+    """In-memory set of revoked token ids, each kept until its token expires.
+
+    load(since) must return [{'jti', 'expires_at'}, ...] for unexpired
+    revocations made at or after since (an ISO timestamp; None for all of
+    them); store(jti, user_id, expires_at) records one; purge(before), if
+    given, deletes revocations whose tokens expired before then.
+    """
+
+    def __init__(self, load, store, purge=None, sync_seconds=30, purge_seconds=3600, retry_seconds=5):
+        self.load = load
+        self.store = store
+        self.purge = purge
+        self.sync_seconds = sync_seconds
+        self.retry_seconds = retry_seconds
+        self.purge_seconds = purge_seconds
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        # jti -> expiry of its token, in seconds since the epoch
+        self.revoked = {}
+        self.loaded = False
+        self.synced_at = None
+        self.purged_at = time.time()
+        self.started = False
+        self.start_lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.syncs = 0
+        self.sync_errors = 0
+
+    def start(self):
+        """Load the stored list and start syncing in the background; later calls do nothing.
+
+        A failed load is logged and retried by the background thread. Calls
+        made while the first is loading wait for it.
+        """
+        if self.started:
+            return
+        with self.start_lock:
+            if self.started:
+                return
+            try:
+                self.sync()
+            except Exception:
+                self.sync_errors += 1
+                logger.exception('Loading revoked tokens failed (is scripts/revoked-tokens.sql applied?); '
+                                 'authenticated requests get 503 until a retry succeeds, every %ss', self.retry_seconds)
+            self._ensure_thread()
+            self.started = True
+
+    def is_revoked(self, jti):
+        # Started before a pre-forking server forked: the child has the ids but not the thread
+        self._ensure_thread()
+        if not self.loaded:
+            # Until the stored list is in, revoked tokens would pass
+            raise RevocationsUnavailable('Token revocations are still loading, please retry')
+        return jti in self.revoked
+
+    def revoke(self, jti, user_id, expires_at):
+        """Revoke a token until expires_at (seconds since the epoch)."""
+        self.store(jti, user_id, datetime.utcfromtimestamp(expires_at).isoformat())
+        with self.lock:
+            self.revoked[jti] = expires_at
+
+    def sync(self):
+        """Merge revocations stored since the last sync, and drop expired ones."""
+        with self.sync_lock:
+            started = time.time()
+            since = None
+            if self.loaded:
+                since = datetime.utcfromtimestamp(self.synced_at - SYNC_OVERLAP_SECONDS).isoformat()
+            rows = self.load(since)
+
+            with self.lock:
+                for row in rows:
+                    self.revoked[row['jti']] = epoch(row['expires_at'])
+                for jti in [jti for jti, expires_at in self.revoked.items() if expires_at <= started]:
+                    del self.revoked[jti]
+                self.synced_at = started
+                self.loaded = True
+                self.syncs += 1
+
+            if self.purge is not None and started - self.purged_at >= self.purge_seconds:
+                self.purge(datetime.utcfromtimestamp(started).isoformat())
+                self.purged_at = started
+        return len(rows)
+
+    def _ensure_thread(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.sync_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='token-revocation-sync', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.sync_seconds if self.loaded else self.retry_seconds):
+            try:
+                self.sync()
+            except Exception:
+                # The ids already held stay in force; retried on the next tick
+                self.sync_errors += 1
+                logger.exception('Token revocation sync failed')
+
+    def stats(self):
+        with self.lock:
+            return {
+                'revoked': len(self.revoked),
+                'syncs': self.syncs,
+                'sync_errors': self.sync_errors,
+                'synced_at': datetime.utcfromtimestamp(self.synced_at).isoformat() if self.synced_at else None
+            }